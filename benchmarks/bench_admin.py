@@ -0,0 +1,139 @@
+"""Latência do changelist de usuários no admin: paginação padrão x ``KeysetAdminMixin``.
+
+Uso::
+
+    DOCKER_MODE=True python -m benchmarks.bench_admin --users 10000000 --keepdb
+
+Popula ``--users`` usuários (2% inativos, 0,1% da equipe, cadastros ao longo
+de cinco anos) e mede ``GET /admin/users/customuser/`` renderizado por
+inteiro, como o navegador recebe, em cada cenário: primeira página, página
+profunda (``?p=`` com ``OFFSET`` no padrão, cursor no keyset), filtros de
+inativos, equipe e data, ordenação por email e busca.
+
+O modo padrão é o ``UserAdmin`` do Django: ``Paginator`` com ``COUNT(*)``
+filtrado, contagem total sem filtros e páginas por ``OFFSET``. No SQLite não
+há estimativa de linhas e os dois modos contam de verdade.
+"""
+import argparse
+import random
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlencode
+
+from benchmarks.bench_search import FIRST_NAMES, PLACES, email
+from benchmarks.common import analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize
+
+COLUMNS = ('password', 'is_superuser', 'email', 'name', 'is_active', 'is_staff', 'created_at', 'updated_at')
+URL = '/admin/users/customuser/'
+
+
+def user_rows(count):
+    from django.utils import timezone
+
+    rng = random.Random(1)
+    start = timezone.now() - timedelta(days=5 * 365)
+    step = 5 * 365 * 86400 / count
+    for i in range(count):
+        created = start + timedelta(seconds=i * step)
+        name = f'{FIRST_NAMES[i % len(FIRST_NAMES)]} {rng.choice(PLACES)}'
+        yield ('!', False, email(i), name, rng.random() >= 0.02, rng.random() < 0.001, created, created)
+
+
+@contextmanager
+def without_indexes(connection, table):
+    """No PostgreSQL, remove os índices secundários durante a carga e os recria depois (bem mais rápido)."""
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid '
+            'WHERE x.indrelid = %s::regclass '
+            'AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)', [table])
+        indexes = cursor.fetchall()
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    yield
+    with connection.cursor() as cursor:
+        cursor.execute("SET maintenance_work_mem = '512MB'")
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+
+def default_admin():
+    """O ``UserAdmin`` padrão no lugar do ``KeysetAdminMixin``."""
+    from django.contrib import admin
+    from django.core.paginator import Paginator
+
+    from users.admin import CustomUserAdmin
+
+    return mock.patch.multiple(
+        CustomUserAdmin, paginator=Paginator, show_full_result_count=True, show_facets=admin.ShowFacets.ALLOW,
+        change_list_template=None, get_changelist=admin.ModelAdmin.get_changelist,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--deep', type=int, default=5_000, help='Página profunda (100 usuários por página)')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.utils import timezone
+
+    from core.pagination import encode_position
+    from users.admin import CustomUserAdmin
+
+    User = get_user_model()
+    per_page = CustomUserAdmin.list_per_page
+    rows = []
+    with bench_database(keepdb=args.keepdb) as connection:
+        vendor = connection.vendor
+        table = User._meta.db_table
+        if not User.objects.exclude(email='admin@bench.local').exists():
+            with without_indexes(connection, table):
+                bulk_insert(table, COLUMNS, user_rows(args.users))
+            analyze(table)
+        admin_user = User.objects.filter(email='admin@bench.local').first() or User.objects.create_superuser(
+            email='admin@bench.local', password='benchpass123')
+        client = Client()
+        client.force_login(admin_user)
+
+        anchor = User.objects.order_by('-created_at', '-id').values_list('created_at', 'id')[args.deep * per_page - 1]
+        cursor = encode_position(['-created_at', '-id'], anchor)
+        # Como o filtro de data do admin gera: meia-noite local, com fuso.
+        midnight = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        week = urlencode({'created_at__gte': midnight - timedelta(days=7)})
+        cases = (
+            ('primeira página', '', ''),
+            (f'página {args.deep:,}', f'p={args.deep}', f'cursor={cursor}'),
+            ('inativos', 'is_active__exact=0', None),
+            ('equipe', 'is_staff__exact=1', None),
+            ('últimos 7 dias', week, None),
+            ('por email', 'o=1', None),
+            ('busca email', f'q={email(args.users // 3).split("@")[0][-8:]}', None),
+            ('busca nome', 'q=lara vista', None),
+        )
+        for label, default_query, keyset_query in cases:
+            for mode, query, patch in (('padrão', default_query, default_admin()),
+                                       ('keyset', default_query if keyset_query is None else keyset_query, nullcontext())):
+                with patch:
+                    url = f'{URL}?{query}'
+                    response = client.get(url)
+                    assert response.status_code == 200 and response.context['cl'].result_list, (label, mode)
+                    stats = summarize(measure(lambda: client.get(url), repeat=args.repeat, warmup=1))
+                rows.append((label, mode, f'{stats["p50_ms"]:.1f}', f'{stats["p95_ms"]:.1f}'))
+
+    print(f'{args.users:,} usuários ({vendor}), {per_page} por página')
+    print_table(('cenário', 'admin', 'p50 ms', 'p95 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
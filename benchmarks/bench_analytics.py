@@ -0,0 +1,233 @@
+"""Estatísticas do fluxo de caixa: NumPy (``transactions.analytics``) x Python puro.
+
+Uso::
+
+    DOCKER_MODE=True python -m benchmarks.bench_analytics --transactions 100000
+
+Popula um usuário com ``--transactions`` transações em cinco anos (valores e
+categorias aleatórios, mais salário e assinaturas mensais) e mede:
+
+- Python puro: laço sobre as instâncias do modelo, com ``dict`` e ``sorted``
+  (a consulta carrega objetos ``Transaction`` inteiros);
+- NumPy: uma consulta ``values_list`` convertida em arrays e o cálculo
+  vetorizado;
+- a memorização: ``for_user`` com o histórico inalterado (só a consulta da
+  versão).
+
+Leitura e cálculo aparecem separados. Os dois cálculos devem chegar ao
+mesmo resultado: o script confere antes de medir.
+"""
+import argparse
+import bisect
+import math
+import statistics
+from collections import defaultdict
+from datetime import date, timedelta
+
+from benchmarks.bench_rollups import COLUMNS, transaction_rows
+from benchmarks.common import analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize
+
+# (descrição, valor, categoria, dia do mês)
+MONTHLY = (('Salário', 650_000, 1, 5), ('Aluguel', -180_000, 2, 10), ('Streaming', -3_990, 9, 18),
+           ('Academia', -11_990, 5, 2))
+
+
+def monthly_rows(user_id, today, now, years=5):
+    month = date(today.year - years, today.month, 1)
+    while month <= today:
+        for description, amount, category, day in MONTHLY:
+            if month.replace(day=day) <= today:
+                yield user_id, amount, month.replace(day=day), category, description, now, now
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+# ------------------------------------------------------------
+# PYTHON PURO: as mesmas contas de transactions.analytics, sem NumPy.
+# ------------------------------------------------------------
+def cents(value):
+    return int(round(float(value)))
+
+
+def ratio(value):
+    return round(float(value), 4)
+
+
+def month_number(day):
+    return (day.year - 1970) * 12 + day.month - 1
+
+
+def percentile(ordered, pct):
+    position = pct / 100 * (len(ordered) - 1)
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def python_analytics(transactions, today, config, labels):
+    transactions = sorted(transactions, key=lambda t: t.date)
+    windows = config['ROLLING_WINDOWS']
+    longest = max(windows)
+
+    def daily(start, end, skip=()):
+        income, expense = defaultdict(int), defaultdict(int)
+        for t in transactions:
+            if start <= t.date <= end and id(t) not in skip:
+                if t.amount > 0:
+                    income[t.date] += t.amount
+                else:
+                    expense[t.date] -= t.amount
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return [income[d] for d in days], [expense[d] for d in days]
+
+    income, expense = daily(today - timedelta(days=2 * longest - 1), today)
+    rolling = []
+    for window in windows:
+        current = sum(expense[-window:]) / window
+        previous = sum(expense[-2 * window:-window]) / window
+        earned = sum(income[-window:]) / window
+        rolling.append({'window': window, 'income': cents(earned), 'expense': cents(current),
+                        'net': cents(earned - current),
+                        'expense_change': ratio(current / previous - 1) if previous else None})
+
+    expenses = sorted(-t.amount for t in transactions if t.amount < 0)
+    percentiles = {f'p{pct}': cents(percentile(expenses, pct)) if expenses else 0 for pct in config['PERCENTILES']}
+
+    current_month = month_number(today)
+    months = list(range(current_month - config['TREND_MONTHS'], current_month))
+    matrix = {category: [0] * len(months) for category in labels}
+    for t in transactions:
+        index = month_number(t.date) - months[0]
+        if 0 <= index < len(months) and t.amount < 0 and t.category in matrix:
+            matrix[t.category][index] -= t.amount
+    monthly = [sum(matrix[category][i] for category in matrix) for i in range(len(months))]
+    _, daily_expense = daily(today - timedelta(days=longest - 1), today)
+    mean = statistics.fmean(monthly)
+    volatility = {'months': len(monthly), 'monthly_mean': cents(mean), 'monthly_std': cents(statistics.pstdev(monthly)),
+                  'coefficient_of_variation': ratio(statistics.pstdev(monthly) / mean) if mean else None,
+                  'daily_std': cents(statistics.pstdev(daily_expense))}
+
+    center = (len(months) - 1) / 2
+    xs = [i - center for i in range(len(months))]
+    month_labels = [f'{1970 + m // 12}-{m % 12 + 1:02d}' for m in months]
+    trends = []
+    for category in sorted(matrix, key=lambda c: -sum(matrix[c])):
+        series = matrix[category]
+        if not any(series):
+            continue
+        average = statistics.fmean(series)
+        slope = sum(x * (y - average) for x, y in zip(xs, series)) / sum(x * x for x in xs)
+        change = slope * (len(months) - 1) / average
+        trends.append({'category': category, 'label': labels[category], 'total': cents(sum(series)),
+                       'monthly_mean': cents(average), 'slope': cents(slope),
+                       'trend': ('up' if change > config['TREND_THRESHOLD']
+                                 else 'down' if change < -config['TREND_THRESHOLD'] else 'stable'),
+                       'series': dict(zip(month_labels, (cents(v) for v in series)))})
+
+    from transactions.analytics import PERIODS
+
+    groups = defaultdict(list)
+    for t in transactions:
+        groups[t.category, t.amount].append(t)
+    recurring, members = [], set()
+    for (category, amount), items in groups.items():
+        if len(items) < config['MIN_OCCURRENCES']:
+            continue
+        gaps = [(b.date - a.date).days for a, b in zip(items, items[1:])]
+        median = sorted(gaps)[len(gaps) // 2]
+        deviation = sum(abs(g - median) for g in gaps) / len(gaps)
+        for name, length, tolerance in PERIODS:
+            if abs(median - length) <= tolerance and deviation <= tolerance:
+                break
+        else:
+            continue
+        if (today - items[-1].date).days > median + max(tolerance, median // 4):
+            continue
+        members.update(id(t) for t in items)
+        recurring.append({'description': items[-1].description, 'category': category, 'amount': amount,
+                          'period': name, 'interval_days': median, 'occurrences': len(items),
+                          'last_date': items[-1].date, 'next_date': items[-1].date + timedelta(days=median)})
+    recurring.sort(key=lambda item: (item['next_date'], item['amount']))
+
+    income, expense = daily(today - timedelta(days=longest - 1), today, skip=members)
+    daily_net = (sum(income) - sum(expense)) / longest
+    horizon = config['FORECAST_DAYS']
+    upcoming = []
+    for item in recurring:
+        when = max(item['next_date'], today + timedelta(days=1))
+        while when <= today + timedelta(days=horizon):
+            upcoming.append({'date': when, 'description': item['description'], 'amount': item['amount']})
+            when += timedelta(days=item['interval_days'])
+    upcoming.sort(key=lambda item: (item['date'], item['amount']))
+    dates = [item['date'] for item in upcoming]
+    balance = sum(t.amount for t in transactions)
+    projections = []
+    for days in sorted({*range(30, horizon, 30), horizon}):
+        scheduled = sum(item['amount'] for item in upcoming[:bisect.bisect_right(dates, today + timedelta(days=days))])
+        projections.append({'days': days, 'date': today + timedelta(days=days),
+                            'balance': cents(balance + daily_net * days + scheduled)})
+    return {
+        'rolling': rolling, 'percentiles': percentiles, 'volatility': volatility, 'trends': trends,
+        'recurring': recurring,
+        'forecast': {'balance': balance, 'daily_net': cents(daily_net), 'projections': projections, 'upcoming': upcoming},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.utils import timezone
+
+    from transactions import analytics
+    from transactions.models import Transaction
+    from transactions.reports import CATEGORY_LABELS
+
+    User = get_user_model()
+    config = analytics.get_config()
+    today = timezone.localdate()
+    with bench_database(keepdb=args.keepdb) as connection:
+        vendor = connection.vendor
+        user, created = User.objects.get_or_create(email=f'analytics{args.transactions}@bench.local')
+        if created:
+            now = timezone.now()
+            table = Transaction._meta.db_table
+            bulk_insert(table, COLUMNS, transaction_rows(args.transactions, user.pk, today, now))
+            bulk_insert(table, COLUMNS, monthly_rows(user.pk, today, now))
+            analyze(table)
+        count = Transaction.objects.filter(user=user).count()
+
+        def load_objects():
+            return list(Transaction.objects.filter(user=user))
+
+        objects = load_objects()
+        history = analytics.load_history(user)
+        expected = python_analytics(objects, today, config, CATEGORY_LABELS)
+        result = analytics.compute(history, today, config)
+        assert result == expected, 'NumPy e Python puro divergem'
+
+        def timed(fn):
+            return summarize(measure(fn, repeat=args.repeat, warmup=1))['p50_ms']
+
+        rows = [
+            ('Python puro', timed(load_objects), timed(lambda: python_analytics(objects, today, config, CATEGORY_LABELS))),
+            ('NumPy', timed(lambda: analytics.load_history(user)), timed(lambda: analytics.compute(history, today, config))),
+        ]
+        cache.clear()
+        analytics.for_user(user, today)
+        memoized = timed(lambda: analytics.for_user(user, today))
+
+    print(f'{count:,} transações de um usuário ({vendor}), {len(result["recurring"])} recorrentes detectados')
+    print_table(('cálculo', 'leitura p50 ms', 'cálculo p50 ms', 'total p50 ms'),
+                [(label, f'{load:.1f}', f'{work:.1f}', f'{load + work:.1f}') for label, load, work in rows])
+    print(f'\nfor_user memorizado (histórico inalterado): {memoized:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Modo síncrono (WSGI) x assíncrono (ASGI) sob carga concorrente.
+
+Uso::
+
+    python -m benchmarks.bench_async --connections 500 --duration 30 [--workers 4]
+
+Popula o banco de benchmark, sobe o gunicorn duas vezes sobre ele — workers
+sync com ``core.wsgi`` e ``ASYNC_API=False``; workers uvicorn com
+``core.asgi`` e ``ASYNC_API=True`` — e dispara ``benchmarks.loadtest`` contra
+``/api/v1/transactions/`` e ``/api/v1/user/<id>/``, com ``--connections``
+conexões keep-alive simultâneas.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import BASE_DIR, analyze, bench_database, bulk_insert, print_table, setup_django
+from benchmarks.loadtest import run_load
+
+MODES = {
+    'sync (WSGI)': ('core.wsgi:application', 'sync', False),
+    'async (ASGI)': ('core.asgi:application', 'uvicorn_worker.UvicornWorker', True),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'servidor não respondeu na porta {port}')
+
+
+def server_env(connection, async_api):
+    env = {**os.environ, 'ASYNC_API': str(async_api), 'DEBUG': 'False', 'ALLOWED_HOSTS': '127.0.0.1'}
+    name = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite':
+        env['DOCKER_MODE'] = 'False'
+        env['SQLITE_NAME'] = str(name)
+    else:
+        env['DB_NAME'] = name
+    return env
+
+
+def start_server(app, worker_class, workers, port, env):
+    command = [
+        sys.executable, '-m', 'gunicorn', app, '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers), '--worker-class', worker_class,
+        '--keep-alive', '30', '--backlog', '2048', '--log-level', 'warning',
+    ]
+    if worker_class == 'sync':
+        # Sync atende uma requisição por vez e fecha a conexão; timeout maior evita
+        # que a fila de 500 conexões derrube workers durante a medição.
+        command += ['--timeout', '120']
+    return subprocess.Popen(command, cwd=BASE_DIR, env=env)
+
+
+def seed(transactions):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from benchmarks.bench_transactions import COLUMNS
+    from transactions.models import Transaction
+    from users.tokens import RefreshToken
+
+    user = get_user_model().objects.create_user(email='async@bench.local', password='bench')
+    start, now = date(2015, 1, 1), timezone.now()
+    rows = (
+        (user.pk, (i % 5000) - 2500, start + timedelta(days=i % 3650), i % 12, f'lançamento {i}', now, now)
+        for i in range(transactions)
+    )
+    bulk_insert(Transaction._meta.db_table, COLUMNS, rows)
+    analyze()
+    return user.pk, str(RefreshToken.for_user(user).access_token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--transactions', type=int, default=100_000)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connection as default_connection
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}')
+        # O token precisa valer durante as duas rodadas.
+        settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'] = timedelta(hours=2)
+        user_id, token = seed(args.transactions)
+        default_connection.close()
+
+        results = []
+        for label, (app, worker_class, async_api) in MODES.items():
+            port = free_port()
+            server = start_server(app, worker_class, args.workers, port, server_env(connection, async_api))
+            try:
+                wait_for_port(port)
+                base = f'http://127.0.0.1:{port}/api/v1'
+                urls = [f'{base}/transactions/', f'{base}/user/{user_id}/']
+                print(f'{label}: {args.connections} conexões por {args.duration:.0f}s')
+                stats = run_load(urls, args.connections, args.duration, {'Authorization': f'Bearer {token}'})
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+            results.append((
+                label, stats['requests'], f'{stats["rps"]:.0f}', f'{stats["p50_ms"]:.1f}',
+                f'{stats["p95_ms"]:.1f}', f'{stats["p99_ms"]:.1f}', stats['errors'],
+                ' '.join(f'{k}:{v}' for k, v in stats['status'].items()),
+            ))
+
+        print_table(('modo', 'requisições', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'erros', 'status'), results)
+
+
+if __name__ == '__main__':
+    main()
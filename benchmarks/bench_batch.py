@@ -0,0 +1,114 @@
+"""Sincronização do app: 100 requisições avulsas x um lote em ``/api/v1/transactions/batch/``.
+
+Uso::
+
+    DOCKER_MODE=True python -m benchmarks.bench_batch --operations 100
+
+Cada rodada sincroniza ``--operations`` mudanças de um usuário (60% criações,
+30% edições, 10% exclusões) de quatro jeitos, pelo cliente de testes com
+token JWT de verdade (autenticação, negociação e renderização entram na
+conta):
+
+- avulsas: um ``POST``/``PATCH``/``DELETE`` por mudança, cada um na sua
+  transação;
+- lote: um ``POST`` com todas as operações, sem ``Idempotency-Key``;
+- lote com chave: o mesmo, gravando a resposta para repetições;
+- repetição: o cliente reenvia o lote com a mesma chave (a resposta gravada
+  volta sem reaplicar nada).
+
+Relata o tempo por rodada e as consultas ao banco de cada jeito.
+"""
+import argparse
+import time
+from datetime import date
+
+from benchmarks.common import bench_database, print_table, setup_django, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--operations', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.db import connection as default_connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from transactions.models import Transaction
+
+    creates = args.operations * 6 // 10
+    updates = args.operations * 3 // 10
+    deletes = args.operations - creates - updates
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        vendor = connection.vendor
+        user = get_user_model().objects.create_user(email=f'batch{time.time_ns()}@bench.local', password=None)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+        def prepare(round_):
+            targets = Transaction.objects.bulk_create(
+                Transaction(user=user, amount=-100, date=date(2024, 1, 1 + i % 28)) for i in range(updates + deletes))
+            return round_, targets[:updates], targets[updates:]
+
+        def operations(round_, edited, removed):
+            return [
+                *({'op': 'create', 'data': {'amount': -100 - i, 'date': '2024-02-01', 'description': f'Sync {round_}'}}
+                  for i in range(creates)),
+                *({'op': 'update', 'id': t.pk, 'data': {'amount': -200, 'category': 3}} for t in edited),
+                *({'op': 'delete', 'id': t.pk} for t in removed),
+            ]
+
+        def single(round_, edited, removed):
+            for operation in operations(round_, edited, removed):
+                if operation['op'] == 'create':
+                    response = client.post('/api/v1/transactions/', operation['data'], format='json')
+                elif operation['op'] == 'update':
+                    response = client.patch(f'/api/v1/transaction/{operation["id"]}/', operation['data'], format='json')
+                else:
+                    response = client.delete(f'/api/v1/transaction/{operation["id"]}/')
+                assert response.status_code in (200, 201, 204), response.content
+
+        def batch(round_, edited, removed, **headers):
+            response = client.post('/api/v1/transactions/batch/', {'operations': operations(round_, edited, removed)},
+                                   format='json', **headers)
+            assert response.status_code == 200, response.content
+            return response
+
+        def keyed(round_, edited, removed):
+            return batch(round_, edited, removed, HTTP_IDEMPOTENCY_KEY=f'sync-{round_}')
+
+        def replay(round_, edited, removed):
+            assert keyed(round_, edited, removed)['Idempotent-Replayed'] == 'true'
+
+        rows = []
+        modes = (('avulsas', single, None), ('lote', batch, None), ('lote com chave', keyed, None),
+                 ('repetição', replay, keyed))
+        round_ = 0
+        for label, run, before in modes:
+            samples, queries = [], 0
+            for _ in range(args.repeat + 2):
+                round_ += 1
+                state = prepare(round_)
+                if before is not None:
+                    before(*state)
+                with CaptureQueriesContext(default_connection) as captured:
+                    start = time.perf_counter()
+                    run(*state)
+                    samples.append(time.perf_counter() - start)
+                queries = len(captured)
+            stats = summarize(samples[2:])
+            rows.append((label, f'{stats["p50_ms"]:.1f}', f'{stats["p95_ms"]:.1f}', queries))
+
+    print(f'{args.operations} operações ({creates} criações, {updates} edições, {deletes} exclusões) por rodada ({vendor})')
+    print_table(('modo', 'p50 ms', 'p95 ms', 'consultas'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Tempo até a primeira requisição: entrypoint antigo x ``manage.py boot``.
+
+Uso::
+
+    python -m benchmarks.bench_boot [--workers 4] [--rounds 3]
+
+Cada modo sobe o servidor sobre um SQLite e um ``STATIC_ROOT`` descartáveis e
+mede, a partir do início do processo, quanto tempo leva até ``/metrics``
+responder 200:
+
+- ``entrypoint antigo``: a sequência do ``scripts/entrypoint.sh`` anterior,
+  um processo Python por etapa (``makemigrations`` — aqui com ``--check
+  --dry-run`` para não gravar arquivos —, ``migrate``, ``collectstatic``, o
+  ``shell`` do superusuário) e o gunicorn sem ``--preload``;
+- ``boot``: ``manage.py boot``, tudo num processo, gunicorn pré-carregado.
+
+``frio`` é o primeiro start (banco vazio, estáticos não coletados);
+``quente`` é um restart sem mudanças, o caso do autoscaling.
+"""
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.bench_async import free_port
+from benchmarks.common import BASE_DIR, print_table
+
+SUPERUSER_SCRIPT = '''
+from django.contrib.auth import get_user_model
+User = get_user_model()
+if not User.objects.filter(email="admin@bench.local").exists():
+    User.objects.create_superuser("admin@bench.local", "bench-password")
+'''
+
+
+def old_entrypoint(env, port, workers):
+    manage = [sys.executable, 'manage.py']
+    steps = [
+        (manage + ['makemigrations', '--check', '--dry-run'], None),
+        (manage + ['migrate'], None),
+        (manage + ['collectstatic', '--noinput'], None),
+        (manage + ['shell'], SUPERUSER_SCRIPT),
+    ]
+    for command, stdin in steps:
+        subprocess.run(command, cwd=BASE_DIR, env=env, input=stdin, text=True, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'core.wsgi:application', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def boot(env, port, workers):
+    env = {**env, 'GUNICORN_BIND': f'127.0.0.1:{port}', 'GUNICORN_WORKERS': str(workers)}
+    return subprocess.Popen([sys.executable, 'manage.py', 'boot'], cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+MODES = {'entrypoint antigo': old_entrypoint, 'boot': boot}
+
+
+def wait_first_request(port, timeout=120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            time.sleep(0.02)
+    raise RuntimeError(f'servidor não respondeu na porta {port}')
+
+
+def time_to_first_request(start_server, env, workers):
+    port = free_port()
+    start = time.perf_counter()
+    server = start_server(env, port, workers)
+    try:
+        wait_first_request(port)
+        return time.perf_counter() - start
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    results = {(mode, phase): [] for mode in MODES for phase in ('frio', 'quente')}
+    for _ in range(args.rounds):
+        for label, start_server in MODES.items():
+            tmp = tempfile.mkdtemp(prefix='pulsevault-boot-')
+            env = {
+                **os.environ, 'DOCKER_MODE': 'False', 'DEBUG': 'False', 'ALLOWED_HOSTS': '127.0.0.1',
+                'DJANGO_SECRET_KEY': os.environ.get('DJANGO_SECRET_KEY', 'benchmark-insecure-key'),
+                'SQLITE_NAME': os.path.join(tmp, 'db.sqlite3'), 'STATIC_ROOT': os.path.join(tmp, 'static'),
+                'METRICS_DIR': os.path.join(tmp, 'metrics'), 'LOG_FILE': os.path.join(tmp, 'app.log'),
+                'DJANGO_SUPERUSER_EMAIL': 'admin@bench.local', 'DJANGO_SUPERUSER_PASSWORD': 'bench-password',
+            }
+            try:
+                for phase in ('frio', 'quente'):
+                    results[label, phase].append(time_to_first_request(start_server, env, args.workers))
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    rows = [(mode, phase, f'{statistics.median(values):.2f}', f'{min(values):.2f}', f'{max(values):.2f}')
+            for (mode, phase), values in results.items()]
+    print_table(('modo', 'start', 'mediana s', 'mín s', 'máx s'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Vazão de ``CustomUserManager.bulk_create_users`` por número de processos.
+
+Uso::
+
+    python -m benchmarks.bench_bulk_users --users 2000 --workers 1 2 4 8
+
+O PBKDF2 domina o custo por usuário, então a vazão deve crescer quase
+linearmente com os processos até o número de núcleos. A linha de base é o
+caminho atual: ``create_user`` (hash + INSERT) um usuário por vez.
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import bench_database, print_table, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--baseline-users', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}, núcleos: {os.cpu_count()}')
+        start = time.perf_counter()
+        for i in range(args.baseline_users):
+            User.objects.create_user(email=f'serial{i}@bench.local', password=f'senha-{i}')
+        baseline = args.baseline_users / (time.perf_counter() - start)
+        results = [('create_user (serial)', '-', f'{baseline:,.1f}', '1.00x')]
+
+        for workers in args.workers:
+            users = ({'email': f'w{workers}-{i}@bench.local', 'password': f'senha-{i}'} for i in range(args.users))
+            result = User.objects.bulk_create_users(users, batch_size=args.batch_size, workers=workers)
+            results.append(('bulk_create_users', workers, f'{result.rate:,.1f}', f'{result.rate / baseline:.2f}x'))
+            print(f'  {workers} processos: {result.rate:,.1f} usuários/s')
+
+    print()
+    print_table(('caminho', 'processos', 'usuários/s', 'vs serial'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Vazão e memória de pico da exportação de transações: lista x fluxo.
+
+Uso::
+
+    python -m benchmarks.bench_export --sizes 1000 100000 1000000
+
+Para cada tamanho popula um usuário e exporta o histórico inteiro de dois
+jeitos, medindo linhas/s e, numa segunda passada sob ``tracemalloc``, o pico
+de memória:
+
+- ``lista``: o que uma listagem DRF sem paginação faria, lendo todas as
+  linhas, serializando com ``TransactionSerializer`` e gerando um único
+  JSON. Só roda até ``--list-limit`` linhas;
+- ``csv``, ``ndjson`` e ``csv gzip``: ``export_transactions``, consumido
+  pedaço a pedaço como o ``StreamingHttpResponse`` faria.
+
+O pico de memória do fluxo deve ficar estável entre os tamanhos.
+``tracemalloc`` só vê alocações do Python; buffers do driver em C ficam de
+fora (no PostgreSQL o cursor do servidor limita também esses).
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.common import analyze, bench_database, bulk_insert, print_table, setup_django
+
+COLUMNS = ('user_id', 'amount', 'date', 'category', 'description', 'created_at', 'updated_at')
+
+
+def transaction_rows(count, user_id, now):
+    rng = random.Random(count)
+    start = date(2010, 1, 1)
+    for i in range(count):
+        yield (user_id, rng.randint(-500_000, 500_000), start + timedelta(days=i * 5000 // max(count, 1)),
+               rng.randrange(12), f'Compra {rng.randint(1, 5000)} NF{i}', now, now)
+
+
+def list_export(user):
+    from rest_framework.renderers import JSONRenderer
+
+    from transactions.models import Transaction
+    from transactions.serializers import TransactionSerializer
+
+    queryset = Transaction.objects.filter(user=user).order_by('date', 'id')
+    yield JSONRenderer().render(TransactionSerializer(queryset, many=True).data)
+
+
+def stream_export(fmt, compress=False):
+    def run(user):
+        from transactions.exporters import export_transactions
+
+        return export_transactions(user, fmt=fmt, compress=compress)
+    return run
+
+
+MODES = {
+    'lista': list_export,
+    'csv': stream_export('csv'),
+    'ndjson': stream_export('ndjson'),
+    'csv gzip': stream_export('csv', compress=True),
+}
+
+
+def consume(chunks):
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--list-limit', type=int, default=100_000, help='Maior tamanho medido no modo lista')
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from transactions.models import Transaction
+
+    User = get_user_model()
+    results = []
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}')
+        for size in args.sizes:
+            user, created = User.objects.get_or_create(email=f'export{size}@bench.local')
+            if created:
+                bulk_insert(Transaction._meta.db_table, COLUMNS, transaction_rows(size, user.pk, timezone.now()))
+                analyze(Transaction._meta.db_table)
+            for mode, export in MODES.items():
+                if mode == 'lista' and size > args.list_limit:
+                    continue
+                start = time.perf_counter()
+                written = consume(export(user))
+                elapsed = time.perf_counter() - start
+
+                # Segunda passada só para a memória: o tracemalloc deixa tudo bem mais lento.
+                tracemalloc.start()
+                consume(export(user))
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results.append((f'{size:,}', mode, f'{written / 2**20:.1f}', f'{size / elapsed:,.0f}',
+                                f'{peak / 2**20:.1f}'))
+                print(f'  {size:>10,} linhas, {mode}: {peak / 2**20:.1f} MiB')
+
+    print()
+    print_table(('linhas', 'modo', 'saída MiB', 'linhas/s', 'pico MiB'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Vazão (linhas/s) e memória de pico da importação de extratos.
+
+Uso::
+
+    python -m benchmarks.bench_import --sizes 50000 500000
+
+Para cada tamanho gera um CSV temporário, importa-o para um usuário novo
+medindo linhas/s e repete a importação (para outro usuário) sob
+``tracemalloc`` para registrar o pico de memória, que deve permanecer
+estável independentemente do tamanho do arquivo. Uma reimportação do mesmo
+arquivo mede o caminho de deduplicação.
+"""
+import argparse
+import csv
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.common import bench_database, print_table, setup_django
+
+
+def write_statement(path, rows, seed=0):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'amount', 'description', 'category'])
+        for i in range(rows):
+            day = start + timedelta(days=i * 1500 // max(rows, 1))
+            amount = f'{rng.randint(-500_000, 500_000) / 100:.2f}'
+            writer.writerow([day.isoformat(), amount, f'Compra {rng.randint(1, 5000)}', rng.randint(0, 11)])
+
+
+def run_import(user, path, chunk_size):
+    from transactions.importers import import_transactions
+
+    with open(path, encoding='utf-8', newline='') as stream:
+        start = time.perf_counter()
+        result = import_transactions(user, stream, chunk_size=chunk_size)
+        return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50_000, 500_000])
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    results = []
+    with bench_database(keepdb=args.keepdb) as connection, tempfile.TemporaryDirectory() as tmp:
+        print(f'Banco: {connection.vendor}')
+        for size in args.sizes:
+            path = f'{tmp}/statement_{size}.csv'
+            write_statement(path, size)
+
+            user = User.objects.create_user(email=f'import{size}@bench.local', password='bench')
+            result, elapsed = run_import(user, path, args.chunk_size)
+            assert result.created == size, result.as_dict()
+            _, dedupe_elapsed = run_import(user, path, args.chunk_size)
+
+            tracemalloc.start()
+            memory_user = User.objects.create_user(email=f'memory{size}@bench.local', password='bench')
+            run_import(memory_user, path, args.chunk_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append((
+                f'{size:,}',
+                f'{size / elapsed:,.0f}',
+                f'{size / dedupe_elapsed:,.0f}',
+                f'{peak / 2**20:.1f}',
+            ))
+            print(f'  {size:>10,} linhas: {size / elapsed:,.0f} linhas/s')
+
+    print()
+    print_table(('linhas', 'import linhas/s', 'reimport linhas/s', 'pico MiB'), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Vazão da fila de tarefas em segundo plano (``jobs``), em tarefas/s por worker.
+
+Uso::
+
+    python -m benchmarks.bench_jobs --jobs 5000 --workers 1 2 4 8
+    DOCKER_MODE=True python -m benchmarks.bench_jobs --jobs 20000 --workers 1 2 4 8 16
+
+Para cada número de processos enfileira ``--jobs`` tarefas e roda a pool de
+``manage.py run_workers`` em modo ``--burst`` (sai quando a fila esvazia),
+medindo do início ao último processo encerrado. Duas tarefas:
+
+- ``vazia``: não faz nada; mede só o custo da fila (pegar + gravar o
+  resultado, dois comandos por tarefa) e a disputa entre os workers;
+- ``--work-ms`` (padrão 5 ms): espera de E/S simulada, onde mais processos
+  devem escalar quase linearmente até o banco virar o gargalo.
+
+Ao final confere que cada tarefa rodou uma única vez. No SQLite todos os
+workers disputam o mesmo lock de escrita; no PostgreSQL o
+``FOR UPDATE SKIP LOCKED`` deixa cada um pegar uma linha diferente.
+"""
+import argparse
+import time
+
+from benchmarks.common import bench_database, print_table, setup_django
+
+QUEUE = 'bench'
+
+
+def register_tasks(work_ms):
+    from jobs.registry import task
+
+    @task('bench.empty', queue=QUEUE)
+    def empty(job):
+        return None
+
+    @task('bench.io', queue=QUEUE)
+    def io(job):
+        time.sleep(work_ms / 1000)
+
+
+def run(name, jobs, workers):
+    from django.utils import timezone
+
+    from jobs.models import Job, JobStatus
+    from jobs.worker import run_pool
+
+    Job.objects.all().delete()
+    now = timezone.now()
+    Job.objects.bulk_create([Job(task=name, queue=QUEUE, run_at=now, max_attempts=1) for _ in range(jobs)],
+                            batch_size=5000)
+    start = time.perf_counter()
+    run_pool({QUEUE: workers}, burst=True, log=print)
+    elapsed = time.perf_counter() - start
+    once = Job.objects.filter(status=JobStatus.SUCCEEDED, attempts=1).count()
+    assert once == jobs, f'{once} de {jobs} tarefas concluídas uma única vez'
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--work-ms', type=float, default=5.0)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+    # Antes do fork: os processos herdam o registro.
+    register_tasks(args.work_ms)
+
+    rows = []
+    with bench_database(keepdb=args.keepdb) as connection:
+        vendor = connection.vendor
+        for label, name in (('vazia', 'bench.empty'), (f'E/S {args.work_ms:g} ms', 'bench.io')):
+            for workers in args.workers:
+                elapsed = run(name, args.jobs, workers)
+                rate = args.jobs / elapsed
+                rows.append((label, workers, f'{elapsed:.2f}', f'{rate:,.0f}', f'{rate / workers:,.0f}'))
+
+    print(f'{args.jobs:,} tarefas por execução ({vendor})')
+    print_table(('tarefa', 'workers', 'tempo s', 'tarefas/s', 'tarefas/s por worker'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Latência das requisições com logging desligado, síncrono e em fila.
+
+Uso::
+
+    python -m benchmarks.bench_logging --rows 10000 --repeat 500
+
+Compara, nas mesmas requisições da API (``APIClient``):
+
+- ``desligado``: sem handlers;
+- ``FileHandler síncrono``: a configuração antiga, ``django`` em DEBUG num
+  ``logging.FileHandler`` (formatação e escrita na thread da requisição);
+- ``fila + JSON``: ``core.logs.QueueFileHandler`` com rotação, sem amostragem;
+- ``fila + JSON, SQL 10%``: idem, com ``django.db.backends`` amostrado;
+- ``fila + JSON, produção``: os níveis padrão com ``DEBUG=False`` (INFO, e
+  ``django.db.backends`` só a partir de WARNING).
+
+As consultas são registradas como com ``DEBUG=True`` (``force_debug_cursor``),
+que é quando ``django.db.backends`` emite um registro por consulta.
+
+Num disco local rápido a escrita cai no page cache e custa pouco; o que a fila
+elimina são as esperas de I/O na thread da requisição (disco concorrido,
+volume de rede). ``--io-delay-ms`` simula essa espera a cada gravação
+(``flush``) dos handlers de arquivo.
+"""
+import argparse
+import logging
+import logging.config
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import bench_database, measure, print_table, setup_django, summarize
+
+
+def scenarios(directory):
+    base = {'version': 1, 'disable_existing_loggers': False}
+    queue_handler = {
+        '()': 'core.logs.QueueFileHandler',
+        'formatter': 'json',
+        'filename': str(directory / 'fila.log'),
+    }
+
+    def queued(rate):
+        return {
+            **base,
+            'formatters': {'json': {'()': 'core.logs.JSONFormatter'}},
+            'filters': {'db_sample': {'()': 'core.logs.SampleFilter', 'rate': rate}},
+            'handlers': {'queue': queue_handler},
+            'root': {'handlers': ['queue'], 'level': 'DEBUG'},
+            'loggers': {'django.db.backends': {'level': 'DEBUG', 'filters': ['db_sample']}},
+        }
+    return {
+        'desligado': {**base, 'root': {'handlers': [], 'level': 'CRITICAL'}},
+        'FileHandler síncrono': {
+            **base,
+            'handlers': {'file': {'level': 'DEBUG', 'class': 'logging.FileHandler',
+                                  'filename': str(directory / 'debug.log')}},
+            'loggers': {'django': {'handlers': ['file'], 'level': 'DEBUG', 'propagate': True}},
+        },
+        'fila + JSON': queued(1.0),
+        'fila + JSON, SQL 10%': queued(0.1),
+        'fila + JSON, produção': {
+            **queued(1.0),
+            'root': {'handlers': ['queue'], 'level': 'INFO'},
+            'loggers': {'django.db.backends': {'level': 'WARNING'}},
+        },
+    }
+
+
+def slow_flush(delay):
+    flush = logging.StreamHandler.flush
+
+    def wrapper(self):
+        flush(self)
+        time.sleep(delay)
+    return wrapper
+
+
+def reset_logging():
+    for logger in [logging.getLogger(), *logging.Logger.manager.loggerDict.values()]:
+        if isinstance(logger, logging.Logger):
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            logger.filters.clear()
+            logger.setLevel(logging.NOTSET)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=500, help='requisições por cenário')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--io-delay-ms', type=float, default=0.0, help='espera simulada por gravação em disco')
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+    if args.io_delay_ms:
+        logging.StreamHandler.flush = slow_flush(args.io_delay_ms / 1000)
+
+    setup_django()
+
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    from benchmarks.bench_serialization import seed
+    from transactions.models import Transaction
+
+    with bench_database(keepdb=args.keepdb), tempfile.TemporaryDirectory() as tmp:
+        owner = seed(args.rows)
+        client = APIClient()
+        client.force_authenticate(owner)
+        transaction = Transaction.objects.filter(user=owner).order_by('id').first()
+        urls = ['/api/v1/transactions/', f'/api/v1/transaction/{transaction.pk}/', '/api/v1/users/']
+
+        connection.force_debug_cursor = True
+        configs = scenarios(Path(tmp))
+        samples = {label: [] for label in configs}
+        measure(lambda: [client.get(url) for url in urls], repeat=0, warmup=50)
+        # Cenários intercalados em rodadas, para que ruído da máquina afete todos igualmente.
+        for _ in range(args.rounds):
+            for label, config in configs.items():
+                reset_logging()
+                logging.config.dictConfig(config)
+                samples[label] += measure(lambda: [client.get(url) for url in urls],
+                                          repeat=args.repeat // args.rounds, warmup=2)
+        reset_logging()
+        connection.force_debug_cursor = False
+
+    rows, baseline = [], None
+    for label, values in samples.items():
+        stats = summarize([s / len(urls) for s in values])
+        baseline = baseline or stats
+        overhead = (stats['p50_ms'] / baseline['p50_ms'] - 1) * 100
+        rows.append((label, f'{stats["p50_ms"]:.3f}', f'{stats["p95_ms"]:.3f}', f'{stats["p99_ms"]:.3f}',
+                     f'{overhead:+.1f}%'))
+    print_table(('logging', 'p50 ms', 'p95 ms', 'p99 ms', 'sobrecarga p50'), rows)
+
+
+if __name__ == '__main__':
+    main()
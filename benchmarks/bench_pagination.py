@@ -0,0 +1,75 @@
+"""Latência da primeira página versus páginas profundas em ``GET /api/v1/users/``.
+
+Uso::
+
+    python -m benchmarks.bench_pagination --users 1000000 --pages 1 100 10000
+
+Com paginação por cursor, a página N é buscada a partir da chave
+``(created_at, id)`` do último item da página anterior; a latência deve ser a
+mesma para a página 1 e para a página 10.000.
+"""
+import argparse
+from datetime import timedelta
+
+from benchmarks.common import (
+    analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize,
+)
+
+COLUMNS = ('password', 'is_superuser', 'email', 'name', 'is_active', 'is_staff', 'created_at', 'updated_at')
+
+
+def user_rows(count):
+    from django.utils import timezone
+
+    start = timezone.now() - timedelta(days=3650)
+    for i in range(count):
+        # Alguns empates em created_at, como em cargas em massa reais.
+        created = start + timedelta(seconds=i // 3)
+        yield ('!', False, f'user{i}@bench.local', f'Usuário {i}', True, False, created, created)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 100, 10_000])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+
+    from core.pagination import KeysetPagination
+
+    User = get_user_model()
+    url = '/api/v1/users/'
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}')
+        bulk_insert(User._meta.db_table, COLUMNS, user_rows(args.users))
+        analyze(User._meta.db_table)
+        client = APIClient()
+        client.force_authenticate(User.objects.order_by('id').first())
+
+        paginator = KeysetPagination()
+        paginator.ordering = ['-created_at', '-id']
+        paginator.base_url = f'http://testserver{url}'
+        results = []
+        for page in args.pages:
+            params = {'page_size': args.page_size}
+            if page > 1:
+                offset = (page - 1) * args.page_size - 1
+                anchor = User.objects.order_by('-created_at', '-id').values_list('created_at', 'id')[offset]
+                params['cursor'] = paginator.encode_cursor(anchor).split('cursor=')[1]
+            response = client.get(url, params)
+            assert response.status_code == 200 and response.data['results'], response.status_code
+            stats = summarize(measure(lambda: client.get(url, params), repeat=args.repeat))
+            results.append((f'{page:,}', f'{stats["p50_ms"]:.2f}', f'{stats["p95_ms"]:.2f}', f'{stats["p99_ms"]:.2f}'))
+
+    print_table(('página', 'p50 ms', 'p95 ms', 'p99 ms'), results)
+
+
+if __name__ == '__main__':
+    main()
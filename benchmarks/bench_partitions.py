@@ -0,0 +1,128 @@
+"""Consultas por intervalo de datas antes e depois do particionamento mensal.
+
+Uso::
+
+    DOCKER_MODE=True python -m benchmarks.bench_partitions --rows 10000000
+
+Só faz sentido no PostgreSQL. Desfaz a migração de particionamento
+(``transactions`` volta à tabela única), popula as transações dos últimos
+dez anos, mede as consultas, aplica a migração sobre os mesmos dados (o
+tempo da conversão também é registrado) e mede de novo:
+
+- ``mês do usuário``, ``ano do usuário``: listagem com ``date__gte/lte``;
+- ``primeira página``: listagem sem filtro de data (``ORDER BY date DESC``);
+- ``soma do mês``: ``SUM(amount)`` de um mês, todos os usuários — o
+  relatório que mais ganha com o descarte de partições;
+- ``detalhe por id``: o caso que não tem como descartar partições;
+- ``remover um mês``: ``DELETE`` na tabela única x ``DETACH`` + ``DROP`` da
+  partição (uma execução só; cada fase remove um mês diferente, os mais
+  antigos fora de ``<tabela>_old``).
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import (
+    analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize,
+)
+
+COLUMNS = ('user_id', 'amount', 'date', 'category', 'description', 'created_at', 'updated_at')
+HISTORY_DAYS = 3650
+UNPARTITIONED = '0004_transaction_search_index'
+
+
+def transaction_rows(user_ids, count, today, now):
+    rng = random.Random(18)
+    for _ in range(count):
+        yield (rng.choice(user_ids), rng.randint(-500_000, 500_000),
+               today - timedelta(days=rng.randrange(HISTORY_DAYS)), rng.randrange(12),
+               f'Transação {rng.randint(1, 10**6)}', now, now)
+
+
+def run_queries(user_id, probe_id, month, repeat):
+    from django.db.models import Sum
+
+    from core.partitioning import add_months
+    from transactions.models import Transaction
+
+    month_end = add_months(month, 1) - timedelta(days=1)
+    own = Transaction.objects.filter(user_id=user_id).order_by('-date', '-id')
+    queries = {
+        'mês do usuário': lambda: list(own.filter(date__gte=month, date__lte=month_end)[:51]),
+        'ano do usuário': lambda: list(own.filter(date__gte=add_months(month, -11), date__lte=month_end)[:51]),
+        'primeira página': lambda: list(own[:51]),
+        'soma do mês': lambda: Transaction.objects.filter(
+            date__gte=month, date__lte=month_end).aggregate(total=Sum('amount')),
+        'detalhe por id': lambda: Transaction.objects.filter(user_id=user_id, pk=probe_id).first(),
+    }
+    return {label: summarize(measure(fn, repeat=repeat, warmup=3)) for label, fn in queries.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from core.partitioning import add_months
+    from transactions.models import Transaction
+
+    User = get_user_model()
+    table = Transaction._meta.db_table
+    with bench_database(keepdb=args.keepdb) as connection:
+        if connection.vendor != 'postgresql':
+            print('Particionamento só existe no PostgreSQL (DOCKER_MODE=True).')
+            return
+        call_command('migrate', 'transactions', UNPARTITIONED, verbosity=0)
+        today = date.today()
+        if not Transaction.objects.exists():
+            users = [User(email=f'part{i}@bench.local', password='!') for i in range(args.users)]
+            user_ids = [u.pk for u in User.objects.bulk_create(users, batch_size=5000)]
+            bulk_insert(table, COLUMNS, transaction_rows(user_ids, args.rows, today, timezone.now()))
+        analyze(table)
+
+        probe = Transaction.objects.order_by('id')[args.rows // 2]
+        month = add_months(today.replace(day=1), -6)
+        # Primeiro mês com partição própria; o anterior vai para <tabela>_old.
+        oldest = add_months(today.replace(day=1), -Transaction.partitioning.history_months)
+
+        results = {}
+        before = run_queries(probe.user_id, probe.pk, month, args.repeat)
+        start = time.perf_counter()
+        deleted = Transaction.objects.filter(
+            date__gte=add_months(oldest, -1), date__lt=oldest)._raw_delete(connection.alias)
+        removal_before = time.perf_counter() - start
+
+        start = time.perf_counter()
+        call_command('migrate', 'transactions', verbosity=0)
+        conversion = time.perf_counter() - start
+        analyze(table)
+        after = run_queries(probe.user_id, probe.pk, month, args.repeat)
+
+        removed = Transaction.objects.filter(date__gte=oldest, date__lt=add_months(oldest, 1)).count()
+        start = time.perf_counter()
+        Transaction.partitioning.detach(Transaction, connection, f'{table}_p{oldest:%Y%m}', drop=True)
+        removal_after = time.perf_counter() - start
+
+        for label in before:
+            results[label] = (before[label]['p50_ms'], after[label]['p50_ms'])
+
+    rows = [(label, f'{old:.2f}', f'{new:.2f}', f'{old / new:.1f}x' if new else '-')
+            for label, (old, new) in results.items()]
+    rows.append(('remover um mês', f'{removal_before * 1000:.0f}', f'{removal_after * 1000:.0f}',
+                 f'{deleted:,} x {removed:,} linhas'))
+    print(f'Conversão de {args.rows:,} linhas: {conversion:.1f}s')
+    print_table(('consulta', 'tabela única p50 ms', 'particionada p50 ms', 'ganho'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Conexão nova por requisição x conexão persistente x pool do psycopg3.
+
+Uso (PostgreSQL local do docker compose)::
+
+    docker compose up -d db
+    DOCKER_MODE=True DB_HOST=127.0.0.1 DB_PORT=5433 \\
+        python -m benchmarks.bench_pool --connections 200 --duration 30 [--workers 4]
+
+Popula o banco de benchmark e sobe o gunicorn (workers sync) três vezes sobre
+ele, mudando só a configuração de conexão:
+
+- ``sem persistência``: ``DB_POOL=False``, ``DB_CONN_MAX_AGE=0`` — TCP,
+  autenticação e inicialização da sessão a cada requisição;
+- ``persistente``: ``DB_POOL=False``, ``DB_CONN_MAX_AGE=60``;
+- ``pool``: ``DB_POOL=True`` (``psycopg_pool``, ver ``core.db_pool``).
+
+Para cada modo: vazão e latência (``benchmarks.loadtest``), sessões abertas no
+PostgreSQL durante a carga (``pg_stat_database.sessions``, PostgreSQL 14+) e,
+no modo pool, espera e conexões abertas segundo o ``/metrics``.
+"""
+import argparse
+import os
+import re
+import signal
+import tempfile
+import time
+import urllib.request
+from datetime import timedelta
+
+from benchmarks.bench_async import free_port, seed, server_env, start_server, wait_for_port
+from benchmarks.common import bench_database, print_table, setup_django
+from benchmarks.loadtest import run_load
+
+MODES = {
+    'sem persistência': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '0'},
+    'persistente': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '60'},
+    'pool': {'DB_POOL': 'True'},
+}
+
+
+def sessions(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_stat_clear_snapshot()')
+        cursor.execute('SELECT sessions FROM pg_stat_database WHERE datname = current_database()')
+        return cursor.fetchone()[0]
+
+
+def pool_metrics(port):
+    body = urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=10).read().decode()
+    values = {}
+    for name in ('pulsevault_db_pool_connects_total', 'pulsevault_db_pool_requests_total',
+                 'pulsevault_db_pool_wait_seconds_total', 'pulsevault_db_pool_timeouts_total'):
+        match = re.search(rf'^{name}{{[^}}]*}} (\S+)$', body, re.MULTILINE)
+        values[name] = float(match.group(1)) if match else 0.0
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--transactions', type=int, default=100_000)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.db import connection as default_connection
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        if connection.vendor != 'postgresql':
+            raise SystemExit('Este benchmark requer PostgreSQL (DOCKER_MODE=True).')
+        settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'] = timedelta(hours=2)
+        user_id, token = seed(args.transactions)
+
+        results = []
+        for label, overrides in MODES.items():
+            metrics_dir = tempfile.mkdtemp(prefix='pulsevault-bench-pool-')
+            env = {**server_env(connection, async_api=False), **overrides, 'METRICS_DIR': metrics_dir}
+            port = free_port()
+            before = sessions(connection)
+            default_connection.close()
+            server = start_server('core.wsgi:application', 'sync', args.workers, port, env)
+            try:
+                wait_for_port(port)
+                base = f'http://127.0.0.1:{port}/api/v1'
+                urls = [f'{base}/transactions/', f'{base}/user/{user_id}/']
+                print(f'{label}: {args.connections} conexões por {args.duration:.0f}s')
+                stats = run_load(urls, args.connections, args.duration, {'Authorization': f'Bearer {token}'})
+                # Espera os workers gravarem as métricas (FLUSH_INTERVAL).
+                time.sleep(6)
+                pool = pool_metrics(port) if overrides['DB_POOL'] == 'True' else None
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait(timeout=30)
+            time.sleep(1)  # as estatísticas de sessão são publicadas ao fim de cada backend
+            opened = sessions(connection) - before
+            wait = (f'{pool["pulsevault_db_pool_wait_seconds_total"] * 1000:.0f} ms '
+                    f'({pool["pulsevault_db_pool_timeouts_total"]:.0f} timeouts)') if pool else '-'
+            results.append((
+                label, stats['requests'], f'{stats["rps"]:.0f}', f'{stats["p50_ms"]:.1f}',
+                f'{stats["p95_ms"]:.1f}', f'{stats["p99_ms"]:.1f}', stats['errors'], opened, wait,
+            ))
+
+        print_table(('modo', 'requisições', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'erros',
+                     'sessões abertas', 'espera no pool'), results)
+
+
+if __name__ == '__main__':
+    main()
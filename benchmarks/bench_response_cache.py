@@ -0,0 +1,154 @@
+"""Cache de respostas GET (``core.response_cache``): taxa de acerto e latência.
+
+Uso::
+
+    python -m benchmarks.bench_response_cache --users 2000 --clients 5 --requests 20000
+    DOCKER_MODE=True python -m benchmarks.bench_response_cache --write-ratio 0.05
+
+Carga de leitura com distribuição de Zipf (``--zipf``) sobre o detalhe de
+``--users`` usuários e páginas da listagem (ordenações e buscas variadas),
+feita por ``--clients`` usuários autenticados, com uma fração
+``--write-ratio`` de escritas (``save()`` de um usuário, que invalida o
+detalhe dele e a listagem). A mesma sequência roda sem cache, com o
+``LocMemCache`` (por processo) e com o ``SharedLRUCache`` (compartilhado
+entre processos), relatando acertos e latência por requisição.
+
+Por fim, o estouro de cache: ``--threads`` requisições simultâneas numa
+chave fria, contando quantas montaram a resposta, com a trava da falta e sem
+ela (``LOCK_WAIT=0``).
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import bench_database, percentile, print_table, setup_django
+
+# O mesmo limite de entradas nos dois: a diferença fica no custo de cada operação.
+OPTIONS = {'MAX_ENTRIES': 10_000}
+BACKENDS = {
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-responses',
+               'OPTIONS': OPTIONS},
+    'shared': {'BACKEND': 'core.cache_backends.SharedLRUCache',
+               'LOCATION': os.path.join(tempfile.gettempdir(), f'pulsevault-bench-responses-{os.getpid()}.sqlite3'),
+               'OPTIONS': OPTIONS},
+}
+
+
+def workload(args, user_ids, client_ids):
+    rng = random.Random(1)
+    paths = [f'/api/v1/user/{pk}/' for pk in user_ids]
+    paths += [f'/api/v1/users/?ordering={ordering}' for ordering in ('-created_at', 'email', '-email')]
+    paths += [f'/api/v1/users/?search={term}' for term in ('ana', 'bruno', 'carla', 'diego', 'elisa')]
+    rng.shuffle(paths)
+    weights = list(itertools.accumulate(1 / rank ** args.zipf for rank in range(1, len(paths) + 1)))
+    for _ in range(args.requests):
+        if rng.random() < args.write_ratio:
+            yield rng.choice(client_ids), 'write', rng.choice(user_ids)
+        else:
+            yield rng.choice(client_ids), 'read', rng.choices(paths, cum_weights=weights)[0]
+
+
+def run(requests, clients, users):
+    hits, samples = 0, []
+    for client_id, kind, target in requests:
+        start = time.perf_counter()
+        if kind == 'write':
+            user = users[target]
+            user.name = f'{user.name[:20]} {start:.0f}'
+            user.save(update_fields=['name', 'updated_at'])
+        else:
+            response = clients[client_id].get(target)
+            hits += response.get('X-Cache') == 'HIT'
+        samples.append(time.perf_counter() - start)
+    return hits, samples
+
+
+def stampede(path, client, threads, lock_wait):
+    from django.core.cache import caches
+    from django.db import connections
+    from django.test import override_settings
+
+    def get(_):
+        try:
+            return client.get(path)
+        finally:
+            # A conexão é da thread: fechada aqui, não impede remover o banco de benchmark.
+            connections.close_all()
+
+    caches['responses'].clear()
+    with override_settings(RESPONSE_CACHE={'LOCK_WAIT': lock_wait}):
+        with ThreadPoolExecutor(threads) as executor:
+            responses = list(executor.map(get, range(threads)))
+    return sum(response['X-Cache'] == 'MISS' for response in responses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2_000)
+    parser.add_argument('--clients', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=20_000)
+    parser.add_argument('--write-ratio', type=float, default=0.01)
+    parser.add_argument('--zipf', type=float, default=1.1)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.core.cache import caches
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    User = get_user_model()
+    rows = []
+    with bench_database(keepdb=args.keepdb) as connection:
+        vendor = connection.vendor
+        if not User.objects.exists():
+            names = ('Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio')
+            User.objects.bulk_create([
+                User(email=f'user{i}@example.com', name=f'{names[i % len(names)]} {i}', password='!')
+                for i in range(args.users)
+            ], batch_size=5000)
+        users = {user.pk: user for user in User.objects.order_by('id')}
+        user_ids = list(users)
+        client_ids = user_ids[:args.clients]
+        clients = {}
+        for pk in client_ids:
+            clients[pk] = APIClient()
+            clients[pk].force_authenticate(users[pk])
+        requests = list(workload(args, user_ids, client_ids))
+        reads = sum(kind == 'read' for _, kind, _ in requests)
+
+        modes = [('sem cache', None, {'TIMEOUT': 0})]
+        modes += [(name, backend, {}) for name, backend in BACKENDS.items()]
+        for label, backend, options in modes:
+            cache_settings = {'responses': backend} if backend else {}
+            with override_settings(CACHES={**caches.settings, **cache_settings}, RESPONSE_CACHE=options):
+                caches['responses'].clear()
+                start = time.perf_counter()
+                hits, samples = run(requests, clients, users)
+                elapsed = time.perf_counter() - start
+                if label == 'shared':
+                    path = f'/api/v1/users/?search=stampede{time.time_ns()}'
+                    misses = [stampede(path + suffix, clients[client_ids[0]], args.threads, lock_wait)
+                              for suffix, lock_wait in (('a', 0), ('b', 2.0))]
+            rows.append((label, f'{hits / reads:.1%}', f'{percentile(samples, 50) * 1000:.2f}',
+                         f'{percentile(samples, 95) * 1000:.2f}', f'{percentile(samples, 99) * 1000:.2f}',
+                         f'{len(requests) / elapsed:,.0f}'))
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(BACKENDS['shared']['LOCATION'] + suffix):
+                os.remove(BACKENDS['shared']['LOCATION'] + suffix)
+
+    print(f'{len(requests):,} requisições ({reads:,} leituras), {args.users:,} usuários, zipf {args.zipf} ({vendor})')
+    print_table(('cache', 'acertos', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s'), rows)
+    print(f'\nEstouro: {args.threads} requisições simultâneas numa chave fria (shared)')
+    print_table(('trava', 'montaram a resposta'), [('sem (LOCK_WAIT=0)', misses[0]), ('com', misses[1])])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Relatórios do painel: SUM sobre as transações x leitura dos totais.
+
+Uso::
+
+    python -m benchmarks.bench_rollups --sizes 1000 10000 100000
+
+Para cada tamanho popula um usuário com transações espalhadas por cinco anos
+(os triggers preenchem ``MonthlyRollup`` e ``Balance`` durante a carga) e
+mede, para o saldo, os últimos 12 meses e os totais por categoria, a
+agregação sobre ``transactions_transaction`` e a leitura de
+``transactions.reports``. A segunda deve ficar estável entre os tamanhos.
+
+Depois mede o custo dos triggers nas escritas: ``create`` de uma transação
+e ``bulk_create`` de ``--batch`` linhas, com e sem os triggers.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize
+
+COLUMNS = ('user_id', 'amount', 'date', 'category', 'description', 'created_at', 'updated_at')
+HISTORY_DAYS = 5 * 365
+
+
+def transaction_rows(count, user_id, today, now):
+    rng = random.Random(count)
+    for i in range(count):
+        yield (user_id, rng.randint(-50_000, 30_000), today - timedelta(days=rng.randrange(HISTORY_DAYS)),
+               rng.randrange(12), f'Compra {i}', now, now)
+
+
+def report_queries(user):
+    from django.db.models import Count
+    from django.db.models.functions import TruncMonth
+
+    from transactions import reports
+    from transactions.models import Transaction
+    from transactions.rollups import expense_sum, income_sum
+
+    own = Transaction.objects.filter(user=user)
+    month_from, month_to = reports.month_range({}, reports.DEFAULT_MONTHS)
+    totals = {'income': income_sum(), 'expense': expense_sum(), 'count': Count('id')}
+    return {
+        'saldo': (
+            lambda: own.aggregate(**totals),
+            lambda: list(reports.balance_queryset(user)),
+        ),
+        'últimos 12 meses': (
+            lambda: list(own.filter(date__gte=month_from).annotate(month=TruncMonth('date'))
+                         .values('month').annotate(**totals).order_by('month')),
+            lambda: list(reports.monthly_queryset(user, month_from, month_to)),
+        ),
+        'por categoria': (
+            lambda: list(own.values('category').annotate(**totals).order_by('-expense')),
+            lambda: list(reports.category_queryset(user)),
+        ),
+    }
+
+
+def write_costs(user, batch, repeat):
+    from django.apps import apps
+    from django.db import connection, transaction
+
+    from transactions.models import Transaction
+    from transactions.rollups import create_sql, drop_sql
+
+    def create():
+        with transaction.atomic():
+            Transaction.objects.create(user=user, amount=-100, date=date.today(), description='Café')
+
+    def bulk():
+        objs = [Transaction(user=user, amount=-100 - i, date=date.today() - timedelta(days=i % 900),
+                            category=i % 12, description='Lote') for i in range(batch)]
+        start = time.perf_counter()
+        with transaction.atomic():
+            Transaction.objects.bulk_create(objs, batch_size=1000)
+        return time.perf_counter() - start
+
+    results = {}
+    for label in ('com triggers', 'sem triggers'):
+        results[label] = (summarize(measure(create, repeat=repeat, warmup=5))['p50_ms'],
+                          min(bulk() for _ in range(3)) * 1000)
+        with connection.cursor() as cursor:
+            for sql in drop_sql(apps, connection):
+                cursor.execute(sql)
+    with connection.cursor() as cursor:
+        for sql in create_sql(apps, connection):
+            cursor.execute(sql)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000])
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from transactions.models import Transaction
+
+    User = get_user_model()
+    table = Transaction._meta.db_table
+    rows = []
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}')
+        today = date.today()
+        users = {}
+        for size in args.sizes:
+            user, created = User.objects.get_or_create(email=f'rollup{size}@bench.local')
+            if created:
+                bulk_insert(table, COLUMNS, transaction_rows(size, user.pk, today, timezone.now()))
+            users[size] = user
+        analyze()
+
+        for size, user in users.items():
+            for label, (raw, rollup) in report_queries(user).items():
+                before = summarize(measure(raw, repeat=args.repeat, warmup=3))['p50_ms']
+                after = summarize(measure(rollup, repeat=args.repeat, warmup=3))['p50_ms']
+                rows.append((label, f'{size:,}', f'{before:.2f}', f'{after:.2f}', f'{before / after:.0f}x'))
+
+        writes = write_costs(users[args.sizes[0]], args.batch, args.repeat)
+
+    print_table(('relatório', 'transações', 'SUM p50 ms', 'totais p50 ms', 'ganho'), rows)
+    print()
+    print_table(('escrita', 'create p50 ms', f'bulk_create {args.batch:,} ms'),
+                [(label, f'{single:.2f}', f'{bulk:.0f}') for label, (single, bulk) in writes.items()])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Latência da busca textual: ``icontains`` x índice de busca (``core.search``).
+
+Uso::
+
+    python -m benchmarks.bench_search --transactions 10000000 --users 1000000
+
+Popula usuários e transações (descrições de um vocabulário de
+estabelecimentos com um número de documento, distribuídas entre ``--owners``
+usuários) e mede a primeira página de cada busca como a
+API a executa (filtro, ordenação padrão e ``LIMIT``), com a busca por
+``icontains`` do ``SearchFilter`` e com o ``search_index`` do modelo:
+
+- descrição nas transações de um usuário (com o escopo do índice): palavra
+  comum, rara e duas palavras;
+- usuários por substring do email, por nome e, no PostgreSQL, um email com
+  erro de digitação (sem resultado exato, cai na busca por semelhança).
+"""
+import argparse
+import hashlib
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import (
+    analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize,
+)
+
+MERCHANTS = (
+    'Mercado', 'Padaria', 'Farmácia', 'Posto', 'Restaurante', 'Uber', 'Cinema', 'Livraria', 'Academia',
+    'Aluguel', 'Energia', 'Internet', 'Salário', 'Pix', 'Transferência', 'Hospital', 'Escola', 'Lanchonete',
+)
+PLACES = ('Central', 'Jardim', 'São Jorge', 'Vila Nova', 'Bela Vista', 'do Porto', 'Santa Luzia', 'Boa Esperança')
+TRANSACTION_COLUMNS = ('user_id', 'amount', 'date', 'category', 'description', 'created_at', 'updated_at')
+USER_COLUMNS = ('password', 'is_superuser', 'email', 'name', 'is_active', 'is_staff', 'created_at', 'updated_at')
+
+
+FIRST_NAMES = ('Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabi', 'Hugo', 'Íris', 'João', 'Lara', 'Marcos')
+DOMAINS = ('gmail.com', 'hotmail.com', 'empresa.com.br', 'yahoo.com.br', 'outlook.com')
+
+
+def email(i):
+    # Parte local variada, como em cadastros reais: nome, hash curto e número.
+    first = FIRST_NAMES[i % len(FIRST_NAMES)].lower().replace('á', 'a').replace('í', 'i').replace('ã', 'a')
+    return f'{first}.{hashlib.md5(str(i).encode()).hexdigest()[:6]}{i}@{DOMAINS[i % len(DOMAINS)]}'
+
+
+def user_rows(count, now):
+    rng = random.Random(1)
+    for i in range(count):
+        name = f'{FIRST_NAMES[i % len(FIRST_NAMES)]} {rng.choice(PLACES)}'
+        yield ('!', False, email(i), name, True, False, now, now)
+
+
+def transaction_rows(count, user_ids, now):
+    rng = random.Random(2)
+    start = date(2015, 1, 1)
+    for i in range(count):
+        description = f'{rng.choice(MERCHANTS)} {rng.choice(PLACES)} NF{i}'
+        yield (rng.choice(user_ids), -rng.randint(100, 50_000), start + timedelta(days=rng.randrange(3650)),
+               rng.randrange(12), description, now, now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--owners', type=int, default=1_000, help='Usuários com transações')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from transactions.models import Transaction
+
+    User = get_user_model()
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}')
+        now = timezone.now()
+        if not User.objects.exists():
+            bulk_insert(User._meta.db_table, USER_COLUMNS, user_rows(args.users, now))
+            user_ids = list(User.objects.order_by('id').values_list('id', flat=True)[:args.owners])
+            bulk_insert(Transaction._meta.db_table, TRANSACTION_COLUMNS,
+                        transaction_rows(args.transactions, user_ids, now))
+            analyze()
+        if connection.vendor == 'postgresql':
+            # Depois da carga, esvazia a lista pendente do GIN, como o autovacuum faria.
+            with connection.cursor() as cursor:
+                cursor.execute(f'VACUUM {Transaction._meta.db_table}')
+        user_id = User.objects.order_by('id').values_list('id', flat=True)[args.owners // 2]
+        rare = Transaction.objects.filter(user_id=user_id).order_by('id').values_list('description', flat=True)[0]
+        transactions = Transaction.objects.filter(user_id=user_id).order_by('-date', '-id')
+        users = User.objects.order_by('-created_at', '-id')
+        sample = email(args.users // 3)
+        index_t, index_u = Transaction.search_index, User.search_index
+
+        cases = [
+            ('transações', 'palavra comum', transactions, index_t, user_id, ['mercado']),
+            ('transações', 'palavra rara', transactions, index_t, user_id, [rare.split()[-1]]),
+            ('transações', 'duas palavras', transactions, index_t, user_id, ['farmácia', 'jardim']),
+            ('usuários', 'email', users, index_u, None, [sample.split('@')[0][-8:]]),
+            ('usuários', 'nome', users, index_u, None, ['lara', 'vista']),
+        ]
+        if connection.vendor == 'postgresql':
+            typo = sample[1] + sample[0] + sample[2:].split('@')[0]
+            cases.append(('usuários', 'email com erro', users, index_u, None, [typo]))
+
+        rows = []
+        for table, label, queryset, index, scope, terms in cases:
+            searches = (('icontains', index.filter_icontains(queryset, terms)),
+                        ('índice', index.filter(queryset, terms, scope=scope)))
+            for mode, found_rows in searches:
+                page = found_rows[:args.page_size + 1]
+                found = len(list(page))
+                stats = summarize(measure(lambda: list(page.all()), repeat=args.repeat, warmup=3))
+                rows.append((table, label, ' '.join(terms), mode, found,
+                             f'{stats["p50_ms"]:.2f}', f'{stats["p95_ms"]:.2f}', f'{stats["p99_ms"]:.2f}'))
+
+    print_table(('tabela', 'caso', 'termos', 'busca', 'linhas', 'p50 ms', 'p95 ms', 'p99 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
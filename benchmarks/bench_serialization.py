@@ -0,0 +1,93 @@
+"""Serialização de listagens: ``ModelSerializer`` x ``.values()`` + orjson.
+
+Uso::
+
+    python -m benchmarks.bench_serialization --rows 10000
+
+Popula ``--rows`` usuários e transações e mede, para cada modelo, o caminho
+completo de uma listagem (consulta, serialização e renderização JSON) das
+duas formas: ``ModelSerializer(many=True)`` com o ``JSONRenderer`` do DRF e
+``core.serializers.ValuesReader`` com ``core.renderers.JSONRenderer``. Antes
+de medir, confere que as duas saídas são idênticas byte a byte.
+"""
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.common import analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize
+
+
+def seed(rows):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from benchmarks.bench_pagination import COLUMNS as USER_COLUMNS, user_rows
+    from benchmarks.bench_transactions import COLUMNS as TRANSACTION_COLUMNS
+    from transactions.models import Transaction
+
+    User = get_user_model()
+    bulk_insert(User._meta.db_table, USER_COLUMNS, user_rows(rows))
+    owner = User.objects.order_by('id').first()
+    start, now = date(2015, 1, 1), timezone.now()
+    bulk_insert(Transaction._meta.db_table, TRANSACTION_COLUMNS, (
+        (owner.pk, (i % 5000) - 2500, start + timedelta(days=i % 3650), i % 12, f'lançamento {i}', now, now)
+        for i in range(rows)
+    ))
+    analyze()
+    return owner
+
+
+def model_serializer_path(queryset, serializer_class):
+    from rest_framework.renderers import JSONRenderer
+
+    return lambda: JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+
+def values_path(queryset, serializer_class):
+    from core.renderers import JSONRenderer
+    from core.serializers import ValuesReader
+
+    reader = ValuesReader.for_serializer(serializer_class)
+    return lambda: JSONRenderer().render(reader.represent_many(reader.values(queryset.all())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+
+    from transactions.models import Transaction
+    from transactions.serializers import TransactionSerializer
+    from users.serializers import CustomUserSerializer
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}')
+        owner = seed(args.rows)
+        cases = (
+            ('usuários', get_user_model().objects.order_by('-created_at', '-id'), CustomUserSerializer),
+            ('transações', Transaction.objects.filter(user=owner).order_by('-date', '-id'), TransactionSerializer),
+        )
+
+        results = []
+        for label, queryset, serializer_class in cases:
+            slow = model_serializer_path(queryset, serializer_class)
+            fast = values_path(queryset, serializer_class)
+            if slow() != fast():
+                raise SystemExit(f'{label}: saídas diferentes entre os dois caminhos')
+            baseline = None
+            for path, fn in (('ModelSerializer', slow), ('.values() + orjson', fast)):
+                stats = summarize(measure(fn, repeat=args.repeat, warmup=2))
+                baseline = baseline or stats['p50_ms']
+                results.append((label, path, f'{stats["p50_ms"]:.1f}', f'{stats["p95_ms"]:.1f}',
+                                f'{baseline / stats["p50_ms"]:.1f}x'))
+
+        print_table(('modelo', 'caminho', 'p50 ms', 'p95 ms', 'ganho'), results)
+
+
+if __name__ == '__main__':
+    main()
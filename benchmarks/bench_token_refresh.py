@@ -0,0 +1,120 @@
+"""``/api/token/refresh/`` com milhões de tokens históricos.
+
+Uso::
+
+    python -m benchmarks.bench_token_refresh --tokens 10000000 [--prune]
+
+Popula ``OutstandingToken``/``BlacklistedToken`` com tokens antigos (metade
+expirados, todos na blacklist, como acontece com a rotação) e mede a cadeia
+de refresh — cada iteração usa o refresh token devolvido pela anterior —
+com o serializer padrão do simplejwt e com ``users.serializers.TokenRefreshSerializer``.
+Com ``--prune`` mede também o ``manage.py prune_tokens``.
+"""
+import argparse
+import io
+import time
+from datetime import timedelta
+
+from benchmarks.common import (
+    analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize,
+)
+
+
+def outstanding_rows(count, user_id):
+    from django.utils import timezone
+
+    now = timezone.now()
+    for i in range(count):
+        # Metade expirada, metade ainda válida.
+        expires = now + timedelta(hours=12) - timedelta(days=2) * (i < count // 2)
+        yield (user_id, f'hist-{i:012d}', 'x', expires - timedelta(days=1), expires)
+
+
+def blacklisted_rows(count):
+    from django.utils import timezone
+
+    now = timezone.now()
+    for i in range(1, count + 1):
+        yield (i, now)
+
+
+def refresh_chain(serializer_class, user):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    state = {'refresh': str(RefreshToken.for_user(user))}
+
+    def step():
+        serializer = serializer_class(data={'refresh': state['refresh']})
+        serializer.is_valid(raise_exception=True)
+        state['refresh'] = serializer.validated_data['refresh']
+    return step
+
+
+def count_queries(step):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        step()
+    return len(ctx.captured_queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=10_000_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--prune', action='store_true')
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt import serializers as stock
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+    from users import serializers as ours
+    from users.blacklist import blacklist_index
+    from users.tokens import RefreshToken
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor}')
+        user = get_user_model().objects.create_user(email='refresh@bench.local', password='bench')
+        bulk_insert(OutstandingToken._meta.db_table, ('user_id', 'jti', 'token', 'created_at', 'expires_at'),
+                    outstanding_rows(args.tokens, user.pk))
+        bulk_insert(BlacklistedToken._meta.db_table, ('token_id', 'blacklisted_at'), blacklisted_rows(args.tokens))
+        analyze()
+
+        start = time.perf_counter()
+        blacklist_index.refresh()
+        print(f'Índice construído em {time.perf_counter() - start:.2f}s')
+
+        results = []
+        for label, serializer_class in (('simplejwt', stock.TokenRefreshSerializer),
+                                        ('users (índice)', ours.TokenRefreshSerializer)):
+            step = refresh_chain(serializer_class, user)
+            stats = summarize(measure(step, repeat=args.repeat))
+            results.append((label, count_queries(step), f'{stats["p50_ms"]:.2f}', f'{stats["p95_ms"]:.2f}', f'{stats["p99_ms"]:.2f}'))
+
+        client = APIClient()
+        state = {'refresh': str(RefreshToken.for_user(user))}
+
+        def http_step():
+            response = client.post('/api/token/refresh/', state)
+            state['refresh'] = response.data['refresh']
+        stats = summarize(measure(http_step, repeat=args.repeat))
+        results.append(('POST /api/token/refresh/', count_queries(http_step), f'{stats["p50_ms"]:.2f}', f'{stats["p95_ms"]:.2f}', f'{stats["p99_ms"]:.2f}'))
+
+        print_table(('caminho', 'consultas', 'p50 ms', 'p95 ms', 'p99 ms'), results)
+
+        if args.prune:
+            start = time.perf_counter()
+            call_command('prune_tokens', sleep=0, stdout=io.StringIO())
+            print(f'prune_tokens: {time.perf_counter() - start:.2f}s, '
+                  f'{OutstandingToken.objects.count():,} tokens restantes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Listagem de transações por usuário enquanto a tabela cresce até 10M de linhas.
+
+Uso::
+
+    python -m benchmarks.bench_transactions                 # SQLite (DOCKER_MODE=False)
+    DOCKER_MODE=True python -m benchmarks.bench_transactions  # PostgreSQL
+
+Um usuário "sonda" tem um número fixo de transações; o restante da tabela é
+preenchido com outros usuários. A cada checkpoint mede-se a latência de
+``GET /api/v1/transactions/`` (com e sem filtro de categoria/data) para a
+sonda e registra-se o plano de execução, que deve usar apenas os índices
+compostos ``(user, date)`` e ``(user, category, date)``.
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import (
+    analyze, bench_database, bulk_insert, measure, print_table, setup_django, summarize,
+)
+
+COLUMNS = ('user_id', 'amount', 'date', 'category', 'description', 'created_at', 'updated_at')
+
+
+def transaction_rows(user_ids, count, seed):
+    from django.utils import timezone
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    start = date(2015, 1, 1)
+    for _ in range(count):
+        yield (
+            rng.choice(user_ids),
+            rng.randint(-500_000, 500_000),
+            start + timedelta(days=rng.randint(0, 3650)),
+            rng.randint(0, 11),
+            f'Transação {rng.randint(1, 10**6)}',
+            now,
+            now,
+        )
+
+
+def explain(queryset):
+    try:
+        return queryset.explain()
+    except Exception as exc:  # pragma: no cover - depende do backend
+        return f'(explain indisponível: {exc})'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--checkpoints', type=int, default=4)
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--probe-rows', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+
+    from transactions.models import Transaction
+
+    User = get_user_model()
+    table = Transaction._meta.db_table
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        print(f'Banco: {connection.vendor} ({connection.settings_dict["NAME"]})')
+        probe = User.objects.create_user(email='probe@bench.local', password='bench')
+        User.objects.bulk_create(
+            User(email=f'user{i}@bench.local', password='!') for i in range(args.users)
+        )
+        others = list(User.objects.exclude(pk=probe.pk).values_list('pk', flat=True))
+        bulk_insert(table, COLUMNS, transaction_rows([probe.pk], args.probe_rows, seed=0))
+
+        client = APIClient()
+        client.force_authenticate(probe)
+        month_start = date(2020, 1, 1)
+        queries = {
+            'lista': ('/api/v1/transactions/', {}),
+            'categoria+data': ('/api/v1/transactions/', {
+                'category': 3,
+                'date__gte': month_start.isoformat(),
+                'date__lte': (month_start + timedelta(days=365)).isoformat(),
+            }),
+        }
+
+        step = max(1, (args.rows - args.probe_rows) // args.checkpoints)
+        results = []
+        total = args.probe_rows
+        for checkpoint in range(args.checkpoints):
+            total += bulk_insert(table, COLUMNS, transaction_rows(others, step, seed=checkpoint + 1))
+            analyze(table)
+            for label, (url, params) in queries.items():
+                samples = measure(lambda: client.get(url, params), repeat=args.repeat)
+                stats = summarize(samples)
+                results.append((f'{total:,}', label, f'{stats["p50_ms"]:.2f}', f'{stats["p95_ms"]:.2f}', f'{stats["p99_ms"]:.2f}'))
+                print(f'  {total:>12,} linhas  {label:<16} p50={stats["p50_ms"]:.2f}ms')
+
+        print()
+        print_table(('linhas', 'consulta', 'p50 ms', 'p95 ms', 'p99 ms'), results)
+        print()
+        print('Plano (lista):')
+        print(explain(Transaction.objects.filter(user=probe).order_by('-date', '-id')))
+        print('Plano (categoria+data):')
+        print(explain(Transaction.objects.filter(
+            user=probe, category=3, date__gte=month_start, date__lte=month_start + timedelta(days=365),
+        ).order_by('-date', '-id')))
+
+
+if __name__ == '__main__':
+    main()
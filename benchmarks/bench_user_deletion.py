@@ -0,0 +1,131 @@
+"""Exclusão de um usuário com muitas transações: ``instance.delete()`` x ``users.deletion``.
+
+Uso::
+
+    DOCKER_MODE=True python -m benchmarks.bench_user_deletion --transactions 1000000
+
+Para cada modo popula um usuário com ``--transactions`` transações (cinco
+anos de histórico, os triggers preenchem os totais) e o apaga:
+
+- ``delete()``: o que a view fazia, uma única transação com o ``Collector``;
+- ``lotes``: ``schedule_deletion`` (o que a requisição passa a fazer antes do
+  202) e ``delete_user`` com lotes de ``--batch-size`` linhas.
+
+Relata o tempo até a resposta, o tempo total, a transação mais longa (o
+tempo em que locks ficam presos e o vacuum e as réplicas esperam) e, durante
+a exclusão, a latência de uma escrita concorrente de outro usuário (uma
+transação nova a cada ``--write-interval`` segundos, em outra conexão).
+"""
+import argparse
+import threading
+import time
+from datetime import date
+from unittest import mock
+
+from benchmarks.bench_rollups import COLUMNS, transaction_rows
+from benchmarks.common import analyze, bench_database, bulk_insert, percentile, print_table, setup_django
+
+
+class ConcurrentWriter(threading.Thread):
+    """Cria transações de ``user`` em outra conexão e registra quanto cada uma demorou."""
+
+    def __init__(self, user, interval):
+        super().__init__(daemon=True)
+        self.user = user
+        self.interval = interval
+        self.stop = threading.Event()
+        self.samples = []
+
+    def run(self):
+        from django.db import connections
+
+        from transactions.models import Transaction
+
+        try:
+            while not self.stop.is_set():
+                start = time.perf_counter()
+                Transaction.objects.create(user=self.user, amount=-100, date=date.today(), description='Concorrente')
+                self.samples.append(time.perf_counter() - start)
+                self.stop.wait(self.interval)
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.join()
+
+
+def populate(count):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from transactions.models import Transaction
+
+    user = get_user_model().objects.create_user(email=f'delete{time.time_ns()}@bench.local', password=None)
+    bulk_insert(Transaction._meta.db_table, COLUMNS, transaction_rows(count, user.pk, date.today(), timezone.now()))
+    analyze(Transaction._meta.db_table)
+    return user
+
+
+def inline(user, batch_size):
+    start = time.perf_counter()
+    user.delete()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, elapsed
+
+
+def batched(user, batch_size):
+    from users import deletion
+
+    durations = []
+    run = deletion.Step.run
+
+    def timed(step, size):
+        started = time.perf_counter()
+        run(step, size)
+        durations.append(time.perf_counter() - started)
+
+    start = time.perf_counter()
+    deletion.schedule_deletion(user)
+    response = time.perf_counter() - start
+    with mock.patch.object(deletion.Step, 'run', timed):
+        deletion.delete_user(user.pk, batch_size=batch_size)
+    return response, time.perf_counter() - start, max(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--write-interval', type=float, default=0.01)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth import get_user_model
+
+    from transactions.models import Transaction
+
+    rows = []
+    with bench_database(keepdb=args.keepdb) as connection:
+        vendor = connection.vendor
+        other = get_user_model().objects.create_user(email=f'writer{time.time_ns()}@bench.local', password=None)
+        for label, delete in (('delete()', inline), ('lotes', batched)):
+            user = populate(args.transactions)
+            with ConcurrentWriter(other, args.write_interval) as writer:
+                response, total, longest = delete(user, args.batch_size)
+            assert not Transaction.objects.filter(user_id=user.pk).exists()
+            rows.append((label, f'{response * 1000:,.0f}', f'{total:,.1f}', f'{longest * 1000:,.0f}',
+                         f'{percentile(writer.samples, 99) * 1000:,.1f}', f'{max(writer.samples) * 1000:,.0f}'))
+
+    print(f'{args.transactions:,} transações, lotes de {args.batch_size:,} ({vendor})')
+    print_table(('modo', 'resposta ms', 'total s', 'maior transação ms', 'escrita p99 ms', 'escrita máx ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
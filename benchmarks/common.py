@@ -0,0 +1,130 @@
+"""Utilitários compartilhados pelos benchmarks do PulseVault.
+
+Os scripts deste pacote rodam fora do ``manage.py``: chamam ``setup_django()``
+e criam um banco descartável (o mesmo mecanismo do ``manage.py test``) com
+``bench_database()``, de modo que a configuração de ``core/settings.py``
+(SQLite ou PostgreSQL, conforme ``DOCKER_MODE``) é respeitada sem tocar no
+banco de desenvolvimento.
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark-insecure-key')
+    import django
+    django.setup()
+
+
+@contextmanager
+def bench_database(keepdb=False):
+    """Cria (ou reaproveita, com ``keepdb``) o banco de benchmark e o remove ao final."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    if not test_settings.get('NAME'):
+        if connection.vendor == 'sqlite':
+            # Em memória, 10M de linhas não cabem; usa um arquivo dedicado.
+            test_settings['NAME'] = str(BASE_DIR / 'db_bench.sqlite3')
+        else:
+            test_settings['NAME'] = f"bench_{connection.settings_dict['NAME']}"
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def bulk_insert(table, columns, rows, batch_size=50_000):
+    """Insere ``rows`` pelo caminho mais rápido do backend (COPY no PostgreSQL)."""
+    from django.db import connection, transaction
+
+    inserted = 0
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN'
+            with cursor.cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    inserted += 1
+        return inserted
+
+    placeholders = ', '.join(['%s'] * len(columns))
+    sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})'
+    batch = []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('PRAGMA synchronous = OFF')
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    cursor.executemany(sql, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                cursor.executemany(sql, batch)
+            inserted += len(batch)
+    return inserted
+
+
+def analyze(table=None):
+    """Atualiza as estatísticas do planejador após uma carga em massa."""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {table}' if table else 'ANALYZE')
+
+
+def measure(fn, repeat=50, warmup=5):
+    """Executa ``fn`` ``repeat`` vezes e devolve as durações em segundos."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Resumo em milissegundos: média e percentis 50/95/99."""
+    return {
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) if rows else len(str(h))
+              for i, h in enumerate(headers)]
+    line = '  '.join(str(h).ljust(w) for h, w in zip(headers, widths))
+    print(line)
+    print('-' * len(line))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
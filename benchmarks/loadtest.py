@@ -0,0 +1,134 @@
+"""Gerador de carga HTTP/1.1 local, sem dependências externas.
+
+Uso::
+
+    python -m benchmarks.loadtest http://127.0.0.1:8000/api/v1/transactions/ \\
+        -c 500 -d 30 -H "Authorization: Bearer <token>"
+
+Abre ``-c`` conexões concorrentes (asyncio), reaproveitando-as com keep-alive
+quando o servidor permite, e reporta requisições por segundo, latências
+p50/p95/p99 e a distribuição de status.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks.common import summarize
+
+
+def build_request(url, method='GET', headers=None, body=b''):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive']
+    for name, value in (headers or {}).items():
+        lines.append(f'{name}: {value}')
+    if body:
+        lines.append(f'Content-Length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin1') + body
+
+
+async def read_response(reader):
+    """Lê uma resposta completa; devolve ``(status, manter_conexão)``."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('conexão encerrada pelo servidor')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif status not in (204, 304):
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _worker(host, port, requests, deadline, latencies, statuses, offset):
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < deadline:
+        raw = requests[i % len(requests)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(raw)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            statuses['erro'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[status] += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _run(urls, concurrency, duration, headers):
+    parts = urlsplit(urls[0])
+    host, port = parts.hostname, parts.port or 80
+    requests = [build_request(url, headers=headers) for url in urls]
+    latencies, statuses = [], Counter()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _worker(host, port, requests, deadline, latencies, statuses, n) for n in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def run_load(urls, concurrency=50, duration=10.0, headers=None):
+    """Dispara carga contra ``urls`` (alternadas) e devolve um resumo em dict."""
+    if isinstance(urls, str):
+        urls = [urls]
+    latencies, statuses, elapsed = asyncio.run(_run(urls, concurrency, duration, headers or {}))
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'errors': statuses.pop('erro', 0),
+        'status': {str(k): v for k, v in sorted(statuses.items())},
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('-c', '--concurrency', type=int, default=50)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    parser.add_argument('-H', '--header', action='append', default=[], help='"Nome: valor"')
+    args = parser.parse_args()
+
+    headers = dict(h.split(':', 1) for h in args.header)
+    headers = {k.strip(): v.strip() for k, v in headers.items()}
+    print(json.dumps(run_load(args.urls, args.concurrency, args.duration, headers), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""Suíte de desempenho: microbenchmarks, carga HTTP e comparação com baseline.
+
+Uso::
+
+    python -m benchmarks.run                       # microbenchmarks
+    python -m benchmarks.run --load                # + carga em core.wsgi e core.asgi
+    python -m benchmarks.run --save                # grava a baseline
+    python -m benchmarks.run --threshold 0.2       # falha se piorar mais de 20%
+
+Os microbenchmarks cobrem serializers (``ModelSerializer`` x ``.values()``),
+autenticação JWT (simplejwt, cache frio e quente), o hasher de senhas e os
+caminhos de consulta da API (requisições completas pelo ``APIClient``). A
+carga sobe o gunicorn com workers sync e uvicorn (ver ``bench_async``) sobre
+o mesmo banco populado.
+
+Cada resultado traz p50/p95/p99, vazão e consultas por requisição. Com
+``--save`` o resultado vira a baseline (``benchmarks/baselines/<banco>.json``
+por padrão); sem ele, o resultado é comparado com a baseline existente e o
+processo termina com código 1 se alguma latência (p50/p95) subir, ou a vazão
+cair, mais que ``--threshold`` — ou se o número de consultas aumentar.
+"""
+import argparse
+import json
+import platform
+import signal
+import sys
+from datetime import date
+from pathlib import Path
+
+from benchmarks.common import BASE_DIR, bench_database, measure, print_table, setup_django, summarize
+
+BASELINE_DIR = BASE_DIR / 'benchmarks' / 'baselines'
+LOWER_IS_BETTER = ('p50_ms', 'p95_ms')
+HIGHER_IS_BETTER = ('rps',)
+
+
+# ------------------------------------------------------------
+# MICROBENCHMARKS
+# ------------------------------------------------------------
+def serializer_benchmarks(owner):
+    from django.contrib.auth import get_user_model
+
+    from benchmarks.bench_serialization import model_serializer_path, values_path
+    from transactions.models import Transaction
+    from transactions.serializers import TransactionSerializer
+    from users.serializers import CustomUserSerializer
+
+    users = get_user_model().objects.order_by('-created_at', '-id')[:1000]
+    transactions = Transaction.objects.filter(user=owner).order_by('-date', '-id')[:1000]
+    return {
+        'serializer.users.model': (model_serializer_path(users, CustomUserSerializer), 20),
+        'serializer.users.values': (values_path(users, CustomUserSerializer), 20),
+        'serializer.transactions.model': (model_serializer_path(transactions, TransactionSerializer), 20),
+        'serializer.transactions.values': (values_path(transactions, TransactionSerializer), 20),
+    }
+
+
+def auth_benchmarks(token):
+    from django.core.cache import cache
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+
+    from users.authentication import CachedJWTAuthentication
+
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    stock, cached = JWTAuthentication(), CachedJWTAuthentication()
+
+    def cold():
+        cache.clear()
+        cached.authenticate(request)
+    return {
+        'auth.jwt.simplejwt': (lambda: stock.authenticate(request), 500),
+        'auth.jwt.cache_frio': (cold, 500),
+        'auth.jwt.cache_quente': (lambda: cached.authenticate(request), 500),
+    }
+
+
+def hasher_benchmarks():
+    from django.contrib.auth.hashers import check_password, make_password
+
+    encoded = make_password('senha-benchmark')
+    return {
+        'hasher.make_password': (lambda: make_password('senha-benchmark'), 5),
+        'hasher.check_password': (lambda: check_password('senha-benchmark', encoded), 5),
+    }
+
+
+def query_urls(owner):
+    from rest_framework.test import APIClient
+
+    from transactions.models import Category, Transaction
+
+    client = APIClient()
+    client.force_authenticate(owner)
+    deep = '/api/v1/transactions/'
+    for _ in range(20):
+        deep = client.get(deep).data['next'] or deep
+    transaction = Transaction.objects.filter(user=owner).order_by('id').first()
+    etag = client.get(f'/api/v1/transaction/{transaction.pk}/')['ETag']
+    return {
+        'query.transactions.list': ('/api/v1/transactions/', {}),
+        'query.transactions.list_pagina_21': (deep, {}),
+        'query.transactions.categoria': (f'/api/v1/transactions/?category={Category.LAZER}', {}),
+        'query.transactions.periodo': ('/api/v1/transactions/?date__gte=2020-01-01&date__lte=2020-03-31', {}),
+        'query.transactions.detalhe': (f'/api/v1/transaction/{transaction.pk}/', {}),
+        'query.transactions.detalhe_304': (f'/api/v1/transaction/{transaction.pk}/', {'HTTP_IF_NONE_MATCH': etag}),
+        'query.transactions.busca': ('/api/v1/transactions/?search=4242', {}),
+        'query.users.list': ('/api/v1/users/', {}),
+        'query.users.busca': ('/api/v1/users/?search=user4242@', {}),
+        'query.users.detalhe': (f'/api/v1/user/{owner.pk}/', {}),
+    }
+
+
+def query_benchmarks(owner, token):
+    from rest_framework.test import APIClient
+
+    # Requisições completas, com autenticação real pelo cabeçalho (cache quente).
+    client = APIClient(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def request(url, headers):
+        def step():
+            response = client.get(url, **headers)
+            if response.status_code >= 400:
+                raise SystemExit(f'{url}: status {response.status_code}')
+        return step
+    return {name: (request(url, headers), 100) for name, (url, headers) in query_urls(owner).items()}
+
+
+def count_queries(fn):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    return len(ctx.captured_queries)
+
+
+def run_micro(owner, token, only=None):
+    benchmarks = {
+        **serializer_benchmarks(owner),
+        **auth_benchmarks(token),
+        **hasher_benchmarks(),
+        **query_benchmarks(owner, token),
+    }
+    results = {}
+    for name, (fn, repeat) in benchmarks.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        samples = measure(fn, repeat=repeat, warmup=min(5, repeat))
+        stats = summarize(samples)
+        stats['rps'] = len(samples) / sum(samples) if sum(samples) else 0.0
+        stats['queries'] = count_queries(fn)
+        results[name] = stats
+    return results
+
+
+# ------------------------------------------------------------
+# LOAD
+# ------------------------------------------------------------
+def run_load_suite(connection, owner, token, args):
+    from django.db import connection as default_connection
+
+    from benchmarks.bench_async import MODES, free_port, server_env, start_server, wait_for_port
+    from benchmarks.loadtest import run_load
+
+    paths = [url for url, headers in query_urls(owner).values() if not headers]
+    default_connection.close()
+    results = {}
+    for label, (app, worker_class, async_api) in MODES.items():
+        port = free_port()
+        server = start_server(app, worker_class, args.workers, port, server_env(connection, async_api))
+        try:
+            wait_for_port(port)
+            urls = [f'http://127.0.0.1:{port}{path}' for path in paths]
+            stats = run_load(urls, args.connections, args.duration, {'Authorization': f'Bearer {token}'})
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+        name = 'load.' + label.split()[0]
+        results[name] = {key: stats[key] for key in ('rps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'errors')}
+    return results
+
+
+# ------------------------------------------------------------
+# BASELINE
+# ------------------------------------------------------------
+def compare(results, baseline, threshold):
+    """Lista de ``(benchmark, métrica, baseline, atual)`` que pioraram além do limite."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in LOWER_IS_BETTER:
+            if metric in previous and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append((name, metric, previous[metric], current[metric]))
+        for metric in HIGHER_IS_BETTER:
+            if metric in previous and current[metric] < previous[metric] * (1 - threshold):
+                regressions.append((name, metric, previous[metric], current[metric]))
+        if 'queries' in previous and current.get('queries', 0) > previous['queries']:
+            regressions.append((name, 'queries', previous['queries'], current['queries']))
+    return regressions
+
+
+def print_results(results):
+    rows = [
+        (name, f'{r["rps"]:.1f}', f'{r["p50_ms"]:.2f}', f'{r["p95_ms"]:.2f}', f'{r["p99_ms"]:.2f}',
+         r.get('queries', '-'))
+        for name, r in results.items()
+    ]
+    print_table(('benchmark', 'ops/s', 'p50 ms', 'p95 ms', 'p99 ms', 'consultas'), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000, help='usuários e transações populados')
+    parser.add_argument('--only', nargs='*', help='prefixos de benchmarks a executar (ex.: auth query)')
+    parser.add_argument('--load', action='store_true', help='inclui a carga HTTP em WSGI e ASGI')
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--baseline', type=Path, help='arquivo JSON da baseline')
+    parser.add_argument('--save', action='store_true', help='grava o resultado como baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='piora tolerada (0.25 = 25%%)')
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from benchmarks.bench_serialization import seed
+    from users.tokens import RefreshToken
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        vendor = connection.vendor
+        print(f'Banco: {vendor}, {args.rows:,} linhas')
+        owner = seed(args.rows)
+        token = str(RefreshToken.for_user(owner).access_token)
+
+        results = run_micro(owner, token, args.only)
+        if args.load:
+            results.update(run_load_suite(connection, owner, token, args))
+    print_results(results)
+
+    path = args.baseline or BASELINE_DIR / f'{vendor}.json'
+    meta = {'vendor': vendor, 'rows': args.rows, 'python': platform.python_version(), 'date': date.today().isoformat()}
+    if args.save:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({'meta': meta, 'results': results}, indent=2, sort_keys=True) + '\n')
+        print(f'Baseline gravada em {path}')
+        return
+
+    if not path.exists():
+        print(f'Sem baseline em {path}; use --save para criá-la.')
+        return
+    baseline = json.loads(path.read_text())
+    if baseline['meta'].get('rows') != args.rows:
+        print(f'Aviso: baseline com {baseline["meta"].get("rows"):,} linhas, execução com {args.rows:,}.')
+    regressions = compare(results, baseline['results'], args.threshold)
+    if regressions:
+        print(f'\nRegressões acima de {args.threshold:.0%}:')
+        print_table(('benchmark', 'métrica', 'baseline', 'atual'),
+                    [(n, m, f'{b:.2f}', f'{c:.2f}') for n, m, b, c in regressions])
+        sys.exit(1)
+    print(f'\nSem regressões acima de {args.threshold:.0%} em relação a {path}.')
+
+
+if __name__ == '__main__':
+    main()
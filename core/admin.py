@@ -0,0 +1,165 @@
+"""Changelist do admin para tabelas grandes, sem ``COUNT(*)`` nem ``OFFSET``.
+
+``KeysetAdminMixin`` troca três peças do ``ModelAdmin``:
+
+- ``EstimatedCountPaginator``: no PostgreSQL, usa a estimativa do catálogo
+  (``pg_class.reltuples``, sem filtros) ou do planejador (``EXPLAIN``, com
+  filtros ou busca); só quando ela fica abaixo de ``exact_limit`` conta de
+  verdade, com ``COUNT`` sobre um ``LIMIT`` (custo limitado). Nos outros
+  bancos, que não têm estimativa barata, faz a contagem exata;
+- a contagem total sem filtros (``show_full_result_count``) e as facetas
+  ficam desligadas;
+- ``KeysetChangeList``: as páginas seguem um cursor (``?cursor=``) com os
+  valores da última linha vista, como ``core.pagination.KeysetPagination``.
+  A página 10.000 custa o mesmo que a primeira, desde que a ordenação tenha
+  índice: limite as colunas ordenáveis com ``sortable_by``.
+
+Ordenações que não são campos do próprio modelo (expressões, relações) e
+changelists com ``list_editable`` voltam à paginação por número de página,
+ainda com a contagem estimada.
+"""
+import json
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .pagination import KeysetPagination, decode_position, encode_position
+
+CURSOR_VAR = 'cursor'
+
+
+def estimate_count(queryset):
+    """Número estimado de linhas do queryset pelo PostgreSQL; ``None`` em outros bancos."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # -1: tabela ainda não analisada; cai no planejador.
+            if row and row[0] >= 0:
+                return row[0]
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPaginator(Paginator):
+    exact_limit = 10_000
+    # False quando count é a estimativa do banco.
+    exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or connections[queryset.db].vendor != 'postgresql':
+            return super().count
+        estimate = estimate_count(queryset)
+        if estimate <= self.exact_limit:
+            # Estimativa pequena: conta de verdade, parando no limite se ela errou para menos.
+            bounded = queryset.order_by()[:self.exact_limit + 1].count()
+            if bounded <= self.exact_limit:
+                return bounded
+            estimate = bounded
+        self.exact = False
+        return estimate
+
+
+class KeysetChangeList(ChangeList):
+    cursor = None
+    keyset = False
+    next_url = previous_url = first_url = None
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # O cursor é da navegação, não um filtro: fica fora dos lookups e dos links de filtro, ordenação e busca.
+        if CURSOR_VAR in self.params:
+            self.cursor = self.params.pop(CURSOR_VAR)
+            del self.filter_params[CURSOR_VAR]
+        return super().get_queryset(request, exclude_parameters)
+
+    def keyset_ordering(self):
+        """Ordenação do changelist se toda ela for de campos do modelo; senão ``None``."""
+        if self.list_editable:
+            return None
+        ordering, fields = [], []
+        for name in self.queryset.query.order_by:
+            if not isinstance(name, str) or '__' in name:
+                return None
+            try:
+                field = self.lookup_opts.pk if name.lstrip('-') == 'pk' else self.lookup_opts.get_field(name.lstrip('-'))
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.is_relation:
+                return None
+            # A ordenação do ModelAdmin chega repetida (a do queryset é somada à da changelist).
+            if field not in fields:
+                ordering.append(('-' if name.startswith('-') else '') + field.name)
+                fields.append(field)
+        return (ordering, fields) if ordering else None
+
+    def get_results(self, request):
+        keyset = None if self.show_all else self.keyset_ordering()
+        if keyset is None:
+            if self.cursor is not None:
+                raise IncorrectLookupParameters
+            return super().get_results(request)
+        ordering, fields = keyset
+        try:
+            position, reverse = decode_position(self.cursor, ordering, fields) if self.cursor else (None, False)
+        except ValueError:
+            raise IncorrectLookupParameters
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        queryset = self.queryset
+        order = [KeysetPagination.invert(name) for name in ordering] if reverse else ordering
+        if position is not None:
+            queryset = queryset.filter(KeysetPagination.keyset_filter(order, position))
+        rows = list(queryset.order_by(*order)[:self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+        if reverse:
+            rows.reverse()
+        has_next = has_more if not reverse else position is not None
+        has_previous = position is not None if not reverse else has_more
+
+        def page_url(row, reverse):
+            token = encode_position(ordering, [getattr(row, field.attname) for field in fields], reverse)
+            return self.get_query_string({CURSOR_VAR: token})
+
+        self.keyset = True
+        self.next_url = page_url(rows[-1], False) if rows and has_next else None
+        self.previous_url = page_url(rows[0], True) if rows and has_previous else None
+        self.first_url = self.get_query_string() if position is not None else None
+        if position is None and not has_more:
+            # Tudo coube na primeira página: a contagem é o tamanho dela.
+            paginator.count = len(rows)
+        self.result_count = paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.result_list = rows
+        self.can_show_all = paginator.exact and self.result_count <= self.list_max_show_all
+        self.multi_page = has_next or has_previous
+        self.paginator = paginator
+
+
+class KeysetAdminMixin:
+    """``ModelAdmin`` com contagem estimada e navegação por cursor (ver o módulo)."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    change_list_template = 'admin/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,182 @@
+"""Views assíncronas para o modo ASGI (``ASYNC_API=True``).
+
+O DRF não tem views async, então ``AsyncAPIView`` é uma ``View`` do Django
+com handlers ``async`` que reaproveita a view DRF equivalente
+(``api_view_class``) para tudo que não faz I/O: negociação de conteúdo,
+permissões, filtros, serializers, paginação e tratamento de exceções. O que
+toca o banco usa o ORM assíncrono (``aget``, ``adelete``, iteração async);
+a validação e a gravação dos serializers, que o DRF só oferece de forma
+síncrona, rodam em ``sync_to_async``. Views com ``ValuesReadMixin`` leem
+por ``.values()`` também aqui.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.response import Response
+
+from users.authentication import CachedJWTAuthentication
+from .mixins import ConditionalMixin, ValuesReadMixin, lookup_kwargs
+
+
+class AsyncAPIView(View):
+    api_view_class = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Autenticação por JWT no cabeçalho, como nas views DRF (também isentas de CSRF).
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        return self.handle(handler, request, *args, **kwargs)
+
+    async def handle(self, handler, request, *args, **kwargs):
+        view = self.api_view_class()
+        view.args, view.kwargs = args, kwargs
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        view.headers = view.default_response_headers
+        try:
+            view.format_kwarg = view.get_format_suffix(**kwargs)
+            neg = view.perform_content_negotiation(drf_request)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = neg
+            await self.authenticate(drf_request)
+            view.check_permissions(drf_request)
+            if handler is None:
+                raise MethodNotAllowed(request.method)
+            response = await handler(view, drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        response = view.finalize_response(drf_request, response, *args, **kwargs)
+        return response.render() if isinstance(response, Response) else response
+
+    async def options(self, view, request, *args, **kwargs):
+        # Metadados podem consultar o banco (ex.: get_object em PUT); roda na thread sync.
+        return await sync_to_async(view.options)(request, *args, **kwargs)
+
+    async def authenticate(self, request):
+        authenticator = CachedJWTAuthentication()
+        # Sem autenticador bem-sucedido o DRF responde 401 (e não 403) às permissões negadas.
+        request._authenticator = None
+        result = await authenticator.aauthenticate(request)
+        if result is None:
+            request.user, request.auth = AnonymousUser(), None
+        else:
+            request._authenticator = authenticator
+            request.user, request.auth = result
+
+    async def get_object(self, view, queryset=None):
+        if queryset is None:
+            queryset = view.filter_queryset(view.get_queryset())
+        try:
+            obj = await queryset.aget(**lookup_kwargs(view))
+        except (queryset.model.DoesNotExist, ValueError, TypeError):
+            raise Http404
+        if isinstance(obj, queryset.model):
+            view.check_object_permissions(view.request, obj)
+        return obj
+
+    @staticmethod
+    def get_values_reader(view):
+        """Leitor ``.values()`` da view DRF, quando ela usa ``ValuesReadMixin``."""
+        return view.get_values_reader() if isinstance(view, ValuesReadMixin) else None
+
+    async def get_validators(self, view, collection=False):
+        """``(etag, last_modified)`` da view DRF, quando ela usa ``ConditionalMixin``."""
+        if not isinstance(view, ConditionalMixin):
+            return None
+        if collection:
+            return view.collection_validators(await view.get_queryset().aaggregate(**view.collection_aggregates()))
+        return view.object_validators(*await self.get_object(view, view.get_validator_queryset()))
+
+    @staticmethod
+    def evaluate_preconditions(view, request, validators):
+        if validators is None:
+            return None
+        return view.evaluate_preconditions(request, *validators)
+
+    async def check_write_preconditions(self, view, request):
+        if isinstance(view, ConditionalMixin) and view.has_write_preconditions():
+            self.evaluate_preconditions(view, request, await self.get_validators(view))
+
+    @staticmethod
+    def set_validators(view, response, validators):
+        return response if validators is None else view.set_validators(response, *validators)
+
+
+class AsyncListMixin:
+    async def get(self, view, request, *args, **kwargs):
+        validators = await self.get_validators(view, collection=True)
+        not_modified = self.evaluate_preconditions(view, request, validators)
+        if not_modified is not None:
+            return not_modified
+        reader = self.get_values_reader(view)
+        if reader is not None:
+            queryset = view.get_values_queryset(reader)
+        else:
+            queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        if paginator is None:
+            items = [item async for item in queryset]
+        else:
+            items = await paginator.apaginate_queryset(queryset, request, view=view)
+        data = reader.represent_many(items) if reader is not None else view.get_serializer(items, many=True).data
+        response = Response(data) if paginator is None else paginator.get_paginated_response(data)
+        return self.set_validators(view, response, validators)
+
+
+class AsyncCreateMixin:
+    async def post(self, view, request, *args, **kwargs):
+        serializer = view.get_serializer(data=request.data)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        await sync_to_async(view.perform_create)(serializer)
+        headers = view.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class AsyncRetrieveMixin:
+    async def get(self, view, request, *args, **kwargs):
+        reader = view.get_detail_reader() if isinstance(view, ValuesReadMixin) else None
+        if reader is not None:
+            row = await self.get_object(view, view.get_values_queryset(reader))
+            validators = view.row_validators(row) if isinstance(view, ConditionalMixin) else None
+            response = self.evaluate_preconditions(view, request, validators)
+            if response is None:
+                response = self.set_validators(view, Response(reader.represent(row)), validators)
+            return response
+        validators = await self.get_validators(view)
+        response = self.evaluate_preconditions(view, request, validators)
+        if response is not None:
+            return response
+        instance = await self.get_object(view)
+        return self.set_validators(view, Response(view.get_serializer(instance).data), validators)
+
+
+class AsyncUpdateMixin:
+    async def put(self, view, request, *args, partial=False, **kwargs):
+        await self.check_write_preconditions(view, request)
+        instance = await self.get_object(view)
+        serializer = view.get_serializer(instance, data=request.data, partial=partial)
+        await sync_to_async(serializer.is_valid)(raise_exception=True)
+        await sync_to_async(view.perform_update)(serializer)
+        response = Response(serializer.data)
+        if isinstance(view, ConditionalMixin):
+            view.set_validators(response, *view.instance_validators(instance))
+        return response
+
+    async def patch(self, view, request, *args, **kwargs):
+        return await self.put(view, request, *args, partial=True, **kwargs)
+
+
+class AsyncDestroyMixin:
+    async def delete(self, view, request, *args, **kwargs):
+        await self.check_write_preconditions(view, request)
+        instance = await self.get_object(view)
+        # perform_destroy, e não adelete, para a conferência de versão sob lock (If-Match).
+        await sync_to_async(view.perform_destroy)(instance)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,148 @@
+"""Backend de cache compartilhado entre processos, com despejo LRU.
+
+``SharedLRUCache`` guarda as entradas num arquivo SQLite em modo WAL. Em
+``/dev/shm`` (o padrão de ``RESPONSE_CACHE_LOCATION``) o arquivo fica na
+memória compartilhada: todos os workers do gunicorn no host leem e gravam
+as mesmas entradas, e uma invalidação feita num processo vale para todos —
+o que o ``LocMemCache`` não oferece. Containers têm cada um o seu
+``/dev/shm``: a web e o ``run_workers`` precisam apontar para o mesmo arquivo
+num volume compartilhado. Em vários hosts, use o Redis
+(``django.core.cache.backends.redis.RedisCache`` com
+``maxmemory-policy allkeys-lru``).
+
+Cada entrada registra o último acesso. A cada ``MAX_ENTRIES // 100``
+gravações de um processo, as expiradas são removidas e, acima de
+``MAX_ENTRIES``, as menos usadas recentemente também (mais
+``1/CULL_FREQUENCY`` do limite, para não repetir o corte a cada gravação).
+Leituras só regravam o último acesso quando ele tem mais de
+``ACCESS_RESOLUTION`` segundos: uma leitura não vira escrita a cada hit.
+
+``add`` é atômico entre processos (``INSERT ... ON CONFLICT DO UPDATE
+... WHERE`` expirada), base das travas de ``core.response_cache``.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+ACCESS_RESOLUTION = 1.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+
+
+class SharedLRUCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._cull_every = max(1, self._max_entries // 100)
+
+    # --------------------------------------------------------
+    # Conexão: uma por thread, reaberta depois de um fork.
+    # --------------------------------------------------------
+    @property
+    def _db(self):
+        pid, db = getattr(self._local, 'db', (None, None))
+        if pid != os.getpid():
+            db = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+            # Cache não precisa sobreviver a uma queda do sistema: sem fsync.
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            for sql in SCHEMA:
+                db.execute(sql)
+            self._local.db = (os.getpid(), db)
+            self._local.sets = 0
+        return db
+
+    def _encode(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _touch_access(self, rows, now):
+        stale = [key for key, _, _, accessed in rows if accessed < now - ACCESS_RESOLUTION]
+        if stale:
+            self._db.execute(f'UPDATE cache SET accessed = ? WHERE key IN ({", ".join("?" * len(stale))})',
+                             [now, *stale])
+
+    def _fetch(self, keys):
+        now = time.time()
+        rows = [row for row in self._db.execute(
+            f'SELECT key, value, expires, accessed FROM cache WHERE key IN ({", ".join("?" * len(keys))})', keys,
+        ) if row[2] is None or row[2] > now]
+        self._touch_access(rows, now)
+        return {key: pickle.loads(value) for key, value, _, _ in rows}
+
+    def _cull(self):
+        self._local.sets += 1
+        if self._local.sets % self._cull_every:
+            return
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', [time.time()])
+        (count,), = db.execute('SELECT COUNT(*) FROM cache')
+        if count > self._max_entries:
+            excess = count - self._max_entries + self._max_entries // self._cull_frequency
+            db.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)', [excess])
+
+    def _write(self, key, value, timeout, only_if_missing=False):
+        now = time.time()
+        sql = ('INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE '
+               'SET value = excluded.value, expires = excluded.expires, accessed = excluded.accessed')
+        params = [key, self._encode(value), self.get_backend_timeout(timeout), now]
+        if only_if_missing:
+            sql += ' WHERE cache.expires <= ?'
+            params.append(now)
+        written = self._db.execute(sql, params).rowcount
+        self._cull()
+        return written > 0
+
+    # --------------------------------------------------------
+    # API do cache do Django
+    # --------------------------------------------------------
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(self.make_and_validate_key(key, version=version), value, timeout, only_if_missing=True)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        mapping = {self.make_and_validate_key(key, version=version): key for key in keys}
+        return {mapping[key]: value for key, value in self._fetch(list(mapping)).items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(self.make_and_validate_key(key, version=version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return self._db.execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), now, key, now],
+        ).rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._db.execute('DELETE FROM cache WHERE key = ?', [key]).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._db.execute(f'DELETE FROM cache WHERE key IN ({", ".join("?" * len(keys))})', keys)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', [key, time.time()],
+        ).fetchone())
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
@@ -0,0 +1,39 @@
+"""Pool de conexões do psycopg3 para o PostgreSQL.
+
+Com ``DB_POOL=True`` o ``OPTIONS['pool']`` de ``settings.DATABASES`` é
+repassado pelo Django ao ``psycopg_pool.ConnectionPool``. O pool é criado
+fechado e aberto na primeira conexão de cada processo, então cada worker do
+gunicorn tem o seu. Ao fim da requisição a conexão volta ao pool em vez de ser
+fechada. Com pool, ``close_if_health_check_failed`` do Django não faz nada;
+``CONN_HEALTH_CHECKS`` vira o ``check`` do pool
+(``ConnectionPool.check_connection``), que testa a conexão a cada empréstimo
+e descarta as perdidas num restart ou failover do banco.
+
+``pool_stats`` resume os pools abertos no processo para o ``/metrics`` (ver
+``core.instrumentation``).
+"""
+from django.conf import settings
+
+# Contadores do psycopg_pool (cumulativos; ausentes enquanto zerados) e medidas instantâneas.
+COUNTERS = ('requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors',
+            'connections_num', 'connections_ms', 'connections_errors', 'connections_lost')
+GAUGES = ('pool_max', 'pool_size', 'pool_available', 'requests_waiting')
+
+
+def open_pools():
+    """Pools do processo (compartilhados entre threads, ao contrário das conexões)."""
+    if not any(db['ENGINE'] == 'django.db.backends.postgresql' for db in settings.DATABASES.values()):
+        return {}
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    return dict(DatabaseWrapper._connection_pools)
+
+
+def pool_stats():
+    """``{'<alias>|<estatística>': valor}`` para cada pool aberto neste processo."""
+    stats = {}
+    for alias, pool in open_pools().items():
+        raw = pool.get_stats()
+        for key in COUNTERS + GAUGES:
+            stats[f'{alias}|{key}'] = raw.get(key, 0)
+    return stats
@@ -0,0 +1,210 @@
+"""Leituras em réplica, escritas no primário.
+
+``PrimaryReplicaRouter`` só manda leituras para as réplicas de
+``REPLICA_ROUTING['REPLICAS']`` dentro de uma requisição marcada por
+``ReplicaRoutingMiddleware`` e quando nada exige o primário:
+
+- métodos não seguros (POST, PUT, PATCH, DELETE) leem e escrevem no primário,
+  o que inclui os endpoints de token do simplejwt;
+- depois da primeira escrita, o resto da requisição lê do primário;
+- por ``STICKY_SECONDS`` após uma escrita, as requisições do mesmo cliente
+  (cabeçalho ``Authorization`` ou cookie de sessão) também leem do primário,
+  para que ele veja o que acabou de gravar. A marca fica no alias ``CACHE``
+  de ``CACHES``, compartilhado entre os workers (o ``SharedLRUCache`` das
+  respostas por padrão; com vários hosts, o Redis);
+- uma réplica com atraso acima de ``MAX_LAG`` segundos, fora do ar ou sem
+  receber WAL do primário (``pg_stat_wal_receiver`` vazio ou fora de
+  ``streaming``), é ignorada; o atraso é medido no máximo a cada
+  ``LAG_CHECK_INTERVAL`` segundos por processo;
+- blocos em ``use_primary()`` (ex.: a autenticação) leem do primário.
+
+Fora de requisições (comandos, threads de fundo) tudo vai para o primário.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 5,
+    'MAX_LAG': 5.0,
+    'LAG_CHECK_INTERVAL': 1.0,
+    # Alias de CACHES da marca de leitura das próprias escritas: precisa ser
+    # compartilhado entre os workers (a requisição seguinte pode cair em outro).
+    'CACHE': 'responses',
+}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+current = ContextVar('replica_routing', default=None)
+forced_primary = ContextVar('replica_forced_primary', default=False)
+
+# alias -> (instante da medição, saudável)
+_health = {}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REPLICA_ROUTING', {})}
+
+
+class RoutingState:
+    __slots__ = ('primary', 'wrote')
+
+    def __init__(self, primary):
+        self.primary = primary
+        self.wrote = False
+
+
+@contextmanager
+def use_primary():
+    token = forced_primary.set(True)
+    try:
+        yield
+    finally:
+        forced_primary.reset(token)
+
+
+# ------------------------------------------------------------
+# ATRASO
+# ------------------------------------------------------------
+LAG_SQL = (
+    'SELECT pg_is_in_recovery(),'
+    # Sem linha, o walreceiver não está rodando. status só aparece com pg_read_all_stats (senão é nulo).
+    ' (SELECT status FROM pg_stat_wal_receiver),'
+    ' EXISTS (SELECT 1 FROM pg_stat_wal_receiver),'
+    ' pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn(),'
+    ' EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())'
+)
+
+
+def lag_from_status(in_recovery, receiver_status, receiving, caught_up, replay_lag):
+    """Atraso em segundos a partir de ``LAG_SQL``; infinito se a réplica perdeu o primário.
+
+    ``caught_up`` (tudo o que chegou já foi aplicado) só quer dizer atraso
+    zero enquanto o WAL continua chegando: uma réplica sem conexão com o
+    primário também fica com os dois LSNs iguais, parada no tempo.
+    """
+    if not in_recovery:
+        return 0.0
+    if not receiving or receiver_status not in (None, 'streaming'):
+        return math.inf
+    if caught_up:
+        return 0.0
+    return float(replay_lag or 0.0)
+
+
+def replica_lag(alias):
+    """Atraso da réplica em segundos (0 para bancos sem replicação, como o SQLite)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return lag_from_status(*cursor.fetchone())
+
+
+def is_healthy(alias, config):
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < config['LAG_CHECK_INTERVAL']:
+        return checked[1]
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= config['MAX_LAG']
+        if not healthy:
+            logger.warning('Réplica %s com atraso de %.1fs; lendo do primário.', alias, lag)
+    except DatabaseError:
+        logger.warning('Réplica %s indisponível; lendo do primário.', alias, exc_info=True)
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+# ------------------------------------------------------------
+# ROUTER
+# ------------------------------------------------------------
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current.get()
+        if state is None or state.primary or state.wrote or forced_primary.get():
+            return DEFAULT_DB_ALIAS
+        config = get_config()
+        replicas = [alias for alias in config['REPLICAS'] if is_healthy(alias, config)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_config()['REPLICAS']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+# ------------------------------------------------------------
+# MIDDLEWARE
+# ------------------------------------------------------------
+def sticky_key(request):
+    identity = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not identity:
+        return None
+    return 'replica:sticky:' + hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        config = get_config()
+        if not config['REPLICAS']:
+            return self.get_response(request)
+        key = sticky_key(request)
+        cache = caches[config['CACHE']]
+        state = RoutingState(request.method not in SAFE_METHODS or bool(key and cache.get(key)))
+        token = current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        if state.wrote and key:
+            cache.set(key, True, config['STICKY_SECONDS'])
+        return response
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['REPLICAS']:
+            return await self.get_response(request)
+        key = sticky_key(request)
+        cache = caches[config['CACHE']]
+        state = RoutingState(request.method not in SAFE_METHODS or bool(key and await cache.aget(key)))
+        token = current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        if state.wrote and key:
+            await cache.aset(key, True, config['STICKY_SECONDS'])
+        return response
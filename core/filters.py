@@ -0,0 +1,37 @@
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+
+class IndexedOrderingFilter(OrderingFilter):
+    """``OrderingFilter`` restrito a ordenações com índice.
+
+    Só aceita campos listados explicitamente em ``ordering_fields`` na view
+    (sem ``'__all__'`` nem o padrão de "todos os campos do serializer") e um
+    único campo por vez, que a paginação por cursor completa com ``id``.
+    """
+
+    def get_valid_fields(self, queryset, view, context={}):
+        ordering_fields = getattr(view, 'ordering_fields', None)
+        if not ordering_fields or ordering_fields == '__all__':
+            return []
+        return [(field, field) for field in ordering_fields]
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        return super().remove_invalid_fields(queryset, fields, view, request)[:1]
+
+
+class IndexedSearchFilter(SearchFilter):
+    """``SearchFilter`` que usa o ``search_index`` do modelo (ver ``core.search``).
+
+    Só quando o índice cobre exatamente os ``search_fields`` da view; caso
+    contrário, o comportamento é o do ``SearchFilter`` (``icontains``). Uma
+    view cujo queryset é restrito ao escopo do índice informa o valor em
+    ``get_search_scope()``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        index = getattr(queryset.model, 'search_index', None)
+        search_fields = self.get_search_fields(view, request)
+        if index is None or not search_fields or set(search_fields) != set(index.fields):
+            return super().filter_queryset(request, queryset, view)
+        scope = view.get_search_scope() if hasattr(view, 'get_search_scope') else None
+        return index.filter(queryset, self.get_search_terms(request), scope=scope)
@@ -0,0 +1,123 @@
+"""Repetições seguras de escritas com o cabeçalho ``Idempotency-Key``.
+
+Uso::
+
+    class TransactionBatchView(generics.GenericAPIView):
+        @idempotent
+        def post(self, request, *args, **kwargs):
+            ...
+
+Um cliente que não sabe se a escrita chegou (timeout, rede móvel caindo)
+manda de novo a mesma requisição com a mesma chave e recebe a resposta da
+primeira, sem aplicá-la outra vez:
+
+- a resposta 2xx fica gravada em ``IdempotencyKey`` por ``TTL`` segundos,
+  por usuário e chave, na mesma transação da escrita: ou as duas ficam ou
+  nenhuma fica;
+- uma repetição devolve a resposta gravada com ``Idempotent-Replayed: true``,
+  numa só leitura e sem executar a view;
+- a mesma chave com outro método, caminho ou corpo responde 422;
+- respostas de erro não são gravadas: nada foi escrito e a requisição pode
+  ser repetida com a mesma chave;
+- duas requisições simultâneas com a mesma chave: a segunda esbarra na
+  restrição única ao gravar, a transação dela é desfeita e ela devolve a
+  resposta da primeira.
+
+As chaves vencidas são removidas pela manutenção do ``run_workers``
+(``IdempotencyKey.objects.purge()``) ou, se a mesma chave voltar, na hora.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+DEFAULTS = {
+    'TTL': 24 * 3600,
+}
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+
+
+def request_fingerprint(request):
+    """SHA-256 do método, do caminho e do corpo já interpretado (indiferente a espaços e à ordem das chaves)."""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return hashlib.sha256('\n'.join((request.method, request.path, body)).encode()).hexdigest()
+
+
+class IdempotentRequest:
+    """A chave de uma requisição: busca a resposta gravada e grava a nova."""
+
+    def __init__(self, request, key):
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({HEADER: [f'Informe uma chave de 1 a {MAX_KEY_LENGTH} caracteres.']})
+        self.user = request.user
+        self.key = key
+        self.fingerprint = request_fingerprint(request)
+        # Sempre no primário: numa réplica atrasada a chave recém-gravada não apareceria.
+        self.using = router.db_for_write(IdempotencyKey)
+        self.expired = False
+
+    def replay(self):
+        """A resposta gravada para a chave, ou ``None`` se ela ainda não foi usada (ou venceu)."""
+        stored = IdempotencyKey.objects.using(self.using).filter(user=self.user, key=self.key).first()
+        if stored is None:
+            return None
+        if stored.expires_at <= timezone.now():
+            self.expired = True
+            return None
+        if stored.fingerprint != self.fingerprint:
+            return Response({'error': f'{HEADER} já usada com outra requisição.'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response(json.loads(stored.body), status=stored.status, headers={REPLAYED_HEADER: 'true'})
+
+    def save(self, response):
+        """Grava ``response`` para a chave; chamado dentro da transação da escrita."""
+        keys = IdempotencyKey.objects.using(self.using)
+        if self.expired:
+            keys.filter(user=self.user, key=self.key, expires_at__lte=timezone.now()).delete()
+        keys.create(user=self.user, key=self.key, fingerprint=self.fingerprint, status=response.status_code,
+                    body=json.dumps(response.data, cls=DjangoJSONEncoder), expires_at=timezone.now() + timedelta(seconds=get_config()['TTL']))
+
+
+def idempotent(handler):
+    """Handler de view DRF com ``Idempotency-Key`` opcional (ver o módulo); sem o cabeçalho nada muda."""
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(self, request, *args, **kwargs)
+        stored = IdempotentRequest(request, key)
+        replay = stored.replay()
+        if replay is not None:
+            return replay
+        try:
+            with transaction.atomic(using=stored.using):
+                response = handler(self, request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    stored.save(response)
+        except IntegrityError:
+            # Outra requisição com a mesma chave gravou primeiro: a escrita desta foi desfeita.
+            replay = stored.replay()
+            if replay is None:
+                raise
+            return replay
+        return response
+
+    return wrapper
@@ -0,0 +1,395 @@
+"""Custo por requisição: SQL, serialização, renderização, Server-Timing e /metrics.
+
+``InstrumentationMiddleware`` abre um ``RequestMetrics`` por requisição numa
+``ContextVar`` (que o asgiref propaga para as threads de ``sync_to_async``)
+e, ao final:
+
+- devolve ``Server-Timing`` com ``db``, ``serialize``, ``render`` e ``total``;
+- acumula, por view, histograma de latência e totais de consultas e tempos;
+- sinaliza N+1: a mesma instrução SQL repetida ``N_PLUS_ONE_THRESHOLD`` vezes
+  na mesma requisição (o SQL chega parametrizado, então repetições de
+  ``WHERE id = %s`` contam como a mesma consulta).
+
+As consultas são medidas por um ``execute_wrapper`` instalado em cada conexão
+aberta (sinal ``connection_created``), de modo que o caminho assíncrono, que
+consulta o banco em outra thread, também é contado. Fora de uma requisição o
+wrapper só repassa a chamada.
+
+Com o pool de conexões do PostgreSQL ativo (``core.db_pool``), o ``/metrics``
+traz também ocupação, saturação, espera e timeouts do pool.
+
+Cada processo mantém seus agregados em memória e os grava, a cada
+``FLUSH_INTERVAL`` segundos, em ``METRICS_DIR/<pid>.json``. O endpoint
+``/metrics`` soma os arquivos de todos os workers e responde no formato texto
+do Prometheus; exige ``Authorization: Bearer <METRICS_TOKEN>`` e, sem token
+configurado, só responde com ``DEBUG``. ``Server-Timing`` só sai com
+``SERVER_TIMING`` ligado.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .db_pool import pool_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'METRICS_DIR': str(Path(tempfile.gettempdir()) / 'pulsevault-metrics'),
+    'METRICS_TOKEN': '',
+    'FLUSH_INTERVAL': 5.0,
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'SERVER_TIMING': False,
+}
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current = ContextVar('request_metrics', default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {})}
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'timings', 'statements', 'open')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = {}
+        self.statements = {}
+        self.open = set()
+
+
+@contextmanager
+def timed(name):
+    """Soma a duração do bloco em ``name`` na requisição atual (reentrante)."""
+    metrics = current.get()
+    if metrics is None or name in metrics.open:
+        yield
+        return
+    metrics.open.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - start
+        metrics.open.discard(name)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.queries += 1
+        metrics.statements[sql] = metrics.statements.get(sql, 0) + 1
+
+
+def install_wrapper(sender, connection, **kwargs):
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+connection_created.connect(install_wrapper, dispatch_uid='core.instrumentation')
+
+
+# ------------------------------------------------------------
+# STORE
+# ------------------------------------------------------------
+class MetricsStore:
+    """Agregados do processo atual, gravados periodicamente em ``<pid>.json``."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._data = {'requests': {}, 'latency': {}, 'queries': {}, 'db_seconds': {},
+                      'serialize_seconds': {}, 'render_seconds': {}, 'n_plus_one': {}, 'db_pool': {}}
+        self._dirty = False
+        self._flusher = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Worker criado por fork: começa do zero, com arquivo e thread próprios.
+            self.reset()
+
+    def observe(self, view, method, status, duration, metrics, n_plus_one=0):
+        self._check_pid()
+        with self._lock:
+            data = self._data
+            key = f'{view}|{method}|{status}'
+            data['requests'][key] = data['requests'].get(key, 0) + 1
+            key = f'{view}|{method}'
+            histogram = data['latency'].setdefault(key, {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += duration
+            histogram['count'] += 1
+            for name, value in (('queries', metrics.queries), ('db_seconds', metrics.db_time),
+                                ('serialize_seconds', metrics.timings.get('serialize', 0.0)),
+                                ('render_seconds', metrics.timings.get('render', 0.0)),
+                                ('n_plus_one', n_plus_one)):
+                data[name][view] = data[name].get(view, 0) + value
+            self._dirty = True
+        self._start_flusher()
+
+    def _start_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(get_config()['FLUSH_INTERVAL'])
+            self.flush()
+
+    def flush(self):
+        self._check_pid()
+        pool = pool_stats()
+        with self._lock:
+            if pool != self._data['db_pool']:
+                self._data['db_pool'] = pool
+                self._dirty = True
+            if not self._dirty:
+                return
+            payload = json.dumps(self._data)
+            self._dirty = False
+        directory = Path(get_config()['METRICS_DIR'])
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{os.getpid()}.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(payload)
+        tmp.replace(path)
+
+    @staticmethod
+    def collect():
+        """Soma os arquivos de todos os processos.
+
+        Contadores somam também os de processos que já saíram (o arquivo fica
+        até o próximo ``boot``); as medidas instantâneas do pool (gauges) vêm
+        só dos processos vivos: a última foto de um worker morto inflaria o
+        pool e a saturação.
+        """
+        merged = {}
+        for path in Path(get_config()['METRICS_DIR']).glob('*.json'):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            alive = is_alive(path.stem)
+            for metric, series in data.items():
+                target = merged.setdefault(metric, {})
+                for key, value in series.items():
+                    if not alive and metric == 'db_pool' and key.split('|')[-1] in POOL_GAUGES:
+                        continue
+                    if isinstance(value, dict):
+                        hist = target.setdefault(key, {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+                        hist['buckets'] = [a + b for a, b in zip(hist['buckets'], value['buckets'])]
+                        hist['sum'] += value['sum']
+                        hist['count'] += value['count']
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+
+store = MetricsStore()
+
+
+def is_alive(pid):
+    """O processo ``pid`` (nome do arquivo de métricas) ainda existe neste host?"""
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# ------------------------------------------------------------
+# PROMETHEUS
+# ------------------------------------------------------------
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values):
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in values.items()) + '}'
+
+
+SIMPLE_METRICS = (
+    ('queries', 'pulsevault_db_queries_total', 'Consultas SQL executadas.'),
+    ('db_seconds', 'pulsevault_db_query_seconds_total', 'Tempo gasto em consultas SQL.'),
+    ('serialize_seconds', 'pulsevault_serialize_seconds_total', 'Tempo gasto serializando respostas.'),
+    ('render_seconds', 'pulsevault_render_seconds_total', 'Tempo gasto renderizando respostas.'),
+    ('n_plus_one', 'pulsevault_n_plus_one_total', 'Requisições com padrão N+1 detectado.'),
+)
+
+
+POOL_METRICS = (
+    ('pool_size', 'pulsevault_db_pool_connections', 'gauge', 'Conexões abertas nos pools.', 1),
+    ('pool_available', 'pulsevault_db_pool_available', 'gauge', 'Conexões ociosas nos pools.', 1),
+    ('pool_max', 'pulsevault_db_pool_max', 'gauge', 'Tamanho máximo somado dos pools.', 1),
+    ('requests_waiting', 'pulsevault_db_pool_waiting', 'gauge', 'Pedidos aguardando conexão agora.', 1),
+    ('requests_num', 'pulsevault_db_pool_requests_total', 'counter', 'Conexões pedidas ao pool.', 1),
+    ('requests_queued', 'pulsevault_db_pool_requests_queued_total', 'counter',
+     'Pedidos que esperaram por uma conexão.', 1),
+    ('requests_wait_ms', 'pulsevault_db_pool_wait_seconds_total', 'counter',
+     'Tempo total de espera por conexão.', 1000),
+    ('requests_errors', 'pulsevault_db_pool_timeouts_total', 'counter', 'Pedidos que estouraram o timeout.', 1),
+    ('connections_num', 'pulsevault_db_pool_connects_total', 'counter', 'Conexões novas abertas no banco.', 1),
+    ('connections_ms', 'pulsevault_db_pool_connect_seconds_total', 'counter',
+     'Tempo gasto abrindo conexões.', 1000),
+    ('connections_lost', 'pulsevault_db_pool_lost_total', 'counter', 'Conexões descartadas por falha.', 1),
+)
+
+
+POOL_GAUGES = frozenset(stat for stat, _, kind, _, _ in POOL_METRICS if kind == 'gauge')
+
+
+def render_pool(pool):
+    aliases = sorted({key.split('|')[0] for key in pool})
+    lines = []
+    for stat, name, kind, help_text, divisor in POOL_METRICS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for alias in aliases:
+            lines.append(f'{name}{labels(alias=alias)} {pool.get(f"{alias}|{stat}", 0) / divisor:g}')
+    lines += [
+        '# HELP pulsevault_db_pool_saturation Fração das conexões máximas em uso.',
+        '# TYPE pulsevault_db_pool_saturation gauge',
+    ]
+    for alias in aliases:
+        maximum = pool.get(f'{alias}|pool_max', 0)
+        in_use = pool.get(f'{alias}|pool_size', 0) - pool.get(f'{alias}|pool_available', 0)
+        lines.append(f'pulsevault_db_pool_saturation{labels(alias=alias)} {in_use / maximum if maximum else 0:g}')
+    return lines
+
+
+def render_prometheus(data):
+    lines = [
+        '# HELP pulsevault_http_requests_total Requisições atendidas.',
+        '# TYPE pulsevault_http_requests_total counter',
+    ]
+    for key, value in sorted(data.get('requests', {}).items()):
+        view, method, status = key.split('|')
+        lines.append(f'pulsevault_http_requests_total{labels(view=view, method=method, status=status)} {value}')
+
+    lines += [
+        '# HELP pulsevault_http_request_duration_seconds Latência por view.',
+        '# TYPE pulsevault_http_request_duration_seconds histogram',
+    ]
+    for key, hist in sorted(data.get('latency', {}).items()):
+        view, method = key.split('|')
+        for bound, count in zip(BUCKETS, hist['buckets']):
+            lines.append('pulsevault_http_request_duration_seconds_bucket'
+                         f'{labels(view=view, method=method, le=bound)} {count}')
+        lines.append('pulsevault_http_request_duration_seconds_bucket'
+                     f'{labels(view=view, method=method, le="+Inf")} {hist["count"]}')
+        lines.append(f'pulsevault_http_request_duration_seconds_sum{labels(view=view, method=method)} {hist["sum"]}')
+        lines.append(f'pulsevault_http_request_duration_seconds_count{labels(view=view, method=method)} {hist["count"]}')
+
+    for key, name, help_text in SIMPLE_METRICS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for view, value in sorted(data.get(key, {}).items()):
+            lines.append(f'{name}{labels(view=view)} {value}')
+    if data.get('db_pool'):
+        lines += render_pool(data['db_pool'])
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = get_config()['METRICS_TOKEN']
+    if not token and not settings.DEBUG:
+        # Sem token, as métricas ficariam abertas a qualquer cliente em produção.
+        return HttpResponseForbidden()
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    store.flush()
+    return HttpResponse(render_prometheus(store.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ------------------------------------------------------------
+# MIDDLEWARE
+# ------------------------------------------------------------
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        config = get_config()
+        self.threshold = config['N_PLUS_ONE_THRESHOLD']
+        self.server_timing = config['SERVER_TIMING']
+        self._reported = set()
+        # Conexões abertas antes do carregamento do middleware (as demais passam pelo sinal).
+        for connection in connections.all(initialized_only=True):
+            install_wrapper(None, connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token, start = current.set(RequestMetrics()), time.perf_counter()
+        try:
+            response = self.get_response(request)
+            return self.finish(request, response, start)
+        finally:
+            current.reset(token)
+
+    async def __acall__(self, request):
+        token, start = current.set(RequestMetrics()), time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self.finish(request, response, start)
+        finally:
+            current.reset(token)
+
+    def finish(self, request, response, start):
+        duration = time.perf_counter() - start
+        metrics = current.get()
+        match = request.resolver_match
+        view = (match.view_name or match.route) if match else '<unmatched>'
+        if view == 'metrics':
+            return response
+        n_plus_one = self.check_n_plus_one(view, metrics)
+        store.observe(view, request.method, response.status_code, duration, metrics, n_plus_one)
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"',
+                *(f'{name};dur={value * 1000:.2f}' for name, value in metrics.timings.items()),
+                f'total;dur={duration * 1000:.2f}',
+            ])
+        return response
+
+    def check_n_plus_one(self, view, metrics):
+        repeated = [(sql, n) for sql, n in metrics.statements.items() if n >= self.threshold]
+        for sql, count in repeated:
+            key = (view, sql)
+            if key not in self._reported:
+                # Um aviso por (view, consulta) por processo; o contador segue somando.
+                self._reported.add(key)
+                logger.warning('Possível N+1 em %s: consulta repetida %d vezes: %s', view, count, sql[:300])
+        return 1 if repeated else 0
@@ -0,0 +1,230 @@
+"""Logging sem bloquear a requisição: fila, thread de gravação e JSON por linha.
+
+``QueueFileHandler`` só enfileira o registro (com a mensagem já interpolada)
+na thread da requisição; a cada ``flush_interval`` segundos uma thread em
+segundo plano (``Writer``) formata em JSON (``JSONFormatter``) e grava, em
+lotes, em arquivo com rotação por tamanho (``max_bytes``) ou por tempo
+(``when``), ou em stdout se ``filename`` for vazio. Com a fila cheia o
+registro é descartado (e contado em ``dropped``) em vez de segurar a
+requisição.
+
+A thread é criada no primeiro registro de cada processo, então workers do
+gunicorn criados por fork (inclusive com ``--preload``) têm a sua. Vários
+processos gravando e rotacionando o mesmo arquivo competem entre si: use
+``{pid}`` no nome do arquivo ou stdout nesse caso.
+
+``SampleFilter`` deixa passar só uma fração dos registros abaixo de WARNING;
+em ``settings.LOGGING`` ele é aplicado ao logger ``django.db.backends``, que
+emite um registro por consulta SQL.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+# Atributos padrão de LogRecord; o resto veio de ``extra=`` e vai para o JSON.
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def dumps(payload):
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, default=str).decode()
+        except TypeError:
+            pass
+    return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc_info'] = record.exc_text
+        if record.stack_info:
+            payload['stack_info'] = record.stack_info
+        return dumps(payload)
+
+
+class SampleFilter(logging.Filter):
+    """Mantém ``rate`` (0 a 1) dos registros abaixo de WARNING; WARNING ou acima passam sempre."""
+
+    def __init__(self, rate=1.0, name=''):
+        super().__init__(name)
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class BatchFlushMixin:
+    """Adia o ``flush`` por registro; o listener descarrega uma vez por lote."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class StreamHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class RotatingFileHandler(BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class TimedRotatingFileHandler(BatchFlushMixin, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+class Writer:
+    """Thread que, a cada ``interval`` segundos, esvazia o buffer no handler.
+
+    Não há sinalização por registro (acordar a thread a cada log custa mais
+    que formatá-lo); o lote é gravado em blocos de ``chunk_size`` com um
+    ``flush`` cada, que solta o GIL entre um bloco e outro.
+    """
+    chunk_size = 64
+
+    def __init__(self, buffer, handler, interval):
+        self.buffer = buffer
+        self.handler = handler
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        written = 0
+        while True:
+            try:
+                record = self.buffer.popleft()
+            except IndexError:
+                break
+            self.handler.handle(record)
+            written += 1
+            if written % self.chunk_size == 0:
+                self.handler.flush_batch()
+        if written:
+            self.handler.flush_batch()
+
+    def stop(self):
+        """Grava o que restou no buffer e encerra a thread."""
+        self._stopped.set()
+        self._thread.join()
+        self.handler.close()
+
+
+class QueueFileHandler(logging.handlers.QueueHandler):
+    def __init__(self, filename='', max_bytes=50 * 1024 * 1024, backup_count=5, when='', interval=1,
+                 queue_size=10_000, flush_interval=0.2):
+        super().__init__(deque())
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.when = when
+        self.interval = interval
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.target_formatter = None
+        self.dropped = 0
+        self._pid = None
+        self._writer = None
+        atexit.register(self.stop)
+
+    def setFormatter(self, fmt):
+        # O formatter do dictConfig vale para a gravação, feita pela thread de fundo.
+        self.target_formatter = fmt
+
+    def build_target(self):
+        if not self.filename:
+            handler = StreamHandler(sys.stdout)
+        else:
+            filename = str(self.filename).format(pid=os.getpid())
+            os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+            if self.when:
+                handler = TimedRotatingFileHandler(
+                    filename, when=self.when, interval=self.interval, backupCount=self.backup_count,
+                    encoding='utf-8', delay=True,
+                )
+            else:
+                handler = RotatingFileHandler(
+                    filename, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8', delay=True,
+                )
+        handler.setFormatter(self.target_formatter or JSONFormatter())
+        return handler
+
+    def start(self):
+        self._pid = os.getpid()
+        self.queue = deque()
+        self._writer = Writer(self.queue, self.build_target(), self.flush_interval)
+        self._writer.start()
+
+    def stop(self):
+        """Grava o que restou na fila e encerra a thread (no processo que a criou)."""
+        if self._writer is not None and self._pid == os.getpid():
+            self._writer.stop()
+        self._writer = None
+        self._pid = None
+
+    def emit(self, record):
+        # Chamado sob o lock do handler: só uma thread inicia a gravação.
+        if self._pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def enqueue(self, record):
+        # ``deque.append`` é atômico: nenhum lock nem thread acordada por registro.
+        if len(self.queue) >= self.queue_size:
+            self.dropped += 1
+        else:
+            self.queue.append(record)
+
+    def prepare(self, record):
+        # Só o que não pode esperar a thread de fundo: interpolar a mensagem (os
+        # argumentos podem mudar depois) e o traceback. Sem cópia: o resultado
+        # formatado é o mesmo para os outros handlers do registro.
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args = record.message, None
+        return record
+
+    def close(self):
+        self.stop()
+        super().close()
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from core.db_pool import open_pools
+from core.partitioning import partitioned_models
+from core.instrumentation import get_config as instrumentation_config
+
+FINGERPRINT_FILE = '.fingerprint'
+
+
+def pending_migrations(database=DEFAULT_DB_ALIAS):
+    """Migrações do grafo em disco ainda não aplicadas no banco (uma consulta)."""
+    executor = MigrationExecutor(connections[database])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def static_fingerprint():
+    """Hash de caminho, tamanho e mtime de cada arquivo que o collectstatic copiaria."""
+    digest = hashlib.blake2b(digest_size=16)
+    entries = []
+    for finder in get_finders():
+        for path, storage in finder.list(['CVS', '.*', '*~']):
+            stat = os.stat(storage.path(path))
+            entries.append(f'{path}\0{stat.st_size}\0{stat.st_mtime_ns}')
+    for entry in sorted(entries):
+        digest.update(entry.encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def ensure_superuser(email, password, name=''):
+    """Cria o superusuário se não existir; devolve True se criou."""
+    User = get_user_model()
+    email = User.objects.normalize_email(email)
+    if User.objects.filter(email=email).exists():
+        return False
+    User.objects.create_superuser(email, password, name=name)
+    return True
+
+
+def server_options(config):
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    threads = config['THREADS']
+    if settings.ASYNC_API:
+        worker_class = 'uvicorn_worker.UvicornWorker'
+    else:
+        worker_class = 'gthread' if threads > 1 else 'sync'
+    return {
+        'bind': config['BIND'],
+        'workers': config['WORKERS'] or 2 * cpus + 1,
+        'threads': threads,
+        'worker_class': worker_class,
+        'timeout': config['TIMEOUT'],
+        'keepalive': config['KEEPALIVE'],
+        'preload_app': True,
+        'accesslog': None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Prepara e inicia o servidor num só processo: migra e coleta estáticos só quando algo mudou, '
+        'garante o superusuário e sobe o gunicorn com a aplicação já carregada (--preload).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Migra e coleta estáticos mesmo sem mudanças')
+        parser.add_argument('--no-serve', action='store_true', help='Só prepara, sem iniciar o servidor')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        self.step('Migrações', self.migrate, options['force'])
+        self.step('Partições', self.partitions)
+        self.step('Arquivos estáticos', self.collectstatic, options['force'])
+        self.step('Superusuário', self.superuser)
+        self.step('Aplicação', self.load_application)
+        self.stdout.write(self.style.SUCCESS(f'🟢 Pronto em {time.perf_counter() - start:.2f}s'))
+        if not options['no_serve']:
+            self.serve()
+
+    def step(self, label, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.stdout.write(f'🟡 {label}: {result} ({time.perf_counter() - start:.2f}s)')
+
+    def migrate(self, force):
+        plan = pending_migrations()
+        if not plan and not force:
+            return 'nada pendente'
+        call_command('migrate', interactive=False, verbosity=0)
+        return f'{len(plan)} aplicadas'
+
+    def partitions(self):
+        connection = connections[DEFAULT_DB_ALIAS]
+        created = [name for model in partitioned_models()
+                   for name in model.partitioning.ensure(model, connection)]
+        return f'{len(created)} criadas' if created else 'em dia'
+
+    def collectstatic(self, force):
+        marker = Path(settings.STATIC_ROOT) / FINGERPRINT_FILE
+        fingerprint = static_fingerprint()
+        if not force and marker.exists() and marker.read_text() == fingerprint:
+            return 'sem mudanças'
+        call_command('collectstatic', interactive=False, verbosity=0)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.write_text(fingerprint)
+        return 'coletados'
+
+    def superuser(self):
+        email = os.environ.get('DJANGO_SUPERUSER_EMAIL')
+        password = os.environ.get('DJANGO_SUPERUSER_PASSWORD')
+        if not email or not password:
+            raise CommandError('Variáveis DJANGO_SUPERUSER_EMAIL e DJANGO_SUPERUSER_PASSWORD não definidas.')
+        created = ensure_superuser(email, password, os.environ.get('DJANGO_SUPERUSER_USERNAME', ''))
+        return 'criado' if created else 'já existe'
+
+    def load_application(self):
+        if settings.ASYNC_API:
+            from core.asgi import application
+        else:
+            from core.wsgi import application
+        self.application = application
+        return 'ASGI' if settings.ASYNC_API else 'WSGI'
+
+    def serve(self):
+        from gunicorn.app.base import BaseApplication
+
+        # Nada aberto no processo mestre deve ser herdado pelos workers.
+        connections.close_all()
+        for alias in open_pools():
+            connections[alias].close_pool()
+        for path in Path(instrumentation_config()['METRICS_DIR']).glob('*.json'):
+            path.unlink(missing_ok=True)  # métricas de processos de execuções anteriores
+
+        application = self.application
+        options = server_options(settings.GUNICORN)
+
+        class Server(BaseApplication):
+            def load_config(self):
+                for key, value in options.items():
+                    self.cfg.set(key, value)
+
+            def load(self):
+                return application
+
+        threads = f' × {options["threads"]} threads' if options['worker_class'] == 'gthread' else ''
+        self.stdout.write(
+            f'🟢 Gunicorn em {options["bind"]}: {options["workers"]} workers {options["worker_class"]}{threads}'
+        )
+        self.stdout.flush()
+        Server().run()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.partitioning import get_config, partitioned_models
+
+
+class Command(BaseCommand):
+    help = (
+        'Manutenção das tabelas particionadas por mês: cria as partições dos próximos meses e, '
+        'com retenção, desanexa e arquiva (ou remove) as antigas.'
+    )
+
+    def add_arguments(self, parser):
+        config = get_config()
+        parser.add_argument('--ahead', type=int, default=config['AHEAD_MONTHS'],
+                            help='Meses à frente com partição pronta')
+        parser.add_argument('--retain-months', type=int, default=config['RETENTION_MONTHS'],
+                            help='Meses mantidos na tabela (0: mantém tudo)')
+        parser.add_argument('--archive-schema', default=config['ARCHIVE_SCHEMA'],
+                            help='Schema para onde vão as partições desanexadas')
+        parser.add_argument('--drop', action='store_true', help='Remove as partições antigas em vez de arquivar')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            self.stdout.write(f'Banco {connection.vendor} sem particionamento: nada a fazer.')
+            return
+        for model in partitioned_models():
+            partitioning = model.partitioning
+            created = partitioning.ensure(model, connection, ahead=options['ahead'])
+            retired = partitioning.retire(model, connection, months=options['retain_months'],
+                                          archive_schema=options['archive_schema'], drop=options['drop'])
+            action = 'removidas' if options['drop'] else f'arquivadas em {options["archive_schema"]}'
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.db_table}: {len(created)} criadas{self.names(created)}, '
+                f'{len(retired)} {action}{self.names(retired)}'
+            ))
+
+    @staticmethod
+    def names(names):
+        return f' ({", ".join(names)})' if names else ''
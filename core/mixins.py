@@ -0,0 +1,221 @@
+"""Mixins compartilhados pelas views da API."""
+import hashlib
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+
+from .serializers import ValuesReader
+
+
+def lookup_kwargs(view):
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    return {view.lookup_field: view.kwargs[lookup_url_kwarg]}
+
+
+def make_etag(*parts):
+    raw = '|'.join(str(p) for p in parts)
+    return '"%s"' % hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'O recurso foi alterado desde a versão informada.'
+    default_code = 'precondition_failed'
+
+
+class ValuesReadMixin:
+    """GETs de listagem e detalhe por ``.values()`` (ver ``core.serializers``).
+
+    A escrita continua passando pelo ``ModelSerializer``. Se o serializer
+    não tiver leitor, ou se alguma permissão verificar o objeto, a view usa
+    o caminho normal.
+    """
+
+    def get_values_reader(self):
+        return ValuesReader.for_serializer(self.get_serializer_class())
+
+    def get_values_queryset(self, reader):
+        return reader.values(self.filter_queryset(self.get_queryset()), extra=self.get_values_extra_fields())
+
+    def get_values_extra_fields(self):
+        # Colunas de ordenação entram no .values() para o cursor da paginação.
+        ordering = [*(getattr(self, 'ordering_fields', None) or ()), *(getattr(self, 'ordering', None) or ())]
+        return [name.lstrip('-') for name in ordering]
+
+    def get_detail_reader(self):
+        if self.checks_object_permissions():
+            return None
+        return self.get_values_reader()
+
+    def get_values_object(self, reader):
+        return get_object_or_404(self.get_values_queryset(reader), **lookup_kwargs(self))
+
+    def checks_object_permissions(self):
+        return any(
+            type(permission).has_object_permission is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_values_queryset(reader)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.represent_many(page))
+        return Response(reader.represent_many(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_detail_reader()
+        if reader is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(reader.represent(self.get_values_object(reader)))
+
+
+class ConditionalMixin:
+    """ETag/Last-Modified derivados de ``version_field`` e requisições condicionais.
+
+    - Detalhe: uma única consulta pela chave primária. Com ``ValuesReadMixin``
+      a própria linha do ``.values()`` traz a versão; sem ele, ``(pk,
+      version_field)`` decide o ``304 Not Modified`` antes de buscar e
+      serializar o objeto.
+    - Listagem: ETag da coleção a partir de ``COUNT`` e ``MAX(version_field)``
+      do queryset da view (por usuário), do usuário e da URL completa (filtros,
+      cursor). Sem Last-Modified: exclusões não mudam o ``MAX``.
+    - PUT/PATCH/DELETE: ``If-Match``/``If-Unmodified-Since`` respondem 412 se
+      a versão não confere; as precondições são avaliadas de novo contra a
+      linha travada (``select_for_update``) no momento da gravação.
+
+    ``QuerySet.update()`` não atualiza campos ``auto_now``: gravações em massa
+    que devam invalidar os validadores precisam definir ``updated_at``.
+    """
+    version_field = 'updated_at'
+
+    # ------------------------------------------------------------
+    # VALIDATORS
+    # ------------------------------------------------------------
+    def get_validator_queryset(self):
+        return self.filter_queryset(self.get_queryset()).values_list('pk', self.version_field)
+
+    def object_validators(self, pk, version):
+        last_modified = int(version.timestamp()) if version is not None else None
+        return make_etag(pk, version.isoformat() if version is not None else ''), last_modified
+
+    def row_validators(self, row):
+        opts = self.get_queryset().model._meta
+        return self.object_validators(row[opts.pk.attname], row[opts.get_field(self.version_field).attname])
+
+    def instance_validators(self, instance):
+        return self.object_validators(instance.pk, getattr(instance, self.version_field))
+
+    def get_object_validators(self):
+        return self.object_validators(*get_object_or_404(self.get_validator_queryset(), **lookup_kwargs(self)))
+
+    def collection_aggregates(self):
+        return {'count': Count('pk'), 'version': Max(self.version_field)}
+
+    def collection_validators(self, aggregate):
+        user = getattr(self.request.user, 'pk', None)
+        version = aggregate['version'].isoformat() if aggregate['version'] is not None else ''
+        return make_etag(user, self.request.get_full_path(), aggregate['count'], version), None
+
+    def get_collection_validators(self):
+        return self.collection_validators(self.get_queryset().aggregate(**self.collection_aggregates()))
+
+    # ------------------------------------------------------------
+    # PRECONDITIONS
+    # ------------------------------------------------------------
+    def evaluate_preconditions(self, request, etag, last_modified):
+        """``304`` pronto para devolver, ``None`` para seguir, ou ``PreconditionFailed``."""
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            return None
+        if response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+            raise PreconditionFailed()
+        return self.set_validators(response, etag, last_modified)
+
+    def set_validators(self, response, etag, last_modified):
+        if 200 <= response.status_code < 300 or response.status_code == status.HTTP_304_NOT_MODIFIED:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def has_write_preconditions(self):
+        return 'HTTP_IF_MATCH' in self.request.META or 'HTTP_IF_UNMODIFIED_SINCE' in self.request.META
+
+    def lock_version(self, instance):
+        """Avalia ``If-Match``/``If-Unmodified-Since`` de novo contra a linha travada.
+
+        A conferência de ``update``/``destroy`` é uma leitura sem trava e
+        ``get_object`` é outra: uma escrita entre elas passaria pelas duas.
+        A versão que decide é a da linha sob ``select_for_update``, presa até
+        o fim da transação da gravação.
+        """
+        if not self.has_write_preconditions():
+            return
+        row = (
+            type(instance)._default_manager.select_for_update()
+            .filter(pk=instance.pk).values_list('pk', self.version_field).first()
+        )
+        if row is None:
+            raise PreconditionFailed()
+        self.evaluate_preconditions(self.request, *self.object_validators(*row))
+
+    # ------------------------------------------------------------
+    # HANDLERS
+    # ------------------------------------------------------------
+    def list(self, request, *args, **kwargs):
+        validators = self.get_collection_validators()
+        response = self.evaluate_preconditions(request, *validators)
+        if response is None:
+            response = self.set_validators(super().list(request, *args, **kwargs), *validators)
+        return response
+
+    def get_values_extra_fields(self):
+        return [*super().get_values_extra_fields(), self.version_field]
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_detail_reader() if isinstance(self, ValuesReadMixin) else None
+        if reader is not None:
+            row = self.get_values_object(reader)
+            validators = self.row_validators(row)
+            response = self.evaluate_preconditions(request, *validators)
+            if response is None:
+                response = self.set_validators(Response(reader.represent(row)), *validators)
+            return response
+        validators = self.get_object_validators()
+        response = self.evaluate_preconditions(request, *validators)
+        if response is None:
+            response = self.set_validators(super().retrieve(request, *args, **kwargs), *validators)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        if self.has_write_preconditions():
+            self.evaluate_preconditions(request, *self.get_object_validators())
+        response = super().update(request, *args, **kwargs)
+        return self.set_validators(response, *self.instance_validators(self.written_instance))
+
+    def destroy(self, request, *args, **kwargs):
+        if self.has_write_preconditions():
+            self.evaluate_preconditions(request, *self.get_object_validators())
+        return super().destroy(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self.lock_version(serializer.instance)
+            super().perform_update(serializer)
+        self.written_instance = serializer.instance
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self.lock_version(instance)
+            super().perform_destroy(instance)
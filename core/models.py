@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def purge(self):
+        """Remove as chaves vencidas."""
+        return self.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+class IdempotencyKey(models.Model):
+    """Resposta gravada de uma requisição com ``Idempotency-Key`` (ver ``core.idempotency``)."""
+    # Sem db_index: a restrição única (user, key) já atende buscas por usuário.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', db_index=False, verbose_name='Usuário')
+    key = models.CharField(max_length=255, verbose_name='Chave')
+    # SHA-256 do método, do caminho e do corpo: a mesma chave com outra requisição é recusada.
+    fingerprint = models.CharField(max_length=64, verbose_name='Assinatura da requisição')
+    status = models.PositiveSmallIntegerField(verbose_name='Situação HTTP')
+    # Corpo em JSON como texto: o jsonb do PostgreSQL reordenaria as chaves e a repetição sairia diferente.
+    body = models.TextField(verbose_name='Corpo da resposta')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Criada em')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Expira em')
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    def __str__(self):
+        return self.key
+
+    class Meta:
+        verbose_name = 'Chave de idempotência'
+        verbose_name_plural = 'Chaves de idempotência'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key'),
+        ]
@@ -0,0 +1,204 @@
+"""Paginação por cursor (keyset) para todos os endpoints de listagem.
+
+Cada página é buscada com ``WHERE (chave) < (última chave vista)`` sobre a
+ordenação da view, completada com ``id`` como desempate. Não há ``COUNT(*)``
+nem ``OFFSET``: a página 10.000 custa o mesmo que a primeira, desde que a
+ordenação tenha um índice por trás (ver ``core.filters.IndexedOrderingFilter``).
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_position(ordering, position, reverse=False):
+    """Cursor opaco com a ordenação, os valores da última linha vista e o sentido."""
+    values = [
+        v.isoformat() if isinstance(v, (datetime, date, time))
+        else str(v) if isinstance(v, Decimal) else v
+        for v in position
+    ]
+    payload = json.dumps({'o': list(ordering), 'p': values, 'r': int(reverse)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_position(token, ordering, fields):
+    """``(posição, reverso)`` de ``encode_position``; ``ValueError`` se o cursor não vale para ``ordering``."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if payload['o'] != list(ordering) or len(payload['p']) != len(fields):
+            raise ValueError
+        position = [field.to_python(value) for field, value in zip(fields, payload['p'])]
+        return position, bool(payload['r'])
+    except (binascii.Error, ValueError, KeyError, TypeError, ValidationError, FieldDoesNotExist):
+        raise ValueError('Cursor inválido')
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at',)
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.prepare_queryset(queryset, request, view)
+        return self.finish_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Versão para views assíncronas: a página é lida com iteração async do ORM."""
+        queryset = self.prepare_queryset(queryset, request, view)
+        return self.finish_page([item async for item in queryset])
+
+    def prepare_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        model = queryset.model
+        self.fields = [model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+        self.position, self.reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self.invert(name) for name in ordering]
+        if self.position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, self.position))
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def finish_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        has_next = has_more if not self.reverse else self.position is not None
+        has_previous = self.position is not None if not self.reverse else has_more
+        self.next_position = self.item_position(results[-1]) if results and has_next else None
+        self.previous_position = self.item_position(results[0]) if results and has_previous else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        ordering_filters = [
+            backend for backend in getattr(view, 'filter_backends', [])
+            if hasattr(backend, 'get_ordering')
+        ]
+        ordering = None
+        if ordering_filters:
+            ordering = ordering_filters[0]().get_ordering(request, queryset, view)
+        if not ordering:
+            ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = [name for name in ordering if name.lstrip('-') != 'pk']
+
+        # Sem desempate único, linhas com a mesma chave seriam puladas entre páginas.
+        model = queryset.model
+        names = [name.lstrip('-') for name in ordering]
+        pk_name = model._meta.pk.name
+        if pk_name not in names and not any(model._meta.get_field(n).unique for n in names):
+            ordering.append(('-' if ordering[0].startswith('-') else '') + pk_name)
+        return ordering
+
+    @staticmethod
+    def invert(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """``(a, b) > (x, y)`` expandido em ``a >= x AND (a > x OR (a = x AND b > y))``."""
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        first = ordering[0]
+        # Conjunção redundante que permite ao planejador iniciar a varredura do índice na posição.
+        bound = Q(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': position[0]})
+        return bound & condition
+
+    def item_position(self, item):
+        if isinstance(item, dict):
+            return [item[field.attname] if field.attname in item else item[field.name] for field in self.fields]
+        return [getattr(item, field.attname) for field in self.fields]
+
+    # ------------------------------------------------------------
+    # CURSOR ENCODING
+    # ------------------------------------------------------------
+    def encode_cursor(self, position, reverse=False):
+        token = encode_position(self.ordering, position, reverse)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            return decode_position(token, self.ordering, self.fields)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor de paginação devolvido em next/previous.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Quantidade de itens por página.',
+                'schema': {'type': 'integer'},
+            },
+        ]
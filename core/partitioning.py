@@ -0,0 +1,377 @@
+"""Particionamento mensal por data (PostgreSQL).
+
+Um modelo com ``partitioning = MonthlyPartitions('date')`` vira, na migração
+``PartitionTable``, uma tabela particionada por ``RANGE`` da coluna, com:
+
+- uma partição por mês (``<tabela>_p202401``), do primeiro mês com dados
+  (no máximo ``history_months`` para trás) até ``AHEAD_MONTHS`` à frente;
+- ``<tabela>_old`` para datas anteriores e ``<tabela>_future`` (até
+  ``MAXVALUE``) para as posteriores, de modo que nenhum INSERT falha por
+  falta de partição.
+
+O histórico além de ``history_months`` fica inteiro em ``<tabela>_old``:
+consultas sem filtro de data (a primeira página, o detalhe por ``id``) são
+planejadas sobre todas as partições, e esse custo cresce com a quantidade
+delas.
+
+Não há partição ``DEFAULT``: com ela o planejador não pode ler as partições
+em ordem, e um ``ORDER BY date DESC LIMIT n`` sem filtro de data vira um
+``Merge Append`` que abre o índice de todas as partições. Com limites em
+todas, ele percorre as partições da mais recente para trás e para ao
+completar a página.
+
+A chave primária passa a ser ``(id, <coluna>)`` (o PostgreSQL exige a coluna
+de partição em toda restrição única); o ``id`` continua vindo de uma
+sequência e o Django segue tratando ``id`` como chave. Índices e restrições
+da tabela original são recriados na tabela particionada, que os replica em
+cada partição.
+
+O planejador só descarta partições quando a consulta compara a coluna de
+partição diretamente (``date >= x``, ``date <= y``, ``date = z``), o que os
+filtros de data e o cursor do ``KeysetPagination`` já fazem. Uma busca só
+por ``id`` (o detalhe da API) consulta o índice de cada partição.
+
+``manage.py partitions`` (também chamado pelo ``boot``) cria as partições
+dos próximos meses e, com ``RETENTION_MONTHS``, desanexa as antigas e as
+move para o schema ``ARCHIVE_SCHEMA`` (ou as remove com ``--drop``): tirar um
+mês inteiro é um ``DETACH``, não um ``DELETE`` de milhares de linhas. O
+``DETACH`` não dispara triggers: os totais de ``transactions.rollups`` desses
+meses continuam valendo, e ``manage.py rollups`` confere só os meses anexados
+(``MonthlyPartitions.retained_from``).
+
+Depois da retenção não há partição para datas anteriores ao corte: a API, o
+lote e a importação recusam essas datas (``retention_cutoff``) com 400 em vez
+de deixar o INSERT falhar. O corte vem de ``RETENTION_MONTHS``, então rodar
+``manage.py partitions --retain-months`` com outro valor deixa a validação
+para trás.
+
+Em outros bancos (SQLite) a tabela continua única e tudo isso é no-op.
+"""
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.migrations.operations.base import Operation
+
+DEFAULTS = {
+    'AHEAD_MONTHS': 3,
+    'RETENTION_MONTHS': 0,
+    'ARCHIVE_SCHEMA': 'archive',
+}
+
+BOUND_RE = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PARTITIONING', {})}
+
+
+def add_months(month, months):
+    years, index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def retention_cutoff(months=None, today=None):
+    """Primeiro dia mantido com a retenção de ``months`` meses (``None`` sem retenção).
+
+    ``retire`` só desanexa partições que terminam até esse dia: uma data a
+    partir dele sempre tem partição.
+    """
+    months = get_config()['RETENTION_MONTHS'] if months is None else months
+    if not months:
+        return None
+    return add_months((today or date.today()).replace(day=1), -months)
+
+
+def parse_bound(value):
+    return None if value in ('MINVALUE', 'MAXVALUE') else date.fromisoformat(value.strip("'"))
+
+
+class MonthlyPartitions:
+    def __init__(self, field, history_months=24):
+        self.field = field
+        self.history_months = history_months
+
+    def deconstruct(self):
+        kwargs = {}
+        if self.history_months != 24:
+            kwargs['history_months'] = self.history_months
+        return 'core.partitioning.MonthlyPartitions', (self.field,), kwargs
+
+    def __eq__(self, other):
+        return isinstance(other, MonthlyPartitions) and self.deconstruct() == other.deconstruct()
+
+    def names(self, model, connection):
+        qn = connection.ops.quote_name
+        return qn, model._meta.db_table, model._meta.get_field(self.field).column
+
+    # ------------------------------------------------------------
+    # CATÁLOGO
+    # ------------------------------------------------------------
+    def is_partitioned(self, model, connection):
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+                           [connection.ops.quote_name(model._meta.db_table)])
+            return cursor.fetchone() is not None
+
+    def partitions(self, model, connection):
+        """``[(nome, início, fim)]`` das partições, com ``None`` nos limites abertos."""
+        qn, table, _ = self.names(model, connection)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+                'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)',
+                [qn(table)],
+            )
+            rows = cursor.fetchall()
+        partitions = []
+        for name, bound in rows:
+            match = BOUND_RE.search(bound)
+            if match:
+                partitions.append((name, parse_bound(match[1]), parse_bound(match[2])))
+        return sorted(partitions, key=lambda p: p[1] or date.min)
+
+    def retained_from(self, model, connection):
+        """Início da partição mais antiga anexada, ou ``None`` se nada foi retirado (ou fora do PostgreSQL)."""
+        if not self.is_partitioned(model, connection):
+            return None
+        partitions = self.partitions(model, connection)
+        return partitions[0][1] if partitions else None
+
+    @staticmethod
+    def copy_columns(cursor, table):
+        # Colunas geradas (ex. search_vector) são recalculadas pelo banco.
+        cursor.execute(
+            "SELECT attname FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attnum > 0 "
+            "AND NOT attisdropped AND attgenerated = '' ORDER BY attnum",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def table_definitions(cursor, table):
+        """Índices avulsos e restrições únicas/FK, para recriar na tabela nova."""
+        cursor.execute(
+            'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i WHERE i.indrelid = to_regclass(%s) '
+            'AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid) '
+            'ORDER BY i.indexrelid',
+            [table],
+        )
+        # O pg_get_indexdef de uma tabela particionada diz "ON ONLY"; a recriação vale para as partições.
+        indexes = [row[0].replace(' ON ONLY ', ' ON ', 1) for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) "
+            "AND contype IN ('u', 'f') ORDER BY contype DESC, conname",
+            [table],
+        )
+        return indexes, cursor.fetchall()
+
+    # ------------------------------------------------------------
+    # DDL
+    # ------------------------------------------------------------
+    def partition_sql(self, qn, parent, table, month):
+        return (f'CREATE TABLE {qn(f"{table}_p{month:%Y%m}")} PARTITION OF {qn(parent)} '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')")
+
+    def partition(self, model, schema_editor, today=None):
+        """Converte a tabela do modelo em particionada, preservando os dados."""
+        connection = schema_editor.connection
+        qn, table, column = self.names(model, connection)
+        pk = model._meta.pk.column
+        new = f'{table}_partitioned'
+        schema_editor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        with connection.cursor() as cursor:
+            columns = ', '.join(qn(name) for name in self.copy_columns(cursor, qn(table)))
+            indexes, constraints = self.table_definitions(cursor, qn(table))
+            cursor.execute(f'SELECT MIN({qn(column)}) FROM {qn(table)}')
+            first = cursor.fetchone()[0]
+
+        current = (today or date.today()).replace(day=1)
+        first = min(max(first.replace(day=1), add_months(current, -self.history_months)), current) if first else current
+        last = add_months(current, get_config()['AHEAD_MONTHS'])
+
+        schema_editor.execute(
+            f'CREATE TABLE {qn(new)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING GENERATED '
+            f'INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE ({qn(column)})'
+        )
+        schema_editor.execute(f'CREATE TABLE {qn(f"{table}_old")} PARTITION OF {qn(new)} '
+                              f"FOR VALUES FROM (MINVALUE) TO ('{first.isoformat()}')")
+        month = first
+        while month <= last:
+            schema_editor.execute(self.partition_sql(qn, new, table, month))
+            month = add_months(month, 1)
+        schema_editor.execute(f'CREATE TABLE {qn(f"{table}_future")} PARTITION OF {qn(new)} '
+                              f"FOR VALUES FROM ('{month.isoformat()}') TO (MAXVALUE)")
+
+        schema_editor.execute(f'INSERT INTO {qn(new)} ({columns}) SELECT {columns} FROM {qn(table)}')
+        schema_editor.execute(f'DROP TABLE {qn(table)}')
+        schema_editor.execute(f'ALTER TABLE {qn(new)} RENAME TO {qn(table)}')
+
+        # Identidade em tabela particionada só existe a partir do PostgreSQL 17: usa uma sequência.
+        sequence = f'{table}_{pk}_seq'
+        schema_editor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.{qn(pk)}')
+        schema_editor.execute(f"SELECT setval('{qn(sequence)}', COALESCE(MAX({qn(pk)}), 0) + 1, false) FROM {qn(table)}")
+        schema_editor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN {qn(pk)} SET DEFAULT nextval('{qn(sequence)}')")
+        schema_editor.execute(
+            f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f"{table}_pkey")} PRIMARY KEY ({qn(pk)}, {qn(column)})'
+        )
+        self.restore_definitions(schema_editor, qn, table, indexes, constraints)
+
+    def unpartition(self, model, schema_editor):
+        """Volta a uma tabela única com os dados de todas as partições anexadas."""
+        connection = schema_editor.connection
+        qn, table, _ = self.names(model, connection)
+        pk = model._meta.pk.column
+        new = f'{table}_single'
+        schema_editor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        with connection.cursor() as cursor:
+            columns = ', '.join(qn(name) for name in self.copy_columns(cursor, qn(table)))
+            indexes, constraints = self.table_definitions(cursor, qn(table))
+
+        schema_editor.execute(
+            f'CREATE TABLE {qn(new)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING GENERATED '
+            f'INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS)'
+        )
+        # O DEFAULT aponta para a sequência da tabela particionada, removida junto com ela.
+        schema_editor.execute(f'ALTER TABLE {qn(new)} ALTER COLUMN {qn(pk)} DROP DEFAULT')
+        schema_editor.execute(f'INSERT INTO {qn(new)} ({columns}) SELECT {columns} FROM {qn(table)}')
+        schema_editor.execute(f'DROP TABLE {qn(table)}')
+        schema_editor.execute(f'ALTER TABLE {qn(new)} RENAME TO {qn(table)}')
+
+        schema_editor.execute(f'ALTER TABLE {qn(table)} ALTER COLUMN {qn(pk)} ADD GENERATED BY DEFAULT AS IDENTITY')
+        schema_editor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{qn(table)}', '{pk}'), COALESCE(MAX({qn(pk)}), 0) + 1, false) "
+            f'FROM {qn(table)}'
+        )
+        schema_editor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(f"{table}_pkey")} PRIMARY KEY ({qn(pk)})')
+        self.restore_definitions(schema_editor, qn, table, indexes, constraints)
+
+    @staticmethod
+    def restore_definitions(schema_editor, qn, table, indexes, constraints):
+        for sql in indexes:
+            schema_editor.execute(sql)
+        for name, definition in constraints:
+            schema_editor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+
+    # ------------------------------------------------------------
+    # MANUTENÇÃO
+    # ------------------------------------------------------------
+    def ensure(self, model, connection, ahead=None, today=None):
+        """Cria as partições mensais que faltam até ``ahead`` meses à frente.
+
+        Cada mês novo sai do começo de ``<tabela>_future``, levando as linhas
+        que já estavam lá. Devolve os nomes criados.
+        """
+        if not self.is_partitioned(model, connection):
+            return []
+        _, table, _ = self.names(model, connection)
+        ahead = get_config()['AHEAD_MONTHS'] if ahead is None else ahead
+        current = (today or date.today()).replace(day=1)
+        partitions = self.partitions(model, connection)
+        covered = {lower for _, lower, upper in partitions if lower and upper}
+        # Meses sem manutenção (ex. o comando parou de rodar) também são criados.
+        uppers = [upper for _, _, upper in partitions if upper]
+        month = min(max(uppers), current) if uppers else current
+        created = []
+        while month <= add_months(current, ahead):
+            if month not in covered:
+                self.create_partition(model, connection, month)
+                created.append(f'{table}_p{month:%Y%m}')
+            month = add_months(month, 1)
+        return created
+
+    def create_partition(self, model, connection, month):
+        qn, table, column = self.names(model, connection)
+        future = f'{table}_future'
+        bounds = [month, add_months(month, 1)]
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [qn(future)])
+            if not cursor.fetchone()[0]:
+                cursor.execute(self.partition_sql(qn, table, table, month))
+                return
+            # Os limites de uma partição não mudam: desanexa, monta o mês numa tabela avulsa e anexa as duas.
+            # As linhas movidas não passam pela tabela-mãe nem por seus triggers.
+            name = f'{table}_p{month:%Y%m}'
+            columns = ', '.join(qn(field) for field in self.copy_columns(cursor, qn(table)))
+            cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(future)}')
+            cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING GENERATED '
+                           f'INCLUDING CONSTRAINTS INCLUDING STORAGE)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {qn(future)} WHERE {qn(column)} >= %s AND {qn(column)} < %s '
+                f'RETURNING {columns}) INSERT INTO {qn(name)} ({columns}) SELECT {columns} FROM moved',
+                bounds,
+            )
+            cursor.execute(f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} '
+                           f"FOR VALUES FROM ('{bounds[0].isoformat()}') TO ('{bounds[1].isoformat()}')")
+            cursor.execute(f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(future)} '
+                           f"FOR VALUES FROM ('{bounds[1].isoformat()}') TO (MAXVALUE)")
+
+    def retire(self, model, connection, months=None, archive_schema=None, drop=False, today=None):
+        """Desanexa as partições que terminam antes dos últimos ``months`` meses.
+
+        Elas vão para ``archive_schema`` (ou são removidas com ``drop``).
+        Devolve os nomes.
+        """
+        cutoff = retention_cutoff(months, today)
+        if cutoff is None or not self.is_partitioned(model, connection):
+            return []
+        schema = archive_schema or get_config()['ARCHIVE_SCHEMA']
+        retired = []
+        for name, _, upper in self.partitions(model, connection):
+            if upper is not None and upper <= cutoff:
+                self.detach(model, connection, name, schema, drop)
+                retired.append(name)
+        return retired
+
+    def detach(self, model, connection, name, archive_schema=None, drop=False):
+        """Desanexa uma partição e a move para ``archive_schema`` (ou a remove com ``drop``)."""
+        qn, table, _ = self.names(model, connection)
+        schema = archive_schema or get_config()['ARCHIVE_SCHEMA']
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}')
+            if drop:
+                cursor.execute(f'DROP TABLE {qn(name)}')
+            else:
+                cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {qn(schema)}')
+                cursor.execute(f'ALTER TABLE {qn(name)} SET SCHEMA {qn(schema)}')
+
+
+class PartitionTable(Operation):
+    """Particiona a tabela de um modelo por mês (no-op fora do PostgreSQL)."""
+
+    reversible = True
+
+    def __init__(self, model_name, partitioning):
+        self.model_name = model_name
+        self.partitioning = partitioning
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if schema_editor.connection.vendor == 'postgresql' and self.allow_migrate_model(
+                schema_editor.connection.alias, model):
+            self.partitioning.partition(model, schema_editor)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if schema_editor.connection.vendor == 'postgresql' and self.allow_migrate_model(
+                schema_editor.connection.alias, model):
+            self.partitioning.unpartition(model, schema_editor)
+
+    def describe(self):
+        return f'Partition {self.model_name} by month of {self.partitioning.field}'
+
+    @property
+    def migration_name_fragment(self):
+        return f'{self.model_name.lower()}_partitions'
+
+
+def partitioned_models():
+    from django.apps import apps
+
+    return [model for model in apps.get_models() if getattr(model, 'partitioning', None)]
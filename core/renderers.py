@@ -0,0 +1,41 @@
+"""Renderer JSON com orjson e saída idêntica à do ``JSONRenderer`` do DRF.
+
+Na configuração padrão (compacto, ``UNICODE_JSON``, sem ``indent``) o orjson
+gera exatamente os mesmos bytes que ``json.dumps``; tipos que ele não
+conhece — e datas, que o DRF formata do seu jeito — são entregues ao
+``default`` do ``JSONEncoder`` do DRF. Qualquer outra configuração, ou
+qualquer valor que o orjson recuse (chaves não textuais, inteiros acima de
+64 bits), cai no renderer original.
+
+Diferença conhecida: floats em notação científica saem como ``1e16`` em vez
+de ``1e+16`` e ``NaN`` vira ``null``. A API não expõe floats (valores em
+centavos, inteiros).
+"""
+from rest_framework import renderers
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Mesmo escape do DRF para manter o JSON um subconjunto estrito de JavaScript.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,272 @@
+"""Cache de respostas GET das views DRF, invalidado por tags.
+
+Uso::
+
+    class CustomUserRetriveUpdateDestroyView(CachedResponseMixin, ...):
+        def get_cache_tags(self):
+            return (f'user:{self.kwargs["pk"]}',)
+
+e, onde o dado muda (em geral um sinal do modelo), ``invalidate('user:1')``.
+
+A chave combina a view, o caminho, os parâmetros de consulta (ordenados),
+o usuário autenticado e o formato negociado. Só respostas 200 em JSON são
+guardadas, com o corpo já renderizado e os cabeçalhos da view (inclusive
+``ETag``/``Last-Modified``): um acerto não consulta o banco nem passa pelo
+serializer, e responde 304 a requisições condicionais.
+
+Tags: cada tag tem uma versão no cache (um token aleatório). A entrada
+guarda as versões das suas tags lidas *antes* de a resposta ser montada, e
+invalidar uma tag apaga a versão: toda entrada gravada antes ou durante a
+escrita deixa de valer, sem precisar saber quais chaves usam a tag. Entrada
+e versões vêm numa só leitura (``get_many``).
+
+Estouro de cache (stampede):
+
+- na falta, só quem consegue a trava (``cache.add``) monta a resposta; os
+  demais esperam até ``LOCK_WAIT`` segundos pela entrada e, se ela não
+  vier, montam por conta própria;
+- perto de expirar, cada leitura decide, com probabilidade crescente,
+  renovar antes da hora (``agora - custo × BETA × ln(rand) >= expira``);
+  quem renova fica com a trava e os demais seguem servindo a entrada ainda
+  válida.
+
+O backend é o alias ``ALIAS`` de ``CACHES``: ``core.cache_backends.SharedLRUCache``
+(memória compartilhada entre os workers do host) ou o Redis.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import secrets
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+DEFAULTS = {
+    'ALIAS': 'responses',
+    'TIMEOUT': 60,
+    'LOCK_TIMEOUT': 10,
+    'LOCK_WAIT': 2.0,
+    'POLL_INTERVAL': 0.02,
+    'BETA': 1.0,
+}
+
+PREFIX = 'responses'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+
+def tag_key(tag):
+    return f'{PREFIX}:tag:{tag}'
+
+
+def invalidate(*tags):
+    get_cache().delete_many([tag_key(tag) for tag in tags])
+
+
+def make_key(view, request):
+    user = request.user
+    parts = (
+        type(view).__module__, type(view).__qualname__, request.path, request.accepted_media_type,
+        user.pk if user.is_authenticated else '', urlencode(sorted(request.query_params.lists()), doseq=True),
+    )
+    return f'{PREFIX}:{hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16).hexdigest()}'
+
+
+class CachedRequest:
+    """Uma requisição GET diante do cache: leitura, trava da falta e gravação da resposta."""
+
+    def __init__(self, view, request, timeout, config):
+        self.config = config
+        self.cache = caches[config['ALIAS']]
+        self.request = request
+        self.timeout = timeout
+        self.key = make_key(view, request)
+        self.lock_key = f'{self.key}:lock'
+        self.tag_keys = {tag_key(tag): tag for tag in view.get_cache_tags()}
+        self.versions = {}
+        self.locked = False
+        self.started = time.monotonic()
+
+    @classmethod
+    def for_view(cls, view, request):
+        """``None`` quando a resposta não é cacheável (cache desligado, formato não JSON)."""
+        config = get_config()
+        timeout = view.cache_timeout if view.cache_timeout is not None else config['TIMEOUT']
+        if not timeout or request.method not in ('GET', 'HEAD') or request.accepted_renderer.format != 'json':
+            return None
+        return cls(view, request, timeout, config)
+
+    @property
+    def keys(self):
+        return [self.key, *self.tag_keys]
+
+    def evaluate(self, found):
+        """``(entrada válida ou None, renovar já)`` a partir do que veio do cache."""
+        self.versions = {tag: found.get(key) for key, tag in self.tag_keys.items()}
+        entry = found.get(self.key)
+        if entry is None or None in self.versions.values() or entry['versions'] != self.versions:
+            return None, True
+        early = time.time() - entry['cost'] * self.config['BETA'] * math.log(1 - random.random())
+        return entry, early >= entry['expires']
+
+    def missing_versions(self):
+        return [key for key, tag in self.tag_keys.items() if self.versions[tag] is None]
+
+    def respond(self, entry):
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for header, value in entry['headers']:
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        last_modified = parse_http_date_safe(response['Last-Modified']) if response.has_header('Last-Modified') else None
+        return get_conditional_response(self.request, etag=response.get('ETag'), last_modified=last_modified,
+                                        response=response)
+
+    def make_entry(self, response):
+        if not isinstance(response, Response) or response.status_code != 200 or None in self.versions.values():
+            return None
+        response['X-Cache'] = 'MISS'
+        return {
+            'versions': self.versions,
+            'expires': time.time() + self.timeout,
+            'cost': time.monotonic() - self.started,
+            'status': response.status_code,
+            'headers': [(header, value) for header, value in response.items() if header != 'X-Cache'],
+            'content': response.content,
+        }
+
+    # --------------------------------------------------------
+    # SÍNCRONO
+    # --------------------------------------------------------
+    def lookup(self):
+        """Resposta do cache, ou ``None`` para a view montá-la (e ``store`` guardá-la)."""
+        entry, refresh = self.evaluate(self.cache.get_many(self.keys))
+        if entry is not None and not refresh:
+            return self.respond(entry)
+        self.locked = self.cache.add(self.lock_key, 1, self.config['LOCK_TIMEOUT'])
+        if not self.locked:
+            if entry is not None:
+                return self.respond(entry)
+            deadline = time.monotonic() + self.config['LOCK_WAIT']
+            while time.monotonic() < deadline:
+                time.sleep(self.config['POLL_INTERVAL'])
+                entry, _ = self.evaluate(self.cache.get_many(self.keys))
+                if entry is not None:
+                    return self.respond(entry)
+        self.prepare_versions()
+        self.started = time.monotonic()
+        return None
+
+    def prepare_versions(self):
+        for key in self.missing_versions():
+            version = secrets.token_hex(8)
+            # Outro processo pode ter criado a versão ao mesmo tempo: vale a que ficou gravada.
+            self.versions[self.tag_keys[key]] = version if self.cache.add(key, version, None) else self.cache.get(key)
+
+    def store(self, response):
+        try:
+            entry = self.make_entry(response)
+            if entry is not None:
+                self.cache.set(self.key, entry, self.timeout)
+        finally:
+            if self.locked:
+                self.cache.delete(self.lock_key)
+
+    # --------------------------------------------------------
+    # ASSÍNCRONO
+    # --------------------------------------------------------
+    async def alookup(self):
+        entry, refresh = self.evaluate(await self.cache.aget_many(self.keys))
+        if entry is not None and not refresh:
+            return self.respond(entry)
+        self.locked = await self.cache.aadd(self.lock_key, 1, self.config['LOCK_TIMEOUT'])
+        if not self.locked:
+            if entry is not None:
+                return self.respond(entry)
+            deadline = time.monotonic() + self.config['LOCK_WAIT']
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.config['POLL_INTERVAL'])
+                entry, _ = self.evaluate(await self.cache.aget_many(self.keys))
+                if entry is not None:
+                    return self.respond(entry)
+        await self.aprepare_versions()
+        self.started = time.monotonic()
+        return None
+
+    async def aprepare_versions(self):
+        for key in self.missing_versions():
+            version = secrets.token_hex(8)
+            added = await self.cache.aadd(key, version, None)
+            self.versions[self.tag_keys[key]] = version if added else await self.cache.aget(key)
+
+    async def astore(self, response):
+        try:
+            entry = self.make_entry(response)
+            if entry is not None:
+                await self.cache.aset(self.key, entry, self.timeout)
+        finally:
+            if self.locked:
+                await self.cache.adelete(self.lock_key)
+
+
+class CachedResponseMixin:
+    """GETs servidos do cache de respostas; ``get_cache_tags`` diz o que os invalida."""
+    # Segundos; None usa RESPONSE_CACHE['TIMEOUT'] e 0 desliga o cache na view.
+    cache_timeout = None
+
+    def get_cache_tags(self):
+        return ()
+
+    def get(self, request, *args, **kwargs):
+        cached = CachedRequest.for_view(self, request)
+        if cached is None:
+            return super().get(request, *args, **kwargs)
+        response = cached.lookup()
+        if response is not None:
+            return response
+        try:
+            response = super().get(request, *args, **kwargs)
+        except BaseException:
+            cached.store(None)
+            raise
+        if isinstance(response, Response):
+            # Guardada já renderizada, com os cabeçalhos que o DRF acrescenta em finalize_response.
+            response.add_post_render_callback(cached.store)
+        else:
+            cached.store(response)
+        return response
+
+
+class AsyncCachedResponseMixin:
+    """``CachedResponseMixin`` para ``AsyncAPIView``: tags e tempo vêm da view DRF."""
+
+    async def get(self, view, request, *args, **kwargs):
+        cached = CachedRequest.for_view(view, request)
+        if cached is None:
+            return await super().get(view, request, *args, **kwargs)
+        response = await cached.alookup()
+        if response is not None:
+            return response
+        try:
+            response = await super().get(view, request, *args, **kwargs)
+            if isinstance(response, Response):
+                # handle() finaliza e renderiza de novo; as duas operações são idempotentes.
+                response = view.finalize_response(request, response, *args, **kwargs)
+                response.render()
+        except BaseException:
+            await cached.astore(None)
+            raise
+        await cached.astore(response)
+        return response
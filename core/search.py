@@ -0,0 +1,253 @@
+"""Busca textual indexada.
+
+O ``SearchFilter`` do DRF e o ``search_fields`` do admin viram ``icontains``,
+que o banco resolve com varredura sequencial. Um modelo com
+``search_index = SearchIndex(...)``, criado na migração por
+``CreateSearchIndex``, passa a ser buscado por um índice que o próprio banco
+mantém a cada INSERT, UPDATE e DELETE:
+
+- ``WORDS`` (palavras inteiras, ex. descrições):
+  - PostgreSQL: coluna gerada ``search_vector``
+    (``to_tsvector('simple', ...)``) com índice GIN;
+  - SQLite: tabela FTS5 ``<tabela>_search`` (``unicode61``), de conteúdo
+    externo e mantida por triggers.
+
+  Com ``scope`` (ex. ``'user'``), o valor da coluna entra no índice como um
+  termo a mais (``'=<id>'`` no ``tsvector``, uma coluna na FTS5). Quem passa
+  ``scope=<id>`` ao ``filter`` faz o GIN/FTS5 cruzar o termo buscado com o
+  escopo numa única leitura do índice, em vez de ler todas as linhas do
+  termo e só depois descartar as de outros usuários. Não há busca por
+  prefixo (``:*``): o GIN teria de materializar as linhas de cada prefixo
+  antes do cruzamento.
+- ``TRIGRAM`` (substring, a mesma semântica do ``icontains``, ex. email):
+  - PostgreSQL: um índice GIN ``gin_trgm_ops`` (``pg_trgm``) por campo.
+    Se nada casar, os campos em ``fuzzy`` são buscados por semelhança de
+    palavra (``%>``), o que tolera erros de digitação;
+  - SQLite: FTS5 com o tokenizador ``trigram``. Termos com menos de três
+    caracteres não formam trigramas e caem no ``icontains``.
+
+Em ambos os bancos nenhum dos dois tipos remove acentos. Em outros bancos, a
+busca volta ao ``icontains``.
+
+No SQLite, uma migração que recria a tabela (``ALTER`` que o SQLite não
+suporta) descarta os triggers. Nesse caso, reaplique ``CreateSearchIndex``.
+"""
+import re
+
+from django.db import connections
+from django.db.migrations.operations.base import Operation
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+WORDS = 'words'
+TRIGRAM = 'trigram'
+SEARCH_VECTOR = 'search_vector'
+GIN_PENDING_LIST_KB = 256
+
+WORD_RE = re.compile(r'[^\W_]+')
+SQLITE_TOKENIZERS = {WORDS: 'unicode61 remove_diacritics 0', TRIGRAM: 'trigram'}
+
+
+def like_pattern(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def fts5_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    def __init__(self, fields, kind=WORDS, scope=None, fuzzy=()):
+        if kind not in SQLITE_TOKENIZERS:
+            raise ValueError(f'Tipo de índice de busca desconhecido: {kind}')
+        if scope and kind != WORDS:
+            raise ValueError('Só índices WORDS aceitam escopo.')
+        self.fields = tuple(fields)
+        self.kind = kind
+        self.scope = scope
+        self.fuzzy = tuple(fuzzy)
+
+    def deconstruct(self):
+        kwargs = {}
+        if self.kind != WORDS:
+            kwargs['kind'] = self.kind
+        if self.scope:
+            kwargs['scope'] = self.scope
+        if self.fuzzy:
+            kwargs['fuzzy'] = self.fuzzy
+        return 'core.search.SearchIndex', (self.fields,), kwargs
+
+    def __eq__(self, other):
+        return isinstance(other, SearchIndex) and self.deconstruct() == other.deconstruct()
+
+    # ------------------------------------------------------------
+    # DDL
+    # ------------------------------------------------------------
+    def names(self, model, connection):
+        qn = connection.ops.quote_name
+        table = model._meta.db_table
+        columns = [model._meta.get_field(name).column for name in self.fields]
+        return qn, table, columns
+
+    def scope_column(self, model):
+        return model._meta.get_field(self.scope).column if self.scope else None
+
+    def create_sql(self, model, connection):
+        qn, table, columns = self.names(model, connection)
+        if connection.vendor == 'postgresql':
+            if self.kind == TRIGRAM:
+                yield 'CREATE EXTENSION IF NOT EXISTS pg_trgm'
+                for column in columns:
+                    yield (f'CREATE INDEX {qn(f"{table}_{column}_trgm_idx")} ON {qn(table)} '
+                           f'USING gin ({qn(column)} gin_trgm_ops)')
+                return
+            document = " || ' ' || ".join(f"coalesce({qn(column)}, '')" for column in columns)
+            vector = f"to_tsvector('simple'::regconfig, {document})"
+            if self.scope:
+                # '=' nunca sai do parser, então o termo do escopo não colide com palavras.
+                vector += f" || array_to_tsvector(ARRAY['=' || {qn(self.scope_column(model))}::text])"
+            yield (f'ALTER TABLE {qn(table)} ADD COLUMN {qn(SEARCH_VECTOR)} tsvector '
+                   f'GENERATED ALWAYS AS ({vector}) STORED')
+            # Toda busca lê a lista pendente do GIN inteira; o limite baixo a mantém curta numa tabela muito escrita.
+            yield (f'CREATE INDEX {qn(f"{table}_search_idx")} ON {qn(table)} USING gin ({qn(SEARCH_VECTOR)}) '
+                   f'WITH (gin_pending_list_limit = {GIN_PENDING_LIST_KB})')
+        elif connection.vendor == 'sqlite':
+            fts = qn(f'{table}_search')
+            pk = qn(model._meta.pk.column)
+            if self.scope:
+                columns = [*columns, self.scope_column(model)]
+            names = ', '.join(qn(column) for column in columns)
+            new = ', '.join(f'new.{qn(column)}' for column in columns)
+            old = ', '.join(f'old.{qn(column)}' for column in columns)
+            insert = f'INSERT INTO {fts}(rowid, {names}) VALUES (new.{pk}, {new});'
+            delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{pk}, {old});"
+            yield (f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content={qn(table)}, content_rowid={pk}, "
+                   f"tokenize='{SQLITE_TOKENIZERS[self.kind]}')")
+            yield f'CREATE TRIGGER {qn(f"{table}_search_ai")} AFTER INSERT ON {qn(table)} BEGIN {insert} END'
+            yield f'CREATE TRIGGER {qn(f"{table}_search_ad")} AFTER DELETE ON {qn(table)} BEGIN {delete} END'
+            yield (f'CREATE TRIGGER {qn(f"{table}_search_au")} AFTER UPDATE OF {names} ON {qn(table)} '
+                   f'BEGIN {delete} {insert} END')
+            yield f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+
+    def drop_sql(self, model, connection):
+        qn, table, columns = self.names(model, connection)
+        if connection.vendor == 'postgresql':
+            if self.kind == TRIGRAM:
+                for column in columns:
+                    yield f'DROP INDEX IF EXISTS {qn(f"{table}_{column}_trgm_idx")}'
+            else:
+                yield f'DROP INDEX IF EXISTS {qn(f"{table}_search_idx")}'
+                yield f'ALTER TABLE {qn(table)} DROP COLUMN IF EXISTS {qn(SEARCH_VECTOR)}'
+        elif connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                yield f'DROP TRIGGER IF EXISTS {qn(f"{table}_search_{suffix}")}'
+            yield f'DROP TABLE IF EXISTS {qn(f"{table}_search")}'
+
+    # ------------------------------------------------------------
+    # CONSULTA
+    # ------------------------------------------------------------
+    def filter(self, queryset, terms, scope=None):
+        """Linhas de ``queryset`` em que cada termo casa com algum dos campos.
+
+        ``scope`` só acelera a busca: ``queryset`` já deve estar restrito a ele.
+        """
+        terms = [term for term in terms if term]
+        if not terms:
+            return queryset
+        connection = connections[queryset.db]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            return self.filter_icontains(queryset, terms)
+        if self.kind == WORDS:
+            return self.filter_words(queryset, terms, connection, scope if self.scope else None)
+        return self.filter_trigram(queryset, terms, connection)
+
+    def filter_icontains(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(Q.create([(f'{name}__icontains', term) for name in self.fields],
+                                                connector=Q.OR))
+        return queryset
+
+    def filter_words(self, queryset, terms, connection, scope):
+        qn, table, columns = self.names(queryset.model, connection)
+        words = WORD_RE.findall(' '.join(terms).lower())
+        if not words:
+            return queryset.none()
+        if connection.vendor == 'postgresql':
+            query = "to_tsquery('simple'::regconfig, %s)"
+            params = [' & '.join(words)]
+            if scope is not None:
+                query = f'({query} && %s::tsquery)'
+                params.append(f"'={int(scope)}'")
+            sql = f'{qn(table)}.{qn(SEARCH_VECTOR)} @@ {query}'
+        else:
+            fts = qn(f'{table}_search')
+            sql = f'{qn(table)}.{qn(queryset.model._meta.pk.column)} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)'
+            query = '{%s} : (%s)' % (' '.join(columns), ' '.join(fts5_phrase(word) for word in words))
+            if scope is not None:
+                query += ' AND {%s} : %s' % (self.scope_column(queryset.model), fts5_phrase(str(int(scope))))
+            params = [query]
+        return queryset.filter(RawSQL(sql, params, output_field=BooleanField()))
+
+    def filter_trigram(self, queryset, terms, connection):
+        qn, table, columns = self.names(queryset.model, connection)
+        if connection.vendor == 'postgresql':
+            conditions, params = [], []
+            for term in terms:
+                conditions.append('(' + ' OR '.join(f'{qn(table)}.{qn(column)} ILIKE %s' for column in columns) + ')')
+                params += [like_pattern(term)] * len(columns)
+            found = queryset.filter(RawSQL(' AND '.join(conditions), params, output_field=BooleanField()))
+            if not self.fuzzy or found.exists():
+                return found
+            # Sem resultado exato: tenta por semelhança (``word_similarity`` >= pg_trgm.word_similarity_threshold).
+            fuzzy = [f'{qn(table)}.{qn(queryset.model._meta.get_field(name).column)} %%> %s' for name in self.fuzzy]
+            return queryset.filter(RawSQL(' OR '.join(fuzzy), [' '.join(terms)] * len(fuzzy), output_field=BooleanField()))
+
+        long_terms = [term for term in terms if len(term) >= 3]
+        if long_terms:
+            fts = qn(f'{table}_search')
+            sql = f'{qn(table)}.{qn(queryset.model._meta.pk.column)} IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)'
+            query = ' AND '.join(fts5_phrase(term) for term in long_terms)
+            queryset = queryset.filter(RawSQL(sql, [query], output_field=BooleanField()))
+        return self.filter_icontains(queryset, [term for term in terms if len(term) < 3])
+
+
+class CreateSearchIndex(Operation):
+    """Cria o ``SearchIndex`` de um modelo (no-op em bancos sem suporte)."""
+
+    reversible = True
+
+    def __init__(self, model_name, index):
+        self.model_name = model_name
+        self.index = index
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            for sql in self.index.create_sql(model, schema_editor.connection):
+                schema_editor.execute(sql)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            for sql in self.index.drop_sql(model, schema_editor.connection):
+                schema_editor.execute(sql)
+
+    def describe(self):
+        return f'Create search index on {self.model_name} ({", ".join(self.index.fields)})'
+
+    @property
+    def migration_name_fragment(self):
+        return f'{self.model_name.lower()}_search_index'
+
+
+class IndexedSearchAdminMixin:
+    """``ModelAdmin`` cujo ``search_fields`` usa o ``search_index`` do modelo."""
+
+    def get_search_results(self, request, queryset, search_term):
+        index = getattr(queryset.model, 'search_index', None)
+        if index is None or set(self.get_search_fields(request)) != set(index.fields):
+            return super().get_search_results(request, queryset, search_term)
+        return index.filter(queryset, search_term.split()), False
@@ -0,0 +1,147 @@
+"""Caminho de leitura leve para serializers de modelo.
+
+``ValuesReader`` lê as colunas declaradas por um ``ModelSerializer`` com
+``.values()`` e monta cada item como o serializer montaria, sem instanciar
+o modelo nem passar pelo ``to_representation`` genérico do serializer. Campos
+cujo ``to_representation`` devolve o próprio valor vindo do banco (inteiros,
+textos, booleanos, chaves estrangeiras) são copiados diretamente. Datas e
+datas/horas em ISO 8601 repetem os passos do DRF com o fuso resolvido uma
+vez por lote, e não a cada valor; os demais campos usam o
+``to_representation`` do próprio serializer. O formato de saída é o mesmo.
+
+Serializers com campos que não são colunas simples do modelo (métodos,
+serializers aninhados, ``source`` com pontos ou relações many-to-many) não
+têm leitor e seguem pelo caminho normal.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+from rest_framework.settings import api_settings
+
+from .instrumentation import timed
+
+PASSTHROUGH_FIELDS = (
+    drf_fields.IntegerField,
+    drf_fields.CharField,
+    drf_fields.EmailField,
+    drf_fields.BooleanField,
+    drf_fields.ReadOnlyField,
+    relations.PrimaryKeyRelatedField,
+)
+
+
+def is_passthrough(field):
+    """O valor lido do banco já é a representação do campo?"""
+    if type(field) in PASSTHROUGH_FIELDS:
+        return True
+    # Escolhas inteiras (IntegerChoices): to_representation devolve a própria chave.
+    return type(field) is drf_fields.ChoiceField and all(type(key) is int for key in field.choices)
+
+
+def is_iso_format(field, setting):
+    output_format = getattr(field, 'format', getattr(api_settings, setting))
+    return isinstance(output_format, str) and output_format.lower() == ISO_8601
+
+
+def get_converter(field, current_timezone):
+    """Conversor de um valor do banco para a representação de ``field`` (``None`` = o próprio valor)."""
+    if is_passthrough(field):
+        return None
+    if type(field) is drf_fields.DateField and is_iso_format(field, 'DATE_FORMAT'):
+        return date.isoformat
+    if type(field) is drf_fields.DateTimeField and is_iso_format(field, 'DATETIME_FORMAT'):
+        field_timezone = field.timezone if hasattr(field, 'timezone') else current_timezone
+        if field_timezone is not None:
+            def convert(value):
+                # Mesmo resultado de DateTimeField.enforce_timezone + isoformat, sem consultar o fuso ativo.
+                if value.tzinfo is None:
+                    return field.to_representation(value)
+                text = value.astimezone(field_timezone).isoformat()
+                return text[:-6] + 'Z' if text.endswith('+00:00') else text
+            return convert
+    return field.to_representation
+
+
+class ValuesReader:
+    _cache = {}
+
+    def __init__(self, model, columns):
+        self.model = model
+        # (nome na saída, coluna do .values(), campo do serializer)
+        self.columns = columns
+
+    @classmethod
+    def for_serializer(cls, serializer_class):
+        """Leitor para ``serializer_class`` (memorizado) ou ``None`` se não houver."""
+        try:
+            return cls._cache[serializer_class]
+        except KeyError:
+            reader = cls._cache[serializer_class] = cls.build(serializer_class())
+            return reader
+
+    @classmethod
+    def build(cls, serializer):
+        if not isinstance(serializer, serializers.ModelSerializer):
+            return None
+        opts = serializer.Meta.model._meta
+        columns = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField,
+                                  relations.ManyRelatedField)) or '.' in field.source or field.source == '*':
+                return None
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                return None
+            if isinstance(field, relations.RelatedField) and (
+                    not isinstance(field, relations.PrimaryKeyRelatedField) or field.pk_field is not None):
+                return None
+            columns.append((name, model_field.attname, field))
+        return cls(serializer.Meta.model, columns)
+
+    def values(self, queryset, extra=()):
+        """``queryset.values()`` com as colunas do serializer e as de ``extra`` (ex.: ordenação)."""
+        names = [column for _, column, _ in self.columns]
+        for name in extra:
+            try:
+                attname = self.model._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                continue
+            if attname not in names:
+                names.append(attname)
+        return queryset.values(*names)
+
+    def bind(self):
+        """Conversores para um lote, com o fuso ativo (``timezone.activate``) já resolvido."""
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [(name, column, get_converter(field, current_timezone)) for name, column, field in self.columns]
+
+    def represent(self, row, converters=None):
+        with timed('serialize'):
+            item = {}
+            for name, column, convert in converters or self.bind():
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+            return item
+
+    def represent_many(self, rows):
+        with timed('serialize'):
+            converters = self.bind()
+            return [self.represent(row, converters) for row in rows]
+
+
+class ModelSerializer(serializers.ModelSerializer):
+    """``ModelSerializer`` com o tempo de serialização contado em ``core.instrumentation``."""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
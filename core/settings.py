@@ -1,4 +1,6 @@
+import os
 import sys
+import tempfile
 from decouple import config
 from pathlib import Path
 from datetime import timedelta
@@ -31,11 +33,15 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt.token_blacklist',
 
     # My Apps
+    'core',
+    'jobs',
     'transactions',
     'users',
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.InstrumentationMiddleware",
+    "core.db_routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -64,6 +70,20 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "core.wsgi.application"
+ASGI_APPLICATION = "core.asgi.application"
+
+# Servir a API com views assíncronas (gunicorn + workers uvicorn sobre core.asgi)
+ASYNC_API = config('ASYNC_API', default=False, cast=bool)
+
+# Gunicorn iniciado por `manage.py boot` (aplicação pré-carregada e compartilhada
+# entre os workers). WORKERS = 0 usa 2 × CPUs + 1; THREADS > 1 usa workers gthread.
+GUNICORN = {
+    'BIND': config('GUNICORN_BIND', default='0.0.0.0:8000'),
+    'WORKERS': config('GUNICORN_WORKERS', default=0, cast=int),
+    'THREADS': config('GUNICORN_THREADS', default=2, cast=int),
+    'TIMEOUT': config('GUNICORN_TIMEOUT', default=30, cast=int),
+    'KEEPALIVE': config('GUNICORN_KEEPALIVE', default=5, cast=int),
+}
 
 # ------------------------------------------------------------
 # DATABASES
@@ -80,30 +100,147 @@ if DOCKER_MODE:
             'PASSWORD': config('DB_PASSWORD'),
             'HOST': config('DB_HOST'),
             'PORT': config('DB_PORT'),
+            # Sem pool: conexão persistente por worker, validada antes de reusar.
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': config('DB_HEALTH_CHECKS', default=True, cast=bool),
         }
     }
+    # Com pool (psycopg_pool), a conexão volta ao pool ao fim da requisição; o
+    # Django exige CONN_MAX_AGE = 0 nesse caso. A validação por requisição de
+    # CONN_HEALTH_CHECKS não roda com pool: o Django passa a flag ao pool como
+    # `check=ConnectionPool.check_connection`, que testa cada conexão antes do
+    # empréstimo. Com DB_HEALTH_CHECKS=False, conexões mortas num restart ou
+    # failover chegariam às requisições. Ver core/db_pool.py.
+    if config('DB_POOL', default=True, cast=bool):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+                'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+                'timeout': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+                'max_idle': config('DB_POOL_MAX_IDLE', default=300.0, cast=float),
+                'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800.0, cast=float),
+            },
+        }
+    if config('DB_REPLICA_HOST', default=''):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': config('DB_REPLICA_HOST'),
+            'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        }
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': BASE_DIR / config('SQLITE_NAME', default='db.sqlite3'),
         }
     }
+    # Réplica local para desenvolvimento: outro arquivo (sem replicação automática).
+    if config('SQLITE_REPLICA_NAME', default=''):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / config('SQLITE_REPLICA_NAME'),
+        }
+
+# Leituras de requisições GET nas réplicas, escritas no primário (core.db_routers)
+DATABASE_ROUTERS = ['core.db_routers.PrimaryReplicaRouter']
+REPLICA_ROUTING = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'STICKY_SECONDS': config('DB_REPLICA_STICKY_SECONDS', default=5, cast=int),
+    'MAX_LAG': config('DB_REPLICA_MAX_LAG', default=5.0, cast=float),
+    'LAG_CHECK_INTERVAL': 1.0,
+    # Marca de leitura das próprias escritas: alias compartilhado entre os workers.
+    'CACHE': config('DB_REPLICA_STICKY_CACHE', default='responses'),
+}
+
+# Particionamento mensal das transações no PostgreSQL (core.partitioning):
+# partições criadas com antecedência e, com retenção > 0, meses antigos
+# desanexados para ARCHIVE_SCHEMA pelo comando `partitions`.
+PARTITIONING = {
+    'AHEAD_MONTHS': config('PARTITION_AHEAD_MONTHS', default=3, cast=int),
+    'RETENTION_MONTHS': config('PARTITION_RETENTION_MONTHS', default=0, cast=int),
+    'ARCHIVE_SCHEMA': config('PARTITION_ARCHIVE_SCHEMA', default='archive'),
+}
+
+# ------------------------------------------------------------
+# BACKGROUND JOBS
+# ------------------------------------------------------------
+# Tarefas gravadas no próprio banco e executadas por `manage.py run_workers`
+# (jobs.worker). QUEUES: processos por fila ("fila=processos,..."), o limite
+# de tarefas de cada fila rodando ao mesmo tempo por host.
+JOBS = {
+    'QUEUES': config('JOBS_QUEUES', default='default=2'),
+    'MAX_ATTEMPTS': config('JOBS_MAX_ATTEMPTS', default=3, cast=int),
+    # Espera antes da nova tentativa: BACKOFF_SECONDS × 2^(tentativas - 1), até BACKOFF_MAX_SECONDS.
+    'BACKOFF_SECONDS': config('JOBS_BACKOFF_SECONDS', default=10, cast=int),
+    'BACKOFF_MAX_SECONDS': config('JOBS_BACKOFF_MAX_SECONDS', default=3600, cast=int),
+    'POLL_INTERVAL': config('JOBS_POLL_INTERVAL', default=1.0, cast=float),
+    # Sem sinal de vida há mais que isso: o worker caiu, a tarefa volta à fila.
+    'TIMEOUT_SECONDS': config('JOBS_TIMEOUT_SECONDS', default=3600, cast=int),
+    # Intervalo com que o worker renova o sinal de vida da tarefa em execução (bem abaixo de TIMEOUT_SECONDS).
+    'HEARTBEAT_SECONDS': config('JOBS_HEARTBEAT_SECONDS', default=60, cast=float),
+    'RETENTION_DAYS': config('JOBS_RETENTION_DAYS', default=7, cast=int),
+}
+
+# ------------------------------------------------------------
+# CACHE
+# ------------------------------------------------------------
+# LocMemCache é por processo: com vários workers, use um backend
+# compartilhado para que a invalidação chegue a todos.
+RESPONSE_CACHE_BACKEND = config('RESPONSE_CACHE_BACKEND', default='core.cache_backends.SharedLRUCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='pulsevault'),
+    },
+    # Respostas GET cacheadas (core.response_cache). O padrão é compartilhado
+    # entre os workers do host (SQLite em /dev/shm, com despejo LRU); em
+    # vários hosts use django.core.cache.backends.redis.RedisCache (requer
+    # `pip install redis`) com maxmemory-policy allkeys-lru. O `run_workers`
+    # também invalida (ex.: users.delete_user): se roda em outro container,
+    # LOCATION deve estar num volume compartilhado com a web — o /dev/shm de
+    # cada container é separado (ver docker-compose.yml).
+    'responses': {
+        'BACKEND': RESPONSE_CACHE_BACKEND,
+        'LOCATION': config('RESPONSE_CACHE_LOCATION', default=str(
+            Path('/dev/shm' if Path('/dev/shm').is_dir() else tempfile.gettempdir(), 'pulsevault-responses.sqlite3'),
+        )),
+        # O RedisCache repassa OPTIONS ao cliente; MAX_ENTRIES só vale para o SharedLRUCache.
+        **({'OPTIONS': {'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=10000, cast=int)}}
+           if RESPONSE_CACHE_BACKEND == 'core.cache_backends.SharedLRUCache' else {}),
+    },
+}
+
+# TIMEOUT: segundos de validade de uma resposta; 0 desliga o cache. Escritas
+# invalidam antes disso pelas tags (ver users/signals.py).
+RESPONSE_CACHE = {
+    'ALIAS': 'responses',
+    'TIMEOUT': config('RESPONSE_CACHE_TIMEOUT', default=60, cast=int),
+    # Na falta, quem não monta a resposta espera por ela até LOCK_WAIT segundos.
+    'LOCK_WAIT': config('RESPONSE_CACHE_LOCK_WAIT', default=2.0, cast=float),
+}
 
 # ------------------------------------------------------------
 # DRF AND AUTHENTICATION
 # ------------------------------------------------------------
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
-        'rest_framework.filters.OrderingFilter',
+        'core.filters.IndexedSearchFilter',
+        'core.filters.IndexedOrderingFilter',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
@@ -120,6 +257,44 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'users.serializers.TokenVerifySerializer',
+}
+
+# Índice em processo da blacklist de tokens (ver users/blacklist.py)
+BLACKLIST_INDEX = {
+    'CAPACITY': config('BLACKLIST_INDEX_CAPACITY', default=1_000_000, cast=int),
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': config('BLACKLIST_INDEX_SYNC_INTERVAL', default=1.0, cast=float),
+    'REBUILD_INTERVAL': 3600.0,
+}
+
+# Teto (segundos) para o cache do usuário autenticado (users.authentication).
+# Os sinais só limpam o cache do processo que salvou o usuário: com o
+# LocMemCache, os demais workers enxergam uma desativação ou troca de senha
+# depois de até esse tempo. 0 = validade do token, só com CACHE_BACKEND
+# compartilhado por todos os workers e hosts (Redis).
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=5, cast=int)
+
+# Respostas de escritas com Idempotency-Key (core.idempotency): TTL em segundos
+# durante os quais uma repetição recebe a resposta gravada.
+IDEMPOTENCY = {
+    'TTL': config('IDEMPOTENCY_TTL', default=24 * 3600, cast=int),
+}
+
+# ------------------------------------------------------------
+# INSTRUMENTATION
+# ------------------------------------------------------------
+# Server-Timing, métricas por view em /metrics e detecção de N+1 (core.instrumentation).
+# Server-Timing expõe os tempos de banco e renderização a qualquer cliente: por
+# padrão, só com DEBUG. Sem METRICS_TOKEN, /metrics só responde com DEBUG.
+INSTRUMENTATION = {
+    'METRICS_DIR': config('METRICS_DIR', default=str(Path(tempfile.gettempdir()) / 'pulsevault-metrics')),
+    'METRICS_TOKEN': config('METRICS_TOKEN', default=''),
+    'FLUSH_INTERVAL': 5.0,
+    'N_PLUS_ONE_THRESHOLD': config('N_PLUS_ONE_THRESHOLD', default=10, cast=int),
+    'SERVER_TIMING': config('SERVER_TIMING', default=DEBUG, cast=bool),
 }
 
 # ------------------------------------------------------------
@@ -158,7 +333,7 @@ USE_TZ = True
 # ------------------------------------------------------------
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
-STATIC_ROOT = BASE_DIR / 'staticfiles'
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -178,27 +353,66 @@ if 'test' in sys.argv:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db_test.sqlite3',
-        }
+        },
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db_test.sqlite3',
+            'TEST': {'MIRROR': 'default'},
+        },
+    }
+    # Os testes de roteamento ligam a réplica com override_settings.
+    REPLICA_ROUTING['REPLICAS'] = []
+    # Cache de respostas próprio de cada execução dos testes.
+    CACHES['responses'] = {
+        'BACKEND': 'core.cache_backends.SharedLRUCache',
+        'LOCATION': str(Path(tempfile.gettempdir()) / f'pulsevault-responses-test-{os.getpid()}.sqlite3'),
     }
 
 # ------------------------------------------------------------
 # SETTINGS LOGS
 # ------------------------------------------------------------
+# Registros vão para uma fila; uma thread de fundo grava JSON por linha com
+# rotação (ver core/logs.py). LOG_FILE vazio grava em stdout; o padrão tem
+# {pid} no nome, um arquivo por worker: vários processos rotacionando o mesmo
+# arquivo se atropelam. LOG_ROTATE_WHEN (ex.: midnight) troca a rotação por
+# tamanho pela rotação por tempo.
+LOG_LEVEL = config('LOG_LEVEL', default='DEBUG' if DEBUG else 'INFO')
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'core.logs.JSONFormatter',
+        },
+    },
+    'filters': {
+        'db_sample': {
+            '()': 'core.logs.SampleFilter',
+            'rate': config('DB_LOG_SAMPLE_RATE', default=0.1, cast=float),
+        },
+    },
     'handlers': {
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'debug.log',
+        'queue': {
+            '()': 'core.logs.QueueFileHandler',
+            'formatter': 'json',
+            'filename': config('LOG_FILE', default=str(BASE_DIR / 'logs' / 'pulsevault.{pid}.log')),
+            'max_bytes': config('LOG_MAX_BYTES', default=50 * 1024 * 1024, cast=int),
+            'backup_count': config('LOG_BACKUP_COUNT', default=5, cast=int),
+            'when': config('LOG_ROTATE_WHEN', default=''),
         },
     },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
     'loggers': {
         'django': {
-            'handlers': ['file'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'level': LOG_LEVEL,
+        },
+        # Uma entrada por consulta SQL (só com DEBUG=True): amostrada.
+        'django.db.backends': {
+            'level': config('DB_LOG_LEVEL', default='DEBUG' if DEBUG else 'WARNING'),
+            'filters': ['db_sample'],
         },
     },
 }
@@ -0,0 +1,671 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from transactions.models import Balance, Transaction
+from transactions.rollups import rebuild as rebuild_rollups, verify as verify_rollups
+from users.tokens import RefreshToken
+
+from . import db_routers
+from .cache_backends import SharedLRUCache
+from .idempotency import IdempotentRequest, idempotent
+from .instrumentation import InstrumentationMiddleware, store
+from .logs import JSONFormatter, QueueFileHandler, SampleFilter
+from .models import IdempotencyKey
+from .management.commands.boot import ensure_superuser, server_options, static_fingerprint
+from .partitioning import add_months
+from .response_cache import CachedResponseMixin, invalidate
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(INSTRUMENTATION={
+            'METRICS_DIR': self.tmp.name, 'N_PLUS_ONE_THRESHOLD': 5, 'SERVER_TIMING': True, 'METRICS_TOKEN': 'segredo'})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        store.reset()
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """Testa se a resposta traz Server-Timing com consultas, serialização e renderização"""
+        response = self.client.get('/api/v1/transactions/')
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="2 queries"')
+        for name in ('serialize', 'render', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+
+    def test_metrics_merge_worker_files(self):
+        """Testa se /metrics soma os arquivos de todos os processos"""
+        self.client.get('/api/v1/transactions/')
+        store.flush()
+        own = next(Path(self.tmp.name).glob('*.json'))
+        Path(self.tmp.name, '999999.json').write_text(own.read_text())
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('pulsevault_http_requests_total{view="transaction-create-list",method="GET",status="200"} 2', body)
+        self.assertIn('pulsevault_http_request_duration_seconds_count{view="transaction-create-list",method="GET"} 2', body)
+        self.assertIn('pulsevault_db_queries_total{view="transaction-create-list"} 4', body)
+        self.assertNotIn('view="metrics"', body)
+
+    def test_metrics_token(self):
+        """Testa se /metrics exige o token e, sem token configurado, só responde com DEBUG"""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo').status_code, 200)
+        with override_settings(INSTRUMENTATION={'METRICS_DIR': self.tmp.name}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_server_timing_off_by_default(self):
+        """Testa se Server-Timing fica desligado sem SERVER_TIMING (o padrão fora de DEBUG)"""
+        with override_settings(INSTRUMENTATION={'METRICS_DIR': self.tmp.name}):
+            response = InstrumentationMiddleware(lambda request: HttpResponse('ok'))(RequestFactory().get('/'))
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_pool_metrics(self):
+        """Testa se /metrics expõe ocupação, espera e saturação do pool de conexões"""
+        stats = {'default|pool_max': 4, 'default|pool_size': 3, 'default|pool_available': 1,
+                 'default|requests_num': 40, 'default|requests_queued': 2, 'default|requests_wait_ms': 250,
+                 'default|connections_num': 3}
+        with mock.patch('core.instrumentation.pool_stats', return_value=stats):
+            body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+
+        self.assertIn('pulsevault_db_pool_saturation{alias="default"} 0.5', body)
+        self.assertIn('pulsevault_db_pool_wait_seconds_total{alias="default"} 0.25', body)
+        self.assertIn('pulsevault_db_pool_requests_total{alias="default"} 40', body)
+        self.assertIn('pulsevault_db_pool_connects_total{alias="default"} 3', body)
+
+    def test_pool_gauges_skip_dead_workers(self):
+        """Testa se o pool de um worker que saiu conta só nos contadores, não nas medidas instantâneas"""
+        stats = {'default|pool_max': 4, 'default|pool_size': 3, 'default|pool_available': 1,
+                 'default|requests_num': 40}
+        with mock.patch('core.instrumentation.pool_stats', return_value=stats):
+            store.flush()
+        own = next(Path(self.tmp.name).glob('*.json'))
+        Path(self.tmp.name, '999999.json').write_text(own.read_text())
+
+        with mock.patch('core.instrumentation.is_alive', side_effect=lambda pid: pid != '999999'), \
+                mock.patch('core.instrumentation.pool_stats', return_value=stats):
+            body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+
+        self.assertIn('pulsevault_db_pool_max{alias="default"} 4', body)
+        self.assertIn('pulsevault_db_pool_saturation{alias="default"} 0.5', body)
+        self.assertIn('pulsevault_db_pool_requests_total{alias="default"} 80', body)
+
+    def test_n_plus_one_detection(self):
+        """Testa se a mesma consulta repetida na requisição é sinalizada como N+1"""
+        User = get_user_model()
+
+        def view(request):
+            for _ in range(6):
+                User.objects.filter(pk=self.user.pk).first()
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/lento/')
+        with self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            response = InstrumentationMiddleware(view)(request)
+
+        self.assertIn('desc="6 queries"', response['Server-Timing'])
+        self.assertIn('repetida 6 vezes', logs.output[0])
+        store.flush()
+        data = json.loads(next(Path(self.tmp.name).glob('*.json')).read_text())
+        self.assertEqual(data['n_plus_one'], {'<unmatched>': 1})
+
+    async def test_async_queries_are_counted(self):
+        """Testa se consultas feitas em sync_to_async entram na requisição assíncrona"""
+        async def view(request):
+            await sync_to_async(list)(get_user_model().objects.all())
+            await get_user_model().objects.acount()
+            return HttpResponse('ok')
+
+        # Como no handler do Django, o middleware é carregado no contexto síncrono.
+        middleware = await sync_to_async(InstrumentationMiddleware)(view)
+        response = await middleware(AsyncRequestFactory().get('/'))
+
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+
+class LogsTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make_logger(self, handler):
+        logger = logging.getLogger(f'pulsevault.teste.{self._testMethodName}')
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        self.addCleanup(handler.close)
+        return logger
+
+    def test_json_lines_written_in_background(self):
+        """Testa se os registros são gravados em JSON pela thread de fundo, com extras e traceback"""
+        handler = QueueFileHandler(filename=str(Path(self.tmp.name, 'app.log')))
+        handler.setFormatter(JSONFormatter())
+        logger = self.make_logger(handler)
+        payload = {'valor': 1}
+
+        logger.info('Transação %s criada', 42, extra={'user_id': 7})
+        try:
+            raise ValueError('falhou')
+        except ValueError:
+            logger.exception('Erro ao processar %s', payload)
+        payload['valor'] = 2  # mudanças após o log não alteram o registro
+        handler.stop()
+
+        lines = [json.loads(line) for line in Path(self.tmp.name, 'app.log').read_text().splitlines()]
+        self.assertEqual(lines[0]['message'], 'Transação 42 criada')
+        self.assertEqual(lines[0]['level'], 'INFO')
+        self.assertEqual(lines[0]['user_id'], 7)
+        self.assertEqual(lines[1]['message'], "Erro ao processar {'valor': 1}")
+        self.assertIn('ValueError: falhou', lines[1]['exc_info'])
+
+    def test_size_rotation(self):
+        """Testa se o arquivo é rotacionado ao atingir o tamanho máximo"""
+        handler = QueueFileHandler(filename=str(Path(self.tmp.name, 'app.log')), max_bytes=500, backup_count=2)
+        logger = self.make_logger(handler)
+
+        for i in range(50):
+            logger.info('registro %d', i)
+        handler.stop()
+
+        files = sorted(p.name for p in Path(self.tmp.name).iterdir())
+        self.assertEqual(files, ['app.log', 'app.log.1', 'app.log.2'])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Testa se, com a fila cheia, o registro é descartado em vez de bloquear"""
+        handler = QueueFileHandler(filename=str(Path(self.tmp.name, 'app.log')), queue_size=1)
+        handler._pid = os.getpid()  # fila sem thread de gravação: ninguém a esvazia
+        logger = self.make_logger(handler)
+
+        for _ in range(3):
+            logger.info('registro')
+
+        self.assertEqual(handler.dropped, 2)
+
+    def test_sample_filter(self):
+        """Testa se a amostragem descarta registros de depuração mas mantém avisos"""
+        sample = SampleFilter(rate=0.0)
+        debug = logging.LogRecord('django.db.backends', logging.DEBUG, '', 0, 'SELECT 1', (), None)
+        warning = logging.LogRecord('django.db.backends', logging.WARNING, '', 0, 'lenta', (), None)
+
+        self.assertFalse(sample.filter(debug))
+        self.assertTrue(sample.filter(warning))
+        self.assertTrue(SampleFilter(rate=1.0).filter(debug))
+
+
+@override_settings(REPLICA_ROUTING={'REPLICAS': ['replica'], 'STICKY_SECONDS': 5, 'MAX_LAG': 5.0,
+                                    'LAG_CHECK_INTERVAL': 0},
+                   RESPONSE_CACHE={'TIMEOUT': 0})
+class ReplicaRoutingTests(TransactionTestCase):
+    # A réplica é outra conexão ao mesmo arquivo (MIRROR): os dados precisam
+    # estar gravados, não presos na transação de um TestCase.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        db_routers._health.clear()
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def count_queries(self, fn):
+        """Executa ``fn`` e devolve (consultas no primário, consultas na réplica)."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            fn()
+        return len(primary), len(replica)
+
+    def test_get_reads_from_replica(self):
+        """Testa se o GET lê da réplica, exceto o usuário da autenticação"""
+        primary, replica = self.count_queries(lambda: self.client.get('/api/v1/users/'))
+
+        self.assertEqual(primary, 1)
+        self.assertGreater(replica, 0)
+
+    def test_write_sticks_client_to_primary(self):
+        """Testa se, após uma escrita, as leituras do mesmo cliente ficam no primário"""
+        url = f'/api/v1/user/{self.user.pk}/'
+        primary, replica = self.count_queries(lambda: self.client.patch(url, {'name': 'Ana'}))
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
+
+        primary, replica = self.count_queries(lambda: self.assertEqual(self.client.get(url).data['name'], 'Ana'))
+        self.assertEqual(replica, 0)
+        # A marca fica no cache compartilhado: um worker com outro cache local também a vê.
+        cache.clear()
+        self.assertEqual(self.count_queries(lambda: self.client.get(url))[1], 0)
+
+        other = APIClient()
+        other.force_authenticate(self.user)
+        self.assertGreater(self.count_queries(lambda: other.get(url))[1], 0)
+
+    def test_token_endpoints_use_primary(self):
+        """Testa se os endpoints de token leem e escrevem só no primário"""
+        client = APIClient()
+
+        def flow():
+            pair = client.post('/api/token/', {'email': 'ana@example.com', 'password': 'testpass123'})
+            refreshed = client.post('/api/token/refresh/', {'refresh': pair.data['refresh']})
+            self.assertEqual(refreshed.status_code, 200)
+            verify = client.post('/api/token/verify/', {'token': pair.data['refresh']})
+            self.assertEqual(verify.status_code, 400)
+
+        self.assertEqual(self.count_queries(flow)[1], 0)
+
+    def test_lag_guard_falls_back_to_primary(self):
+        """Testa se réplica atrasada ou fora do ar é trocada pelo primário"""
+        for effect in ({'return_value': 30.0}, {'side_effect': DatabaseError('fora do ar')}):
+            with mock.patch('core.db_routers.replica_lag', **effect), \
+                    self.assertLogs('core.db_routers', 'WARNING'):
+                primary, replica = self.count_queries(lambda: self.client.get('/api/v1/users/'))
+            self.assertEqual(replica, 0)
+            self.assertGreater(primary, 0)
+
+    def test_lag_of_replica_without_upstream(self):
+        """Testa se uma réplica em dia mas sem receber WAL do primário conta como atraso infinito"""
+        lag = db_routers.lag_from_status
+        self.assertEqual(lag(False, None, False, None, None), 0.0)
+        self.assertEqual(lag(True, 'streaming', True, True, 600.0), 0.0)
+        self.assertEqual(lag(True, 'streaming', True, False, 12.5), 12.5)
+        # Sem pg_read_all_stats o status vem nulo; a linha do walreceiver ainda aparece.
+        self.assertEqual(lag(True, None, True, True, 600.0), 0.0)
+        self.assertEqual(lag(True, None, False, True, 600.0), float('inf'))
+        self.assertEqual(lag(True, 'waiting', True, True, 600.0), float('inf'))
+
+    def test_read_after_write_in_same_request(self):
+        """Testa se, na mesma requisição, as leituras seguintes a uma escrita vão ao primário"""
+        router = db_routers.PrimaryReplicaRouter()
+        User = get_user_model()
+        self.assertEqual(router.db_for_read(User), 'default')  # fora de requisição
+
+        token = db_routers.current.set(db_routers.RoutingState(primary=False))
+        try:
+            self.assertEqual(router.db_for_read(User), 'replica')
+            with db_routers.use_primary():
+                self.assertEqual(router.db_for_read(User), 'default')
+            router.db_for_write(User)
+            self.assertEqual(router.db_for_read(User), 'default')
+        finally:
+            db_routers.current.reset(token)
+
+    async def test_async_middleware(self):
+        """Testa se o middleware assíncrono roteia GET para a réplica e POST para o primário"""
+        router = db_routers.PrimaryReplicaRouter()
+
+        async def view(request):
+            return HttpResponse(await sync_to_async(router.db_for_read)(get_user_model()))
+
+        middleware = await sync_to_async(db_routers.ReplicaRoutingMiddleware)(view)
+        self.assertEqual((await middleware(AsyncRequestFactory().get('/'))).content, b'replica')
+        self.assertEqual((await middleware(AsyncRequestFactory().post('/'))).content, b'default')
+
+
+class BootCommandTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(STATIC_ROOT=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        env = mock.patch.dict(os.environ, {'DJANGO_SUPERUSER_EMAIL': 'Admin@Example.com',
+                                           'DJANGO_SUPERUSER_PASSWORD': 'testpass123'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def boot(self, *args):
+        out = StringIO()
+        call_command('boot', '--no-serve', *args, stdout=out)
+        return out.getvalue()
+
+    def test_second_boot_skips_work(self):
+        """Testa se o segundo boot não migra, não coleta estáticos nem recria o superusuário"""
+        first = self.boot()
+        self.assertIn('Arquivos estáticos: coletados', first)
+        self.assertIn('Superusuário: criado', first)
+        self.assertTrue(Path(self.tmp.name, 'admin', 'css', 'base.css').exists())
+
+        second = self.boot()
+        self.assertIn('Migrações: nada pendente', second)
+        self.assertIn('Arquivos estáticos: sem mudanças', second)
+        self.assertIn('Superusuário: já existe', second)
+        self.assertEqual(get_user_model().objects.filter(email='Admin@example.com', is_superuser=True).count(), 1)
+
+    def test_static_fingerprint_tracks_source_files(self):
+        """Testa se a impressão digital dos estáticos muda quando um arquivo de origem muda"""
+        with tempfile.TemporaryDirectory() as source:
+            asset = Path(source, 'app.js')
+            asset.write_text('console.log(1)')
+            with override_settings(STATICFILES_DIRS=[source]):
+                before = static_fingerprint()
+                self.assertEqual(static_fingerprint(), before)
+                asset.write_text('console.log(22)')
+                self.assertNotEqual(static_fingerprint(), before)
+
+    def test_superuser_requires_env(self):
+        """Testa se o boot falha sem as variáveis do superusuário"""
+        with mock.patch.dict(os.environ, {'DJANGO_SUPERUSER_PASSWORD': ''}):
+            with self.assertRaisesMessage(CommandError, 'DJANGO_SUPERUSER_EMAIL'):
+                self.boot()
+        self.assertTrue(ensure_superuser('admin@example.com', 'testpass123'))
+        self.assertFalse(ensure_superuser('admin@example.com', 'testpass123'))
+
+    def test_server_options(self):
+        """Testa a escolha de workers, threads e classe de worker do gunicorn"""
+        config = {'BIND': '0.0.0.0:8000', 'WORKERS': 3, 'THREADS': 4, 'TIMEOUT': 30, 'KEEPALIVE': 5}
+        options = server_options(config)
+        self.assertEqual((options['workers'], options['worker_class'], options['preload_app']), (3, 'gthread', True))
+        self.assertEqual(server_options({**config, 'THREADS': 1})['worker_class'], 'sync')
+        self.assertGreaterEqual(server_options({**config, 'WORKERS': 0})['workers'], 3)
+        with override_settings(ASYNC_API=True):
+            self.assertEqual(server_options(config)['worker_class'], 'uvicorn_worker.UvicornWorker')
+
+
+class PartitioningTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+
+    def create(self, day):
+        return Transaction.objects.create(user=self.user, amount=-100, date=day, description='Padaria')
+
+    def partitions(self, **kwargs):
+        out = StringIO()
+        call_command('partitions', stdout=out, **kwargs)
+        return out.getvalue()
+
+    def test_add_months(self):
+        """Testa a aritmética de meses usada nos limites das partições"""
+        self.assertEqual(add_months(date(2024, 11, 1), 3), date(2025, 2, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -1), date(2023, 12, 1))
+        self.assertEqual(add_months(date(2024, 1, 1), -25), date(2021, 12, 1))
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite mantém a tabela única')
+    def test_sqlite_keeps_single_table(self):
+        """Testa se no SQLite a tabela continua única e a manutenção não faz nada"""
+        self.assertFalse(Transaction.partitioning.is_partitioned(Transaction, connection))
+        self.assertEqual(Transaction.partitioning.ensure(Transaction, connection), [])
+        self.assertIn('nada a fazer', self.partitions())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamento só existe no PostgreSQL')
+    def test_ensure_creates_months_and_moves_future_rows(self):
+        """Testa se a manutenção cria os meses à frente e tira as linhas de <tabela>_future"""
+        partitioning = Transaction.partitioning
+        self.assertTrue(partitioning.is_partitioned(Transaction, connection))
+        start = partitioning.partitions(Transaction, connection)[-1][1]
+        future = self.create(add_months(start, 2))
+
+        created = partitioning.ensure(Transaction, connection, ahead=0, today=add_months(start, 2))
+        self.assertEqual(created, [f'transactions_transaction_p{add_months(start, i):%Y%m}' for i in range(3)])
+        self.assertEqual(partitioning.ensure(Transaction, connection, ahead=0, today=add_months(start, 2)), [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM transactions_transaction WHERE id = %s', [future.pk])
+            self.assertEqual(cursor.fetchone()[0], created[-1])
+        self.assertEqual(Transaction.objects.get(pk=future.pk).date, add_months(start, 2))
+        # As linhas movidas não passam pelos triggers da tabela-mãe: os totais não mudam.
+        self.assertEqual(verify_rollups(), {})
+        self.assertEqual(partitioning.partitions(Transaction, connection)[-1],
+                         ('transactions_transaction_future', add_months(start, 3), None))
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamento só existe no PostgreSQL')
+    def test_date_range_prunes_partitions(self):
+        """Testa se o filtro por data consulta só a partição do mês"""
+        month = date.today().replace(day=1)
+        self.create(month)
+        queryset = Transaction.objects.filter(user=self.user, date__gte=month, date__lt=add_months(month, 1))
+        plan = queryset.explain()
+
+        self.assertIn(f'transactions_transaction_p{month:%Y%m}', plan)
+        self.assertNotIn('transactions_transaction_future', plan)
+        self.assertNotIn(f'transactions_transaction_p{add_months(month, 1):%Y%m}', plan)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamento só existe no PostgreSQL')
+    def test_retire_archives_old_partitions(self):
+        """Testa se a retenção desanexa os meses antigos para o schema de arquivo"""
+        month = date.today().replace(day=1)
+        current = self.create(month)
+        old = self.create(add_months(month, -30))
+
+        # A tabela de teste foi particionada vazia: tudo antes do mês atual está em _old.
+        retired = Transaction.partitioning.retire(Transaction, connection, months=1, archive_schema='archive_test',
+                                                  today=add_months(month, 1))
+        self.assertEqual(retired, ['transactions_transaction_old'])
+        self.assertEqual(list(Transaction.objects.values_list('pk', flat=True)), [current.pk])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM archive_test.transactions_transaction_old')
+            self.assertEqual(cursor.fetchall(), [(old.pk,)])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Particionamento só existe no PostgreSQL')
+    def test_rollups_survive_retention(self):
+        """Testa se os totais dos meses retirados continuam no saldo e a conferência ignora esses meses"""
+        month = date.today().replace(day=1)
+        self.create(month)
+        self.create(add_months(month, -30))
+
+        Transaction.partitioning.retire(Transaction, connection, months=1, archive_schema='archive_test',
+                                        today=add_months(month, 1))
+
+        self.assertEqual(Transaction.partitioning.retained_from(Transaction, connection), month)
+        self.assertEqual(verify_rollups(), {})
+        rebuild_rollups()
+        self.assertEqual(Balance.objects.get(user=self.user).expense, 200)
+        self.assertEqual(verify_rollups(), {})
+
+
+class SharedLRUCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = SharedLRUCache(os.path.join(self.tmp.name, 'cache.sqlite3'),
+                                    {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 5}})
+
+    def test_get_set_and_expiry(self):
+        """Testa leitura, gravação, expiração e remoção"""
+        self.cache.set('a', {'x': 1})
+        self.cache.set('b', 2, timeout=-1)
+        self.cache.set_many({'c': 3, 'd': 4})
+
+        self.assertEqual(self.cache.get('a'), {'x': 1})
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c', 'd']), {'a': {'x': 1}, 'c': 3, 'd': 4})
+        self.cache.delete_many(['c', 'd'])
+        self.assertFalse(self.cache.has_key('c'))
+
+    def test_add_only_when_missing_or_expired(self):
+        """Testa se add só grava quando a chave não existe ou já expirou"""
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.add('lock', 2))
+        self.cache.set('old', 1, timeout=-1)
+        self.assertTrue(self.cache.add('old', 2))
+        self.assertEqual(self.cache.get_many(['lock', 'old']), {'lock': 1, 'old': 2})
+
+    def test_evicts_least_recently_used(self):
+        """Testa se, acima de MAX_ENTRIES, saem as entradas acessadas há mais tempo"""
+        with mock.patch('core.cache_backends.ACCESS_RESOLUTION', -1):
+            for index in range(10):
+                self.cache.set(f'k{index}', index)
+            self.cache.get('k0')
+            self.cache.set('k10', 10)
+
+        # 11 entradas: sai o excesso mais 10 // 5, as três menos usadas (k1, k2, k3).
+        remaining = self.cache.get_many([f'k{index}' for index in range(11)])
+        self.assertEqual(sorted(remaining, key=lambda key: int(key[1:])),
+                         ['k0', 'k4', 'k5', 'k6', 'k7', 'k8', 'k9', 'k10'])
+
+
+class SlowView(APIView):
+    authentication_classes = ()
+    permission_classes = ()
+    calls = 0
+
+    def get(self, request):
+        SlowView.calls += 1
+        time.sleep(0.2)
+        return Response({'calls': SlowView.calls, 'q': request.query_params.get('q')})
+
+
+class CachedSlowView(CachedResponseMixin, SlowView):
+    def get_cache_tags(self):
+        return ('slow',)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches['responses'].clear()
+        SlowView.calls = 0
+        self.factory = RequestFactory()
+        self.view = CachedSlowView.as_view()
+
+    def get(self, path='/slow/', **headers):
+        response = self.view(self.factory.get(path, **headers))
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_hit_and_tag_invalidation(self):
+        """Testa o acerto, a chave por parâmetros de consulta e a invalidação pela tag"""
+        first = self.get()
+        self.assertEqual((first['X-Cache'], json.loads(first.content)['calls']), ('MISS', 1))
+        hit = self.get()
+        self.assertEqual((hit['X-Cache'], hit.content), ('HIT', first.content))
+        self.assertEqual(json.loads(self.get('/slow/?q=x').content), {'calls': 2, 'q': 'x'})
+
+        invalidate('slow')
+        self.assertEqual(json.loads(self.get().content)['calls'], 3)
+        self.assertEqual(SlowView.calls, 3)
+
+    def test_concurrent_misses_run_view_once(self):
+        """Testa se requisições simultâneas numa chave fria montam a resposta uma única vez"""
+        with ThreadPoolExecutor(8) as executor:
+            responses = list(executor.map(lambda _: self.get(), range(8)))
+
+        self.assertEqual(SlowView.calls, 1)
+        self.assertEqual({response.content for response in responses}, {responses[0].content})
+        self.assertEqual(sorted(response['X-Cache'] for response in responses), ['HIT'] * 7 + ['MISS'])
+
+    def test_early_refresh_serves_stale_to_others(self):
+        """Testa se, perto de expirar, um só renova e os demais recebem a entrada ainda válida"""
+        self.get()
+        # Com BETA alto toda leitura cai na janela de renovação antecipada.
+        with override_settings(RESPONSE_CACHE={'BETA': 1000}):
+            with ThreadPoolExecutor(4) as executor:
+                responses = list(executor.map(lambda _: self.get(), range(4)))
+
+        self.assertEqual(SlowView.calls, 2)
+        self.assertEqual(sorted(response['X-Cache'] for response in responses), ['HIT'] * 3 + ['MISS'])
+
+
+class CreateView(APIView):
+    @idempotent
+    def post(self, request):
+        if request.data.get('amount') is None:
+            return Response({'amount': ['Obrigatório.']}, status=400)
+        created = Transaction.objects.create(user=request.user, amount=request.data['amount'], date=date(2024, 1, 1))
+        return Response({'id': created.pk, 'amount': created.amount}, status=201)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+        self.other = get_user_model().objects.create_user(email='bia@example.com', password='testpass123')
+        self.factory = RequestFactory()
+        self.view = CreateView.as_view()
+
+    def post(self, data, key=None, user=None, path='/create/'):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key is not None else {}
+        request = self.factory.post(path, json.dumps(data), content_type='application/json', **headers)
+        request.user = user or self.user
+        request._force_auth_user = user or self.user
+        response = self.view(request)
+        response.render()
+        return response
+
+    def test_retry_replays_stored_response(self):
+        """Testa se a repetição com a mesma chave devolve a primeira resposta sem escrever de novo"""
+        first = self.post({'amount': 100}, key='abc')
+        with self.assertNumQueries(1):
+            retry = self.post({'amount': 100}, key='abc')
+
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        self.assertEqual(Transaction.objects.count(), 1)
+        # Sem o cabeçalho, ou com a mesma chave de outro usuário, nada é repetido.
+        self.post({'amount': 100})
+        self.post({'amount': 100}, key='abc', user=self.other)
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_key_reused_with_other_request(self):
+        """Testa a recusa da mesma chave com outro corpo ou caminho, e de chaves inválidas"""
+        self.post({'amount': 100}, key='abc')
+
+        self.assertEqual(self.post({'amount': 200}, key='abc').status_code, 422)
+        self.assertEqual(self.post({'amount': 100}, key='abc', path='/other/').status_code, 422)
+        self.assertEqual(self.post({'amount': 100}, key='').status_code, 400)
+        self.assertEqual(self.post({'amount': 100}, key='x' * 256).status_code, 400)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_errors_are_not_stored(self):
+        """Testa se uma resposta de erro não é gravada e a chave pode ser usada depois"""
+        self.assertEqual(self.post({}, key='abc').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post({}, key='abc').status_code, 400)
+
+    def test_expired_key_runs_again_and_purge(self):
+        """Testa se uma chave vencida volta a executar e se purge remove as vencidas"""
+        self.post({'amount': 100}, key='abc')
+        self.post({'amount': 100}, key='old')
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        retry = self.post({'amount': 100}, key='abc')
+        self.assertFalse(retry.has_header('Idempotent-Replayed'))
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertEqual(IdempotencyKey.objects.purge(), 1)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['abc'])
+
+    def test_concurrent_duplicate_is_rolled_back(self):
+        """Testa se, quando outra requisição grava a chave primeiro, a escrita é desfeita e a resposta dela devolvida"""
+        first = self.post({'amount': 100}, key='abc')
+        replay = IdempotentRequest.replay
+        calls = []
+
+        def late_replay(idempotent):
+            # A primeira busca não vê a chave, como se a outra requisição ainda não tivesse confirmado.
+            calls.append(1)
+            return None if len(calls) == 1 else replay(idempotent)
+
+        with mock.patch.object(IdempotentRequest, 'replay', late_replay), transaction.atomic():
+            retry = self.post({'amount': 100}, key='abc')
+
+        self.assertEqual((retry.status_code, retry.content, len(calls)), (201, first.content, 2))
+        self.assertEqual(Transaction.objects.count(), 1)
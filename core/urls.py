@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
+from core.instrumentation import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -8,7 +9,10 @@ from rest_framework_simplejwt.views import (
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/v1/', include('users.urls')),
+    path('api/v1/', include('transactions.urls')),
+    path('api/v1/', include('jobs.urls')),
 ]
 
 api_token = [
@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job, JobStatus
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'queue', 'status', 'attempts', 'user', 'run_at', 'finished_at']
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('attempts', 'locked_by', 'result', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    list_filter = ('status', 'queue', 'task')
+    ordering = ('-id',)
+    actions = ['requeue']
+
+    @admin.action(description='Reenfileirar as tarefas com falha selecionadas')
+    def requeue(self, request, queryset):
+        count = queryset.filter(status=JobStatus.FAILED).update(
+            status=JobStatus.QUEUED, attempts=0, run_at=timezone.now(), locked_by='', finished_at=None)
+        self.message_user(request, f'{count} tarefa(s) reenfileirada(s).')
+
+
+admin.site.register(Job, JobAdmin)
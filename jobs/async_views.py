@@ -0,0 +1,6 @@
+from core.async_views import AsyncAPIView, AsyncRetrieveMixin
+from . import views
+
+
+class JobRetrieveView(AsyncRetrieveMixin, AsyncAPIView):
+    api_view_class = views.JobRetrieveView
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from jobs.registry import TASKS, get_config, parse_queues
+from jobs.worker import run_pool
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as tarefas em segundo plano: um processo por vaga de cada fila, '
+        'que é o limite de tarefas dela rodando ao mesmo tempo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', default=[],
+                            help='fila=processos (repetível; padrão: JOBS["QUEUES"])')
+        parser.add_argument('--burst', action='store_true', help='Sai quando as filas esvaziarem')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Tarefas por processo antes de ele ser recriado (0: sem limite)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        try:
+            queues = parse_queues(options['queue'] or get_config()['QUEUES'])
+        except ValueError as e:
+            raise CommandError(e)
+        if not queues:
+            raise CommandError('Nenhuma fila com processos.')
+        summary = ', '.join(f'{name}={count}' for name, count in queues.items())
+        self.stdout.write(f'Filas: {summary}; tarefas registradas: {", ".join(sorted(TASKS)) or "nenhuma"}')
+        run_pool(queues, using=options['database'], burst=options['burst'], max_jobs=options['max_jobs'],
+                 log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Workers encerrados.'))
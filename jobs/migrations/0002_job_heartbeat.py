@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 06:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_heartbeat(apps, schema_editor):
+    # Tarefas já em execução: o último sinal de vida conhecido é o início.
+    Job = apps.get_model("jobs", "Job")
+    Job.objects.using(schema_editor.connection.alias).filter(status="running").update(
+        heartbeat_at=models.F("started_at")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("jobs", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="job",
+            name="job_running_idx",
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="heartbeat_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Último sinal de vida"
+            ),
+        ),
+        migrations.RunPython(backfill_heartbeat, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                condition=models.Q(("status", "running")),
+                fields=["heartbeat_at"],
+                name="job_running_idx",
+            ),
+        ),
+    ]
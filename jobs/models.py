@@ -0,0 +1,120 @@
+import functools
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = 'queued', 'Na fila'
+    RUNNING = 'running', 'Em execução'
+    SUCCEEDED = 'succeeded', 'Concluída'
+    FAILED = 'failed', 'Falhou'
+
+
+FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+@functools.lru_cache(maxsize=None)
+def claim_sql(model, using, queues):
+    """SQL de ``JobQuerySet.claim``, montado uma vez por banco e conjunto de filas.
+
+    Parâmetros: situação nova, worker, agora (início e sinal de vida), situação na fila, as filas e agora.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    meta = model._meta
+    table, pk = qn(meta.db_table), qn(meta.pk.column)
+    # Mesmas colunas e condição do índice parcial job_ready_idx.
+    ready = (f'SELECT {pk} FROM {table} WHERE {qn("status")} = %s AND {qn("queue")} IN ({", ".join(["%s"] * len(queues))}) '
+             f'AND {qn("run_at")} <= %s ORDER BY {qn("run_at")}, {pk} LIMIT 1')
+    if connection.features.has_select_for_update_skip_locked:
+        ready = f'{ready} {connection.ops.for_update_sql(skip_locked=True)}'
+    columns = ', '.join(qn(field.column) for field in meta.concrete_fields)
+    return (f'UPDATE {table} SET {qn("status")} = %s, {qn("attempts")} = {qn("attempts")} + 1, '
+            f'{qn("locked_by")} = %s, {qn("started_at")} = %s, {qn("heartbeat_at")} = %s WHERE {pk} IN ({ready}) RETURNING {columns}')
+
+
+class JobQuerySet(models.QuerySet):
+    def claim(self, queues, worker, using=DEFAULT_DB_ALIAS):
+        """Pega a próxima tarefa pronta de ``queues`` para ``worker`` num único ``UPDATE ... RETURNING``.
+
+        No PostgreSQL a linha é escolhida com ``FOR UPDATE SKIP LOCKED``:
+        workers concorrentes pulam as tarefas já travadas em vez de esperar
+        por elas. No SQLite o comando inteiro roda sob o lock de escrita do
+        banco, então dois workers também nunca pegam a mesma tarefa. O SQL
+        é montado uma vez (``claim_sql``): compilar um queryset a cada tarefa
+        custava mais que executar o comando.
+        """
+        queues = tuple(queues)
+        now = connections[using].ops.adapt_datetimefield_value(timezone.now())
+        claimed = self.model.objects.db_manager(using).raw(
+            claim_sql(self.model, using, queues),
+            [JobStatus.RUNNING, worker, now, now, JobStatus.QUEUED, *queues, now],
+        )
+        return next(iter(claimed), None)
+
+    def abandon(self, error, **lookups):
+        """Devolve à fila (ou dá como falhas, sem tentativas restantes) tarefas em execução cujo worker sumiu."""
+        running = self.filter(status=JobStatus.RUNNING, **lookups)
+        now = timezone.now()
+        requeued = running.filter(attempts__lt=F('max_attempts')).update(
+            status=JobStatus.QUEUED, locked_by='', run_at=now, error=error)
+        failed = running.update(status=JobStatus.FAILED, finished_at=now, error=error)
+        return requeued, failed
+
+    def stale(self, seconds):
+        """Tarefas sem sinal de vida (``heartbeat_at``) há mais de ``seconds`` segundos, não as que só estão demorando."""
+        return self.filter(heartbeat_at__lt=timezone.now() - timedelta(seconds=seconds))
+
+    def purge(self, days):
+        """Remove tarefas terminadas há mais de ``days`` dias."""
+        return self.filter(status__in=FINISHED, finished_at__lt=timezone.now() - timedelta(days=days)).delete()[0]
+
+
+class Job(models.Model):
+    """Tarefa em segundo plano executada por ``manage.py run_workers`` (ver ``jobs.worker``)."""
+    task = models.CharField(max_length=100, verbose_name='Tarefa')
+    queue = models.CharField(max_length=50, default='default', verbose_name='Fila')
+    args = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name='Argumentos')
+    # Dono da tarefa: só ele a vê pela API. Fica nulo se o usuário for removido.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                             related_name='jobs', verbose_name='Usuário')
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.QUEUED, verbose_name='Situação')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')
+    max_attempts = models.PositiveSmallIntegerField(default=1, verbose_name='Máximo de tentativas')
+    # Quando pode rodar: adiado pelo backoff depois de uma falha.
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='Executar a partir de')
+    # ``<host>:<pid>`` do worker que pegou a tarefa.
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Worker')
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name='Resultado')
+    error = models.TextField(blank=True, verbose_name='Erro')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Criada em')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Iniciada em')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Terminada em')
+    # Renovado pelo worker enquanto a tarefa roda (e por set_progress): parado, o worker sumiu.
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='Último sinal de vida')
+
+    objects = JobQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.get_status_display()})'
+
+    def set_progress(self, progress):
+        """Grava em ``result`` o andamento da tarefa em execução; o valor devolvido por ela o substitui no fim."""
+        self.result, self.heartbeat_at = progress, timezone.now()
+        type(self).objects.using(self._state.db).filter(pk=self.pk, status=JobStatus.RUNNING).update(
+            result=progress, heartbeat_at=self.heartbeat_at)
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        indexes = [
+            # Índices parciais: ficam do tamanho da fila, não do histórico.
+            models.Index(fields=['queue', 'run_at', 'id'], name='job_ready_idx', condition=Q(status=JobStatus.QUEUED)),
+            models.Index(fields=['heartbeat_at'], name='job_running_idx', condition=Q(status=JobStatus.RUNNING)),
+            models.Index(fields=['finished_at'], name='job_finished_idx', condition=Q(status__in=FINISHED)),
+        ]
@@ -0,0 +1,97 @@
+"""Registro das tarefas que os workers sabem executar.
+
+Cada app declara as suas em ``<app>/tasks.py`` (importado por
+``JobsConfig.ready``)::
+
+    @task('transactions.rebuild_rollups')
+    def rebuild_rollups(job, user_id=None):
+        ...
+
+A função recebe o ``Job`` e os argumentos gravados por ``enqueue``; o valor
+devolvido (serializável em JSON) vai para ``Job.result``. Uma exceção conta
+como tentativa falha: a tarefa volta à fila com backoff exponencial até
+``max_attempts``.
+
+``enqueue`` só grava uma linha: dentro de ``transaction.atomic`` a tarefa
+fica visível aos workers no commit, junto com o que a originou.
+"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .models import Job
+
+DEFAULTS = {
+    'QUEUES': 'default=2',
+    'MAX_ATTEMPTS': 3,
+    'BACKOFF_SECONDS': 10,
+    'BACKOFF_MAX_SECONDS': 3600,
+    'POLL_INTERVAL': 1.0,
+    'TIMEOUT_SECONDS': 3600,
+    'HEARTBEAT_SECONDS': 60,
+    'RETENTION_DAYS': 7,
+}
+
+TASKS = {}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'JOBS', {})}
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    queue: str = 'default'
+    max_attempts: int = None
+
+
+def task(name, queue='default', max_attempts=None):
+    """Registra a função decorada como a tarefa ``name``."""
+    def register(func):
+        TASKS[name] = Task(name, func, queue, max_attempts)
+        return func
+    return register
+
+
+def parse_queues(values):
+    """``'default=4,heavy=1'`` (ou uma lista delas) -> ``{'default': 4, 'heavy': 1}``; filas com 0 ficam de fora."""
+    queues = {}
+    for value in [values] if isinstance(values, str) else values:
+        for item in filter(None, value.split(',')):
+            name, _, count = item.partition('=')
+            try:
+                queues[name.strip()] = int(count or 1)
+            except ValueError:
+                raise ValueError(f'Fila inválida: {item!r} (use fila=processos)') from None
+    return {name: count for name, count in queues.items() if count > 0}
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise LookupError(f'Tarefa não registrada: {name}') from None
+
+
+def enqueue(name, user=None, run_at=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Grava a tarefa ``name`` com os argumentos ``kwargs``; devolve o ``Job``."""
+    registered = get_task(name)
+    return Job.objects.using(using).create(
+        task=name, queue=registered.queue, args=kwargs, user=user,
+        max_attempts=registered.max_attempts or get_config()['MAX_ATTEMPTS'],
+        run_at=run_at or timezone.now(),
+    )
+
+
+def backoff(attempts, config=None):
+    """Espera antes da tentativa seguinte: dobra a cada falha, com jitter para espalhar as retentativas."""
+    config = config or get_config()
+    delay = min(config['BACKOFF_SECONDS'] * 2 ** (attempts - 1), config['BACKOFF_MAX_SECONDS'])
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
@@ -0,0 +1,10 @@
+from core.serializers import ModelSerializer
+from .models import Job
+
+
+class JobSerializer(ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ('id', 'task', 'status', 'attempts', 'max_attempts', 'result', 'error',
+                  'run_at', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
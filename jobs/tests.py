@@ -0,0 +1,233 @@
+import json
+import time
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import async_views
+from .models import Job, JobStatus
+from .registry import enqueue, get_config, parse_queues, task
+from .worker import Worker, run_pool, worker_name
+
+CALLS = []
+
+
+@task('tests.echo')
+def echo(job, **kwargs):
+    CALLS.append(job.pk)
+    return {'job': job.pk, **kwargs}
+
+
+@task('tests.broken', max_attempts=2)
+def broken(job):
+    raise RuntimeError('sem saldo')
+
+
+@task('tests.slow')
+def slow(job):
+    time.sleep(0.3)
+    return {'heartbeat_at': Job.objects.get(pk=job.pk).heartbeat_at.isoformat()}
+
+
+@task('tests.other', queue='heavy')
+def other(job):
+    return 'ok'
+
+
+class JobWorkerTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.worker = Worker(['default'], name='teste:1')
+
+    def test_enqueue_and_run(self):
+        """Testa que o worker executa a tarefa e grava o resultado"""
+        job = enqueue('tests.echo', value=3)
+
+        self.assertEqual(self.worker.run(burst=True), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {'job': job.pk, 'value': 3})
+        self.assertEqual((job.attempts, job.locked_by), (1, 'teste:1'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_claim_order_queue_and_run_at(self):
+        """Testa que a tarefa pega é a mais antiga pronta da fila do worker"""
+        now = timezone.now()
+        later = enqueue('tests.echo', run_at=now - timedelta(minutes=1))
+        first = enqueue('tests.echo', run_at=now - timedelta(minutes=5))
+        enqueue('tests.echo', run_at=now + timedelta(minutes=5))
+        enqueue('tests.other', run_at=now - timedelta(hours=1))
+
+        self.assertEqual(self.worker.run(burst=True), 2)
+        self.assertEqual(CALLS, [first.pk, later.pk])
+        self.assertEqual(Job.objects.filter(status=JobStatus.QUEUED).count(), 2)
+
+    def test_failure_retries_with_backoff(self):
+        """Testa que a falha volta à fila com backoff e, esgotadas as tentativas, fica como falha"""
+        job = enqueue('tests.broken')
+        self.assertEqual(job.max_attempts, 2)
+
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.QUEUED, 1))
+        self.assertEqual(job.error, 'RuntimeError: sem saldo')
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIsNone(self.worker.run_once())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JobStatus.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_task_fails(self):
+        """Testa que uma tarefa sem registro falha com a mensagem do erro"""
+        job = Job.objects.create(task='tests.missing')
+
+        self.worker.run_once()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIn('Tarefa não registrada: tests.missing', job.error)
+
+    def test_abandoned_jobs(self):
+        """Testa a devolução à fila das tarefas de um worker que saiu"""
+        retry = enqueue('tests.echo')
+        exhausted = Job.objects.create(task='tests.echo', max_attempts=1)
+        name = worker_name(4242)
+        self.assertEqual(Job.objects.claim(['default'], name), retry)
+        self.assertEqual(Job.objects.claim(['default'], name), exhausted)
+
+        self.assertEqual(Job.objects.abandon('Worker saiu', locked_by=name), (1, 1))
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retry.status, retry.locked_by), (JobStatus.QUEUED, ''))
+        self.assertEqual((exhausted.status, exhausted.error), (JobStatus.FAILED, 'Worker saiu'))
+
+    def test_requeued_job_is_not_overwritten(self):
+        """Testa que o worker não grava o resultado de uma tarefa que já não é dele"""
+        job = enqueue('tests.echo')
+        claimed = Job.objects.claim(['default'], self.worker.name)
+        Job.objects.abandon('Sem resposta', locked_by=self.worker.name)
+
+        self.worker.execute(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+
+    def test_stale_and_purge(self):
+        """Testa o tempo limite das tarefas em execução e a remoção das antigas"""
+        stuck = enqueue('tests.echo')
+        Job.objects.claim(['default'], 'outro:1')
+        Job.objects.filter(pk=stuck.pk).update(heartbeat_at=timezone.now() - timedelta(hours=2))
+        old = Job.objects.create(task='tests.echo', status=JobStatus.SUCCEEDED,
+                                 finished_at=timezone.now() - timedelta(days=30))
+
+        self.assertEqual(Job.objects.stale(3600).abandon('Sem resposta'), (1, 0))
+        self.assertEqual(Job.objects.purge(7), 1)
+        self.assertFalse(Job.objects.filter(pk=old.pk).exists())
+
+    def test_progress_keeps_long_job_alive(self):
+        """Testa que uma tarefa longa com sinal de vida recente não é devolvida à fila"""
+        job = enqueue('tests.echo')
+        claimed = Job.objects.claim(['default'], 'outro:1')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=2),
+                                             heartbeat_at=timezone.now() - timedelta(hours=2))
+
+        claimed.set_progress({'done': 1})
+
+        self.assertEqual(Job.objects.stale(3600).abandon('Sem resposta'), (0, 0))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, JobStatus.RUNNING)
+
+    def test_parse_queues(self):
+        """Testa a leitura de fila=processos"""
+        self.assertEqual(parse_queues(['default=4,heavy=1', 'off=0', 'bulk']), {'default': 4, 'heavy': 1, 'bulk': 1})
+        with self.assertRaises(ValueError):
+            parse_queues('default=muitos')
+
+
+class JobAPITests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email='ana@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='bia@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_job_status(self):
+        """Testa a consulta da situação da tarefa pelo dono"""
+        job = enqueue('tests.echo', user=self.user)
+        Worker(['default']).run(burst=True)
+
+        response = self.client.get(f'/api/v1/jobs/{job.pk}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], JobStatus.SUCCEEDED)
+        self.assertEqual(response.data['result'], {'job': job.pk})
+        self.assertNotIn('args', response.data)
+
+    def test_job_of_another_user(self):
+        """Testa que tarefas de outro usuário não aparecem"""
+        job = enqueue('tests.echo', user=self.other)
+
+        self.assertEqual(self.client.get(f'/api/v1/jobs/{job.pk}/').status_code, 404)
+        self.assertEqual(APIClient().get(f'/api/v1/jobs/{job.pk}/').status_code, 401)
+
+    async def test_async_job_status(self):
+        """Testa a situação da tarefa pela view assíncrona"""
+        job = await Job.objects.acreate(task='tests.echo', user=self.user)
+
+        response = await async_views.JobRetrieveView.as_view()(AsyncRequestFactory().get(
+            f'/api/v1/jobs/{job.pk}/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        ), pk=job.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['status'], JobStatus.QUEUED)
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    def test_heartbeat_while_job_runs(self):
+        """Testa que o worker renova o sinal de vida enquanto a tarefa roda"""
+        job = enqueue('tests.slow')
+        worker = Worker(['default'], name='teste:1', config={**get_config(), 'HEARTBEAT_SECONDS': 0.05})
+
+        worker.run_once()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertGreater(job.result['heartbeat_at'], job.started_at.isoformat())
+
+
+@skipUnless(connection.features.has_select_for_update_skip_locked, 'Sem SKIP LOCKED neste banco')
+class JobConcurrencyTests(TransactionTestCase):
+    def test_claim_skips_locked_jobs(self):
+        """Testa que uma tarefa travada por outra conexão é pulada, sem espera"""
+        first, second = enqueue('tests.echo'), enqueue('tests.echo')
+        other = connections.create_connection('default')
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute(f'SELECT id FROM {Job._meta.db_table} WHERE id = %s FOR UPDATE', [first.pk])
+            self.assertEqual(Job.objects.claim(['default'], 'teste:1'), second)
+            self.assertIsNone(Job.objects.claim(['default'], 'teste:1'))
+        finally:
+            other.rollback()
+            other.close()
+
+    @skipUnless(connection.vendor == 'postgresql', 'Os processos precisam do mesmo banco')
+    def test_pool_runs_each_job_once(self):
+        """Testa a pool de processos: cada tarefa roda uma vez só"""
+        jobs = [enqueue('tests.echo') for _ in range(40)]
+
+        run_pool({'default': 3}, burst=True, log=lambda message: None)
+
+        done = Job.objects.filter(pk__in=[job.pk for job in jobs])
+        self.assertEqual(done.filter(status=JobStatus.SUCCEEDED, attempts=1).count(), 40)
+        self.assertEqual({job.result['job'] for job in done}, {job.pk for job in jobs})
@@ -0,0 +1,9 @@
+from django.conf import settings
+from django.urls import path
+from . import async_views, views
+
+api = async_views if settings.ASYNC_API else views
+
+urlpatterns = [
+    path('jobs/<int:pk>/', api.JobRetrieveView.as_view(), name='job-detail'),
+]
@@ -0,0 +1,11 @@
+from rest_framework import generics
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobRetrieveView(generics.RetrieveAPIView):
+    """Situação de uma tarefa em segundo plano do usuário (``queued``, ``running``, ``succeeded``, ``failed``)."""
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
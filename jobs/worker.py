@@ -0,0 +1,248 @@
+"""Execução das tarefas em segundo plano.
+
+``Worker`` é o laço de um processo: pega uma tarefa (``Job.objects.claim``),
+executa, grava o resultado ou agenda a próxima tentativa, e repete; sem
+tarefas prontas, espera ``POLL_INTERVAL`` segundos. São dois comandos por
+tarefa, sem transação aberta entre eles: a tarefa decide as suas. Enquanto
+a tarefa roda, uma thread renova ``Job.heartbeat_at`` a cada
+``HEARTBEAT_SECONDS`` (numa conexão própria): uma tarefa longa, mas viva,
+não é dada como presa.
+
+``run_pool`` é o supervisor de ``manage.py run_workers``. Cada fila tem um
+número fixo de processos, que é o limite de tarefas dela rodando ao mesmo
+tempo neste host (ex. ``{'default': 4, 'heavy': 1}``). O supervisor recria
+processos que morrem, devolvendo à fila a tarefa que estava com eles, e de
+tempos em tempos devolve as tarefas sem sinal de vida há mais de
+``TIMEOUT_SECONDS`` (worker de outro host que caiu) e remove as terminadas
+há mais de ``RETENTION_DAYS`` dias, além das chaves de idempotência
+vencidas (``core.idempotency``). SIGTERM/SIGINT param a pool: cada processo termina
+a tarefa em andamento e sai.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connections
+from django.utils import timezone
+
+from core.db_pool import open_pools
+from core.models import IdempotencyKey
+from .models import Job, JobStatus
+from .registry import backoff, get_config, get_task
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL = 60
+
+
+def worker_name(pid=None):
+    return f'{socket.gethostname()}:{pid or os.getpid()}'
+
+
+class Worker:
+    def __init__(self, queues, name=None, using=DEFAULT_DB_ALIAS, config=None):
+        self.queues = list(queues)
+        self.name = name or worker_name()
+        self.using = using
+        self.config = config or get_config()
+
+    def run(self, stop=None, burst=False, max_jobs=0):
+        """Executa tarefas até ``stop`` ser sinalizado; com ``burst``, até a fila esvaziar. Devolve quantas rodou."""
+        done = 0
+        while not (stop and stop.is_set()) and not (max_jobs and done >= max_jobs):
+            try:
+                job = self.run_once()
+            except DatabaseError:
+                # Banco fora do ar ou travado: tenta de novo depois do intervalo, sem derrubar o processo.
+                logger.exception('Worker %s sem acesso ao banco', self.name)
+                job = False
+            if job:
+                done += 1
+            elif burst and job is None:
+                break
+            elif stop:
+                stop.wait(self.config['POLL_INTERVAL'])
+            else:
+                time.sleep(self.config['POLL_INTERVAL'])
+        return done
+
+    def run_once(self):
+        """Pega e executa uma tarefa; ``None`` se nenhuma estava pronta."""
+        self.close_old_connections()
+        try:
+            job = Job.objects.claim(self.queues, self.name, using=self.using)
+            if job is not None:
+                self.execute(job)
+            return job
+        finally:
+            self.close_old_connections()
+
+    def close_old_connections(self):
+        # Como no ciclo de uma requisição: descarta conexões velhas ou quebradas.
+        # Dentro de um atomic de quem chamou (ex. testes), a conexão é dele.
+        if not connections[self.using].in_atomic_block:
+            close_old_connections()
+
+    def execute(self, job):
+        heartbeat = Heartbeat(self, job, self.config['HEARTBEAT_SECONDS'])
+        heartbeat.start()
+        try:
+            result = get_task(job.task).func(job, **job.args)
+        except Exception as exc:
+            logger.exception('Tarefa %s #%s falhou (tentativa %s de %s)', job.task, job.pk, job.attempts, job.max_attempts)
+            self.fail(job, f'{type(exc).__name__}: {exc}')
+        else:
+            self.finish(job, status=JobStatus.SUCCEEDED, result=result, error='')
+        finally:
+            heartbeat.stop()
+
+    def fail(self, job, error):
+        if job.attempts < job.max_attempts:
+            job.status, job.run_at = JobStatus.QUEUED, timezone.now() + backoff(job.attempts, self.config)
+            self.save(job, status=job.status, run_at=job.run_at, locked_by='', error=error)
+        else:
+            self.finish(job, status=JobStatus.FAILED, error=error)
+
+    def finish(self, job, **fields):
+        job.finished_at = fields['finished_at'] = timezone.now()
+        self.save(job, **fields)
+
+    def save(self, job, **fields):
+        for name, value in fields.items():
+            setattr(job, name, value)
+        # Só se a tarefa ainda é deste worker: o supervisor pode tê-la devolvido à fila.
+        Job.objects.using(self.using).filter(
+            pk=job.pk, status=JobStatus.RUNNING, locked_by=self.name,
+        ).update(**fields)
+
+
+class Heartbeat(threading.Thread):
+    """Renova ``heartbeat_at`` de uma tarefa a cada ``interval`` segundos até ``stop``; com 0, não faz nada."""
+
+    def __init__(self, worker, job, interval):
+        super().__init__(name=f'heartbeat-{job.pk}', daemon=True)
+        self.jobs = Job.objects.using(worker.using).filter(pk=job.pk, status=JobStatus.RUNNING, locked_by=worker.name)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def start(self):
+        if self.interval:
+            super().start()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    self.jobs.update(heartbeat_at=timezone.now())
+                except DatabaseError:
+                    logger.exception('Sem acesso ao banco para renovar o sinal de vida da tarefa')
+        finally:
+            # Só as conexões desta thread.
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+
+
+# ------------------------------------------------------------
+# POOL DE PROCESSOS
+# ------------------------------------------------------------
+def close_connections():
+    """Nada aberto no supervisor deve ser herdado pelos processos criados por fork."""
+    connections.close_all()
+    for alias in open_pools():
+        connections[alias].close_pool()
+
+
+def work(queue, stop, using, burst, max_jobs):
+    # Ctrl+C chega a todo o grupo de processos: quem para os workers é o supervisor.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    Worker([queue], using=using).run(stop, burst=burst, max_jobs=max_jobs)
+    close_connections()
+
+
+class Pool:
+    def __init__(self, queues, using=DEFAULT_DB_ALIAS, burst=False, max_jobs=0, log=None):
+        self.queues = queues
+        self.using = using
+        self.burst = burst
+        self.max_jobs = max_jobs
+        self.log = log or logger.info
+        self.config = get_config()
+        self.context = multiprocessing.get_context('fork')
+        self.stop = self.context.Event()
+        self.processes = {}
+
+    def start(self, slot):
+        close_connections()
+        process = self.context.Process(
+            target=work, name=f'jobs-{slot[0]}-{slot[1]}',
+            args=(slot[0], self.stop, self.using, self.burst, self.max_jobs),
+        )
+        process.start()
+        self.processes[slot] = process
+
+    def reap(self):
+        """Recria os processos que saíram; devolve à fila a tarefa que estava com eles."""
+        for slot, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            requeued, failed = Job.objects.using(self.using).abandon(
+                f'Worker saiu com código {process.exitcode}', locked_by=worker_name(process.pid))
+            if requeued or failed:
+                self.log(f'{process.name} (pid {process.pid}) saiu com código {process.exitcode}: '
+                         f'{requeued} tarefa(s) devolvida(s) à fila, {failed} dada(s) como falha')
+            if self.burst or self.stop.is_set():
+                del self.processes[slot]
+            else:
+                self.start(slot)
+
+    def maintain(self):
+        jobs = Job.objects.using(self.using)
+        requeued, failed = jobs.stale(self.config['TIMEOUT_SECONDS']).abandon(
+            f'Sem resposta após {self.config["TIMEOUT_SECONDS"]}s')
+        purged = jobs.purge(self.config['RETENTION_DAYS'])
+        keys = IdempotencyKey.objects.using(self.using).purge()
+        if requeued or failed or purged or keys:
+            self.log(f'Manutenção: {requeued} devolvida(s) à fila, {failed} dada(s) como falha, {purged} removida(s), '
+                     f'{keys} chave(s) de idempotência vencida(s)')
+
+    def run(self):
+        def shutdown(signum, frame):
+            if self.stop.is_set():
+                # Segundo sinal: não espera as tarefas em andamento.
+                for process in self.processes.values():
+                    process.terminate()
+            self.stop.set()
+
+        previous = {signum: signal.signal(signum, shutdown) for signum in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            for queue, count in self.queues.items():
+                for index in range(count):
+                    self.start((queue, index))
+            next_maintenance = 0
+            while self.processes:
+                if not self.stop.is_set() and time.monotonic() >= next_maintenance:
+                    self.maintain()
+                    next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+                self.stop.wait(0.5)
+                if self.stop.is_set():
+                    for process in self.processes.values():
+                        process.join()
+                self.reap()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+            close_connections()
+
+
+def run_pool(queues, **options):
+    """Executa ``{fila: processos}`` até SIGTERM/SIGINT (ou, com ``burst``, até as filas esvaziarem)."""
+    Pool(queues, **options).run()
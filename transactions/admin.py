@@ -1,3 +1,16 @@
 from django.contrib import admin
+from core.search import IndexedSearchAdminMixin
+from .models import Transaction
 
-# Register your models here.
+
+class TransactionAdmin(IndexedSearchAdminMixin, admin.ModelAdmin):
+    list_display = ['date', 'user', 'description', 'category', 'amount']
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at', 'updated_at')
+    list_filter = ('category',)
+    search_fields = ('description',)
+    ordering = ('-date', '-id')
+
+
+admin.site.register(Transaction, TransactionAdmin)
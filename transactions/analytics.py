@@ -0,0 +1,319 @@
+"""Estatísticas do fluxo de caixa e previsão, calculadas com NumPy.
+
+O histórico do usuário vem numa única consulta (``values_list`` de data,
+valor, categoria e descrição, pelo índice ``(user, date, id)``) e vira
+arrays; todo o cálculo é vetorizado (``bincount``, ``cumsum``,
+``lexsort``), sem laço por transação:
+
+- ``rolling``: médias diárias de entradas, saídas e saldo nas últimas
+  ``ROLLING_WINDOWS`` janelas de dias e a variação das saídas em relação à
+  janela anterior;
+- ``percentiles``: percentis do valor das saídas;
+- ``volatility``: média, desvio padrão e coeficiente de variação das saídas
+  mensais (``TREND_MONTHS`` meses fechados) e o desvio padrão das diárias
+  (última janela);
+- ``trends``: saídas mensais de cada categoria nesses meses e a inclinação
+  da reta de mínimos quadrados (``up``/``down``/``stable``);
+- ``recurring``: lançamentos de mesmo valor e categoria repetidos em
+  intervalos regulares (semanal, quinzenal, mensal, anual) e ainda ativos;
+- ``forecast``: saldo projetado a cada 30 dias até ``FORECAST_DAYS``, com a
+  média diária do que não é recorrente mais as próximas ocorrências dos
+  recorrentes.
+
+Valores em centavos, como em ``Transaction.amount``. ``for_user`` guarda o
+resultado no cache padrão por usuário e versão do histórico: a quantidade
+de transações e o ``MAX(updated_at)`` (os mesmos validadores do ETag da
+listagem, lidos só do índice ``(user, updated_at)``). Inclusão, edição e
+exclusão mudam a versão; o último id sozinho não perceberia as duas
+últimas.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Transaction
+from .reports import CATEGORY_LABELS
+
+DEFAULTS = {
+    'TIMEOUT': 3600,
+    'ROLLING_WINDOWS': (7, 30, 90),
+    'PERCENTILES': (50, 75, 90, 95, 99),
+    'TREND_MONTHS': 12,
+    # Variação no período (inclinação x meses / média) acima da qual a tendência é up/down.
+    'TREND_THRESHOLD': 0.1,
+    'FORECAST_DAYS': 90,
+    'MIN_OCCURRENCES': 3,
+}
+
+# Períodos reconhecidos: nome, dias e tolerância (dias) na mediana e no desvio dos intervalos.
+PERIODS = (('weekly', 7, 1), ('biweekly', 14, 2), ('monthly', 30, 3), ('yearly', 365, 10))
+COLUMNS = ('date', 'amount', 'category', 'description')
+PREFIX = 'analytics'
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ANALYTICS', {})}
+
+
+@dataclass(frozen=True)
+class History:
+    """Transações de um usuário em ordem de data, uma coluna por array."""
+    days: np.ndarray  # datetime64[D]
+    amounts: np.ndarray  # int64, centavos
+    categories: np.ndarray  # int64
+    descriptions: tuple
+
+    @classmethod
+    def from_rows(cls, rows):
+        if not rows:
+            return cls(np.array([], dtype='datetime64[D]'), np.array([], dtype=np.int64),
+                       np.array([], dtype=np.int64), ())
+        dates, amounts, categories, descriptions = zip(*rows)
+        # Ordinais, e não date -> datetime64 elemento a elemento (quinze vezes mais lento).
+        ordinals = np.fromiter(map(date.toordinal, dates), np.int64, len(dates))
+        return cls((ordinals - EPOCH).astype('datetime64[D]'), np.fromiter(amounts, np.int64, len(amounts)),
+                   np.fromiter(categories, np.int64, len(categories)), descriptions)
+
+    @property
+    def expenses(self):
+        return np.maximum(-self.amounts, 0)
+
+    @property
+    def incomes(self):
+        return np.maximum(self.amounts, 0)
+
+
+def load_history(user):
+    return History.from_rows(list(
+        Transaction.objects.filter(user=user).order_by('date', 'id').values_list(*COLUMNS)))
+
+
+def history_version(user):
+    row = Transaction.objects.filter(user=user).aggregate(count=Count('id'), last=Max('updated_at'))
+    return f'{row["count"]}:{row["last"].timestamp() if row["last"] else 0}'
+
+
+def for_user(user, today=None):
+    """Todas as estatísticas de ``user`` (ver o módulo), calculadas uma vez por versão do histórico."""
+    config = get_config()
+    today = today or timezone.localdate()
+    key = f'{PREFIX}:{user.pk}:{today.isoformat()}:{history_version(user)}'
+    result = cache.get(key)
+    if result is None:
+        result = compute(load_history(user), today, config)
+        cache.set(key, result, config['TIMEOUT'])
+    return result
+
+
+def compute(history, today, config=None):
+    config = config or get_config()
+    today = np.datetime64(today, 'D')
+    recurring, recurring_mask = detect_recurring(history, today, config)
+    return {
+        'rolling': rolling_averages(history, today, config['ROLLING_WINDOWS']),
+        'percentiles': expense_percentiles(history, config['PERCENTILES']),
+        'volatility': volatility(history, today, config),
+        'trends': category_trends(history, today, config),
+        'recurring': recurring,
+        'forecast': forecast(history, today, recurring, recurring_mask, config),
+    }
+
+
+# ------------------------------------------------------------
+# SÉRIES
+# ------------------------------------------------------------
+def daily_totals(history, start, end, mask=None):
+    """``(entradas, saídas)`` por dia de ``start`` a ``end`` (inclusive)."""
+    size = int((end - start).astype(np.int64)) + 1
+    index = (history.days - start).astype(np.int64)
+    keep = (index >= 0) & (index < size)
+    if mask is not None:
+        keep &= mask
+    index = index[keep]
+    return (np.bincount(index, weights=history.incomes[keep], minlength=size),
+            np.bincount(index, weights=history.expenses[keep], minlength=size))
+
+
+def month_index(days):
+    return days.astype('datetime64[M]').astype(np.int64)
+
+
+def closed_months(today, count):
+    """Índices (meses desde 1970) dos ``count`` meses fechados antes do atual."""
+    current = int(month_index(np.array([today]))[0])
+    return np.arange(current - count, current)
+
+
+def trailing_means(values, window):
+    """Média móvel de ``window`` posições de ``values`` (acumulada: uma subtração por posição)."""
+    totals = np.cumsum(np.concatenate(([0.0], values)))
+    return (totals[window:] - totals[:-window]) / window
+
+
+def cents(value):
+    return int(round(float(value)))
+
+
+def ratio(value):
+    return round(float(value), 4)
+
+
+# ------------------------------------------------------------
+# ESTATÍSTICAS
+# ------------------------------------------------------------
+def rolling_averages(history, today, windows):
+    longest = max(windows)
+    income, expense = daily_totals(history, today - 2 * longest + 1, today)
+    result = []
+    for window in windows:
+        expenses = trailing_means(expense, window)
+        current, previous = expenses[-1], expenses[-1 - window]
+        result.append({
+            'window': window,
+            'income': cents(income[-window:].mean()),
+            'expense': cents(current),
+            'net': cents(income[-window:].mean() - current),
+            'expense_change': ratio(current / previous - 1) if previous else None,
+        })
+    return result
+
+
+def expense_percentiles(history, percentiles):
+    expenses = -history.amounts[history.amounts < 0]
+    if not expenses.size:
+        return {f'p{pct}': 0 for pct in percentiles}
+    return {f'p{pct}': cents(value) for pct, value in zip(percentiles, np.percentile(expenses, percentiles))}
+
+
+def monthly_expenses(history, months):
+    """Matriz categoria x mês das saídas nos meses ``months``."""
+    index = month_index(history.days) - months[0]
+    keep = (index >= 0) & (index < len(months)) & (history.categories < len(CATEGORY_LABELS))
+    flat = np.bincount(history.categories[keep] * len(months) + index[keep], weights=history.expenses[keep],
+                       minlength=len(CATEGORY_LABELS) * len(months))
+    return flat.reshape(len(CATEGORY_LABELS), len(months))
+
+
+def volatility(history, today, config):
+    monthly = monthly_expenses(history, closed_months(today, config['TREND_MONTHS'])).sum(axis=0)
+    window = max(config['ROLLING_WINDOWS'])
+    _, daily = daily_totals(history, today - window + 1, today)
+    mean = monthly.mean()
+    return {
+        'months': len(monthly),
+        'monthly_mean': cents(mean),
+        'monthly_std': cents(monthly.std()),
+        'coefficient_of_variation': ratio(monthly.std() / mean) if mean else None,
+        'daily_std': cents(daily.std()),
+    }
+
+
+def category_trends(history, today, config):
+    months = closed_months(today, config['TREND_MONTHS'])
+    matrix = monthly_expenses(history, months)
+    # Inclinação de mínimos quadrados de todas as categorias de uma vez.
+    x = np.arange(len(months)) - (len(months) - 1) / 2
+    slopes = (matrix - matrix.mean(axis=1, keepdims=True)) @ x / (x @ x)
+    means = matrix.mean(axis=1)
+    labels = [month.item().strftime('%Y-%m') for month in months.astype('datetime64[M]')]
+    result = []
+    for category in np.argsort(-matrix.sum(axis=1), kind='stable'):
+        if not matrix[category].any():
+            continue
+        change = slopes[category] * (len(months) - 1) / means[category]
+        result.append({
+            'category': int(category),
+            'label': CATEGORY_LABELS.get(int(category), ''),
+            'total': cents(matrix[category].sum()),
+            'monthly_mean': cents(means[category]),
+            'slope': cents(slopes[category]),
+            'trend': 'up' if change > config['TREND_THRESHOLD'] else 'down' if change < -config['TREND_THRESHOLD'] else 'stable',
+            'series': dict(zip(labels, (cents(value) for value in matrix[category]))),
+        })
+    return result
+
+
+def detect_recurring(history, today, config):
+    """Recorrentes ativos e a máscara das transações que pertencem a eles."""
+    mask = np.zeros(len(history.amounts), dtype=bool)
+    if len(history.amounts) < config['MIN_OCCURRENCES']:
+        return [], mask
+    days = history.days.astype(np.int64)
+    # Agrupa por (categoria, valor) numa chave inteira só; a ordenação estável mantém a ordem de data no grupo.
+    keys = history.categories << 32 | (history.amounts + 2 ** 31)
+    order = np.argsort(keys, kind='stable')
+    amounts, categories, days, keys = history.amounts[order], history.categories[order], days[order], keys[order]
+    starts = np.concatenate(([True], keys[1:] != keys[:-1]))
+    group = np.cumsum(starts) - 1
+    first = np.flatnonzero(starts)
+    last = np.concatenate((first[1:] - 1, [len(order) - 1]))
+    occurrences = last - first + 1
+
+    # Intervalos entre ocorrências seguidas do mesmo grupo; a mediana por grupo vem da ordenação deles.
+    same = ~starts[1:]
+    gaps, gap_group = np.diff(days)[same], group[1:][same]
+    sorted_gaps = np.sort(gap_group << 32 | gaps) & 0xFFFFFFFF
+    counts = occurrences - 1
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    candidates = occurrences >= config['MIN_OCCURRENCES']
+    median = np.zeros(len(first), dtype=np.int64)
+    median[candidates] = sorted_gaps[offsets[candidates] + counts[candidates] // 2]
+    deviation = np.bincount(gap_group, weights=np.abs(gaps - median[gap_group]), minlength=len(first))
+    deviation = np.divide(deviation, counts, out=np.full(len(first), np.inf), where=counts > 0)
+
+    period = np.full(len(first), -1)
+    tolerance = np.zeros(len(first))
+    for index, (_, length, tol) in enumerate(PERIODS):
+        match = candidates & (period < 0) & (np.abs(median - length) <= tol) & (deviation <= tol)
+        period[match], tolerance[match] = index, tol
+    today = int(today.astype(np.int64))
+    # Ativo: a próxima ocorrência não está atrasada mais que a tolerância ou um quarto do período.
+    active = (period >= 0) & (today - days[last] <= median + np.maximum(tolerance, median // 4))
+
+    mask[order[np.isin(group, np.flatnonzero(active))]] = True
+    result = []
+    for index in np.flatnonzero(active):
+        row = order[last[index]]
+        result.append({
+            'description': history.descriptions[row],
+            'category': int(categories[first[index]]),
+            'amount': int(amounts[first[index]]),
+            'period': PERIODS[period[index]][0],
+            'interval_days': int(median[index]),
+            'occurrences': int(occurrences[index]),
+            'last_date': history.days[row].item(),
+            'next_date': (history.days[row] + median[index]).item(),
+        })
+    result.sort(key=lambda item: (item['next_date'], item['amount']))
+    return result, mask
+
+
+def forecast(history, today, recurring, recurring_mask, config):
+    horizon = config['FORECAST_DAYS']
+    window = max(config['ROLLING_WINDOWS'])
+    income, expense = daily_totals(history, today - window + 1, today, mask=~recurring_mask)
+    # O que não é recorrente entra pela média diária recente; os recorrentes, pelas datas previstas.
+    daily_net = (income.sum() - expense.sum()) / window
+    tomorrow = today.item() + timedelta(days=1)
+    upcoming = []
+    for item in recurring:
+        when = max(item['next_date'], tomorrow)
+        while when <= today.item() + timedelta(days=horizon):
+            upcoming.append({'date': when, 'description': item['description'], 'amount': item['amount']})
+            when += timedelta(days=item['interval_days'])
+    upcoming.sort(key=lambda item: (item['date'], item['amount']))
+    dates = np.array([item['date'] for item in upcoming], dtype='datetime64[D]')
+    amounts = np.array([item['amount'] for item in upcoming], dtype=np.int64)
+    balance = int(history.amounts.sum())
+    projections = []
+    for days in sorted({*range(30, horizon, 30), horizon}):
+        scheduled = amounts[dates <= today + days].sum()
+        projections.append({'days': days, 'date': (today + days).item(),
+                            'balance': cents(balance + daily_net * days + scheduled)})
+    return {'balance': balance, 'daily_net': cents(daily_net), 'projections': projections, 'upcoming': upcoming}
@@ -5,3 +5,6 @@ class TransactionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "transactions"
     verbose_name = 'Transações'
+
+    def ready(self):
+        from . import signals  # noqa: F401
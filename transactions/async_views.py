@@ -0,0 +1,86 @@
+from asgiref.sync import sync_to_async
+from rest_framework.response import Response
+
+from core.async_views import (
+    AsyncAPIView,
+    AsyncCreateMixin,
+    AsyncDestroyMixin,
+    AsyncListMixin,
+    AsyncRetrieveMixin,
+    AsyncUpdateMixin,
+)
+from . import views
+from .exporters import export_transactions
+from .views import TransactionBatchView, TransactionImportView  # noqa: F401 - escritas em massa continuam síncronas
+
+
+class TransactionCreateListView(AsyncListMixin, AsyncCreateMixin, AsyncAPIView):
+    api_view_class = views.TransactionCreateListView
+
+
+class TransactionRetrieveUpdateDestroyView(AsyncRetrieveMixin, AsyncUpdateMixin, AsyncDestroyMixin, AsyncAPIView):
+    api_view_class = views.TransactionRetrieveUpdateDestroyView
+
+
+class TransactionExportView(AsyncAPIView):
+    api_view_class = views.TransactionExportView
+
+    async def get(self, view, request, *args, **kwargs):
+        # O roteador pode medir o atraso da réplica: consulta síncrona.
+        options = await sync_to_async(view.get_export)(request)
+        # Sob ASGI, um iterador síncrono seria consumido inteiro antes do envio.
+        return view.export_response(aiter_chunks(export_transactions(request.user, **options)), options)
+
+
+class ReportMixin:
+    async def get(self, view, request, *args, **kwargs):
+        rows = [row async for row in view.get_report_queryset()]
+        return Response(view.represent(rows))
+
+
+class BalanceReportView(ReportMixin, AsyncAPIView):
+    api_view_class = views.BalanceReportView
+
+
+class MonthlyReportView(ReportMixin, AsyncAPIView):
+    api_view_class = views.MonthlyReportView
+
+
+class CategoryReportView(ReportMixin, AsyncAPIView):
+    api_view_class = views.CategoryReportView
+
+
+class AnalyticsMixin:
+    async def get(self, view, request, *args, **kwargs):
+        # Consulta e cálculo com NumPy numa thread: não seguram o event loop.
+        return Response(view.represent(await sync_to_async(view.get_analytics)()))
+
+
+class AnalyticsSummaryView(AnalyticsMixin, AsyncAPIView):
+    api_view_class = views.AnalyticsSummaryView
+
+
+class AnalyticsTrendsView(AnalyticsMixin, AsyncAPIView):
+    api_view_class = views.AnalyticsTrendsView
+
+
+class AnalyticsRecurringView(AnalyticsMixin, AsyncAPIView):
+    api_view_class = views.AnalyticsRecurringView
+
+
+class AnalyticsForecastView(AnalyticsMixin, AsyncAPIView):
+    api_view_class = views.AnalyticsForecastView
+
+
+async def aiter_chunks(chunks):
+    """Consome o gerador síncrono da exportação sem bloquear o event loop.
+
+    Cada pedaço roda na thread síncrona da requisição (``thread_sensitive``),
+    a mesma onde a transação e o cursor do servidor foram abertos.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,129 @@
+"""Lote de criações, edições e exclusões de transações (sincronização do app).
+
+Corpo de ``POST /api/v1/transactions/batch/``::
+
+    {"operations": [
+        {"op": "create", "data": {"amount": -1990, "date": "2026-10-01", ...}},
+        {"op": "update", "id": 42, "data": {"category": 3}},
+        {"op": "delete", "id": 43}
+    ]}
+
+``apply_batch`` valida todas as operações antes de escrever qualquer coisa,
+com o ``TransactionSerializer`` (edições são parciais). As transações
+editadas ou apagadas vêm numa só consulta, travadas até o fim; cada ``id``
+aparece uma vez por lote e precisa ser do usuário. Com um erro que seja,
+nada é aplicado: a resposta é 400 e cada item traz os seus erros (ou 424,
+se só os outros falharam).
+
+Tudo válido, o lote é aplicado numa transação com um comando por tipo de
+operação, e não um por item: ``bulk_create`` (um ``INSERT``), ``bulk_update``
+(um ``UPDATE ... CASE``, com ``updated_at`` preenchido aqui, já que o
+``auto_now`` não vale em escritas em massa) e um ``DELETE ... WHERE id IN``.
+Os triggers mantêm os totais como nas escritas avulsas. A resposta traz um
+resultado por operação, na ordem recebida.
+"""
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework import status
+
+from .models import Transaction
+from .serializers import TransactionSerializer
+
+MAX_OPERATIONS = 500
+OPERATIONS = ('create', 'update', 'delete')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_operation(operation):
+    """Confere o formato de uma operação; devolve os erros (vazio se estiver certa)."""
+    if not isinstance(operation, dict):
+        return {'non_field_errors': ['Cada operação deve ser um objeto.']}
+    errors = {}
+    op = operation.get('op')
+    if op not in OPERATIONS:
+        errors['op'] = [f'Use {", ".join(OPERATIONS)}.']
+    if op in ('update', 'delete'):
+        pk = operation.get('id')
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            errors['id'] = ['Informe o id (inteiro) da transação.']
+    if op in ('create', 'update') and not isinstance(operation.get('data'), dict):
+        errors['data'] = ['Informe os campos da transação em "data".']
+    return errors
+
+
+def apply_batch(user, operations, context):
+    """Valida e aplica ``operations`` de ``user``; devolve a situação HTTP e os resultados por operação."""
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('Envie as operações numa lista "operations".')
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'No máximo {MAX_OPERATIONS} operações por lote.')
+
+    # Por operação: None ou (situação HTTP, erros).
+    errors = [(status.HTTP_400_BAD_REQUEST, found) if (found := parse_operation(operation)) else None
+              for operation in operations]
+    seen = set()
+    for index, operation in enumerate(operations):
+        if errors[index] is None and operation['op'] != 'create':
+            if operation['id'] in seen:
+                errors[index] = status.HTTP_400_BAD_REQUEST, {'id': ['Transação repetida no lote.']}
+            seen.add(operation['id'])
+
+    using = router.db_for_write(Transaction)
+    with transaction.atomic(using=using):
+        existing = Transaction.objects.using(using).filter(user=user).select_for_update().in_bulk(seen) if seen else {}
+
+        created, updated, deleted, fields = [], [], [], set()
+        for index, operation in enumerate(operations):
+            if errors[index] is not None:
+                continue
+            op = operation['op']
+            if op == 'create':
+                serializer = TransactionSerializer(data=operation['data'], context=context)
+                if serializer.is_valid():
+                    created.append((index, Transaction(**serializer.validated_data)))
+                else:
+                    errors[index] = status.HTTP_400_BAD_REQUEST, serializer.errors
+                continue
+            instance = existing.get(operation['id'])
+            if instance is None:
+                errors[index] = status.HTTP_404_NOT_FOUND, {'id': ['Transação não encontrada.']}
+            elif op == 'delete':
+                deleted.append((index, instance))
+            else:
+                serializer = TransactionSerializer(instance, data=operation['data'], partial=True, context=context)
+                if serializer.is_valid():
+                    changes = {name: value for name, value in serializer.validated_data.items() if name != 'user'}
+                    for name, value in changes.items():
+                        setattr(instance, name, value)
+                    fields.update(changes)
+                    updated.append((index, instance))
+                else:
+                    errors[index] = status.HTTP_400_BAD_REQUEST, serializer.errors
+
+        if any(errors):
+            return status.HTTP_400_BAD_REQUEST, [
+                {'status': item[0], 'errors': item[1]} if item else {'status': status.HTTP_424_FAILED_DEPENDENCY}
+                for item in errors
+            ]
+
+        if created:
+            Transaction.objects.using(using).bulk_create([obj for _, obj in created])
+        if updated:
+            now = timezone.now()
+            for _, obj in updated:
+                obj.updated_at = now
+            Transaction.objects.using(using).bulk_update([obj for _, obj in updated], [*sorted(fields), 'updated_at'])
+        if deleted:
+            Transaction.objects.using(using).filter(user=user, pk__in=[obj.pk for _, obj in deleted]).delete()
+
+    results = [None] * len(operations)
+    for code, items in ((status.HTTP_201_CREATED, created), (status.HTTP_200_OK, updated)):
+        data = TransactionSerializer([obj for _, obj in items], many=True, context=context).data
+        for (index, obj), item in zip(items, data):
+            results[index] = {'status': code, 'id': obj.pk, 'data': item}
+    for index, obj in deleted:
+        results[index] = {'status': status.HTTP_204_NO_CONTENT, 'id': obj.pk}
+    return status.HTTP_200_OK, results
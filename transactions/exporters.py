@@ -0,0 +1,177 @@
+"""Exportação do histórico de transações (CSV/NDJSON) em fluxo.
+
+As linhas vêm de um cursor no servidor (``QuerySet.iterator``) em blocos de
+``chunk_size``, são escritas num buffer de texto e entregues em pedaços de
+``CHUNK_BYTES`` — opcionalmente comprimidos com gzip no caminho. A memória
+usada depende do bloco e do pedaço, nunca do tamanho do histórico.
+
+No PostgreSQL o cursor é aberto dentro de uma transação: fora dela o Django
+declara o cursor ``WITH HOLD`` e o servidor materializa o resultado inteiro
+antes da primeira linha.
+
+A ordem é ``(date, id)``, a do índice ``(user, date, id)``, e cada linha
+traz a data e o id: uma exportação interrompida continua com
+``after=<data>,<id>`` da última linha recebida.
+
+O CSV usa as colunas do importador (``id``, ``date``, ``amount`` em reais,
+``category`` pelo nome, ``description``) mais ``fingerprint``, a chave natural
+gravada na importação (vazia nas transações lançadas pela API): reimportado
+na mesma conta ou em outra, não duplica (ver ``transactions.importers``). O
+NDJSON usa os valores da API (centavos, categoria numérica).
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Category, Transaction
+
+DEFAULT_CHUNK_SIZE = 5000
+CHUNK_BYTES = 64 * 1024
+
+COLUMNS = ('id', 'date', 'amount', 'category', 'description', 'fingerprint')
+CATEGORY_LABELS = dict(Category.choices)
+
+
+class ExportError(ValueError):
+    pass
+
+
+# ------------------------------------------------------------
+# PARAMETERS
+# ------------------------------------------------------------
+def parse_date(value, name):
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        raise ExportError(f'{name}: data inválida {value!r} (use AAAA-MM-DD).')
+
+
+def parse_after(value):
+    """Converte ``'2024-01-10,123'`` em ``(date(2024, 1, 10), 123)``."""
+    day, _, pk = value.partition(',')
+    if not pk.strip().isdigit():
+        raise ExportError(f'after: cursor inválido {value!r} (use <data>,<id>).')
+    return parse_date(day, 'after'), int(pk)
+
+
+def export_queryset(user, date_from=None, date_to=None, after=None):
+    queryset = Transaction.objects.filter(user=user)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if after:
+        after_date, after_id = after
+        queryset = queryset.filter(Q(date__gt=after_date) | Q(date=after_date, id__gt=after_id))
+    return queryset.order_by('date', 'id').values_list(*COLUMNS)
+
+
+# ------------------------------------------------------------
+# WRITERS
+# ------------------------------------------------------------
+def format_amount(cents):
+    sign = '-' if cents < 0 else ''
+    return f'{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}'
+
+
+def csv_writer(buffer):
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+
+    def write(row):
+        pk, day, amount, category, description, fingerprint = row
+        writer.writerow((pk, day.isoformat(), format_amount(amount), CATEGORY_LABELS.get(category, category), description,
+                         fingerprint or ''))
+    return write
+
+
+def ndjson_writer(buffer):
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def write(row):
+        pk, day, amount, category, description, _ = row
+        buffer.write(encode({'id': pk, 'date': day.isoformat(), 'amount': amount,
+                             'category': category, 'description': description}))
+        buffer.write('\n')
+    return write
+
+
+WRITERS = {'csv': csv_writer, 'ndjson': ndjson_writer}
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+
+def encode_rows(rows, fmt, chunk_bytes=CHUNK_BYTES):
+    """Gera o arquivo em pedaços de ``bytes`` de cerca de ``chunk_bytes``."""
+    try:
+        make_writer = WRITERS[fmt]
+    except KeyError:
+        raise ExportError(f'Formato não suportado: {fmt!r}')
+    buffer = io.StringIO()
+    write = make_writer(buffer)
+    for row in rows:
+        write(row)
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def accepts_gzip(accept_encoding):
+    """O cabeçalho ``Accept-Encoding`` aceita gzip? ``gzip;q=0`` recusa; ``*`` vale para gzip não listado."""
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, *params = (item.strip() for item in part.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 16 + 15: cabeçalho gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# ------------------------------------------------------------
+# EXPORT
+# ------------------------------------------------------------
+def stream_rows(queryset, chunk_size):
+    with transaction.atomic(using=queryset.db):
+        yield from queryset.iterator(chunk_size=chunk_size)
+
+
+def export_transactions(user, fmt='csv', date_from=None, date_to=None, after=None, compress=False,
+                        chunk_size=DEFAULT_CHUNK_SIZE, using=None):
+    """Gera a exportação das transações de ``user`` em pedaços de ``bytes``.
+
+    ``using`` fixa o banco da consulta; sem ele, vale o roteador no momento
+    em que a primeira linha é lida.
+    """
+    if fmt not in WRITERS:
+        raise ExportError(f'Formato não suportado: {fmt!r}')
+    queryset = export_queryset(user, date_from, date_to, after)
+    if using:
+        queryset = queryset.using(using)
+    chunks = encode_rows(stream_rows(queryset, chunk_size), fmt)
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,355 @@
+"""Importação de extratos bancários (CSV/OFX) em lotes.
+
+O arquivo é lido como fluxo: os parsers são geradores, a validação acontece
+em blocos de ``chunk_size`` linhas e cada bloco é gravado com ``bulk_create``
+dentro de sua própria transação. A memória usada depende do tamanho do bloco
+e das linhas de um mesmo dia, nunca do tamanho do arquivo.
+
+A deduplicação usa a chave natural ``(user, date, fingerprint)``: o FITID do
+OFX (ou a coluna ``id`` do CSV) quando existir, senão um hash da linha.
+
+Um CSV da exportação (``transactions.exporters``) traz a coluna
+``fingerprint``: a chave gravada é reaproveitada e, nas transações lançadas
+pela API (sem chave), ``id`` é o da própria transação. Reimportado na mesma
+conta, nada duplica; em outra, a chave passa a ser derivada desse ``id``.
+"""
+import csv
+import hashlib
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core.partitioning import retention_cutoff
+
+from .models import Category, Transaction
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+CATEGORY_LOOKUP = {label.lower(): value for value, label in Category.choices}
+CATEGORY_LOOKUP.update({name.lower(): value for name, value in Category.__members__.items()})
+
+
+class StatementError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'errors': self.errors,
+        }
+
+
+# ------------------------------------------------------------
+# PARSERS
+# ------------------------------------------------------------
+def parse_csv(stream):
+    """Gera ``(linha, dict)`` para cada registro de um CSV com cabeçalho.
+
+    Colunas reconhecidas: ``date``, ``amount``, ``description``, ``category``,
+    ``id`` e ``fingerprint`` (opcionais as quatro últimas). O delimitador é detectado no
+    cabeçalho (``,`` ou ``;``).
+    """
+    header = stream.readline()
+    if not header:
+        return
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    columns = [c.strip().lower() for c in next(csv.reader([header], delimiter=delimiter))]
+    missing = {'date', 'amount'} - set(columns)
+    if missing:
+        raise StatementError(f'Colunas obrigatórias ausentes: {", ".join(sorted(missing))}')
+
+    reader = csv.reader(stream, delimiter=delimiter)
+    for line, values in enumerate(reader, start=2):
+        if not any(values):
+            continue
+        yield line, dict(zip(columns, values))
+
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def parse_ofx(stream, read_size=64 * 1024):
+    """Gera ``(n, dict)`` para cada ``<STMTTRN>`` de um OFX (SGML ou XML)."""
+    buffer = ''
+    current = None
+    count = 0
+    while True:
+        chunk = stream.read(read_size)
+        buffer += chunk
+        # Só processa até o último '<' para não cortar uma tag ao meio.
+        cut = len(buffer) if not chunk else buffer.rfind('<')
+        if cut <= 0 and chunk:
+            continue
+        for closing, tag, value in OFX_TAG.findall(buffer[:cut]):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing:
+                    if current is not None:
+                        count += 1
+                        yield count, current
+                    current = None
+                else:
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+        buffer = buffer[cut:]
+        if not chunk:
+            break
+    if current:
+        yield count + 1, current
+
+
+def ofx_to_row(record):
+    return {
+        'date': record.get('DTPOSTED', '')[:8],
+        'amount': record.get('TRNAMT', ''),
+        'description': record.get('MEMO') or record.get('NAME', ''),
+        'id': record.get('FITID', ''),
+    }
+
+
+PARSERS = {
+    'csv': lambda stream: parse_csv(stream),
+    'ofx': lambda stream: ((n, ofx_to_row(r)) for n, r in parse_ofx(stream)),
+}
+
+
+def detect_format(filename, default='csv'):
+    if filename and filename.lower().endswith(('.ofx', '.qfx')):
+        return 'ofx'
+    return default
+
+
+# ------------------------------------------------------------
+# VALIDATION
+# ------------------------------------------------------------
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%Y%m%d')
+
+
+def parse_date(value):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f'Data inválida: {value!r}')
+
+
+def parse_amount(value):
+    """Converte ``'1.234,56'``, ``'-1234.56'`` ou ``'R$ 10,00'`` em centavos."""
+    cleaned = value.strip().replace('R$', '').replace(' ', '')
+    if ',' in cleaned and '.' in cleaned:
+        # O último separador é o decimal: '1.234,56' (pt-BR) ou '1,234.56'.
+        if cleaned.rfind(',') > cleaned.rfind('.'):
+            cleaned = cleaned.replace('.', '').replace(',', '.')
+        else:
+            cleaned = cleaned.replace(',', '')
+    elif ',' in cleaned:
+        cleaned = cleaned.replace(',', '.')
+    try:
+        cents = Decimal(cleaned) * 100
+    except InvalidOperation:
+        raise StatementError(f'Valor inválido: {value!r}')
+    if not cents.is_finite():
+        raise StatementError(f'Valor inválido: {value!r}')
+    if cents != cents.to_integral_value():
+        raise StatementError(f'Valor com mais de duas casas decimais: {value!r}')
+    cents = int(cents)
+    if not -2**31 <= cents < 2**31:
+        raise StatementError(f'Valor fora do intervalo permitido: {value!r}')
+    return cents
+
+
+def parse_category(value):
+    value = (value or '').strip()
+    if not value:
+        return Category.OUTROS
+    if value.isdigit() and int(value) in Category.values:
+        return int(value)
+    try:
+        return CATEGORY_LOOKUP[value.lower()]
+    except KeyError:
+        raise StatementError(f'Categoria inválida: {value!r}')
+
+
+FINGERPRINT_RE = re.compile(r'[0-9a-f]{32}')
+
+
+def make_fingerprint(*parts):
+    raw = '|'.join(str(p) for p in parts)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class RowValidator:
+    """Valida linhas em sequência e calcula a chave natural de cada uma.
+
+    Sem identificador externo, linhas idênticas no mesmo dia são diferenciadas
+    por um contador de ocorrência por ``(valor, descrição)``, mantido só para
+    a data corrente: num extrato em ordem (crescente ou decrescente), a data
+    não volta e o contador é descartado quando ela muda. Se uma data já
+    deixada para trás reaparece (extrato fora de ordem), o contador recomeça
+    das linhas que esta importação já gravou naquele dia — ``flush`` grava o
+    bloco pendente antes da consulta. Reiniciar do zero daria a mesma chave a
+    duas linhas e descartaria a segunda como repetida.
+    """
+
+    def __init__(self, user, flush=None):
+        self.user = user
+        self.cutoff = retention_cutoff()
+        self.flush = flush
+        self.started = timezone.now()
+        self._date = None
+        self._range = None
+        self._occurrences = {}
+
+    def _enter(self, txn_date):
+        """Troca o contador de ocorrências para ``txn_date``."""
+        revisit = self._range is not None and self._range[0] <= txn_date <= self._range[1]
+        self._date = txn_date
+        self._occurrences = {}
+        if self._range is None:
+            self._range = (txn_date, txn_date)
+        else:
+            self._range = (min(self._range[0], txn_date), max(self._range[1], txn_date))
+        if not revisit:
+            return
+        if self.flush is not None:
+            self.flush()
+        rows = Transaction.objects.filter(
+            user=self.user, date=txn_date, fingerprint__isnull=False, created_at__gte=self.started,
+        ).values_list('amount', 'description').annotate(n=Count('id'))
+        self._occurrences = {(amount, description): n for amount, description, n in rows}
+
+    def __call__(self, row):
+        txn_date = parse_date(row.get('date', ''))
+        if self.cutoff is not None and txn_date < self.cutoff:
+            raise StatementError(f'Data anterior ao período mantido: {txn_date.isoformat()}')
+        amount = parse_amount(row.get('amount', ''))
+        description = (row.get('description') or '').strip()[:255]
+        category = parse_category(row.get('category'))
+        external_id = (row.get('id') or '').strip()
+        fingerprint = (row.get('fingerprint') or '').strip().lower()
+        exported_pk = None
+
+        if fingerprint:
+            if not FINGERPRINT_RE.fullmatch(fingerprint):
+                raise StatementError(f'Identificador inválido: {fingerprint!r}')
+        elif 'fingerprint' in row and external_id:
+            # Exportação de uma transação lançada pela API: o id é o dela.
+            if not external_id.isdigit():
+                raise StatementError(f'Id inválido: {external_id!r}')
+            exported_pk = int(external_id)
+            fingerprint = make_fingerprint('pk', external_id)
+        elif external_id:
+            fingerprint = make_fingerprint('id', external_id)
+        else:
+            if txn_date != self._date:
+                self._enter(txn_date)
+            key = (amount, description)
+            occurrence = self._occurrences.get(key, 0)
+            self._occurrences[key] = occurrence + 1
+            fingerprint = make_fingerprint(txn_date.isoformat(), amount, description, occurrence)
+
+        obj = Transaction(
+            user=self.user, date=txn_date, amount=amount, category=category,
+            description=description, fingerprint=fingerprint,
+        )
+        obj.exported_pk = exported_pk
+        return obj
+
+
+# ------------------------------------------------------------
+# WRITE
+# ------------------------------------------------------------
+def write_chunk(user, objs):
+    """Grava um bloco e devolve ``(criadas, duplicadas)``.
+
+    Uma única consulta pelo índice único ``(user, date, fingerprint)`` separa
+    as linhas já importadas, e outra por ``id`` as transações sem chave
+    exportadas desta mesma conta; ``ignore_conflicts`` cobre importações
+    concorrentes do mesmo arquivo. As linhas que a outra importação gravou
+    primeiro contam como duplicadas: depois do insert, só são criadas as
+    que estão no banco com o ``created_at`` atribuído aqui.
+    """
+    if not objs:
+        return 0, 0
+    fingerprints = {obj.fingerprint for obj in objs}
+    dates = [obj.date for obj in objs]
+    existing = set(
+        Transaction.objects.filter(
+            user=user, date__range=(min(dates), max(dates)), fingerprint__in=fingerprints,
+        ).values_list('date', 'fingerprint')
+    )
+    exported = {obj.exported_pk for obj in objs if getattr(obj, 'exported_pk', None)}
+    own = set(Transaction.objects.filter(user=user, pk__in=exported).values_list('pk', flat=True)) if exported else set()
+    new = []
+    for obj in objs:
+        key = (obj.date, obj.fingerprint)
+        if key not in existing and getattr(obj, 'exported_pk', None) not in own:
+            existing.add(key)
+            new.append(obj)
+    if not new:
+        return 0, len(objs)
+    with transaction.atomic():
+        Transaction.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        stored = set(
+            Transaction.objects.filter(
+                user=user, date__range=(min(dates), max(dates)), fingerprint__in={obj.fingerprint for obj in new},
+            ).values_list('date', 'fingerprint', 'created_at')
+        )
+    created = sum((obj.date, obj.fingerprint, obj.created_at) in stored for obj in new)
+    return created, len(objs) - created
+
+
+def import_transactions(user, stream, fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Importa um extrato de ``stream`` (texto) para ``user``."""
+    try:
+        parser = PARSERS[fmt]
+    except KeyError:
+        raise StatementError(f'Formato não suportado: {fmt!r}')
+
+    result = ImportResult()
+    chunk = []
+
+    def flush():
+        created, duplicates = write_chunk(user, chunk)
+        result.created += created
+        result.duplicates += duplicates
+        chunk.clear()
+
+    validate = RowValidator(user, flush=flush)
+    for line, row in parser(stream):
+        result.rows += 1
+        try:
+            chunk.append(validate(row))
+        except StatementError as e:
+            result.add_error(line, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    return result
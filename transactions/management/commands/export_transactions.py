@@ -0,0 +1,55 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.exporters import DEFAULT_CHUNK_SIZE, WRITERS, ExportError, export_transactions, parse_after, parse_date
+
+
+class Command(BaseCommand):
+    help = 'Exporta o histórico de transações de um usuário em CSV ou NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Email do usuário dono das transações')
+        parser.add_argument('--output', default='-', help='Arquivo de saída (padrão: saída padrão)')
+        parser.add_argument('--format', choices=tuple(WRITERS), default='csv')
+        parser.add_argument('--date-from', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--date-to', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--after', help='Continua depois da linha <data>,<id>')
+        parser.add_argument('--gzip', action='store_true', help='Comprime a saída com gzip')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=User.objects.normalize_email(options['user']))
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário não encontrado: {options["user"]}')
+
+        try:
+            chunks = export_transactions(
+                user, fmt=options['format'],
+                date_from=parse_date(options['date_from'], 'date-from') if options['date_from'] else None,
+                date_to=parse_date(options['date_to'], 'date-to') if options['date_to'] else None,
+                after=parse_after(options['after']) if options['after'] else None,
+                compress=options['gzip'], chunk_size=options['chunk_size'],
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        start = time.perf_counter()
+        written = 0
+        try:
+            output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        except OSError as e:
+            raise CommandError(str(e))
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        elapsed = time.perf_counter() - start
+        self.stderr.write(self.style.SUCCESS(f'{written:,} bytes em {elapsed:.2f}s'))
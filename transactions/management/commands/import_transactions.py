@@ -0,0 +1,41 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.importers import DEFAULT_CHUNK_SIZE, StatementError, detect_format, import_transactions
+
+
+class Command(BaseCommand):
+    help = 'Importa um extrato bancário (CSV ou OFX) para as transações de um usuário.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Caminho do arquivo do extrato')
+        parser.add_argument('--user', required=True, help='Email do usuário dono das transações')
+        parser.add_argument('--format', choices=('csv', 'ofx'), help='Formato do arquivo (padrão: pela extensão)')
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=User.objects.normalize_email(options['user']))
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário não encontrado: {options["user"]}')
+
+        fmt = options['format'] or detect_format(options['path'])
+        start = time.perf_counter()
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as stream:
+                result = import_transactions(user, stream, fmt=fmt, chunk_size=options['chunk_size'])
+        except (OSError, StatementError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        for error in result.errors:
+            self.stderr.write(f'Linha {error["line"]}: {error["error"]}')
+        rate = result.rows / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.rows} linhas em {elapsed:.2f}s ({rate:,.0f} linhas/s): '
+            f'{result.created} criadas, {result.duplicates} duplicadas, {result.invalid} inválidas'
+        ))
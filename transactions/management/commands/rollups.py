@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from jobs.registry import enqueue
+from transactions.rollups import rebuild, verify
+
+
+class Command(BaseCommand):
+    help = (
+        'Confere os totais por mês/categoria e os saldos com as transações; '
+        'com --rebuild, recalcula-os antes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recalcula os totais a partir das transações')
+        parser.add_argument('--background', action='store_true',
+                            help='Com --rebuild, enfileira o recálculo para os workers (manage.py run_workers)')
+        parser.add_argument('--user', help='Email de um usuário (padrão: todos)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            User = get_user_model()
+            try:
+                user = User.objects.get(email=User.objects.normalize_email(options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Usuário não encontrado: {options["user"]}')
+
+        using = options['database']
+        if options['rebuild'] and options['background']:
+            job = enqueue('transactions.rebuild_rollups', user_id=user and user.pk, database=using, using=using)
+            self.stdout.write(self.style.SUCCESS(f'Recálculo enfileirado: tarefa {job.pk}'))
+            return
+        if options['rebuild']:
+            start = time.perf_counter()
+            counts = rebuild(user, using=using)
+            summary = ', '.join(f'{table}: {rows}' for table, rows in counts.items())
+            self.stdout.write(f'Recalculado em {time.perf_counter() - start:.2f}s ({summary})')
+
+        start = time.perf_counter()
+        mismatches = verify(user, using=using)
+        elapsed = time.perf_counter() - start
+        for table, keys in mismatches.items():
+            for key in keys:
+                self.stderr.write(f'{table}: divergência em {key}')
+        if mismatches:
+            raise CommandError('Totais divergentes das transações; rode com --rebuild.')
+        self.stdout.write(self.style.SUCCESS(f'Totais conferidos em {elapsed:.2f}s: sem divergências'))
@@ -0,0 +1,91 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Transaction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.IntegerField(verbose_name="Valor (centavos)")),
+                ("date", models.DateField(verbose_name="Data")),
+                (
+                    "category",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Outros"),
+                            (1, "Salário"),
+                            (2, "Moradia"),
+                            (3, "Alimentação"),
+                            (4, "Transporte"),
+                            (5, "Saúde"),
+                            (6, "Educação"),
+                            (7, "Lazer"),
+                            (8, "Compras"),
+                            (9, "Serviços"),
+                            (10, "Investimentos"),
+                            (11, "Transferências"),
+                        ],
+                        default=0,
+                        verbose_name="Categoria",
+                    ),
+                ),
+                (
+                    "description",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Descrição"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Editado em"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transactions",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Transação",
+                "verbose_name_plural": "Transações",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "date", "id"], name="transaction_user_date_idx"
+                    ),
+                    models.Index(
+                        fields=["user", "category", "date", "id"],
+                        name="transaction_user_cat_date_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from core.search import CreateSearchIndex, SearchIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0003_transaction_user_updated_index"),
+    ]
+
+    operations = [
+        CreateSearchIndex(
+            model_name="transaction",
+            index=SearchIndex(("description",), scope="user"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from core.partitioning import MonthlyPartitions, PartitionTable
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0004_transaction_search_index"),
+    ]
+
+    operations = [
+        PartitionTable(
+            model_name="transaction",
+            partitioning=MonthlyPartitions("date"),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from transactions.rollups import CreateRollupTriggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0005_transaction_partitions"),
+        ("users", "0004_customuser_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Balance",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário",
+                    ),
+                ),
+                ("income", models.BigIntegerField(default=0, verbose_name="Entradas")),
+                ("expense", models.BigIntegerField(default=0, verbose_name="Saídas")),
+                ("count", models.IntegerField(default=0, verbose_name="Transações")),
+            ],
+            options={
+                "verbose_name": "Saldo",
+                "verbose_name_plural": "Saldos",
+            },
+        ),
+        migrations.CreateModel(
+            name="MonthlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(verbose_name="Mês")),
+                (
+                    "category",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Outros"),
+                            (1, "Salário"),
+                            (2, "Moradia"),
+                            (3, "Alimentação"),
+                            (4, "Transporte"),
+                            (5, "Saúde"),
+                            (6, "Educação"),
+                            (7, "Lazer"),
+                            (8, "Compras"),
+                            (9, "Serviços"),
+                            (10, "Investimentos"),
+                            (11, "Transferências"),
+                        ],
+                        verbose_name="Categoria",
+                    ),
+                ),
+                ("income", models.BigIntegerField(default=0, verbose_name="Entradas")),
+                ("expense", models.BigIntegerField(default=0, verbose_name="Saídas")),
+                ("count", models.IntegerField(default=0, verbose_name="Transações")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Total mensal",
+                "verbose_name_plural": "Totais mensais",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "month", "category"),
+                        name="rollup_user_month_category",
+                    )
+                ],
+            },
+        ),
+        CreateRollupTriggers(),
+    ]
@@ -1,3 +1,93 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+from core.partitioning import MonthlyPartitions
+from core.search import SearchIndex
+
+
+class Category(models.IntegerChoices):
+    OUTROS = 0, 'Outros'
+    SALARIO = 1, 'Salário'
+    MORADIA = 2, 'Moradia'
+    ALIMENTACAO = 3, 'Alimentação'
+    TRANSPORTE = 4, 'Transporte'
+    SAUDE = 5, 'Saúde'
+    EDUCACAO = 6, 'Educação'
+    LAZER = 7, 'Lazer'
+    COMPRAS = 8, 'Compras'
+    SERVICOS = 9, 'Serviços'
+    INVESTIMENTOS = 10, 'Investimentos'
+    TRANSFERENCIAS = 11, 'Transferências'
+
+
+class Transaction(models.Model):
+    # Sem db_index: o índice composto (user, date, id) já atende buscas por usuário.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='transactions', db_index=False, verbose_name='Usuário')
+    # Valor em centavos; negativo para saídas, positivo para entradas.
+    amount = models.IntegerField(verbose_name='Valor (centavos)')
+    date = models.DateField(verbose_name='Data')
+    category = models.PositiveSmallIntegerField(choices=Category.choices, default=Category.OUTROS, verbose_name='Categoria')
+    description = models.CharField(max_length=255, blank=True, verbose_name='Descrição')
+    # Chave natural de importação (FITID do OFX ou hash da linha do extrato); nula em lançamentos manuais.
+    fingerprint = models.CharField(max_length=32, null=True, blank=True, editable=False, verbose_name='Identificador de importação')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Editado em')
+
+    # Busca por palavras da descrição, indexada junto com o usuário.
+    search_index = SearchIndex(('description',), scope='user')
+    # Uma partição por mês no PostgreSQL; filtros por data descartam as demais.
+    partitioning = MonthlyPartitions('date')
+
+    def __str__(self):
+        return f'{self.date} {self.description} ({self.amount})'
+
+    class Meta:
+        verbose_name = 'Transação'
+        verbose_name_plural = 'Transações'
+        indexes = [
+            models.Index(fields=['user', 'date', 'id'], name='transaction_user_date_idx'),
+            models.Index(fields=['user', 'category', 'date', 'id'], name='transaction_user_cat_date_idx'),
+            # ETag da coleção: MAX(updated_at) e COUNT por usuário só pelo índice.
+            models.Index(fields=['user', 'updated_at'], name='transaction_user_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'fingerprint'], name='transaction_natural_key'),
+        ]
+
+
+class MonthlyRollup(models.Model):
+    """Totais de um usuário num mês e categoria, mantidos por triggers (``transactions.rollups``)."""
+
+    # DO_NOTHING: a exclusão do usuário apaga as transações (e os triggers mexem aqui) antes; ver signals.py.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+', db_index=False, verbose_name='Usuário')
+    month = models.DateField(verbose_name='Mês')
+    category = models.PositiveSmallIntegerField(choices=Category.choices, verbose_name='Categoria')
+    # Centavos; as saídas somadas em valor absoluto.
+    income = models.BigIntegerField(default=0, verbose_name='Entradas')
+    expense = models.BigIntegerField(default=0, verbose_name='Saídas')
+    count = models.IntegerField(default=0, verbose_name='Transações')
+
+    class Meta:
+        verbose_name = 'Total mensal'
+        verbose_name_plural = 'Totais mensais'
+        constraints = [
+            # Chave do upsert dos triggers; também atende os relatórios por (user, month).
+            models.UniqueConstraint(fields=['user', 'month', 'category'], name='rollup_user_month_category'),
+        ]
+
+
+class Balance(models.Model):
+    """Totais de todas as transações de um usuário, mantidos por triggers."""
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, primary_key=True, related_name='+', verbose_name='Usuário')
+    income = models.BigIntegerField(default=0, verbose_name='Entradas')
+    expense = models.BigIntegerField(default=0, verbose_name='Saídas')
+    count = models.IntegerField(default=0, verbose_name='Transações')
+
+    class Meta:
+        verbose_name = 'Saldo'
+        verbose_name_plural = 'Saldos'
+
+    @property
+    def balance(self):
+        return self.income - self.expense
@@ -0,0 +1,92 @@
+"""Relatórios do painel, lidos só de ``Balance`` e ``MonthlyRollup``.
+
+Cada consulta percorre, pelo índice ``(user, month, category)``, no máximo
+uma linha por mês e categoria do período; nenhuma lê transações.
+"""
+import re
+from datetime import date
+
+from django.db.models import F, Sum
+
+from .models import Balance, Category, MonthlyRollup
+from .rollups import TOTALS
+
+DEFAULT_MONTHS = 12
+MONTH_RE = re.compile(r'^(\d{4})-(\d{2})$')
+CATEGORY_LABELS = dict(Category.choices)
+
+
+class ReportError(ValueError):
+    pass
+
+
+def parse_month(value, name):
+    match = MONTH_RE.match(value.strip())
+    if not match or not 1 <= int(match[2]) <= 12:
+        raise ReportError(f'{name}: mês inválido {value!r} (use AAAA-MM).')
+    return date(int(match[1]), int(match[2]), 1)
+
+
+def month_range(params, default_months=None):
+    """``(início, fim)`` de ``month_from``/``month_to``; sem ``month_from``, os últimos ``default_months``."""
+    month_to = parse_month(params['month_to'], 'month_to') if params.get('month_to') else None
+    month_from = parse_month(params['month_from'], 'month_from') if params.get('month_from') else None
+    if month_from is None and default_months:
+        last = month_to or date.today().replace(day=1)
+        years, index = divmod(last.year * 12 + last.month - default_months, 12)
+        month_from = date(years, index + 1, 1)
+    if month_from and month_to and month_from > month_to:
+        raise ReportError('month_from deve ser anterior a month_to.')
+    return month_from, month_to
+
+
+def totals(row, prefix=''):
+    income, expense, count = (row[prefix + name] for name in TOTALS)
+    return {'income': income, 'expense': expense, 'net': income - expense, 'count': count}
+
+
+# ------------------------------------------------------------
+# CONSULTAS
+# ------------------------------------------------------------
+def balance_queryset(user):
+    return Balance.objects.filter(user=user).values(*TOTALS)
+
+
+def represent_balance(rows):
+    row = rows[0] if rows else dict.fromkeys(TOTALS, 0)
+    data = totals(row)
+    return {'balance': data.pop('net'), **data}
+
+
+def rollups(user, month_from=None, month_to=None):
+    queryset = MonthlyRollup.objects.filter(user=user)
+    if month_from:
+        queryset = queryset.filter(month__gte=month_from)
+    if month_to:
+        queryset = queryset.filter(month__lte=month_to)
+    return queryset
+
+
+def summed(queryset, key):
+    # Somas com outro nome: uma anotação não pode repetir o nome de um campo.
+    return queryset.values(key).annotate(
+        **{f'total_{name}': Sum(name) for name in TOTALS}
+    ).filter(total_count__gt=0).order_by(key)
+
+
+def monthly_queryset(user, month_from=None, month_to=None):
+    return summed(rollups(user, month_from, month_to), 'month')
+
+
+def represent_monthly(rows):
+    return [{'month': row['month'].strftime('%Y-%m'), **totals(row, 'total_')} for row in rows]
+
+
+def category_queryset(user, month_from=None, month_to=None):
+    # Maiores gastos primeiro; empate pela categoria, para uma ordem estável.
+    return summed(rollups(user, month_from, month_to), 'category').order_by(F('total_expense').desc(), 'category')
+
+
+def represent_categories(rows):
+    return [{'category': row['category'], 'label': CATEGORY_LABELS.get(row['category'], ''), **totals(row, 'total_')}
+            for row in rows]
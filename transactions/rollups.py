@@ -0,0 +1,264 @@
+"""Totais por usuário mantidos pelo próprio banco.
+
+``MonthlyRollup`` guarda entradas, saídas e quantidade por usuário, mês e
+categoria; ``Balance``, os mesmos totais por usuário. Os relatórios leem só
+essas tabelas: o custo depende de quantos meses e categorias o período tem,
+nunca de quantas transações o usuário lançou.
+
+Triggers criados por ``CreateRollupTriggers`` aplicam a diferença de cada
+INSERT, UPDATE e DELETE em ``transactions_transaction`` na mesma transação
+da escrita — inclusive do ``bulk_create`` da importação e de
+``QuerySet.update``/``delete``, que não disparam sinais do Django:
+
+- PostgreSQL: triggers por comando com tabelas de transição, que somam as
+  linhas afetadas e fazem um ``INSERT ... ON CONFLICT DO UPDATE`` por
+  ``(usuário, mês, categoria)``; uma importação de mil linhas é um upsert
+  agrupado, não mil;
+- SQLite: triggers por linha com o mesmo upsert.
+
+UPDATE que não muda valor, data, categoria nem usuário (ex. só a descrição)
+não toca os totais. Linhas zeradas por DELETE ficam na tabela com
+``count = 0``.
+
+Em outros bancos não há triggers: ``manage.py rollups --rebuild`` recalcula
+tudo a partir das transações, e ``manage.py rollups`` confere os totais.
+
+A retenção de ``manage.py partitions`` (``core.partitioning``) desanexa meses
+inteiros sem passar pelos triggers: os totais desses meses continuam em
+``MonthlyRollup`` e no saldo, que segue contando o histórico arquivado.
+Por isso ``rebuild`` e ``verify`` recalculam e conferem só os meses ainda
+anexados à tabela de transações, e o saldo é a soma de ``MonthlyRollup``.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.operations.base import Operation
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from .models import Balance, MonthlyRollup, Transaction
+
+TOTALS = ('income', 'expense', 'count')
+EVENTS = ('insert', 'update', 'delete')
+
+
+def income_sum(field='amount'):
+    return Sum(Case(When(**{f'{field}__gt': 0}, then=F(field)), default=Value(0)))
+
+
+def expense_sum(field='amount'):
+    return Sum(Case(When(**{f'{field}__lt': 0}, then=-F(field)), default=Value(0)))
+
+
+# ------------------------------------------------------------
+# DDL
+# ------------------------------------------------------------
+def table_names(apps, connection):
+    qn = connection.ops.quote_name
+    return qn, *(apps.get_model('transactions', name)._meta.db_table
+                 for name in ('Transaction', 'MonthlyRollup', 'Balance'))
+
+
+def upsert_sql(qn, table, keys, values):
+    """``INSERT ... ON CONFLICT DO UPDATE`` que soma ``values`` aos totais da chave."""
+    columns = ', '.join(qn(column) for column in (*keys, *TOTALS))
+    updates = ', '.join(f'{qn(column)} = {qn(table)}.{qn(column)} + excluded.{qn(column)}' for column in TOTALS)
+    conflict = ', '.join(qn(column) for column in keys)
+    return (f'INSERT INTO {qn(table)} ({columns}) {values} '
+            f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}')
+
+
+def postgresql_sql(qn, table, rollup, balance):
+    for event in EVENTS:
+        sources = []
+        if event != 'insert':
+            sources.append(('OLD', 'old_rows', -1))
+        if event != 'delete':
+            sources.append(('NEW', 'new_rows', 1))
+        delta = ' UNION ALL '.join(
+            f'SELECT user_id, date, category, amount, {sign} AS sign FROM {rows}' for _, rows, sign in sources
+        )
+        totals = 'SUM(sign * GREATEST(amount, 0)), SUM(sign * GREATEST(-amount, 0)), SUM(sign)'
+        # Sem HAVING, um UPDATE só da descrição reescreveria as linhas dos totais.
+        changed = ('HAVING SUM(sign * GREATEST(amount, 0)) <> 0 OR SUM(sign * GREATEST(-amount, 0)) <> 0 '
+                   'OR SUM(sign) <> 0')
+        # Chaves em ordem: dois comandos concorrentes travam as linhas na mesma sequência.
+        monthly = upsert_sql(qn, rollup, ('user_id', 'month', 'category'), (
+            f"SELECT user_id, date_trunc('month', date)::date, category, {totals} FROM ({delta}) AS delta "
+            f'GROUP BY 1, 2, 3 {changed} ORDER BY 1, 2, 3'
+        ))
+        total = upsert_sql(qn, balance, ('user_id',), (
+            f'SELECT user_id, {totals} FROM ({delta}) AS delta GROUP BY 1 {changed} ORDER BY 1'
+        ))
+        function = qn(f'{table}_rollup_{event}')
+        yield (f'CREATE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$ '
+               f'BEGIN {monthly}; {total}; RETURN NULL; END $$')
+        referencing = ' '.join(f'{kind} TABLE AS {rows}' for kind, rows, _ in sources)
+        yield (f'CREATE TRIGGER {qn(f"{table}_rollup_{event}")} AFTER {event.upper()} ON {qn(table)} '
+               f'REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {function}()')
+
+
+def sqlite_sql(qn, table, rollup, balance):
+    def apply(row, sign):
+        amount = f'{row}.{qn("amount")}'
+        totals = f'{sign} * max({amount}, 0), {sign} * max(-{amount}, 0), {sign}'
+        month = f"strftime('%Y-%m-01', {row}.{qn('date')})"
+        monthly = upsert_sql(qn, rollup, ('user_id', 'month', 'category'),
+                             f'VALUES ({row}.{qn("user_id")}, {month}, {row}.{qn("category")}, {totals})')
+        total = upsert_sql(qn, balance, ('user_id',), f'VALUES ({row}.{qn("user_id")}, {totals})')
+        return f'{monthly}; {total};'
+
+    tracked = ('user_id', 'amount', 'date', 'category')
+    changed = ' OR '.join(f'old.{qn(column)} IS NOT new.{qn(column)}' for column in tracked)
+    yield (f'CREATE TRIGGER {qn(f"{table}_rollup_insert")} AFTER INSERT ON {qn(table)} '
+           f'BEGIN {apply("new", 1)} END')
+    yield (f'CREATE TRIGGER {qn(f"{table}_rollup_update")} AFTER UPDATE OF {", ".join(map(qn, tracked))} '
+           f'ON {qn(table)} WHEN {changed} BEGIN {apply("old", -1)} {apply("new", 1)} END')
+    yield (f'CREATE TRIGGER {qn(f"{table}_rollup_delete")} AFTER DELETE ON {qn(table)} '
+           f'BEGIN {apply("old", -1)} END')
+
+
+def create_sql(apps, connection):
+    qn, table, rollup, balance = table_names(apps, connection)
+    if connection.vendor == 'postgresql':
+        yield from postgresql_sql(qn, table, rollup, balance)
+    elif connection.vendor == 'sqlite':
+        yield from sqlite_sql(qn, table, rollup, balance)
+
+
+def drop_sql(apps, connection):
+    qn, table, _, _ = table_names(apps, connection)
+    for event in EVENTS:
+        name = qn(f'{table}_rollup_{event}')
+        if connection.vendor == 'postgresql':
+            yield f'DROP TRIGGER IF EXISTS {name} ON {qn(table)}'
+            yield f'DROP FUNCTION IF EXISTS {name}()'
+        elif connection.vendor == 'sqlite':
+            yield f'DROP TRIGGER IF EXISTS {name}'
+
+
+class CreateRollupTriggers(Operation):
+    """Cria os triggers que mantêm ``MonthlyRollup`` e ``Balance`` e os preenche com as transações existentes.
+
+    Em bancos sem suporte só preenche: os totais não acompanham as escritas.
+    """
+
+    reversible = True
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        apps = to_state.apps
+        model = apps.get_model(app_label, 'Transaction')
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            for sql in create_sql(apps, schema_editor.connection):
+                schema_editor.execute(sql)
+            # Transações anteriores aos triggers.
+            transactions = model._default_manager.using(schema_editor.connection.alias)
+            with schema_editor.connection.cursor() as cursor:
+                fill(cursor, apps.get_model(app_label, 'MonthlyRollup'), rollup_totals(transactions), ROLLUP_KEYS)
+                fill(cursor, apps.get_model(app_label, 'Balance'), balance_totals(transactions), BALANCE_KEYS)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, 'Transaction')
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            for sql in drop_sql(from_state.apps, schema_editor.connection):
+                schema_editor.execute(sql)
+
+    def describe(self):
+        return 'Create triggers that maintain transaction rollups'
+
+    @property
+    def migration_name_fragment(self):
+        return 'rollup_triggers'
+
+
+# ------------------------------------------------------------
+# RECONSTRUÇÃO E CONFERÊNCIA
+# ------------------------------------------------------------
+ROLLUP_KEYS = ('user', 'category', 'month')
+BALANCE_KEYS = ('user',)
+
+
+def rollup_totals(transactions):
+    """Totais por ``(usuário, categoria, mês)`` calculados de ``transactions``."""
+    return transactions.values('user', 'category').annotate(
+        month=TruncMonth('date'), income=income_sum(), expense=expense_sum(), count=Count('id'),
+    ).order_by()
+
+
+def balance_totals(transactions):
+    return transactions.values('user').annotate(income=income_sum(), expense=expense_sum(), count=Count('id')).order_by()
+
+
+def rollup_balance_totals(rollups):
+    """Totais por usuário somados de ``rollups``, inclusive dos meses já retirados das transações."""
+    return rollups.values('user').annotate(
+        total_income=Sum('income'), total_expense=Sum('expense'), total_count=Sum('count'),
+    ).order_by()
+
+
+def fill(cursor, model, totals, keys):
+    """Grava ``totals`` em ``model`` com um ``INSERT ... SELECT``; devolve as linhas."""
+    qn = cursor.db.ops.quote_name
+    # As colunas do SELECT saem na ordem de ``rollup_totals``/``balance_totals``: chaves e totais.
+    columns = ', '.join(qn(model._meta.get_field(name).column) for name in (*keys, *TOTALS))
+    sql, params = totals.query.sql_with_params()
+    cursor.execute(f'INSERT INTO {qn(model._meta.db_table)} ({columns}) {sql}', params)
+    return cursor.rowcount
+
+
+def user_filter(queryset, user):
+    return queryset if user is None else queryset.filter(user=user)
+
+
+def retained_rollups(using, user=None):
+    """``MonthlyRollup`` dos meses ainda anexados à tabela de transações (todos, sem retenção)."""
+    rollups = user_filter(MonthlyRollup.objects.using(using), user)
+    start = Transaction.partitioning.retained_from(Transaction, connections[using])
+    return rollups if start is None else rollups.filter(month__gte=start)
+
+
+def rebuild(user=None, using=DEFAULT_DB_ALIAS):
+    """Recalcula os totais (de um usuário ou de todos) a partir das transações.
+
+    Só os meses ainda anexados à tabela são recalculados; o saldo é somado de
+    ``MonthlyRollup``, com os meses retirados. No PostgreSQL trava as escritas
+    em transações enquanto roda: um delta aplicado por trigger no meio da
+    troca se perderia. Devolve ``{tabela: linhas}``.
+    """
+    connection = connections[using]
+    transactions = user_filter(Transaction.objects.using(using), user)
+    counts = {}
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'LOCK TABLE {connection.ops.quote_name(Transaction._meta.db_table)} IN SHARE MODE')
+        retained_rollups(using, user)._raw_delete(using)
+        counts[MonthlyRollup._meta.db_table] = fill(cursor, MonthlyRollup, rollup_totals(transactions), ROLLUP_KEYS)
+        user_filter(Balance.objects.using(using), user)._raw_delete(using)
+        totals = rollup_balance_totals(user_filter(MonthlyRollup.objects.using(using), user))
+        counts[Balance._meta.db_table] = fill(cursor, Balance, totals, BALANCE_KEYS)
+    return counts
+
+
+def verify(user=None, using=DEFAULT_DB_ALIAS, limit=20):
+    """Chaves cujos totais gravados diferem dos calculados (até ``limit`` por tabela).
+
+    ``MonthlyRollup`` é conferido com as transações nos meses ainda anexados;
+    ``Balance``, com a soma de ``MonthlyRollup``.
+    """
+    transactions = user_filter(Transaction.objects.using(using), user)
+    balances = rollup_balance_totals(user_filter(MonthlyRollup.objects.using(using), user)).exclude(total_count=0)
+    mismatches = {}
+    for model, keys, current, expected in (
+        (MonthlyRollup, ROLLUP_KEYS, retained_rollups(using, user),
+         rollup_totals(transactions).values_list(*ROLLUP_KEYS, *TOTALS)),
+        (Balance, BALANCE_KEYS, user_filter(Balance.objects.using(using), user),
+         balances.values_list(*BALANCE_KEYS, 'total_income', 'total_expense', 'total_count')),
+    ):
+        # Linhas zeradas por DELETE não têm transação correspondente.
+        current = current.exclude(count=0).values_list(*keys, *TOTALS)
+        rows = [*expected.difference(current)[:limit], *current.difference(expected)[:limit]]
+        keys = sorted({row[:-len(TOTALS)] for row in rows}, key=str)
+        if keys:
+            mismatches[model._meta.db_table] = keys
+    return mismatches
@@ -0,0 +1,21 @@
+from rest_framework import serializers
+from core.partitioning import retention_cutoff
+from core.serializers import ModelSerializer
+from .models import Transaction
+
+
+class TransactionSerializer(ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
+    class Meta:
+        model = Transaction
+        fields = ('id', 'user', 'amount', 'date', 'category', 'description',
+                  'created_at', 'updated_at')
+        read_only_fields = ('created_at', 'updated_at')
+
+    def validate_date(self, value):
+        # Meses anteriores ao corte já foram retirados da tabela: o INSERT não teria partição.
+        cutoff = retention_cutoff()
+        if cutoff is not None and value < cutoff:
+            raise serializers.ValidationError(f'Data anterior ao período mantido (a partir de {cutoff.isoformat()}).')
+        return value
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Balance, MonthlyRollup
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def delete_user_rollups(sender, instance, using, **kwargs):
+    # Depois das transações do usuário: apagar antes deixaria os triggers recriarem as linhas.
+    for model in (MonthlyRollup, Balance):
+        model.objects.using(using).filter(user_id=instance.pk)._raw_delete(using)
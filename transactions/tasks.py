@@ -0,0 +1,10 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from jobs.registry import task
+from .rollups import rebuild, verify
+
+
+@task('transactions.rebuild_rollups')
+def rebuild_rollups(job, user_id=None, database=DEFAULT_DB_ALIAS):
+    """``manage.py rollups --rebuild --background``: recalcula e confere os totais fora do comando."""
+    return {'rows': rebuild(user_id, using=database), 'mismatches': verify(user_id, using=database)}
@@ -1,3 +1,926 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.partitioning import add_months
+from jobs.models import Job, JobStatus
+from jobs.worker import Worker
+from . import analytics, async_views, views
+from .exporters import accepts_gzip, encode_rows
+from .importers import RowValidator, import_transactions, parse_amount, write_chunk
+from .models import Balance, Category, MonthlyRollup, Transaction
+from .rollups import verify
+from .serializers import TransactionSerializer
+
+
+class TransactionAPITests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email='ana@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='bia@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, user, **kwargs):
+        data = {'amount': -1500, 'date': date(2024, 1, 10), 'category': Category.ALIMENTACAO,
+                'description': 'Mercado'}
+        data.update(kwargs)
+        return Transaction.objects.create(user=user, **data)
+
+    def test_list_only_own_transactions(self):
+        """Testa se a listagem retorna apenas as transações do usuário autenticado"""
+        own = self.create(self.user)
+        self.create(self.other)
+
+        response = self.client.get('/api/v1/transactions/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['id'] for t in response.data['results']], [own.id])
+
+    @override_settings(PARTITIONING={'RETENTION_MONTHS': 1})
+    def test_dates_before_retention_are_rejected(self):
+        """Testa se criar ou mover uma transação para um mês já retirado pela retenção responde 400"""
+        cutoff = add_months(date.today().replace(day=1), -1)
+        kept = self.create(self.user, date=cutoff)
+
+        created = self.client.post('/api/v1/transactions/', {'amount': -100, 'date': cutoff - timedelta(days=1)})
+        moved = self.client.patch(f'/api/v1/transaction/{kept.pk}/', {'date': cutoff - timedelta(days=1)})
+
+        self.assertEqual((created.status_code, moved.status_code), (400, 400))
+        self.assertIn('date', created.data)
+        self.assertEqual(Transaction.objects.get().date, cutoff)
+
+    def test_list_ordered_by_date_desc(self):
+        """Testa a ordenação padrão por data decrescente"""
+        older = self.create(self.user, date=date(2024, 1, 1))
+        newer = self.create(self.user, date=date(2024, 2, 1))
+
+        response = self.client.get('/api/v1/transactions/')
+
+        self.assertEqual([t['id'] for t in response.data['results']], [newer.id, older.id])
+
+    def test_filter_by_category_and_date(self):
+        """Testa os filtros por categoria e intervalo de datas"""
+        match = self.create(self.user, category=Category.LAZER, date=date(2024, 3, 5))
+        self.create(self.user, category=Category.LAZER, date=date(2023, 3, 5))
+        self.create(self.user, category=Category.SAUDE, date=date(2024, 3, 5))
+
+        response = self.client.get('/api/v1/transactions/', {
+            'category': Category.LAZER, 'date__gte': '2024-01-01', 'date__lte': '2024-12-31',
+        })
+
+        self.assertEqual([t['id'] for t in response.data['results']], [match.id])
+
+    def test_unindexed_ordering_is_ignored(self):
+        """Testa se ordenações sem índice (ex.: amount) são ignoradas"""
+        first = self.create(self.user, amount=100, date=date(2024, 1, 2))
+        second = self.create(self.user, amount=900, date=date(2024, 1, 1))
+
+        response = self.client.get('/api/v1/transactions/', {'ordering': '-amount'})
+
+        self.assertEqual([t['id'] for t in response.data['results']], [first.id, second.id])
+
+    def test_create_assigns_authenticated_user(self):
+        """Testa se a transação criada pertence ao usuário autenticado"""
+        response = self.client.post('/api/v1/transactions/', {
+            'amount': 250000, 'date': '2024-05-05', 'category': Category.SALARIO,
+            'description': 'Salário',
+        })
+
+        self.assertEqual(response.status_code, 201)
+        transaction = Transaction.objects.get(pk=response.data['id'])
+        self.assertEqual(transaction.user, self.user)
+        self.assertEqual(transaction.amount, 250000)
+
+    def test_cannot_access_other_user_transaction(self):
+        """Testa se o detalhe de transação de outro usuário retorna 404"""
+        foreign = self.create(self.other)
+
+        response = self.client.get(f'/api/v1/transaction/{foreign.id}/')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_fast_read_matches_model_serializer_bytes(self):
+        """Testa se listagem e detalhe por .values() geram os mesmos bytes do ModelSerializer"""
+        self.create(self.user, description='Café\u2029 "especial"')
+        last = self.create(self.user, date=date(2024, 2, 1), category=Category.SALARIO, amount=500000, description='')
+
+        response = self.client.get('/api/v1/transactions/')
+        expected = JSONRenderer().render({
+            'next': None, 'previous': None,
+            'results': TransactionSerializer(Transaction.objects.order_by('-date', '-id'), many=True).data,
+        })
+        self.assertEqual(response.content, expected)
+
+        response = self.client.get(f'/api/v1/transaction/{last.pk}/')
+        self.assertEqual(response.content, JSONRenderer().render(TransactionSerializer(last).data))
+
+    def test_list_query_uses_composite_index(self):
+        """Testa se a consulta de listagem usa o índice (user, date)"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plano verificado apenas no SQLite')
+        plan = Transaction.objects.filter(user=self.user).order_by('-date', '-id').explain()
+
+        self.assertIn('transaction_user_date_idx', plan)
+
+    def test_search_description_by_words(self):
+        """Testa a busca por palavras da descrição, restrita ao usuário"""
+        market = self.create(self.user, description='Mercado São Jorge')
+        self.create(self.user, description='Farmácia')
+        self.create(self.other, description='Mercado')
+        renamed = self.create(self.user, description='Padaria')
+
+        def search(term):
+            response = self.client.get('/api/v1/transactions/', {'search': term})
+            return {t['id'] for t in response.data['results']}
+
+        self.assertEqual(search('mercado'), {market.id})
+        self.assertEqual(search('JORGE, mercado'), {market.id})
+        self.assertEqual(search('mercado farmácia'), set())
+        self.assertEqual(search('merc'), set())
+        self.assertEqual(search('!!'), set())
+
+        # O índice acompanha UPDATE e DELETE.
+        Transaction.objects.filter(pk=renamed.pk).update(description='Mercado Central')
+        self.assertEqual(search('mercado'), {market.id, renamed.id})
+        market.delete()
+        self.assertEqual(search('mercado'), {renamed.id})
+
+    def test_search_uses_fulltext_index(self):
+        """Testa se a busca consulta o índice de texto em vez de varrer a descrição"""
+        queryset = Transaction.search_index.filter(
+            Transaction.objects.filter(user=self.user), ['mercado'], scope=self.user.pk,
+        )
+        sql = str(queryset.query)
+
+        self.assertNotIn('LIKE', sql.upper())
+        if connection.vendor == 'sqlite':
+            self.assertIn('transactions_transaction_search', sql)
+            self.assertIn(f'{{user_id}} : "{self.user.pk}"', sql)
+        elif connection.vendor == 'postgresql':
+            # Numa tabela quase vazia o planejador prefere o btree; verifica a forma da consulta.
+            self.assertIn(f"\"search_vector\" @@ (to_tsquery('simple'::regconfig, mercado) && '={self.user.pk}'::tsquery)", sql)
+
+
+CSV_STATEMENT = """date;amount;description;category
+2024-01-10;-15,90;Padaria;Alimentação
+2024-01-10;-15,90;Padaria;Alimentação
+11/01/2024;3.500,00;Salário;1
+2024-01-12;abc;Valor inválido;
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240110120000[-3:BRT]<TRNAMT>-42.50<FITID>A1<MEMO>Farmácia</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240115
+<TRNAMT>100.00
+<FITID>A2
+<NAME>Pix recebido
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class TransactionConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.transaction = Transaction.objects.create(
+            user=self.user, amount=-1500, date=date(2024, 1, 10), category=Category.ALIMENTACAO,
+        )
+        self.url = f'/api/v1/transaction/{self.transaction.pk}/'
+
+    def test_list_etag_changes_with_collection(self):
+        """Testa o ETag da coleção: 304 sem mudanças, novo ETag após criar ou excluir"""
+        etag = self.client.get('/api/v1/transactions/')['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/transactions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Filtros fazem parte do ETag.
+        filtered = self.client.get('/api/v1/transactions/', {'category': Category.LAZER}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(filtered.status_code, 200)
+
+        other = Transaction.objects.create(user=self.user, amount=100, date=date(2024, 1, 11))
+        response = self.client.get('/api/v1/transactions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        other.delete()
+        self.assertEqual(self.client.get('/api/v1/transactions/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_not_modified(self):
+        """Testa o 304 por If-None-Match e If-Modified-Since no detalhe"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        self.client.patch(self.url, {'description': 'Feira'})
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_if_match_on_patch_and_delete(self):
+        """Testa a concorrência otimista com If-Match em PATCH e DELETE"""
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.patch(self.url, {'description': 'Feira'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        stale = self.client.patch(self.url, {'description': 'Outra'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(self.client.delete(self.url, HTTP_IF_MATCH=etag).status_code, 412)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.description, 'Feira')
+
+        self.assertEqual(self.client.delete(self.url, HTTP_IF_MATCH=response['ETag']).status_code, 204)
+
+    def test_if_match_checked_against_locked_row(self):
+        """Testa o 412 quando outra escrita chega entre a conferência do If-Match e a leitura do objeto"""
+        etag = self.client.get(self.url)['ETag']
+        get_object = views.TransactionRetrieveUpdateDestroyView.get_object
+
+        def concurrent_get_object(view):
+            Transaction.objects.filter(pk=self.transaction.pk).update(description='Outra', updated_at=timezone.now())
+            return get_object(view)
+
+        with mock.patch.object(views.TransactionRetrieveUpdateDestroyView, 'get_object', concurrent_get_object):
+            response = self.client.patch(self.url, {'description': 'Feira'}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(response.status_code, 412)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.description, 'Outra')
+
+
+class TransactionBatchTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email='ana@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='bia@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.edited = Transaction.objects.create(user=self.user, amount=-1500, date=date(2024, 1, 10))
+        self.removed = Transaction.objects.create(user=self.user, amount=-700, date=date(2024, 1, 12))
+
+    def batch(self, operations, **headers):
+        return self.client.post('/api/v1/transactions/batch/', {'operations': operations}, format='json', **headers)
+
+    def test_batch_applies_all_operations(self):
+        """Testa um lote com criação, edição e exclusão, e os resultados por operação"""
+        response = self.batch([
+            {'op': 'create', 'data': {'amount': 350000, 'date': '2024-01-05', 'category': Category.SALARIO}},
+            {'op': 'update', 'id': self.edited.pk, 'data': {'description': 'Feira', 'category': Category.ALIMENTACAO}},
+            {'op': 'delete', 'id': self.removed.pk},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        created, updated, deleted = response.data['results']
+        self.assertEqual((created['status'], updated['status'], deleted['status']), (201, 200, 204))
+        self.assertEqual(Transaction.objects.get(pk=created['id']).amount, 350000)
+        self.assertEqual(updated['data']['description'], 'Feira')
+        self.edited.refresh_from_db()
+        self.assertEqual((self.edited.description, self.edited.amount), ('Feira', -1500))
+        self.assertGreater(self.edited.updated_at, self.edited.created_at)
+        self.assertFalse(Transaction.objects.filter(pk=self.removed.pk).exists())
+        self.assertEqual(Balance.objects.get(user=self.user).balance, 350000 - 1500)
+        self.assertEqual(verify(), {})
+
+    def test_invalid_operation_rolls_back_batch(self):
+        """Testa se um erro em qualquer operação impede todo o lote e aparece no item"""
+        foreign = Transaction.objects.create(user=self.other, amount=-100, date=date(2024, 1, 1))
+
+        response = self.batch([
+            {'op': 'create', 'data': {'amount': 100, 'date': '2024-01-05'}},
+            {'op': 'update', 'id': self.edited.pk, 'data': {'date': 'ontem'}},
+            {'op': 'delete', 'id': foreign.pk},
+            {'op': 'delete', 'id': self.removed.pk},
+            {'op': 'delete', 'id': self.removed.pk},
+            {'op': 'move'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([item['status'] for item in response.data['results']], [424, 400, 404, 424, 400, 400])
+        self.assertIn('date', response.data['results'][1]['errors'])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+        self.assertTrue(Transaction.objects.filter(pk=foreign.pk).exists())
+        self.assertEqual(self.client.post('/api/v1/transactions/batch/', {'operations': []}, format='json').status_code, 400)
+
+    def test_batch_queries_do_not_grow_with_size(self):
+        """Testa se o lote usa o mesmo número de consultas com 3 ou 30 operações por tipo"""
+        def operations(count):
+            targets = [Transaction.objects.create(user=self.user, amount=-100, date=date(2024, 2, 1))
+                       for _ in range(2 * count)]
+            return [
+                *[{'op': 'create', 'data': {'amount': -100, 'date': '2024-02-02'}}] * count,
+                *({'op': 'update', 'id': t.pk, 'data': {'amount': -200}} for t in targets[:count]),
+                *({'op': 'delete', 'id': t.pk} for t in targets[count:]),
+            ]
+
+        small, large = operations(3), operations(30)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.batch(small).status_code, 200)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.batch(large).status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+    def test_retry_with_idempotency_key(self):
+        """Testa se repetir o lote com a mesma Idempotency-Key não o aplica de novo"""
+        operations = [{'op': 'create', 'data': {'amount': -990, 'date': '2024-01-05'}},
+                      {'op': 'delete', 'id': self.removed.pk}]
+
+        first = self.batch(operations, HTTP_IDEMPOTENCY_KEY='sync-1')
+        retry = self.batch(operations, HTTP_IDEMPOTENCY_KEY='sync-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual((retry.status_code, retry.content), (200, first.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Transaction.objects.filter(user=self.user, amount=-990).count(), 1)
+        # Sem a chave, o mesmo lote é aplicado de novo e a exclusão já não encontra a transação.
+        self.assertEqual(self.batch(operations).data['results'][1]['status'], 404)
+
+
+class TransactionImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+
+    def test_parse_amount_formats(self):
+        """Testa a conversão de valores em formatos variados para centavos"""
+        self.assertEqual(parse_amount('1.234,56'), 123456)
+        self.assertEqual(parse_amount('1,234.56'), 123456)
+        self.assertEqual(parse_amount('-10.5'), -1050)
+        self.assertEqual(parse_amount('R$ 7,00'), 700)
+
+    def test_import_csv(self):
+        """Testa a importação de CSV, incluindo linhas repetidas e inválidas"""
+        result = import_transactions(self.user, io.StringIO(CSV_STATEMENT), chunk_size=2)
+
+        self.assertEqual((result.rows, result.created, result.duplicates, result.invalid), (4, 3, 0, 1))
+        self.assertEqual(result.errors[0]['line'], 5)
+        self.assertEqual(Transaction.objects.filter(user=self.user, amount=-1590).count(), 2)
+        salary = Transaction.objects.get(user=self.user, amount=350000)
+        self.assertEqual((salary.date, salary.category), (date(2024, 1, 11), Category.SALARIO))
+
+    def test_reimport_is_deduplicated(self):
+        """Testa se reimportar o mesmo extrato não duplica transações"""
+        import_transactions(self.user, io.StringIO(CSV_STATEMENT))
+        result = import_transactions(self.user, io.StringIO(CSV_STATEMENT))
+
+        self.assertEqual((result.created, result.duplicates), (0, 3))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+
+    def test_out_of_order_duplicates_are_kept(self):
+        """Testa se linhas idênticas separadas por outra data (extrato fora de ordem) são todas importadas"""
+        statement = ('date;amount;description\n2024-01-10;-15,90;Padaria\n2024-01-11;-8,00;Café\n'
+                     '2024-01-10;-15,90;Padaria\n')
+
+        result = import_transactions(self.user, io.StringIO(statement))
+        again = import_transactions(self.user, io.StringIO(statement))
+
+        self.assertEqual((result.created, result.duplicates), (3, 0))
+        self.assertEqual((again.created, again.duplicates), (0, 3))
+        self.assertEqual(Transaction.objects.filter(user=self.user, amount=-1590).count(), 2)
+
+    def test_out_of_order_duplicates_across_chunks(self):
+        """Testa se a data que reaparece depois de gravado o bloco continua a contagem das linhas já importadas"""
+        statement = ('date;amount;description\n2024-01-10;-15,90;Padaria\n2024-01-11;-8,00;Café\n'
+                     '2024-01-10;-15,90;Padaria\n2024-01-12;-8,00;Café\n2024-01-10;-15,90;Padaria\n')
+
+        result = import_transactions(self.user, io.StringIO(statement), chunk_size=1)
+        again = import_transactions(self.user, io.StringIO(statement), chunk_size=2)
+
+        self.assertEqual((result.created, result.duplicates), (5, 0))
+        self.assertEqual((again.created, again.duplicates), (0, 5))
+        self.assertEqual(Transaction.objects.filter(user=self.user, amount=-1590).count(), 3)
+
+    def test_occurrences_kept_only_for_current_date(self):
+        """Testa se, em extrato ordenado, o contador de ocorrências guarda só a data corrente e não consulta o banco"""
+        validate = RowValidator(self.user)
+        start = date(2024, 1, 31)
+
+        with self.assertNumQueries(0):
+            for days in range(30):
+                for _ in range(2):
+                    validate({'date': str(start - timedelta(days=days)), 'amount': '-15,90', 'description': 'Padaria'})
+
+        self.assertEqual(validate._occurrences, {(-1590, 'Padaria'): 2})
+
+    def test_concurrent_import_rows_are_not_counted_as_created(self):
+        """Testa se linhas gravadas por uma importação concorrente entre a checagem e o insert contam como duplicadas"""
+        validate = RowValidator(self.user)
+        objs = [validate({'date': '2024-01-10', 'amount': '-15,90', 'description': 'Padaria'}),
+                validate({'date': '2024-01-10', 'amount': '-8,00', 'description': 'Café'})]
+        bulk_create = Transaction.objects.bulk_create
+
+        def concurrent(new, **kwargs):
+            Transaction.objects.create(user=self.user, date=objs[0].date, amount=objs[0].amount,
+                                       description=objs[0].description, fingerprint=objs[0].fingerprint)
+            return bulk_create(new, **kwargs)
+
+        with mock.patch.object(Transaction.objects, 'bulk_create', side_effect=concurrent):
+            created, duplicates = write_chunk(self.user, objs)
+
+        self.assertEqual((created, duplicates), (1, 1))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    @override_settings(PARTITIONING={'RETENTION_MONTHS': 1})
+    def test_dates_before_retention_are_invalid_rows(self):
+        """Testa se linhas de meses já retirados pela retenção são recusadas na importação"""
+        cutoff = add_months(date.today().replace(day=1), -1)
+        statement = f'date;amount\n{cutoff - timedelta(days=1)};-10,00\n{cutoff};-20,00\n'
+
+        result = import_transactions(self.user, io.StringIO(statement))
+
+        self.assertEqual((result.created, result.invalid), (1, 1))
+        self.assertEqual(result.errors[0]['line'], 2)
+
+    def test_import_ofx(self):
+        """Testa a importação de OFX em SGML, com tags em uma ou várias linhas"""
+        result = import_transactions(self.user, io.StringIO(OFX_STATEMENT), fmt='ofx')
+        again = import_transactions(self.user, io.StringIO(OFX_STATEMENT), fmt='ofx')
+
+        self.assertEqual((result.created, again.duplicates), (2, 2))
+        pharmacy = Transaction.objects.get(user=self.user, amount=-4250)
+        self.assertEqual((pharmacy.date, pharmacy.description), (date(2024, 1, 10), 'Farmácia'))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_import_endpoint(self):
+        """Testa o endpoint de importação com upload gravado em disco"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        upload = SimpleUploadedFile('extrato.csv', CSV_STATEMENT.encode('utf-8'))
+
+        response = client.post('/api/v1/transactions/import/', {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['invalid'], 1)
+
+    def test_import_endpoint_requires_file(self):
+        """Testa se o endpoint de importação exige o arquivo"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post('/api/v1/transactions/import/', {}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_command(self):
+        """Testa o comando manage.py import_transactions"""
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'extrato.ofx')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(OFX_STATEMENT)
+
+            call_command('import_transactions', path, user='ana@example.com', stdout=out)
+
+        self.assertIn('2 criadas', out.getvalue())
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email='ana@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='bia@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rows = [
+            Transaction.objects.create(user=self.user, amount=-1590, date=date(2024, 1, 10),
+                                       category=Category.ALIMENTACAO, description='Padaria "Pão, Leite"'),
+            Transaction.objects.create(user=self.user, amount=350000, date=date(2024, 1, 5),
+                                       category=Category.SALARIO, description='Salário'),
+            Transaction.objects.create(user=self.user, amount=-5, date=date(2024, 2, 1), description='Taxa'),
+        ]
+        Transaction.objects.create(user=self.other, amount=-100, date=date(2024, 1, 10))
+
+    def export(self, params=None, headers=None):
+        response = self.client.get('/api/v1/transactions/export/', params or {}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_export_csv_can_be_reimported(self):
+        """Testa se o CSV exportado sai em ordem de data e é aceito pelo importador"""
+        response, body = self.export()
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = body.decode().splitlines()
+        self.assertEqual(lines[0], 'id,date,amount,category,description,fingerprint')
+        self.assertEqual(lines[1], f'{self.rows[1].id},2024-01-05,3500.00,Salário,Salário,')
+        self.assertEqual(lines[3], f'{self.rows[2].id},2024-02-01,-0.05,Outros,Taxa,')
+
+        result = import_transactions(self.other, io.StringIO(body.decode()))
+        again = import_transactions(self.other, io.StringIO(body.decode()))
+        self.assertEqual((result.created, result.invalid, again.duplicates), (3, 0, 3))
+        bakery = Transaction.objects.get(user=self.other, amount=-1590)
+        self.assertEqual((bakery.category, bakery.description), (Category.ALIMENTACAO, 'Padaria "Pão, Leite"'))
+
+    def test_export_ndjson_with_filters_and_resume(self):
+        """Testa o NDJSON com filtro de datas e a continuação por cursor"""
+        _, body = self.export({'format': 'ndjson', 'date_from': '2024-01-06'})
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([r['id'] for r in records], [self.rows[0].id, self.rows[2].id])
+        self.assertEqual(records[0]['amount'], -1590)
+        self.assertEqual(records[0]['category'], Category.ALIMENTACAO)
+
+        last = records[0]
+        _, rest = self.export({'format': 'ndjson', 'after': f'{last["date"]},{last["id"]}'})
+        self.assertEqual([json.loads(line)['id'] for line in rest.decode().splitlines()], [self.rows[2].id])
+
+    def test_export_reimported_into_same_account(self):
+        """Testa se reimportar a exportação na mesma conta não duplica lançamentos manuais nem importados"""
+        import_transactions(self.user, io.StringIO(CSV_STATEMENT))
+        count = Transaction.objects.filter(user=self.user).count()
+        _, body = self.export()
+
+        result = import_transactions(self.user, io.StringIO(body.decode()))
+
+        self.assertEqual((result.created, result.duplicates, result.invalid), (0, count, 0))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), count)
+
+    def test_export_gzip(self):
+        """Testa a compressão gzip quando o cliente a aceita"""
+        _, plain = self.export()
+        response, compressed = self.export(headers={'Accept-Encoding': 'gzip, deflate'})
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_export_gzip_refused(self):
+        """Testa se gzip;q=0 (ou só identity) não recebe a resposta comprimida"""
+        _, plain = self.export()
+        response, body = self.export(headers={'Accept-Encoding': 'gzip;q=0, deflate'})
+
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(body, plain)
+        self.assertTrue(accepts_gzip('deflate, GZIP;q=0.5'))
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip('*, gzip;q=0'))
+        self.assertFalse(accepts_gzip('identity'))
+
+    def test_export_invalid_params(self):
+        """Testa se parâmetros inválidos retornam 400 em JSON"""
+        response = self.client.get('/api/v1/transactions/export/', {'after': '2024-01-10'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('after', response.json()['error'])
+
+    def test_encode_rows_in_bounded_chunks(self):
+        """Testa se a saída é entregue em pedaços do tamanho configurado"""
+        rows = ((i, date(2024, 1, 1), -100, Category.OUTROS, 'x' * 50, None) for i in range(1000))
+        chunks = list(encode_rows(rows, 'csv', chunk_bytes=4096))
+
+        self.assertGreater(len(chunks), 10)
+        self.assertTrue(all(len(chunk) < 4096 + 100 for chunk in chunks))
+
+    def test_export_command(self):
+        """Testa o comando manage.py export_transactions com gzip"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'transacoes.ndjson.gz')
+            call_command('export_transactions', user='ana@example.com', format='ndjson', gzip=True,
+                         date_to='2024-01-31', output=path, stderr=io.StringIO())
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                ids = [json.loads(line)['id'] for line in f]
+
+        self.assertEqual(ids, [self.rows[1].id, self.rows[0].id])
+
+
+class TransactionRollupTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email='ana@example.com', password='testpass123')
+        self.other = User.objects.create_user(email='bia@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, amount, day, category=Category.ALIMENTACAO, user=None):
+        return Transaction.objects.create(user=user or self.user, amount=amount, date=day, category=category)
+
+    def rollups(self, user=None):
+        return {(r.month, r.category): (r.income, r.expense, r.count)
+                for r in MonthlyRollup.objects.filter(user=user or self.user).exclude(count=0)}
+
+    def test_rollups_follow_every_write(self):
+        """Testa se os totais acompanham INSERT, UPDATE, DELETE, update/delete em massa e importação"""
+        market = self.create(-1500, date(2024, 1, 10))
+        self.create(350000, date(2024, 1, 5), Category.SALARIO)
+        self.create(-700, date(2024, 1, 20), user=self.other)
+        self.assertEqual(self.rollups(), {
+            (date(2024, 1, 1), Category.ALIMENTACAO): (0, 1500, 1),
+            (date(2024, 1, 1), Category.SALARIO): (350000, 0, 1),
+        })
+
+        market.amount, market.date = -2000, date(2024, 2, 3)
+        market.save()
+        Transaction.objects.filter(pk=market.pk).update(description='Feira')
+        self.assertEqual(self.rollups()[(date(2024, 2, 1), Category.ALIMENTACAO)], (0, 2000, 1))
+        self.assertNotIn((date(2024, 1, 1), Category.ALIMENTACAO), self.rollups())
+
+        Transaction.objects.filter(user=self.user, category=Category.SALARIO).update(category=Category.OUTROS)
+        import_transactions(self.user, io.StringIO(CSV_STATEMENT))
+        market.delete()
+
+        balance = Balance.objects.get(user=self.user)
+        expected = Transaction.objects.filter(user=self.user)
+        self.assertEqual(balance.balance, sum(t.amount for t in expected))
+        self.assertEqual(balance.count, expected.count())
+        self.assertEqual(Balance.objects.get(user=self.other).balance, -700)
+        self.assertEqual(verify(), {})
+
+    def test_rebuild_and_verify_command(self):
+        """Testa se o comando rollups aponta divergências e o --rebuild as corrige"""
+        self.create(-1500, date(2024, 1, 10))
+        self.create(-300, date(2024, 3, 2), user=self.other)
+        MonthlyRollup.objects.filter(user=self.user).update(expense=1)
+        Balance.objects.filter(user=self.other).delete()
+
+        err = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '--rebuild'):
+            call_command('rollups', stdout=io.StringIO(), stderr=err)
+        self.assertIn('transactions_monthlyrollup', err.getvalue())
+        self.assertIn('transactions_balance', err.getvalue())
+
+        out = io.StringIO()
+        call_command('rollups', rebuild=True, stdout=out)
+        self.assertIn('sem divergências', out.getvalue())
+        self.assertEqual(self.rollups()[(date(2024, 1, 1), Category.ALIMENTACAO)], (0, 1500, 1))
+        self.assertEqual(Balance.objects.get(user=self.other).expense, 300)
+
+    def test_retired_months_keep_their_totals(self):
+        """Testa se rollups confere e recalcula só os meses anexados, mantendo os totais dos retirados"""
+        self.create(-300, date(2024, 1, 10))
+        # Um mês retirado pela retenção: os totais ficam, as transações saem sem passar pelos triggers.
+        MonthlyRollup.objects.create(user=self.user, month=date(2023, 12, 1), category=Category.ALIMENTACAO,
+                                     income=0, expense=1500, count=1)
+        Balance.objects.filter(user=self.user).update(expense=F('expense') + 1500, count=F('count') + 1)
+        self.assertIn('transactions_monthlyrollup', verify())
+
+        with mock.patch.object(Transaction.partitioning, 'retained_from', return_value=date(2024, 1, 1)):
+            self.assertEqual(verify(), {})
+            MonthlyRollup.objects.filter(month=date(2024, 1, 1)).update(expense=1)
+            call_command('rollups', rebuild=True, stdout=io.StringIO())
+
+        self.assertEqual(self.rollups(), {
+            (date(2023, 12, 1), Category.ALIMENTACAO): (0, 1500, 1),
+            (date(2024, 1, 1), Category.ALIMENTACAO): (0, 300, 1),
+        })
+        self.assertEqual(Balance.objects.get(user=self.user).expense, 1800)
+
+    def test_rebuild_in_background(self):
+        """Testa o recálculo de um usuário enfileirado pelo comando e executado pelo worker"""
+        self.create(-1500, date(2024, 1, 10))
+        self.create(-300, date(2024, 3, 2), user=self.other)
+        MonthlyRollup.objects.update(expense=1)
+
+        out = io.StringIO()
+        call_command('rollups', rebuild=True, background=True, user='ana@example.com', stdout=out)
+        job = Job.objects.get()
+        self.assertIn(f'tarefa {job.pk}', out.getvalue())
+        self.assertEqual(self.rollups()[(date(2024, 1, 1), Category.ALIMENTACAO)], (0, 1, 1))
+
+        Worker(['default']).run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result['mismatches'], {})
+        self.assertEqual(self.rollups()[(date(2024, 1, 1), Category.ALIMENTACAO)], (0, 1500, 1))
+        self.assertEqual(MonthlyRollup.objects.get(user=self.other).expense, 1)
+
+    def test_reports_read_only_rollups(self):
+        """Testa os relatórios de saldo, meses e categorias sem consultar as transações"""
+        self.create(350000, date(2024, 1, 5), Category.SALARIO)
+        self.create(-1500, date(2024, 1, 10))
+        self.create(-4000, date(2024, 3, 2), Category.LAZER)
+        self.create(-2500, date(2024, 3, 20))
+        self.create(-999, date(2024, 3, 20), user=self.other)
+        Transaction.objects.filter(date=date(2024, 1, 10)).delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            balance = self.client.get('/api/v1/reports/balance/')
+            monthly = self.client.get('/api/v1/reports/monthly/', {'month_from': '2024-01', 'month_to': '2024-12'})
+            categories = self.client.get('/api/v1/reports/categories/', {'month_from': '2024-03'})
+        self.assertFalse([q for q in queries if 'transactions_transaction' in q['sql']])
+
+        self.assertEqual(balance.data, {'balance': 343500, 'income': 350000, 'expense': 6500, 'count': 3})
+        self.assertEqual(monthly.data, [
+            {'month': '2024-01', 'income': 350000, 'expense': 0, 'net': 350000, 'count': 1},
+            {'month': '2024-03', 'income': 0, 'expense': 6500, 'net': -6500, 'count': 2},
+        ])
+        self.assertEqual([(c['label'], c['expense']) for c in categories.data], [('Lazer', 4000), ('Alimentação', 2500)])
+
+        self.assertEqual(self.client.get('/api/v1/reports/monthly/', {'month_from': '2024-13'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/reports/monthly/', {
+            'month_from': '2024-05', 'month_to': '2024-01'}).status_code, 400)
+
+    def test_reports_default_to_last_months(self):
+        """Testa o período padrão do relatório mensal e o saldo de quem não tem transações"""
+        today = date.today()
+        self.create(-100, today)
+        self.create(-100, date(today.year - 2, today.month, 1))
+
+        monthly = self.client.get('/api/v1/reports/monthly/')
+        self.assertEqual([m['month'] for m in monthly.data], [today.strftime('%Y-%m')])
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get('/api/v1/reports/balance/').data,
+                         {'balance': 0, 'income': 0, 'expense': 0, 'count': 0})
+
+    def test_deleting_user_removes_rollups(self):
+        """Testa se excluir o usuário apaga as transações e os totais dele"""
+        self.create(-1500, date(2024, 1, 10))
+        pk = self.user.pk
+
+        self.user.delete()
+
+        self.assertFalse(Transaction.objects.filter(user_id=pk).exists())
+        self.assertFalse(MonthlyRollup.objects.filter(user_id=pk).exists())
+        self.assertFalse(Balance.objects.filter(user_id=pk).exists())
+
+
+class TransactionAnalyticsTests(TestCase):
+    TODAY = date(2024, 7, 15)
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        rows = [(date(2024, month, 5), 500000, Category.SALARIO, 'Salário') for month in range(1, 8)]
+        rows += [(date(2024, month, 20), -3990, Category.SERVICOS, 'Streaming') for month in range(1, 7)]
+        rows += [(date(2024, 7, day), -10000, Category.ALIMENTACAO, 'Mercado') for day in (1, 8, 10)]
+        rows += [(date(2024, 7, 14), -20000, Category.LAZER, 'Show')]
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, date=day, amount=amount, category=category, description=description)
+            for day, amount, category, description in sorted(rows)
+        ])
+
+    def compute(self):
+        return analytics.compute(analytics.load_history(self.user), self.TODAY)
+
+    def test_statistics(self):
+        """Testa médias móveis, percentis, volatilidade e tendências sobre um histórico conhecido"""
+        result = self.compute()
+
+        self.assertEqual(result['rolling'][0], {'window': 7, 'income': 0, 'expense': 4286, 'net': -4286,
+                                                'expense_change': 2.0})
+        # Saídas: 6 x 3.990, 3 x 10.000 e 20.000, com interpolação linear.
+        self.assertEqual((result['percentiles']['p50'], result['percentiles']['p90']), (3990, 11000))
+        self.assertEqual(result['volatility'], {'months': 12, 'monthly_mean': 1995, 'monthly_std': 1995,
+                                                'coefficient_of_variation': 1.0, 'daily_std': 2799})
+        # Julho ainda não fechou: só o streaming entra nos 12 meses, com gasto a partir de janeiro.
+        [trend] = result['trends']
+        self.assertEqual((trend['category'], trend['total'], trend['trend']), (Category.SERVICOS, 23940, 'up'))
+        self.assertEqual((trend['series']['2023-12'], trend['series']['2024-06']), (0, 3990))
+
+    def test_recurring_and_forecast(self):
+        """Testa a detecção dos recorrentes (não o mercado irregular) e a projeção do saldo"""
+        result = self.compute()
+
+        self.assertEqual([(item['description'], item['period'], item['next_date']) for item in result['recurring']],
+                         [('Streaming', 'monthly', date(2024, 7, 21)), ('Salário', 'monthly', date(2024, 8, 5))])
+        forecast = result['forecast']
+        self.assertEqual(forecast['balance'], 7 * 500000 - 6 * 3990 - 50000)
+        # Não recorrente nos últimos 90 dias: mercado e show.
+        self.assertEqual(forecast['daily_net'], round(-50000 / 90))
+        self.assertEqual(len(forecast['upcoming']), 6)
+        self.assertEqual(forecast['projections'][0], {
+            'days': 30, 'date': date(2024, 8, 14), 'balance': round(forecast['balance'] - 50000 / 90 * 30 - 3990 + 500000),
+        })
+
+    def test_endpoints_memoized_per_history_version(self):
+        """Testa as rotas e o cálculo guardado até o histórico mudar"""
+        with mock.patch('transactions.analytics.timezone.localdate', return_value=self.TODAY):
+            summary = self.client.get('/api/v1/analytics/summary/')
+            self.assertEqual(summary.status_code, 200)
+            self.assertEqual(set(summary.data), {'rolling', 'percentiles', 'volatility'})
+            with self.assertNumQueries(1):
+                recurring = self.client.get('/api/v1/analytics/recurring/')
+            self.assertEqual(len(recurring.data['recurring']), 2)
+
+            Transaction.objects.filter(user=self.user, description='Streaming').update(
+                amount=-4990, updated_at=timezone.now())
+            with self.assertNumQueries(2):
+                trends = self.client.get('/api/v1/analytics/trends/')
+            self.assertEqual(trends.data['trends'][0]['total'], 6 * 4990)
+            self.assertEqual(self.client.get('/api/v1/analytics/forecast/').data['forecast']['balance'],
+                             7 * 500000 - 6 * 4990 - 50000)
+
+        other = get_user_model().objects.create_user(email='bia@example.com', password='testpass123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/v1/analytics/recurring/').data, {'recurring': []})
+
+
+class AsyncTransactionViewsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='ana@example.com', password='testpass123')
+        self.factory = AsyncRequestFactory()
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def test_async_list_with_filters(self):
+        """Testa a listagem assíncrona com filtros e paginação"""
+        match = await Transaction.objects.acreate(user=self.user, amount=-100, date=date(2024, 3, 1), category=Category.LAZER)
+        await Transaction.objects.acreate(user=self.user, amount=-100, date=date(2024, 3, 1), category=Category.SAUDE)
+
+        response = await async_views.TransactionCreateListView.as_view()(self.factory.get(
+            '/api/v1/transactions/', {'category': Category.LAZER}, headers=self.auth,
+        ))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['id'] for t in json.loads(response.content)['results']], [match.id])
+
+    async def test_async_create_and_delete(self):
+        """Testa criação e exclusão pelas views assíncronas"""
+        create = await async_views.TransactionCreateListView.as_view()(self.factory.post(
+            '/api/v1/transactions/', {'amount': 500, 'date': '2024-01-01'}, content_type='application/json',
+            headers=self.auth,
+        ))
+        self.assertEqual(create.status_code, 201)
+        pk = json.loads(create.content)['id']
+        self.assertEqual((await Transaction.objects.aget(pk=pk)).user_id, self.user.pk)
+
+        delete = await async_views.TransactionRetrieveUpdateDestroyView.as_view()(
+            self.factory.delete(f'/api/v1/transaction/{pk}/', headers=self.auth), pk=pk,
+        )
+        self.assertEqual(delete.status_code, 204)
+        self.assertFalse(await Transaction.objects.filter(pk=pk).aexists())
+
+    async def test_async_conditional_requests(self):
+        """Testa 304 e If-Match pelas views assíncronas"""
+        txn = await Transaction.objects.acreate(user=self.user, amount=-100, date=date(2024, 3, 1))
+        view = async_views.TransactionRetrieveUpdateDestroyView.as_view()
+        url = f'/api/v1/transaction/{txn.pk}/'
+
+        response = await view(self.factory.get(url, headers=self.auth), pk=txn.pk)
+        etag = response['ETag']
+        not_modified = await view(self.factory.get(url, headers={**self.auth, 'If-None-Match': etag}), pk=txn.pk)
+        self.assertEqual(not_modified.status_code, 304)
+
+        txn.description = 'Outra'
+        await txn.asave()
+        stale = await view(self.factory.delete(url, headers={**self.auth, 'If-Match': etag}), pk=txn.pk)
+        self.assertEqual(stale.status_code, 412)
+        self.assertTrue(await Transaction.objects.filter(pk=txn.pk).aexists())
+
+    async def test_async_export_streams(self):
+        """Testa a exportação pela view assíncrona com iterador assíncrono"""
+        await Transaction.objects.acreate(user=self.user, amount=-100, date=date(2024, 3, 1), description='Cinema')
+
+        response = await async_views.TransactionExportView.as_view()(self.factory.get(
+            '/api/v1/transactions/export/', {'format': 'ndjson'}, headers=self.auth,
+        ))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(body)['description'], 'Cinema')
+
+    async def test_async_reports(self):
+        """Testa os relatórios pelas views assíncronas"""
+        await Transaction.objects.acreate(user=self.user, amount=-100, date=date(2024, 3, 1), category=Category.LAZER)
+
+        balance = await async_views.BalanceReportView.as_view()(
+            self.factory.get('/api/v1/reports/balance/', headers=self.auth))
+        monthly = await async_views.MonthlyReportView.as_view()(
+            self.factory.get('/api/v1/reports/monthly/', {'month_from': '2024-01', 'month_to': '2024-06'}, headers=self.auth))
+
+        self.assertEqual(json.loads(balance.content)['balance'], -100)
+        self.assertEqual([m['month'] for m in json.loads(monthly.content)], ['2024-03'])
+
+    async def test_async_analytics(self):
+        """Testa a previsão pela view assíncrona"""
+        await Transaction.objects.acreate(user=self.user, amount=-100, date=date(2024, 3, 1))
+
+        response = await async_views.AnalyticsForecastView.as_view()(self.factory.get(
+            '/api/v1/analytics/forecast/', headers=self.auth,
+        ))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['forecast']['balance'], -100)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.urls import path
+from . import async_views, views
+
+api = async_views if settings.ASYNC_API else views
+
+urlpatterns = [
+    path('transactions/', api.TransactionCreateListView.as_view(), name='transaction-create-list'),
+    path('transactions/batch/', api.TransactionBatchView.as_view(), name='transaction-batch'),
+    path('transactions/import/', api.TransactionImportView.as_view(), name='transaction-import'),
+    path('transactions/export/', api.TransactionExportView.as_view(), name='transaction-export'),
+    path('reports/balance/', api.BalanceReportView.as_view(), name='report-balance'),
+    path('reports/monthly/', api.MonthlyReportView.as_view(), name='report-monthly'),
+    path('reports/categories/', api.CategoryReportView.as_view(), name='report-categories'),
+    path('analytics/summary/', api.AnalyticsSummaryView.as_view(), name='analytics-summary'),
+    path('analytics/trends/', api.AnalyticsTrendsView.as_view(), name='analytics-trends'),
+    path('analytics/recurring/', api.AnalyticsRecurringView.as_view(), name='analytics-recurring'),
+    path('analytics/forecast/', api.AnalyticsForecastView.as_view(), name='analytics-forecast'),
+    path('transaction/<int:pk>/', api.TransactionRetrieveUpdateDestroyView.as_view(), name='transaction-detail-view'),
+]
@@ -1,3 +1,226 @@
-from django.shortcuts import render
+import io
 
-# Create your views here.
+from django.db import router
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from core.idempotency import idempotent
+from core.mixins import ConditionalMixin, ValuesReadMixin
+from core.renderers import JSONRenderer
+from .batch import BatchError, apply_batch
+from .exporters import CONTENT_TYPES, ExportError, accepts_gzip, export_transactions, parse_after, parse_date
+from . import analytics, reports
+from .importers import StatementError, detect_format, import_transactions
+from .models import Transaction
+from .serializers import TransactionSerializer
+
+
+class TransactionQuerysetMixin(ValuesReadMixin):
+    serializer_class = TransactionSerializer
+
+    def get_queryset(self):
+        # Toda consulta parte de user_id para usar os índices compostos.
+        return Transaction.objects.filter(user=self.request.user)
+
+    def get_search_scope(self):
+        # Mesmo escopo do queryset: o índice de busca cruza as palavras com o usuário.
+        return self.request.user.pk
+
+
+class TransactionCreateListView(ConditionalMixin, TransactionQuerysetMixin, generics.ListCreateAPIView):
+    # Apenas filtros e ordenações cobertos por (user, date) e (user, category, date).
+    filterset_fields = {
+        'category': ['exact'],
+        'date': ['exact', 'gte', 'lte'],
+    }
+    search_fields = ('description',)
+    ordering_fields = ('date',)
+    ordering = ('-date', '-id')
+
+
+class TransactionRetrieveUpdateDestroyView(ConditionalMixin, TransactionQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
+    pass
+
+
+class TransactionImportView(generics.GenericAPIView):
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['Envie o extrato no campo "file".']}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get('format') or detect_format(upload.name)
+        encoding = request.data.get('encoding') or 'utf-8-sig'
+
+        try:
+            stream = io.TextIOWrapper(upload.file, encoding=encoding, newline='')
+        except LookupError:
+            return Response({'encoding': [f'Codificação desconhecida: {encoding}']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = import_transactions(request.user, stream, fmt=fmt)
+        except (StatementError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED)
+
+
+class TransactionBatchView(generics.GenericAPIView):
+    """Criações, edições e exclusões em lote, numa só transação (``transactions.batch``).
+
+    Com ``Idempotency-Key``, repetir o lote devolve a resposta da primeira vez.
+    """
+    serializer_class = TransactionSerializer
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        try:
+            code, results = apply_batch(request.user, operations, self.get_serializer_context())
+        except BatchError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': results}, status=code)
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class TransactionExportView(generics.GenericAPIView):
+    """Histórico completo em fluxo: ``?format=csv`` (padrão) ou ``?format=ndjson``.
+
+    Filtros ``date_from``/``date_to`` (AAAA-MM-DD) e ``after=<data>,<id>``
+    para continuar uma exportação interrompida. Com ``Accept-Encoding: gzip``
+    a resposta sai comprimida.
+    """
+    # Os renderers só escolhem o formato (Accept ou ?format=); o corpo é gerado por exporters.
+    renderer_classes = (CSVRenderer, NDJSONRenderer)
+
+    def handle_exception(self, exc):
+        # Erros saem em JSON, não no formato pedido para a exportação.
+        renderer = JSONRenderer()
+        self.request.accepted_renderer, self.request.accepted_media_type = renderer, renderer.media_type
+        return super().handle_exception(exc)
+
+    def get_export(self, request):
+        params = request.query_params
+        try:
+            options = {
+                'fmt': request.accepted_renderer.format,
+                'date_from': parse_date(params['date_from'], 'date_from') if params.get('date_from') else None,
+                'date_to': parse_date(params['date_to'], 'date_to') if params.get('date_to') else None,
+                'after': parse_after(params['after']) if params.get('after') else None,
+            }
+        except ExportError as e:
+            raise ValidationError({'error': str(e)})
+        options['compress'] = accepts_gzip(request.headers.get('Accept-Encoding', ''))
+        # As linhas são lidas depois que o middleware de roteamento já saiu: fixa o banco agora.
+        options['using'] = router.db_for_read(Transaction)
+        return options
+
+    def export_response(self, chunks, options):
+        fmt = options['fmt']
+        response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="transacoes.{fmt}"'
+        if options['compress']:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def get(self, request, *args, **kwargs):
+        options = self.get_export(request)
+        return self.export_response(export_transactions(request.user, **options), options)
+
+
+class ReportMixin:
+    """Relatório do painel, lido só dos totais mantidos por triggers (``transactions.reports``).
+
+    A view define ``get_report_queryset``, avaliado pela view síncrona ou pela
+    assíncrona, e ``represent``, que monta a resposta a partir das linhas.
+    """
+    default_months = None
+
+    def get_month_range(self):
+        try:
+            return reports.month_range(self.request.query_params, self.default_months)
+        except reports.ReportError as e:
+            raise ValidationError({'error': str(e)})
+
+    def get(self, request, *args, **kwargs):
+        return Response(self.represent(list(self.get_report_queryset())))
+
+
+class BalanceReportView(ReportMixin, generics.GenericAPIView):
+    def get_report_queryset(self):
+        return reports.balance_queryset(self.request.user)
+
+    def represent(self, rows):
+        return reports.represent_balance(rows)
+
+
+class MonthlyReportView(ReportMixin, generics.GenericAPIView):
+    """Entradas e saídas por mês; ``month_from``/``month_to`` (AAAA-MM), por padrão os últimos 12 meses."""
+    default_months = reports.DEFAULT_MONTHS
+
+    def get_report_queryset(self):
+        return reports.monthly_queryset(self.request.user, *self.get_month_range())
+
+    def represent(self, rows):
+        return reports.represent_monthly(rows)
+
+
+class CategoryReportView(ReportMixin, generics.GenericAPIView):
+    """Totais por categoria, maiores gastos primeiro; ``month_from``/``month_to`` opcionais."""
+
+    def get_report_queryset(self):
+        return reports.category_queryset(self.request.user, *self.get_month_range())
+
+    def represent(self, rows):
+        return reports.represent_categories(rows)
+
+
+class AnalyticsView(generics.GenericAPIView):
+    """Estatísticas do fluxo de caixa (``transactions.analytics``), calculadas uma vez por versão do histórico.
+
+    ``sections`` escolhe as partes do resultado devolvidas.
+    """
+    sections = ()
+
+    def get_analytics(self):
+        return analytics.for_user(self.request.user)
+
+    def represent(self, result):
+        return {name: result[name] for name in self.sections}
+
+    def get(self, request, *args, **kwargs):
+        return Response(self.represent(self.get_analytics()))
+
+
+class AnalyticsSummaryView(AnalyticsView):
+    """Médias móveis, percentis das saídas e volatilidade."""
+    sections = ('rolling', 'percentiles', 'volatility')
+
+
+class AnalyticsTrendsView(AnalyticsView):
+    """Saídas mensais por categoria e a tendência de cada uma."""
+    sections = ('trends',)
+
+
+class AnalyticsRecurringView(AnalyticsView):
+    """Pagamentos e recebimentos recorrentes detectados."""
+    sections = ('recurring',)
+
+
+class AnalyticsForecastView(AnalyticsView):
+    """Saldo projetado e as próximas ocorrências dos recorrentes."""
+    sections = ('forecast',)
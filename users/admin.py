@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from core.admin import KeysetAdminMixin
+from core.search import IndexedSearchAdminMixin
 from .models import CustomUser
 
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(KeysetAdminMixin, IndexedSearchAdminMixin, UserAdmin):
     model = CustomUser
     list_display = ['email', 'name', 'is_active', 'created_at', 'updated_at']
     readonly_fields = ('created_at', 'updated_at')
@@ -19,7 +21,9 @@ class CustomUserAdmin(UserAdmin):
             'fields': ('email', 'name', 'password1', 'password2', 'is_staff', 'is_active')
         }),
     )
-    ordering = ('email',)
+    # Ordenações com índice: (created_at, id), também nos filtros de equipe e inativos, e email (único).
+    ordering = ('-created_at',)
+    sortable_by = ('email', 'created_at')
     search_fields = ('email', 'name')
     list_filter = ('is_staff', 'is_active', 'created_at')
 
@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from core.async_views import (
+    AsyncAPIView,
+    AsyncCreateMixin,
+    AsyncListMixin,
+    AsyncRetrieveMixin,
+    AsyncUpdateMixin,
+)
+from core.mixins import PreconditionFailed
+from core.response_cache import AsyncCachedResponseMixin
+from . import views
+
+
+class CustomUserCreateListView(AsyncCachedResponseMixin, AsyncListMixin, AsyncCreateMixin, AsyncAPIView):
+    api_view_class = views.CustomUserCreateListView
+
+
+class CustomUserRetriveUpdateDestroyView(AsyncCachedResponseMixin, AsyncRetrieveMixin, AsyncUpdateMixin, AsyncAPIView):
+    api_view_class = views.CustomUserRetriveUpdateDestroyView
+
+    async def delete(self, view, request, *args, **kwargs):
+        await self.check_write_preconditions(view, request)
+        instance = await self.get_object(view)
+        try:
+            job = await sync_to_async(view.perform_destroy)(instance)
+            return view.deletion_response(job)
+        except PreconditionFailed:
+            raise
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
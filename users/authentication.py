@@ -0,0 +1,111 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.db_routers import use_primary
+
+
+def user_cache_key(user_id):
+    return f'users:auth:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def cache_timeout(timeout):
+    """``timeout`` limitado por ``AUTH_USER_CACHE_TIMEOUT`` (0 = sem teto)."""
+    limit = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', None)
+    return min(timeout, limit) if limit else timeout
+
+
+def get_cached_user(user_id, timeout):
+    """Devolve o usuário do cache ou do banco (``DoesNotExist`` se não existir).
+
+    A consulta vai ao primário: numa réplica atrasada, um usuário recém-criado
+    ainda não existiria e um desativado ainda passaria.
+    """
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        User = get_user_model()
+        with use_primary():
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        cache.set(key, user, cache_timeout(timeout))
+    return user
+
+
+async def aget_cached_user(user_id, timeout):
+    """Versão assíncrona de ``get_cached_user``, para as views async."""
+    key = user_cache_key(user_id)
+    user = await cache.aget(key)
+    if user is None:
+        User = get_user_model()
+        with use_primary():
+            user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        await cache.aset(key, user, cache_timeout(timeout))
+    return user
+
+
+def token_cache_timeout(validated_token):
+    return max(1, int(validated_token['exp'] - time.time()))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` que guarda o usuário resolvido no cache.
+
+    A entrada vive até o ``exp`` do token, limitada por
+    ``AUTH_USER_CACHE_TIMEOUT`` (5 s por padrão). Os sinais de
+    ``users.signals`` a removem quando o ``CustomUser`` é salvo ou excluído,
+    mas só no cache que o processo enxerga: com o ``LocMemCache`` (por
+    processo) os outros workers só deixam de aceitar um usuário desativado
+    ou com a senha trocada quando a entrada vence. Por isso o teto; sem ele
+    (``0``), use um ``CACHE_BACKEND`` compartilhado por todos os workers.
+    Requisições com o cache aquecido não consultam ``users_customuser``.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user = get_cached_user(self.get_user_id(validated_token), token_cache_timeout(validated_token))
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        return self.check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        try:
+            user = await aget_cached_user(self.get_user_id(validated_token), token_cache_timeout(validated_token))
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
+
+    async def aauthenticate(self, request):
+        """Equivalente async de ``authenticate``; a validação do JWT não faz I/O."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
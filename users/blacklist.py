@@ -0,0 +1,143 @@
+"""Índice em processo dos JTIs presentes na blacklist do simplejwt.
+
+Com ``ROTATE_REFRESH_TOKENS`` e ``BLACKLIST_AFTER_ROTATION`` cada refresh
+grava uma linha em ``BlacklistedToken``, e cada verificação de token
+consultaria essa tabela. O índice mantém um filtro de Bloom com os JTIs na
+blacklist: uma resposta negativa dispensa o banco; uma positiva é confirmada
+com a consulta exata de sempre, então falsos positivos custam apenas uma
+consulta.
+
+A sincronização é incremental (``id > último id visto``) e acontece no máximo
+a cada ``BLACKLIST_INDEX['SYNC_INTERVAL']`` segundos. Tokens colocados na
+blacklist por este processo entram no filtro imediatamente; os de outros
+processos, na próxima sincronização. Use ``SYNC_INTERVAL = 0`` para
+sincronizar a cada verificação.
+
+Ids são alocados antes do commit: uma transação que pegou o id 10 pode
+confirmar depois de outra com o id 11. Os ids pulados (até ``MAX_GAPS`` abaixo
+do maior visto) continuam sendo consultados a cada sincronização por
+``GAP_TIMEOUT`` segundos; depois disso são tratados como transações desfeitas.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+DEFAULTS = {
+    'CAPACITY': 1_000_000,
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 1.0,
+    'REBUILD_INTERVAL': 3600.0,
+    'GAP_TIMEOUT': 60.0,
+}
+
+MAX_GAPS = 1000
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class BlacklistIndex:
+    def __init__(self, **options):
+        config = {**DEFAULTS, **getattr(settings, 'BLACKLIST_INDEX', {}), **options}
+        self.capacity = config['CAPACITY']
+        self.error_rate = config['ERROR_RATE']
+        self.sync_interval = config['SYNC_INTERVAL']
+        self.rebuild_interval = config['REBUILD_INTERVAL']
+        self.gap_timeout = config['GAP_TIMEOUT']
+        self.reset()
+
+    def reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._gaps = {}
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def _rebuild(self):
+        """Recarrega só os tokens ainda válidos; expirados não precisam ser bloqueados."""
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_id = BlacklistedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for jti in live.filter(id__lte=last_id).values_list('token__jti', flat=True).iterator(chunk_size=10_000):
+            bloom.add(jti)
+        now = time.monotonic()
+        # Ids ainda não confirmados abaixo de last_id também ficariam de fora.
+        recent = set(BlacklistedToken.objects.filter(id__gt=last_id - MAX_GAPS, id__lte=last_id).values_list('id', flat=True))
+        self._gaps = {pk: now for pk in range(max(1, last_id - MAX_GAPS + 1), last_id + 1) if pk not in recent}
+        self._bloom, self._last_id = bloom, last_id
+        self._built_at = self._synced_at = now
+
+    def _sync(self):
+        now = time.monotonic()
+        self._gaps = {pk: seen for pk, seen in self._gaps.items() if now - seen < self.gap_timeout}
+        new = BlacklistedToken.objects.filter(Q(id__gt=self._last_id) | Q(id__in=self._gaps))
+        for pk, jti in new.order_by('id').values_list('id', 'token__jti').iterator(chunk_size=10_000):
+            self._bloom.add(jti)
+            if pk > self._last_id:
+                self._gaps.update((gap, now) for gap in range(max(self._last_id + 1, pk - MAX_GAPS), pk))
+                self._last_id = pk
+            self._gaps.pop(pk, None)
+        if len(self._gaps) > MAX_GAPS:
+            self._gaps = dict(sorted(self._gaps.items())[-MAX_GAPS:])
+        self._synced_at = now
+
+    def refresh(self, force=False):
+        if self._pid != os.getpid():
+            # Processo filho (fork do gunicorn): o lock herdado pode estar preso.
+            self.reset()
+        now = time.monotonic()
+        with self._lock:
+            if self._bloom is not None and self._bloom.count > self._bloom.capacity:
+                # Filtro saturado: a taxa de falsos positivos subiria; dobra a capacidade.
+                self.capacity = self._bloom.capacity * 2
+                self._rebuild()
+            elif self._bloom is None or now - self._built_at >= self.rebuild_interval:
+                self._rebuild()
+            elif force or now - self._synced_at >= self.sync_interval:
+                self._sync()
+
+    def might_contain(self, jti):
+        self.refresh()
+        return jti in self._bloom
+
+    def add(self, jti):
+        self.refresh()
+        with self._lock:
+            self._bloom.add(jti)
+
+    def is_blacklisted(self, jti):
+        if not jti:
+            return False
+        return self.might_contain(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+blacklist_index = BlacklistIndex()
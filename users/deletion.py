@@ -0,0 +1,136 @@
+"""Remoção de usuários em segundo plano, em lotes.
+
+``instance.delete()`` apaga o usuário e tudo o que depende dele numa única
+transação: o ``Collector`` carrega na memória as linhas de modelos com
+sinais ou cascatas próprias, e um ``DELETE`` de anos de transações segura
+locks e o worker até o fim.
+
+``schedule_deletion`` desativa o usuário na hora (ele deixa de autenticar)
+e enfileira ``users.delete_user``, que chama ``delete_user``:
+
+1. conta as linhas de cada tabela que aponta para o usuário;
+2. ``CASCADE``: apaga em lotes de ``batch_size`` linhas, cada lote na sua
+   transação. Sem sinais nem cascatas no modelo, o lote é um ``DELETE``
+   direto (``_raw_delete``) por faixa de um índice que comece pela chave
+   estrangeira (ex. ``(user, date, id)``): cada lote continua de onde o
+   anterior parou, sem reler o que já foi apagado e sem carregar as linhas.
+   Nos demais modelos, o lote passa pelo ``delete()`` do Django;
+3. ``SET_NULL``: anula a chave em lotes, do mesmo jeito;
+4. por fim, ``instance.delete()`` do usuário, já sem dependentes: os sinais
+   de ``post_delete`` removem os totais e invalidam os caches.
+
+O andamento vai para ``progress`` (``Job.set_progress``: ``result`` da
+tarefa em ``GET /api/v1/jobs/<id>/``) no máximo a cada
+``PROGRESS_INTERVAL`` segundos. Uma tentativa interrompida pode ser
+repetida: cada lote já confirmado fica apagado e a seguinte continua do
+que restou.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.db.models import CASCADE, SET_NULL
+from django.db.models.deletion import Collector, get_candidate_relations_to_delete
+
+from core.pagination import KeysetPagination
+from jobs.registry import enqueue
+
+BATCH_SIZE = 5000
+PROGRESS_INTERVAL = 1.0
+
+
+def schedule_deletion(user, requested_by=None):
+    """Desativa ``user`` e enfileira a remoção dele e dos dados; devolve o ``Job``."""
+    using = router.db_for_write(type(user), instance=user)
+    with transaction.atomic(using=using):
+        if user.is_active:
+            user.is_active = False
+            user.save(update_fields=['is_active', 'updated_at'])
+        return enqueue('users.delete_user', user=requested_by, using=using, user_id=user.pk, database=using)
+
+
+def batch_ordering(model, field):
+    """Ordem dos lotes: as colunas de um índice de ``model`` que comece por ``field``, e a chave primária."""
+    for index in model._meta.indexes:
+        if index.fields and index.fields[0] == field.name and not index.condition:
+            ordering = [name for name in index.fields[1:] if name.lstrip('-') not in ('id', 'pk')]
+            return [*ordering, 'pk']
+    return ['pk']
+
+
+class Step:
+    """Uma relação com o usuário: as linhas que apontam para ele e o que fazer com elas."""
+
+    def __init__(self, relation, user_id, using):
+        self.model = relation.related_model
+        self.field = relation.field
+        self.label = f'{self.model._meta.label_lower}.{self.field.name}'
+        self.queryset = self.model._base_manager.using(using).filter(**{self.field.attname: user_id})
+        self.using = using
+        self.done = 0
+        self.total = self.queryset.count()
+        self.finished = not self.total
+        # Primeira coluna da ordem na fronteira do último lote: os próximos começam dela no índice.
+        self.start = None
+
+    def run(self, batch_size):
+        """Processa um lote; ``finished`` fica verdadeiro no último."""
+        with transaction.atomic(using=self.using):
+            if self.field.remote_field.on_delete is SET_NULL:
+                count = self.queryset.filter(pk__in=self.next_pks(batch_size)).update(**{self.field.name: None})
+            elif Collector(using=self.using).can_fast_delete(self.queryset):
+                count = self.raw_delete(batch_size)
+            else:
+                count = self.queryset.filter(pk__in=self.next_pks(batch_size)).delete()[0]
+        self.finished = self.finished or count < batch_size
+        self.done += count
+
+    def next_pks(self, batch_size):
+        return list(self.queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+
+    def raw_delete(self, batch_size):
+        ordering = batch_ordering(self.model, self.field)
+        queryset = self.queryset
+        if self.start is not None:
+            # Sem o limite, cada lote percorreria de novo as entradas mortas dos anteriores (até o vacuum).
+            first = ordering[0]
+            queryset = queryset.filter(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': self.start})
+        # A primeira linha que fica para o próximo lote; apaga-se tudo o que vem antes dela.
+        after = queryset.order_by(*ordering).values_list(*ordering)[batch_size:batch_size + 1].first()
+        if after is None:
+            self.finished = True
+        else:
+            self.start = after[0]
+            queryset = queryset.filter(KeysetPagination.keyset_filter(
+                [KeysetPagination.invert(name) for name in ordering], after))
+        return queryset._raw_delete(self.using)
+
+
+def delete_user(user_id, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE, progress=None):
+    """Apaga o usuário ``user_id`` e os dados dele em lotes (ver o módulo); devolve o andamento final."""
+    User = get_user_model()
+    steps = [
+        Step(relation, user_id, using) for relation in get_candidate_relations_to_delete(User._meta)
+        if relation.field.remote_field.on_delete in (CASCADE, SET_NULL)
+    ]
+    state = {'user_id': user_id, 'total': sum(step.total for step in steps), 'done': 0, 'steps': {}}
+
+    def report():
+        state['done'] = sum(step.done for step in steps)
+        state['steps'] = {step.label: {'total': step.total, 'done': step.done} for step in steps if step.total}
+        return state
+
+    reported = time.monotonic()
+    if progress is not None:
+        progress(report())
+    for step in steps:
+        while not step.finished:
+            step.run(batch_size)
+            if progress is not None and time.monotonic() - reported >= PROGRESS_INTERVAL:
+                progress(report())
+                reported = time.monotonic()
+    # Demais relações (PROTECT, SET_DEFAULT...) e o que foi criado durante os lotes ficam com o Collector.
+    user = User._base_manager.using(using).filter(pk=user_id).first()
+    if user is not None:
+        user.delete(using=using)
+    return report()
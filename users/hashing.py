@@ -0,0 +1,19 @@
+"""Hash de senhas em lote, para rodar em processos filhos.
+
+O módulo não importa modelos: com o método ``spawn`` o filho só precisa
+configurar o Django (``init_worker``) antes de chamar ``make_password``.
+"""
+import os
+
+
+def init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+def hash_passwords(passwords):
+    from django.contrib.auth.hashers import make_password
+    return [make_password(password) for password in passwords]
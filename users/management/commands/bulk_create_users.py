@@ -0,0 +1,42 @@
+import csv
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+BOOLEAN_FIELDS = ('is_active', 'is_staff')
+
+
+def read_users(stream):
+    for row in csv.DictReader(stream):
+        data = {'email': row.get('email', ''), 'password': row.get('password') or None}
+        if row.get('name'):
+            data['name'] = row['name']
+        for field in BOOLEAN_FIELDS:
+            if row.get(field):
+                data[field] = row[field].strip().lower() in ('1', 'true', 'sim', 'yes')
+        yield data
+
+
+class Command(BaseCommand):
+    help = 'Cria usuários em massa a partir de um CSV (email,password[,name,is_active,is_staff]).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Caminho do CSV com cabeçalho')
+        parser.add_argument('--workers', type=int, help='Processos para o hash de senhas (padrão: núcleos)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as stream:
+                result = User.objects.bulk_create_users(
+                    read_users(stream), batch_size=options['batch_size'], workers=options['workers'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} usuários criados em {result.elapsed:.2f}s ({result.rate:,.1f} usuários/s); '
+            f'{result.existing} já existentes, {result.duplicates} duplicados no arquivo'
+        ))
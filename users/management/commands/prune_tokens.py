@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove tokens expirados de OutstandingToken/BlacklistedToken em lotes curtos, '
+        'sem travar as tabelas (alternativa ao flushexpiredtokens).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--sleep', type=float, default=0.05, help='Pausa entre lotes, em segundos')
+        parser.add_argument('--max-batches', type=int, default=0, help='0 = até acabar')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now()
+        batch_size = options['batch_size']
+        expired = OutstandingToken.objects.filter(expires_at__lte=cutoff)
+        deleted = batches = 0
+        start = time.perf_counter()
+
+        while True:
+            # Range scan em expires_at (índice de users/0003); cada lote é uma transação curta.
+            ids = list(expired.order_by('expires_at').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids)._raw_delete(BlacklistedToken.objects.db)
+                deleted += OutstandingToken.objects.filter(id__in=ids)._raw_delete(OutstandingToken.objects.db)
+            batches += 1
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} tokens expirados removidos em {batches} lotes ({elapsed:.2f}s)'
+        ))
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+INDEX_NAME = "token_blacklist_outstandingtoken_expires_at_idx"
+TABLE_NAME = "token_blacklist_outstandingtoken"
+
+
+def create_index(apps, schema_editor):
+    # CONCURRENTLY evita travar a tabela de tokens, que pode ser grande.
+    concurrently = "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    schema_editor.execute(
+        f"CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {TABLE_NAME} (expires_at)"
+    )
+
+
+def drop_index(apps, schema_editor):
+    concurrently = "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("token_blacklist", "0012_alter_outstandingtoken_user"),
+        ("users", "0002_customuser_created_at_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
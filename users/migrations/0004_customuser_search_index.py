@@ -0,0 +1,17 @@
+from django.db import migrations
+
+from core.search import TRIGRAM, CreateSearchIndex, SearchIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_outstandingtoken_expires_at_index"),
+    ]
+
+    operations = [
+        CreateSearchIndex(
+            model_name="customuser",
+            index=SearchIndex(("email", "name"), kind=TRIGRAM, fuzzy=("email",)),
+        ),
+    ]
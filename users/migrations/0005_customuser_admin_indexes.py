@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:17
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    # CONCURRENTLY evita travar as escritas em users_customuser (milhões de linhas)
+    # durante a criação; nos outros bancos, um AddIndex comum.
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0004_customuser_search_index"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name="customuser",
+            index=models.Index(
+                condition=models.Q(("is_staff", True)),
+                fields=["created_at", "id"],
+                name="user_staff_created_idx",
+            ),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name="customuser",
+            index=models.Index(
+                condition=models.Q(("is_active", False)),
+                fields=["created_at", "id"],
+                name="user_inactive_created_idx",
+            ),
+        ),
+    ]
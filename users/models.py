@@ -3,7 +3,30 @@ from django.contrib.auth.models import (
     PermissionsMixin,
     BaseUserManager
 )
-from django.db import models
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+
+from django.db import models, router
+
+from core.response_cache import invalidate
+from core.search import TRIGRAM, SearchIndex
+
+from .hashing import hash_passwords, init_worker
+
+
+@dataclass
+class BulkCreateUsersResult:
+    created: int = 0
+    existing: int = 0
+    duplicates: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        return self.created / self.elapsed if self.elapsed else 0.0
 
 
 class CustomUserManager(BaseUserManager):
@@ -16,6 +39,82 @@ class CustomUserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def bulk_create_users(self, users, batch_size=2000, workers=None):
+        """Cria usuários em massa a partir de dicts com ``email``, ``password`` e demais campos.
+
+        Emails são normalizados e deduplicados na entrada, os já cadastrados
+        são descartados com uma consulta ``email IN (...)`` por lote, as senhas
+        são hasheadas em um pool de processos (o PBKDF2 domina o custo) e cada
+        lote é gravado com ``bulk_create``. O hash do lote seguinte roda
+        enquanto o lote atual é inserido.
+
+        ``bulk_create`` não dispara ``post_save``: cada lote invalida a tag
+        ``users`` do cache de respostas por conta própria. Emails cadastrados
+        por outro processo entre a consulta e a inserção contam como
+        ``existing``, não como ``created``.
+        """
+        workers = workers or os.cpu_count() or 1
+        result = BulkCreateUsersResult()
+        seen = set()
+        start = time.perf_counter()
+
+        def batches():
+            iterator = iter(users)
+            while batch := list(islice(iterator, batch_size)):
+                yield self._prepare_batch(batch, seen, result)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'),)) as pool:
+            pending = None
+            for objs, passwords in batches():
+                chunk = max(1, -(-len(passwords) // workers))
+                hashed = pool.map(hash_passwords, [passwords[i:i + chunk] for i in range(0, len(passwords), chunk)])
+                if pending is not None:
+                    self._insert_batch(*pending, result)
+                pending = (objs, hashed)
+            if pending is not None:
+                self._insert_batch(*pending, result)
+
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _prepare_batch(self, batch, seen, result):
+        entries = {}
+        for data in batch:
+            data = dict(data)
+            email = self.normalize_email(data.pop('email', None) or '')
+            if not email:
+                raise ValueError('O email é obrigatório')
+            if email in seen or email in entries:
+                result.duplicates += 1
+                continue
+            entries[email] = data
+        seen.update(entries)
+
+        existing = set(self.filter(email__in=list(entries)).values_list('email', flat=True))
+        result.existing += len(existing)
+        objs, passwords = [], []
+        for email, data in entries.items():
+            if email in existing:
+                continue
+            passwords.append(data.pop('password', None))
+            objs.append(self.model(email=email, **data))
+        return objs, passwords
+
+    def _insert_batch(self, objs, hashed, result):
+        for obj, password in zip(objs, (p for chunk in hashed for p in chunk)):
+            obj.password = password
+        # ignore_conflicts cobre emails inseridos por outro processo após a verificação.
+        self.bulk_create(objs, ignore_conflicts=True)
+        invalidate('users')
+        # ignore_conflicts não diz quais linhas entraram: as deste lote são as que têm o hash
+        # gerado aqui (o sal é aleatório). Lidas do primário, que acabou de recebê-las.
+        passwords = {obj.email: obj.password for obj in objs}
+        stored = self.using(router.db_for_write(self.model)).filter(email__in=list(passwords))
+        created = sum(passwords[email] == password for email, password in stored.values_list('email', 'password'))
+        result.created += created
+        result.existing += len(objs) - created
+
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', True)
         extra_fields.setdefault('is_superuser', True)
@@ -35,6 +134,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = []
 
     objects = CustomUserManager()
+    # Substring em email e nome, como o icontains; email também por semelhança.
+    search_index = SearchIndex(('email', 'name'), kind=TRIGRAM, fuzzy=('email',))
 
     def __str__(self):
         return self.email
@@ -42,3 +143,10 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = 'Usuário'
         verbose_name_plural = 'Usuários'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='user_created_at_idx'),
+            # Filtros do admin: equipe e inativos são poucos; os demais usam o índice acima.
+            models.Index(fields=['created_at', 'id'], name='user_staff_created_idx', condition=models.Q(is_staff=True)),
+            models.Index(fields=['created_at', 'id'], name='user_inactive_created_idx',
+                         condition=models.Q(is_active=False)),
+        ]
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.response_cache import invalidate
+from .authentication import invalidate_cached_user
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_cache(sender, instance, **kwargs):
+    pk = instance.pk
+    invalidate_cached_user(pk)
+    invalidate('users', f'user:{pk}')
+    # De novo após o commit: uma requisição concorrente pode ter lido a versão antiga.
+    transaction.on_commit(lambda: invalidate_cached_user(pk))
+    transaction.on_commit(lambda: invalidate('users', f'user:{pk}'))
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+def invalidate_user_cache_on_permissions(sender, instance, reverse, pk_set, **kwargs):
+    if not reverse:
+        invalidate_cached_user(instance.pk)
+    elif pk_set:
+        for pk in pk_set:
+            invalidate_cached_user(pk)
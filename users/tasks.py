@@ -0,0 +1,10 @@
+from django.db import DEFAULT_DB_ALIAS
+
+from jobs.registry import task
+from .deletion import BATCH_SIZE, delete_user as delete_user_in_batches
+
+
+@task('users.delete_user')
+def delete_user(job, user_id, database=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE):
+    """``DELETE /api/v1/user/<id>/``: remove o usuário desativado e os dados dele em lotes."""
+    return delete_user_in_batches(user_id, using=database, batch_size=batch_size, progress=job.set_progress)
@@ -1,5 +1,40 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.admin import EstimatedCountPaginator
+from jobs.models import Job, JobStatus
+from jobs.worker import Worker
+from transactions.models import Balance, Transaction
+
+from . import async_views
+from .admin import CustomUserAdmin
+from .authentication import CachedJWTAuthentication, user_cache_key
+from .blacklist import BloomFilter, blacklist_index
+from .deletion import delete_user
+from .serializers import CustomUserSerializer
+from .tokens import RefreshToken
+
+ADMIN_CHANGELIST_URL = '/admin/users/customuser/'
 
 
 class CustomUserManagerTests(TestCase):
@@ -112,3 +147,637 @@ class CustomUserManagerTests(TestCase):
         self.assertFalse(user.check_password('oldpass123'))
         # Verifica se a nova senha funciona
         self.assertTrue(user.check_password('newpass123'))
+
+
+# Mede o caminho da view até o banco: sem o cache de respostas.
+@override_settings(RESPONSE_CACHE={'TIMEOUT': 0})
+class CustomUserListPaginationTests(TestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        self.users = [
+            self.User.objects.create_user(email=f'user{i:02d}@example.com', password='testpass123')
+            for i in range(7)
+        ]
+        # Força empates em created_at para exercitar o desempate por id.
+        self.User.objects.filter(pk__in=[u.pk for u in self.users[2:5]]).update(created_at=self.users[2].created_at)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def collect(self, url, params=None, key='next'):
+        ids = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(u['id'] for u in response.data['results'])
+            url, params = response.data[key], None
+        return ids
+
+    def test_list_is_paginated_without_count(self):
+        """Testa se a listagem é paginada por cursor e não executa COUNT"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/users/', {'page_size': 3})
+
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertNotIn('count', response.data)
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in queries.captured_queries))
+        self.assertFalse(any('OFFSET' in q['sql'].upper() for q in queries.captured_queries))
+
+    def test_walk_all_pages_forward_and_backward(self):
+        """Testa se percorrer as páginas retorna todos os usuários sem repetição"""
+        expected = list(self.User.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        forward = self.collect('/api/v1/users/', {'page_size': 2})
+        self.assertEqual(forward, expected)
+
+        last_page = self.client.get('/api/v1/users/', {'page_size': 2})
+        while last_page.data['next']:
+            last_page = self.client.get(last_page.data['next'])
+        previous = last_page.data['previous']
+        backward = []
+        while previous:
+            response = self.client.get(previous)
+            backward = [u['id'] for u in response.data['results']] + backward
+            previous = response.data['previous']
+        self.assertEqual(backward, expected[:len(backward)])
+        self.assertEqual(len(backward) + len(last_page.data['results']), len(expected))
+
+    def test_ordering_by_email(self):
+        """Testa a ordenação permitida por email"""
+        ids = self.collect('/api/v1/users/', {'page_size': 3, 'ordering': 'email'})
+
+        self.assertEqual(ids, list(self.User.objects.order_by('email').values_list('id', flat=True)))
+
+    def test_unindexed_ordering_is_ignored(self):
+        """Testa se ordenações sem índice (ex.: name) são ignoradas"""
+        response = self.client.get('/api/v1/users/', {'ordering': 'name'})
+
+        expected = list(self.User.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual([u['id'] for u in response.data['results']], expected)
+
+    def test_invalid_cursor(self):
+        """Testa se um cursor inválido retorna 404"""
+        response = self.client.get('/api/v1/users/', {'cursor': 'invalido'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class CustomUserSearchTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.marcos = User.objects.create_user(email='marcos.serra@example.com', password='testpass123', name='Marcos')
+        self.ana = User.objects.create_user(email='ana@example.org', password='testpass123', name='Ana Lúcia')
+        self.admin = User.objects.create_superuser(email='admin@example.net', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, term):
+        response = self.client.get('/api/v1/users/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return {u['id'] for u in response.data['results']}
+
+    def test_search_substring_in_email_and_name(self):
+        """Testa se a busca casa substrings de email e nome, como o icontains"""
+        self.assertEqual(self.search('serra'), {self.marcos.id})
+        self.assertEqual(self.search('LÚCIA'), {self.ana.id})
+        self.assertEqual(self.search('example.org ana'), {self.ana.id})
+        self.assertEqual(self.search('xyz'), set())
+        # Termos curtos demais para trigramas caem no icontains.
+        self.assertEqual(self.search('rg'), {self.ana.id})
+
+    def test_search_follows_updates(self):
+        """Testa se o índice de busca acompanha alterações e exclusões"""
+        self.marcos.email = 'marcos@pulsevault.dev'
+        self.marcos.save()
+        self.assertEqual(self.search('pulsevault'), {self.marcos.id})
+        self.assertEqual(self.search('serra'), set())
+
+        self.marcos.delete()
+        self.assertEqual(self.search('pulsevault'), set())
+
+    def test_admin_search_uses_index(self):
+        """Testa a busca de usuários no admin"""
+        self.client.force_login(self.admin)
+        response = self.client.get('/admin/users/customuser/', {'q': 'serra'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([u.pk for u in response.context['cl'].result_list], [self.marcos.pk])
+
+
+class CustomUserAdminChangelistTests(TestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        self.admin = self.User.objects.create_superuser(email='admin@example.com', password='testpass123')
+        self.users = [
+            self.User.objects.create_user(email=f'user{i:02d}@example.com', password='testpass123', is_active=i % 3 > 0)
+            for i in range(7)
+        ]
+        self.User.objects.filter(pk__in=[u.pk for u in self.users[2:5]]).update(created_at=self.users[2].created_at)
+        self.client.force_login(self.admin)
+        patcher = mock.patch.object(CustomUserAdmin, 'list_per_page', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def walk(self, query='', link='next_url'):
+        ids, url = [], f'{ADMIN_CHANGELIST_URL}{query}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            ids.extend(user.pk for user in changelist.result_list)
+            url = getattr(changelist, link) and ADMIN_CHANGELIST_URL + getattr(changelist, link)
+        return ids, changelist
+
+    def test_walk_pages_by_cursor(self):
+        """Testa se o changelist pagina por cursor, nos dois sentidos, sem OFFSET"""
+        expected = list(self.User.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            forward, last = self.walk()
+        self.assertEqual(forward, expected)
+        self.assertFalse(any('OFFSET' in q['sql'].upper() for q in queries.captured_queries))
+
+        backward, _ = self.walk(last.previous_url, link='previous_url')
+        self.assertEqual(backward, expected[3:6] + expected[:3])
+        self.assertEqual(self.client.get(ADMIN_CHANGELIST_URL + last.first_url).context['cl'].result_list[0].pk, expected[0])
+
+    def test_cursor_keeps_filters_and_ordering(self):
+        """Testa se filtros e ordenação por email valem em todas as páginas e não carregam o cursor"""
+        expected = list(self.User.objects.filter(is_active=True).order_by('email').values_list('pk', flat=True))
+
+        ids, changelist = self.walk('?is_active__exact=1&o=1')
+
+        self.assertEqual(ids, expected)
+        self.assertNotIn('cursor', changelist.get_query_string({'o': '2'}))
+        self.assertEqual(self.client.get(f'{ADMIN_CHANGELIST_URL}?cursor=invalido').status_code, 302)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Estimativa de linhas só existe no PostgreSQL')
+    def test_estimated_count_above_limit(self):
+        """Testa se, acima do limite exato, a contagem vem da estimativa do PostgreSQL"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE users_customuser')
+        queryset = self.User.objects.order_by('-created_at')
+        with mock.patch.object(EstimatedCountPaginator, 'exact_limit', 3):
+            paginator = EstimatedCountPaginator(queryset, 3)
+            self.assertGreater(paginator.count, 3)
+            self.assertFalse(paginator.exact)
+        self.assertEqual((EstimatedCountPaginator(queryset, 3).count, EstimatedCountPaginator(queryset, 3).exact), (8, True))
+
+
+# Mede o caminho da view até o banco: sem o cache de respostas.
+@override_settings(RESPONSE_CACHE={'TIMEOUT': 0})
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='test@example.com', password='testpass123')
+        self.token = str(AccessToken.for_user(self.user))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.url = f'/api/v1/user/{self.user.pk}/'
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        return CachedJWTAuthentication().authenticate(request)
+
+    def test_warm_request_runs_no_auth_query(self):
+        """Testa se, com o cache aquecido, a autenticação não consulta o banco"""
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+
+        self.client.get(self.url)
+        # Apenas a busca do próprio recurso; nenhuma consulta de autenticação.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivation_invalidates_cache(self):
+        """Testa se desativar o usuário invalida o cache e bloqueia o acesso"""
+        self.authenticate()
+        self.assertIsNotNone(cache.get(user_cache_key(self.user.pk)))
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_cache_entry_capped_by_setting(self):
+        """Testa se a entrada do cache vence pelo teto, não pela validade do token"""
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.authenticate()
+        self.assertEqual(cache_set.call_args.args[2], settings.AUTH_USER_CACHE_TIMEOUT)
+        self.assertLessEqual(settings.AUTH_USER_CACHE_TIMEOUT, 5)
+
+        cache.clear()
+        with override_settings(AUTH_USER_CACHE_TIMEOUT=0), mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.authenticate()
+        self.assertGreater(cache_set.call_args.args[2], 3000)
+
+    def test_password_change_and_delete_invalidate_cache(self):
+        """Testa se troca de senha e exclusão removem o usuário do cache"""
+        self.authenticate()
+        self.user.set_password('newpass123')
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+        self.authenticate()
+        pk = self.user.pk
+        self.user.delete()
+        self.assertIsNone(cache.get(user_cache_key(pk)))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_index.reset()
+        self.user = get_user_model().objects.create_user(email='test@example.com', password='testpass123')
+        self.client = APIClient()
+
+    def test_bloom_filter_membership(self):
+        """Testa se o filtro de Bloom nunca dá falso negativo"""
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f'jti-{i}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f'outro-{i}' in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_refresh_rotation_blacklists_old_token(self):
+        """Testa se o refresh token antigo é recusado após a rotação"""
+        pair = self.client.post('/api/token/', {'email': 'test@example.com', 'password': 'testpass123'})
+        old_refresh = pair.data['refresh']
+
+        response = self.client.post('/api/token/refresh/', {'refresh': old_refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data['refresh'], old_refresh)
+
+        reused = self.client.post('/api/token/refresh/', {'refresh': old_refresh})
+        self.assertEqual(reused.status_code, 401)
+        verify = self.client.post('/api/token/verify/', {'token': old_refresh})
+        self.assertEqual(verify.status_code, 400)
+
+    def test_refresh_ignores_cached_user(self):
+        """Testa se o refresh lê o usuário do banco, mesmo com uma cópia ativa no cache"""
+        refresh = self.client.post('/api/token/', {'email': 'test@example.com', 'password': 'testpass123'}).data['refresh']
+        CachedJWTAuthentication().get_user(AccessToken.for_user(self.user))
+        # Desativado por outro processo: o cache deste continua com o usuário ativo.
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_clean_token_check_skips_database(self):
+        """Testa se um token fora da blacklist é verificado sem consultar o banco"""
+        token = RefreshToken.for_user(self.user)
+        blacklist_index.refresh()
+        blacklist_index.sync_interval = 3600
+
+        with self.assertNumQueries(0):
+            RefreshToken(str(token))
+
+    def test_index_syncs_blacklist_from_other_processes(self):
+        """Testa se o índice enxerga tokens bloqueados fora deste processo"""
+        token = RefreshToken.for_user(self.user)
+        blacklist_index.refresh()
+        outstanding = OutstandingToken.objects.get(jti=token['jti'])
+        BlacklistedToken.objects.create(token=outstanding)
+
+        blacklist_index.refresh(force=True)
+
+        self.assertTrue(blacklist_index.is_blacklisted(token['jti']))
+
+    def test_index_syncs_token_committed_out_of_order(self):
+        """Testa se o índice enxerga um id menor confirmado depois de um maior"""
+        tokens = [RefreshToken.for_user(self.user) for _ in range(3)]
+        outstanding = [OutstandingToken.objects.get(jti=token['jti']) for token in tokens]
+        blacklist_index.refresh()
+        first = BlacklistedToken.objects.create(token=outstanding[0])
+        # O id seguinte fica com uma transação ainda aberta; a próxima confirma antes.
+        BlacklistedToken.objects.create(id=first.pk + 2, token=outstanding[2])
+        blacklist_index.refresh(force=True)
+
+        BlacklistedToken.objects.create(id=first.pk + 1, token=outstanding[1])
+        blacklist_index.refresh(force=True)
+
+        self.assertTrue(blacklist_index.might_contain(tokens[1]['jti']))
+
+    def test_prune_tokens_removes_only_expired(self):
+        """Testa se prune_tokens remove apenas tokens expirados, em lotes"""
+        now = timezone.now()
+        for i in range(5):
+            expired = OutstandingToken.objects.create(
+                user=self.user, jti=f'expired-{i}', token='x', expires_at=now - timedelta(days=1),
+            )
+            BlacklistedToken.objects.create(token=expired)
+        valid = OutstandingToken.objects.create(user=self.user, jti='valid', token='x', expires_at=now + timedelta(days=1))
+
+        call_command('prune_tokens', batch_size=2, sleep=0, stdout=io.StringIO())
+
+        self.assertEqual(list(OutstandingToken.objects.values_list('pk', flat=True)), [valid.pk])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class BulkCreateUsersTests(TestCase):
+    def setUp(self):
+        self.User = get_user_model()
+
+    def test_bulk_create_users(self):
+        """Testa a criação em massa com normalização, duplicados e emails existentes"""
+        self.User.objects.create_user(email='existente@example.com', password='testpass123')
+
+        result = self.User.objects.bulk_create_users([
+            {'email': 'ana@EXAMPLE.com', 'password': 'senha-ana', 'name': 'Ana'},
+            {'email': 'ana@example.com', 'password': 'outra'},
+            {'email': 'existente@example.com', 'password': 'x'},
+            {'email': 'bia@example.com', 'password': None},
+        ], batch_size=2, workers=2)
+
+        self.assertEqual((result.created, result.existing, result.duplicates), (2, 1, 1))
+        ana = self.User.objects.get(email='ana@example.com')
+        self.assertEqual(ana.name, 'Ana')
+        self.assertTrue(ana.check_password('senha-ana'))
+        self.assertFalse(self.User.objects.get(email='bia@example.com').has_usable_password())
+
+    def test_bulk_create_counts_only_inserted_rows(self):
+        """Testa se um email cadastrado por outro processo durante o lote não conta como criado"""
+        manager = type(self.User.objects)
+        bulk_create = manager.bulk_create
+
+        def racing(self, objs, **kwargs):
+            get_user_model().objects.create_user(email='bia@example.com', password='outra')
+            return bulk_create(self, objs, **kwargs)
+
+        with mock.patch.object(manager, 'bulk_create', racing):
+            result = self.User.objects.bulk_create_users([
+                {'email': 'ana@example.com', 'password': None},
+                {'email': 'bia@example.com', 'password': None},
+            ], workers=1)
+
+        self.assertEqual((result.created, result.existing), (1, 1))
+        self.assertTrue(self.User.objects.get(email='bia@example.com').check_password('outra'))
+
+    def test_bulk_create_users_command(self):
+        """Testa o comando manage.py bulk_create_users"""
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'usuarios.csv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('email,password,name,is_staff\nana@example.com,senha123,Ana,sim\n')
+
+            call_command('bulk_create_users', path, workers=1, stdout=out)
+
+        self.assertIn('1 usuários criados', out.getvalue())
+        self.assertTrue(self.User.objects.get(email='ana@example.com').is_staff)
+
+
+# Mede o caminho da view até o banco: sem o cache de respostas.
+@override_settings(RESPONSE_CACHE={'TIMEOUT': 0})
+class ValuesReadTests(TestCase):
+    def setUp(self):
+        self.User = get_user_model()
+        self.users = [
+            self.User.objects.create_user(email=f'user{i}@example.com', password='testpass123', name=name)
+            for i, name in enumerate(['Ana', 'João "Jó" Ávila', 'Linha\u2028nova', '😀 \\ \t'])
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def test_list_matches_model_serializer_bytes(self):
+        """Testa se a listagem por .values() gera os mesmos bytes do ModelSerializer"""
+        response = self.client.get('/api/v1/users/')
+
+        users = self.User.objects.order_by('-created_at', '-id')
+        expected = JSONRenderer().render({
+            'next': None, 'previous': None, 'results': CustomUserSerializer(users, many=True).data,
+        })
+        self.assertEqual(response.content, expected)
+        self.assertNotIn('password', response.data['results'][0])
+
+    def test_detail_matches_model_serializer_bytes(self):
+        """Testa se o detalhe por .values() gera os mesmos bytes do ModelSerializer"""
+        user = self.users[2]
+        response = self.client.get(f'/api/v1/user/{user.pk}/')
+
+        self.assertEqual(response.content, JSONRenderer().render(CustomUserSerializer(user).data))
+        self.assertEqual(self.client.get('/api/v1/user/999999/').status_code, 404)
+
+    def test_detail_conditional_get(self):
+        """Testa ETag/Last-Modified do usuário e o 304 enquanto updated_at não muda"""
+        user = self.users[1]
+        url = f'/api/v1/user/{user.pk}/'
+        response = self.client.get(url)
+        self.assertEqual(response['Last-Modified'], http_date(user.updated_at.timestamp()))
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+        user.name = 'Outro nome'
+        user.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.delete(url, HTTP_IF_MATCH=response['ETag']).status_code, 412)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['responses'].clear()
+        self.users = [get_user_model().objects.create_user(email=f'user{i}@example.com', password='testpass123', name=f'U{i}')
+                      for i in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def test_list_and_detail_hits(self):
+        """Testa se o segundo GET vem do cache sem consultar o banco, separado por usuário"""
+        url = f'/api/v1/user/{self.users[1].pk}/'
+        for path in ('/api/v1/users/', url):
+            first = self.client.get(path)
+            self.assertEqual(first['X-Cache'], 'MISS')
+            with self.assertNumQueries(0):
+                hit = self.client.get(path)
+            self.assertEqual((hit['X-Cache'], hit.content, hit.get('ETag')), ('HIT', first.content, first.get('ETag')))
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/api/v1/users/?ordering=email')['X-Cache'], 'MISS')
+        self.client.force_authenticate(self.users[1])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_save_invalidates_user_entries(self):
+        """Testa se salvar um usuário invalida o detalhe dele e a listagem, mas não os outros"""
+        own = f'/api/v1/user/{self.users[0].pk}/'
+        other = f'/api/v1/user/{self.users[1].pk}/'
+        for path in ('/api/v1/users/', own, other):
+            self.client.get(path)
+
+        self.users[1].name = 'Outro nome'
+        self.users[1].save()
+
+        detail = self.client.get(other)
+        self.assertEqual((detail['X-Cache'], detail.json()['name']), ('MISS', 'Outro nome'))
+        self.assertEqual(self.client.get('/api/v1/users/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(own)['X-Cache'], 'HIT')
+
+    def test_bulk_create_invalidates_list(self):
+        """Testa se a criação em massa (sem sinais) invalida a listagem em cache"""
+        self.client.get('/api/v1/users/')
+
+        get_user_model().objects.bulk_create_users([{'email': 'novo@example.com', 'password': None}], workers=1)
+
+        listing = self.client.get('/api/v1/users/')
+        self.assertEqual(listing['X-Cache'], 'MISS')
+        self.assertIn('novo@example.com', [u['email'] for u in listing.data['results']])
+
+    async def test_async_views_share_behaviour(self):
+        """Testa acerto e invalidação também nas views assíncronas"""
+        factory = AsyncRequestFactory()
+        auth = {'Authorization': f'Bearer {AccessToken.for_user(self.users[0])}'}
+        user = self.users[1]
+        view = async_views.CustomUserRetriveUpdateDestroyView.as_view()
+
+        async def get():
+            return await view(factory.get(f'/api/v1/user/{user.pk}/', headers=auth), pk=user.pk)
+
+        first = await get()
+        hit = await get()
+        self.assertEqual((first['X-Cache'], hit['X-Cache'], hit.content), ('MISS', 'HIT', first.content))
+
+        user.name = 'Outro nome'
+        await user.asave()
+        changed = await get()
+        self.assertEqual((changed['X-Cache'], json.loads(changed.content)['name']), ('MISS', 'Outro nome'))
+
+
+class UserDeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123')
+        self.user = User.objects.create_user(email='ana@example.com', password='testpass123')
+        self.user.groups.add(Group.objects.create(name='Clientes'))
+        self.token = RefreshToken.for_user(self.user)
+        Transaction.objects.bulk_create([
+            Transaction(user=user, amount=-100 * (i + 1), date=timezone.localdate() - timedelta(days=i))
+            for user in (self.user, self.admin) for i in range(5)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_delete_deactivates_and_schedules(self):
+        """Testa o 202 com a tarefa: usuário desativado na hora e dados removidos pelo worker"""
+        response = self.client.delete(f'/api/v1/user/{self.user.pk}/')
+
+        self.assertEqual(response.status_code, 202)
+        body = response.json()
+        self.assertEqual(body['status_url'], f'/api/v1/jobs/{body["job"]}/')
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(self.client.get(body['status_url']).json()['status'], JobStatus.QUEUED)
+
+        Worker(['default']).run(burst=True)
+        job = Job.objects.get(pk=body['job'])
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual((job.result['total'], job.result['done']), (7, 7))
+        self.assertEqual(job.result['steps']['transactions.transaction.user'], {'total': 5, 'done': 5})
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Transaction.objects.filter(user_id=self.user.pk).exists())
+        self.assertFalse(Balance.objects.filter(user_id=self.user.pk).exists())
+        self.assertIsNone(OutstandingToken.objects.get(jti=self.token['jti']).user)
+        self.assertEqual(Transaction.objects.filter(user=self.admin).count(), 5)
+        self.assertEqual(self.client.get(f'/api/v1/user/{self.user.pk}/').status_code, 404)
+
+    def test_delete_in_batches_with_progress(self):
+        """Testa lotes limitados, cada um na sua transação, e o andamento a cada lote"""
+        progress = []
+        with mock.patch('users.deletion.PROGRESS_INTERVAL', 0), CaptureQueriesContext(connection) as queries:
+            result = delete_user(self.user.pk, batch_size=2, progress=lambda state: progress.append(state['done']))
+
+        deletes = [q['sql'] for q in queries if q['sql'].startswith('DELETE FROM "transactions_transaction"')]
+        # Três lotes (2, 2 e 1) e a conferência final do Collector, já sem linhas.
+        self.assertEqual(len(deletes), 4)
+        self.assertIn('"date" <=', deletes[0])
+        # Vínculo com o grupo, três lotes de transações e o token.
+        self.assertEqual(progress, [0, 1, 3, 5, 6, 7])
+        self.assertEqual((result['total'], result['done']), (7, 7))
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_delete_is_resumable(self):
+        """Testa se repetir a tarefa continua do que restou e não falha com o usuário já removido"""
+        Transaction.objects.filter(user=self.user, amount__lt=-300)._raw_delete('default')
+
+        result = delete_user(self.user.pk)
+        self.assertEqual(result['steps']['transactions.transaction.user'], {'total': 3, 'done': 3})
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(delete_user(self.user.pk), {'user_id': self.user.pk, 'total': 0, 'done': 0, 'steps': {}})
+
+
+class AsyncUserViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='test@example.com', password='testpass123', name='Test')
+        self.factory = AsyncRequestFactory()
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def test_async_list_and_detail(self):
+        """Testa listagem e detalhe assíncronos com a mesma saída das views DRF"""
+        response = await async_views.CustomUserCreateListView.as_view()(self.factory.get('/api/v1/users/', headers=self.auth))
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual([u['email'] for u in body['results']], ['test@example.com'])
+        self.assertIsNone(body['next'])
+
+        detail = await async_views.CustomUserRetriveUpdateDestroyView.as_view()(
+            self.factory.get(f'/api/v1/user/{self.user.pk}/', headers=self.auth), pk=self.user.pk,
+        )
+        self.assertEqual(json.loads(detail.content)['name'], 'Test')
+
+    async def test_async_create_and_update(self):
+        """Testa criação e atualização pelas views assíncronas"""
+        create = await async_views.CustomUserCreateListView.as_view()(self.factory.post(
+            '/api/v1/users/', {'email': 'novo@example.com', 'password': 'testpass123'}, content_type='application/json', headers=self.auth,
+        ))
+        self.assertEqual(create.status_code, 201)
+        new_id = json.loads(create.content)['id']
+
+        patch = await async_views.CustomUserRetriveUpdateDestroyView.as_view()(self.factory.patch(
+            f'/api/v1/user/{new_id}/', {'name': 'Novo'}, content_type='application/json', headers=self.auth,
+        ), pk=new_id)
+        self.assertEqual(patch.status_code, 200)
+        self.assertEqual((await get_user_model().objects.aget(pk=new_id)).name, 'Novo')
+
+    async def test_async_requires_authentication(self):
+        """Testa se as views assíncronas exigem autenticação"""
+        response = await async_views.CustomUserCreateListView.as_view()(AsyncRequestFactory().get('/api/v1/users/'))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response.headers)
+
+    async def test_async_detail_not_found(self):
+        """Testa o 404 da view assíncrona de detalhe"""
+        response = await async_views.CustomUserRetriveUpdateDestroyView.as_view()(
+            self.factory.get('/api/v1/user/999999/', headers=self.auth), pk=999999,
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_delete_schedules_job(self):
+        """Testa o 202 da exclusão assíncrona com o usuário desativado e a tarefa na fila"""
+        other = await sync_to_async(get_user_model().objects.create_user)(email='outro@example.com', password='testpass123')
+        response = await async_views.CustomUserRetriveUpdateDestroyView.as_view()(
+            self.factory.delete(f'/api/v1/user/{other.pk}/', headers=self.auth), pk=other.pk,
+        )
+
+        self.assertEqual(response.status_code, 202)
+        job = await Job.objects.aget(pk=json.loads(response.content)['job'])
+        self.assertEqual((job.task, job.args['user_id'], job.user_id), ('users.delete_user', other.pk, self.user.pk))
+        await other.arefresh_from_db()
+        self.assertFalse(other.is_active)
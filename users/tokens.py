@@ -0,0 +1,39 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .blacklist import blacklist_index
+
+
+class RefreshToken(BaseRefreshToken):
+    """Refresh token que consulta a blacklist pelo índice em processo.
+
+    ``blacklist()`` e ``outstand()`` gravam com o ``user_id`` do payload em vez
+    de buscar o usuário de novo, e o JTI recém-bloqueado entra no índice na hora.
+    """
+
+    def check_blacklist(self):
+        if blacklist_index.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def outstanding_defaults(self):
+        return {
+            'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+            'created_at': self.current_time,
+            'token': str(self),
+            'expires_at': datetime_from_epoch(self.payload['exp']),
+        }
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        token, _ = OutstandingToken.objects.get_or_create(jti=jti, defaults=self.outstanding_defaults())
+        result = BlacklistedToken.objects.get_or_create(token=token)
+        blacklist_index.add(jti)
+        return result
+
+    def outstand(self):
+        # JTI recém-gerado por set_jti(): não há linha anterior a procurar.
+        return OutstandingToken.objects.create(jti=self.payload[api_settings.JTI_CLAIM], **self.outstanding_defaults())
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from .views import CustomUserCreateListView, CustomUserRetriveUpdateDestroyView
+from . import async_views, views
 
+api = async_views if settings.ASYNC_API else views
 
 urlpatterns = [
-    path('users/', CustomUserCreateListView.as_view(), name='user-create-list'),
-    path('user/<int:pk>/', CustomUserRetriveUpdateDestroyView.as_view(), name='user-detail-view'),
+    path('users/', api.CustomUserCreateListView.as_view(), name='user-create-list'),
+    path('user/<int:pk>/', api.CustomUserRetriveUpdateDestroyView.as_view(), name='user-detail-view'),
 ]
@@ -1,22 +1,55 @@
 from rest_framework import generics
+from django.db import transaction
 from django.http import JsonResponse
+from django.urls import reverse
+from core.mixins import ConditionalMixin, PreconditionFailed, ValuesReadMixin
+from core.response_cache import CachedResponseMixin
+from .deletion import schedule_deletion
 from .models import CustomUser
 from .serializers import CustomUserSerializer
 
 
-class CustomUserCreateListView(generics.ListCreateAPIView):
+class CustomUserCreateListView(CachedResponseMixin, ValuesReadMixin, generics.ListCreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
+    # Ordenações com índice: (created_at, id) e email (único).
+    ordering_fields = ('created_at', 'email')
+    ordering = ('-created_at',)
+    search_fields = ('email', 'name')
 
+    def get_cache_tags(self):
+        # Invalidada pelos sinais de CustomUser; bulk_create_users não dispara sinais e a invalida após cada lote.
+        return ('users',)
 
-class CustomUserRetriveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+
+class CustomUserRetriveUpdateDestroyView(CachedResponseMixin, ConditionalMixin, ValuesReadMixin,
+                                         generics.RetrieveUpdateDestroyAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
 
-    def delete(self, *args, **kwargs):
+    def get_cache_tags(self):
+        return (f'user:{self.kwargs["pk"]}',)
+
+    def delete(self, request, *args, **kwargs):
+        if self.has_write_preconditions():
+            self.evaluate_preconditions(request, *self.get_object_validators())
         instance = self.get_object()
         try:
-            instance.delete()
-            return JsonResponse({'message': 'Usuário deletado com sucesso.'}, status=204)
+            return self.deletion_response(self.perform_destroy(instance))
+        except PreconditionFailed:
+            raise
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
+
+    def perform_destroy(self, instance):
+        # Em vez de instance.delete(): desativa agora e apaga os dados em lotes numa tarefa (users.deletion).
+        with transaction.atomic():
+            self.lock_version(instance)
+            return schedule_deletion(instance, requested_by=self.request.user)
+
+    def deletion_response(self, job):
+        return JsonResponse({
+            'message': 'Usuário desativado; a remoção dos dados está em andamento.',
+            'job': job.pk,
+            'status_url': reverse('job-detail', args=[job.pk]),
+        }, status=202)